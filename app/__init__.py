@@ -2,99 +2,107 @@
 Arquivo principal da aplicação Flask
 Inicializa a aplicação e registra blueprints
 """
+import hashlib
+import json
 import os
 import click
 from flask import Flask
 from flask.cli import with_appcontext
 from werkzeug.security import generate_password_hash
-import cloudinary
 
-from app.config import Config, LEVELS
+from app.config import Config, LEVELS, DEFAULT_CATEGORIES
 from app.extensions import db, login_manager, cache
 from app.models import User, Level, Category
+from app.utils.startup_profile import StartupTimer
 
-# Configuração do spaCy
-# spaCy com lazy loading para melhor performance
-SPACY_AVAILABLE = False
-nlp = None
 
 def get_nlp():
     """Carrega spaCy sob demanda (lazy loading)"""
-    global nlp, SPACY_AVAILABLE
-    if nlp is None:
-        try:
-            import spacy
-            SPACY_AVAILABLE = True
-            try:
-                nlp = spacy.load('pt_core_news_sm')
-            except OSError:
-                print("Modelo pt_core_news_sm não encontrado.")
-                nlp = None
-        except ImportError:
-            SPACY_AVAILABLE = False
-            nlp = None
-    return nlp
+    from app.utils.faq_utils import get_nlp as load_nlp
+    return load_nlp()
 
 
 def create_app(config_class=Config):
     """Factory function para criar a aplicação Flask"""
     app = Flask(__name__, template_folder='../templates', static_folder='../static')
     app.config.from_object(config_class)
+    # Tempo de cada etapa do boot (exibido por `flask startup-profile`)
+    timer = app.startup_profile = StartupTimer()
     
-    # Configurar Cloudinary
-    cloudinary.config(
-        cloud_name=app.config['CLOUDINARY_CLOUD_NAME'],
-        api_key=app.config['CLOUDINARY_API_KEY'],
-        api_secret=app.config['CLOUDINARY_API_SECRET'],
-        secure=True
-    )
+    # O Cloudinary, o SDK do Gemini e o spaCy são carregados no primeiro uso
+    # (upload_image, ai_service.client e faq_utils.get_nlp), não aqui
     
     # Inicializar extensões
-    db.init_app(app)
-    login_manager.init_app(app)
-    login_manager.login_view = 'auth.login'
-    cache.init_app(app, config=Config.get_cache_config())
-    
-    # Inicializar SocketIO para notificações em tempo real
-    from flask_socketio import SocketIO
-    socketio = SocketIO(app, cors_allowed_origins="*")
-    
-    # Inicializar serviço de notificações
-    from app.services.notification_service import init_notification_service
-    init_notification_service(socketio)
-    
-    # Registrar event handlers do SocketIO
-    from app.socketio_events import register_socketio_events
-    register_socketio_events(socketio)
-    
-    # Armazenar socketio no app para acesso posterior
-    app.socketio = socketio
-    
-    # Registrar blueprints
-    from app.routes.auth import auth_bp
-    from app.routes.user import user_bp
-    from app.routes.notifications import notifications_bp
-    from app.routes.admin_logs import admin_logs_bp
-    from app.routes.security import security_bp
-    from app.routes.backup import backup_bp
-    
-    app.register_blueprint(auth_bp)
-    app.register_blueprint(user_bp)
-    app.register_blueprint(notifications_bp)
-    app.register_blueprint(admin_logs_bp)
-    app.register_blueprint(security_bp)
-    app.register_blueprint(backup_bp)
-    
-    # Registrar blueprint da API admin
-    from app.routes.admin_api import admin_api_bp
-    app.register_blueprint(admin_api_bp)
-
+    with timer.phase('extensions'):
+        db.init_app(app)
+        login_manager.init_app(app)
+        login_manager.login_view = 'auth.login'
+        cache.init_app(app, config=Config.get_cache_config())
+        
+        # Configurar prazo e concorrência das chamadas à IA
+        from app.services.ai_service import ai_service
+        ai_service.init_app(app)
     
-    # Importar rotas do app.py original temporariamente
-    # Isso será refatorado gradualmente
-    with app.app_context():
-        from app import legacy_routes
-        legacy_routes.register_routes(app)
+    with timer.phase('socketio'):
+        # Inicializar SocketIO para notificações em tempo real
+        # Com SOCKETIO_MESSAGE_QUEUE, os emits passam pela fila e chegam aos
+        # clientes de todos os workers
+        from flask_socketio import SocketIO
+        from app.services.socketio_queue import socketio_options, DEFAULT_CHANNEL
+        socketio = SocketIO(
+            app, cors_allowed_origins="*", async_mode=app.config.get('SOCKETIO_ASYNC_MODE'),
+            **socketio_options(app.config.get('SOCKETIO_MESSAGE_QUEUE'), app.config.get('SOCKETIO_CHANNEL', DEFAULT_CHANNEL))
+        )
+        
+        # Inicializar serviço de notificações
+        from app.services.notification_service import init_notification_service
+        init_notification_service(socketio)
+        
+        # Anúncios do feed agrupados em lotes 'feed_batch'
+        from app.services.broadcast_aggregator import broadcast_aggregator
+        broadcast_aggregator.init_app(app, socketio)
+        
+        # HP do World Boss enviado em ticks para a sala 'world_boss'
+        from app.services.world_boss_stream import world_boss_stream
+        world_boss_stream.init_app(app, socketio)
+        
+        # Contadores de não lidas mantidos a cada flush/commit de notificações
+        from app.services.unread_counter import unread_counter
+        unread_counter.init_app(app)
+        
+        # Registrar event handlers do SocketIO
+        from app.socketio_events import register_socketio_events
+        register_socketio_events(socketio)
+        
+        # Armazenar socketio no app para acesso posterior
+        app.socketio = socketio
+    
+    with timer.phase('blueprints'):
+        # Registrar blueprints
+        from app.routes.auth import auth_bp
+        from app.routes.user import user_bp
+        from app.routes.notifications import notifications_bp
+        from app.routes.admin_logs import admin_logs_bp
+        from app.routes.security import security_bp
+        from app.routes.backup import backup_bp
+        
+        app.register_blueprint(auth_bp)
+        app.register_blueprint(user_bp)
+        app.register_blueprint(notifications_bp)
+        app.register_blueprint(admin_logs_bp)
+        app.register_blueprint(security_bp)
+        app.register_blueprint(backup_bp)
+        
+        # Registrar blueprint da API admin
+        from app.routes.admin_api import admin_api_bp
+        app.register_blueprint(admin_api_bp)
+    
+    with timer.phase('legacy_routes'):
+        # Importar rotas do app.py original temporariamente
+        # Isso será refatorado gradualmente
+        with app.app_context():
+            from app import legacy_routes
+            legacy_routes.register_routes(app)
     
     # User loader
     @login_manager.user_loader
@@ -102,34 +110,67 @@ def create_app(config_class=Config):
         return User.query.get(int(user_id))
     
     # Context processors
+    # Os níveis vêm do level_cache (sem consulta ao banco) e o resultado é
+    # memorizado em g para as demais renderizações da mesma requisição
+    def _gamification_context():
+        from flask import g
+        from flask_login import current_user
+        from app.services.level_cache import level_cache
+        if 'gamification_context' not in g:
+            level = level_cache.get(current_user.level_id)
+            g.gamification_context = {
+                'user_level': level,
+                'user_level_insignia': level.insignia if level and level.insignia else '',
+                'progress': level_cache.progress(current_user.level_id, current_user.points)
+            }
+        return g.gamification_context
+
     @app.context_processor
     def inject_user_gamification_data():
         from flask_login import current_user
-        if current_user.is_authenticated and current_user.level:
-            return dict(user_level_insignia=current_user.level.insignia)
-        return dict(user_level_insignia='')
+        if current_user.is_authenticated and current_user.level_id:
+            context = _gamification_context()
+            return dict(user_level=context['user_level'], user_level_insignia=context['user_level_insignia'])
+        return dict(user_level=None, user_level_insignia='')
     
     @app.context_processor
     def inject_gamification_progress():
         from flask_login import current_user
         if not current_user.is_authenticated:
             return {}
-        progress_data = {'percentage': 0, 'next_level_points': None}
-        if current_user.level:
-            current_level = current_user.level
-            next_level = Level.query.filter(Level.min_points > current_level.min_points).order_by(Level.min_points.asc()).first()
-            if next_level:
-                points_for_level = next_level.min_points - current_level.min_points
-                points_achieved = current_user.points - current_level.min_points
-                progress_data['percentage'] = max(0, min(100, (points_achieved / points_for_level) * 100 if points_for_level > 0 else 100))
-                progress_data['next_level_points'] = next_level.min_points
-            else:
-                progress_data['percentage'] = 100
-        return dict(progress=progress_data)
+        return dict(progress=_gamification_context()['progress'])
     
     # Inicializar banco de dados
+    from app.services.level_cache import level_cache
+    from app.utils.query_profile import init_query_counter
+    level_cache.init_app(app)
+    from app.services.world_boss import world_boss
+    world_boss.init_app(app)
+    from app.services.challenge_pipeline import challenge_pipeline
+    challenge_pipeline.init_app(app, app.socketio)
     with app.app_context():
-        initialize_database()
+        init_query_counter(app, db.engine)
+        with timer.phase('database'):
+            timer.schema_checked = initialize_database()
+        
+        # Construir índice invertido e matriz de vetores das FAQs
+        # (atualizados incrementalmente pelas rotas de CRUD)
+        with timer.phase('faq_index'):
+            from app.services.faq_index import faq_index
+            from app.services.faq_vectors import faq_vectors
+            from app.services.lemma_service import lemma_service
+            lemma_service.init_app(app)
+            faq_index.build()
+            faq_vectors.init_app(app)
+            faq_vectors.load_or_build()
+        
+        # Rankings pré-calculados (atualizados a cada commit que altera pontos)
+        with timer.phase('leaderboard'):
+            from app.services.team_points import team_points
+            from app.services.leaderboard_service import leaderboard
+            team_points.init_app(app)
+            leaderboard.init_app(app)
+            leaderboard.warm()
     
     # Comandos CLI
     @app.cli.command(name='create-admin')
@@ -141,7 +182,8 @@ def create_app(config_class=Config):
         if User.query.filter_by(email=email).first():
             print(f'Erro: O email {email} já está registrado.')
             return
-        initial_level = Level.query.order_by(Level.min_points).first()
+        from app.services.level_cache import level_cache
+        initial_level = level_cache.initial()
         if not initial_level:
             print('Erro: Nenhum nível inicial encontrado. Execute a inicialização do banco de dados primeiro.')
             return
@@ -157,52 +199,138 @@ def create_app(config_class=Config):
         db.session.commit()
         print(f'Administrador {name} criado com sucesso!')
     
+    @app.cli.command(name='repair-team-points')
+    def repair_team_points():
+        """Recalcula os pontos totais das equipes a partir dos membros."""
+        from app.services.team_points import team_points
+        from app.services.leaderboard_service import leaderboard
+        fixed = team_points.recompute()
+        for team_id, (stored, actual) in sorted(fixed.items()):
+            print(f'Equipe {team_id}: {stored} -> {actual}')
+        leaderboard.rebuild()
+        print(f'{len(fixed)} equipe(s) corrigida(s).')
+    
+    @app.cli.command(name='repair-unread-counts')
+    def repair_unread_counts():
+        """Recalcula os contadores de notificações não lidas dos usuários."""
+        from app.services.unread_counter import unread_counter
+        fixed = unread_counter.recompute()
+        for user_id, (stored, actual) in sorted(fixed.items()):
+            print(f'Usuário {user_id}: {stored} -> {actual}')
+        print(f'{len(fixed)} usuário(s) corrigido(s).')
+    
+    @app.cli.command(name='run-scheduler')
+    def run_scheduler():
+        """Roda os jobs agendados (backups) em um processo dedicado."""
+        import time
+        from app.services.backup_scheduler import backup_scheduler
+        backup_scheduler.init_app(app)
+        if not app.config.get('SOCKETIO_MESSAGE_QUEUE'):
+            print('Aviso: sem SOCKETIO_MESSAGE_QUEUE as notificações não chegam aos workers web.')
+        try:
+            while True:
+                time.sleep(60)
+        except KeyboardInterrupt:
+            backup_scheduler.shutdown()
+    
+    @app.cli.command(name='migrate-db')
+    @click.option('--status', is_flag=True, help='Apenas lista as migrações aplicadas e pendentes.')
+    def migrate_db(status):
+        """Aplica as migrações pendentes do banco de dados."""
+        from app.migrations import migration_runner
+        if status:
+            applied = migration_runner.applied(db.engine)
+            for migration in migration_runner.migrations:
+                info = applied.get(migration.version)
+                if info:
+                    print(f'{migration.version:04d} {migration.name}: aplicada em {info["applied_at"]} ({info["duration_ms"]:.1f} ms)')
+                else:
+                    print(f'{migration.version:04d} {migration.name}: pendente')
+            return
+        results = migration_runner.run(db.engine)
+        # Refaz a verificação completa de esquema e dados padrão
+        initialize_database(force=True)
+        print(f'{len(results)} migração(ões) aplicada(s).')
+    
+    @app.cli.command(name='startup-profile')
+    @click.option('--top', default=15, show_default=True, help='Quantos pacotes listar no ranking de importação.')
+    def startup_profile(top):
+        """Mede o boot a frio: tempo de importação por pacote e de cada etapa do create_app."""
+        from app.utils.startup_profile import profile_startup
+        report = profile_startup(top=top)
+        print(f"Importação do pacote app: {report['import_ms']:.1f} ms")
+        print(f"create_app: {report['create_app_ms']:.1f} ms")
+        print('\nImportações (tempo próprio por pacote raiz):')
+        for name, ms in report['imports']:
+            print(f'  {name:<30} {ms:>9.1f} ms')
+        print('\nEtapas do create_app:')
+        for name, ms in report['phases']:
+            print(f'  {name:<30} {ms:>9.1f} ms')
+        print(f"\nVerificação de esquema executada: {'sim' if report['schema_checked'] else 'não (versão em dia)'}")
+        if report['deferred_loaded']:
+            print(f"Atenção: módulos adiados carregados no boot: {', '.join(report['deferred_loaded'])}")
+    
     return app
 
 
-def initialize_database():
-    """Inicializa o banco de dados com dados padrão"""
-    db.create_all()
+def _boot_version():
+    """
+    Impressão digital do esquema e dos dados padrão esperados por este código
+
+    Muda quando entra uma migração, uma tabela nova ou um nível/categoria novo.
+    """
+    from app.migrations import migration_runner
+    payload = json.dumps([
+        migration_runner.latest_version,
+        sorted(db.metadata.tables),
+        LEVELS,
+        DEFAULT_CATEGORIES
+    ], sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def initialize_database(force=False):
+    """
+    Inicializa o banco de dados com dados padrão
+
+    A verificação completa (create_all, migrações e seed) só roda quando a
+    versão gravada em schema_meta difere da atual; nos demais boots custa uma
+    única consulta.
+
+    Returns:
+        bool: True se o esquema foi verificado, False se já estava em dia
+    """
+    from app.migrations import migration_runner
+    boot_version = _boot_version()
+    if not force and migration_runner.get_meta(db.engine, 'boot_version') == boot_version:
+        return False
     
-    # --- AUTO-MIGRATION: Adicionar colunas faltantes ---
-    try:
-        from sqlalchemy import text
-        inspector = db.inspect(db.engine)
-        
-        # Verificar e corrigir tabela user_path_progress
-        if inspector.has_table('user_path_progress'):
-            columns = [c['name'] for c in inspector.get_columns('user_path_progress')]
-            if 'started_at' not in columns:
-                print("Auto-migration: Adding 'started_at' to 'user_path_progress'...")
-                try:
-                    # Tentar sintaxe PostgreSQL
-                    with db.engine.connect() as conn:
-                        conn.execute(text("ALTER TABLE user_path_progress ADD COLUMN started_at TIMESTAMP DEFAULT NOW() NOT NULL"))
-                        conn.commit()
-                    print("Auto-migration: Column added (PostgreSQL).")
-                except Exception as e:
-                    print(f"Auto-migration (PG) failed: {e}")
-                    try:
-                        # Tentar sintaxe SQLite
-                        with db.engine.connect() as conn:
-                            conn.execute(text("ALTER TABLE user_path_progress ADD COLUMN started_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL"))
-                            conn.commit()
-                        print("Auto-migration: Column added (SQLite).")
-                    except Exception as e2:
-                        print(f"Auto-migration (SQLite) failed: {e2}")
-    except Exception as e:
-        print(f"Auto-migration error: {e}")
-    # ---------------------------------------------------
+    # Banco novo: create_all já gera o esquema atual, basta marcar as migrações
+    fresh = not db.inspect(db.engine).has_table('user')
+    db.create_all()
+    if fresh:
+        migration_runner.stamp(db.engine)
+    else:
+        migration_runner.run(db.engine)
     
+    existing_levels = {name for (name,) in db.session.query(Level.name)}
+    levels_added = False
     for level_name, level_data in LEVELS.items():
-        if not Level.query.filter_by(name=level_name).first():
+        if level_name not in existing_levels:
             level = Level(name=level_name, min_points=level_data['min_points'], insignia=level_data['insignia'])
             db.session.add(level)
+            levels_added = True
     
-    categories = ['Hardware', 'Software', 'Rede', 'Outros', 'Mobile', 'Automation']
-    for category_name in categories:
-        if not Category.query.filter_by(name=category_name).first():
+    existing_categories = {name for (name,) in db.session.query(Category.name)}
+    for category_name in DEFAULT_CATEGORIES:
+        if category_name not in existing_categories:
             category = Category(name=category_name)
             db.session.add(category)
     
     db.session.commit()
+    if levels_added:
+        from app.services.level_cache import level_cache
+        level_cache.invalidate()
+    
+    migration_runner.set_meta(db.engine, 'boot_version', boot_version)
+    return True
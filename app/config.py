@@ -28,6 +28,34 @@ class Config:
     # Configurações de Cache
     REDIS_URL = os.getenv('REDIS_URL')
     
+    # Configurações da IA (Gemini)
+    AI_TIMEOUT_SECONDS = float(os.getenv('AI_TIMEOUT_SECONDS', '8'))
+    AI_MAX_CONCURRENCY = int(os.getenv('AI_MAX_CONCURRENCY', '4'))
+    
+    # Socket Unix do sidecar de NLP (python -m app.services.nlp_sidecar); vazio = spaCy no próprio worker
+    NLP_SIDECAR_SOCKET = os.getenv('NLP_SIDECAR_SOCKET') or None
+    
+    # Modo assíncrono do Socket.IO (None = detectar; 'threading' evita importar o eventlet)
+    SOCKETIO_ASYNC_MODE = os.getenv('SOCKETIO_ASYNC_MODE') or None
+    
+    # Fila de mensagens do Socket.IO para vários workers/máquinas (redis://..., unix:///hub.sock);
+    # sem fila, os emits só alcançam clientes do próprio processo (--workers 1)
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE') or REDIS_URL
+    SOCKETIO_CHANNEL = os.getenv('SOCKETIO_CHANNEL', 'oraculo-socketio')
+    
+    # Anúncios globais do feed (desafios, níveis, conquistas, bosses) saem em um
+    # único 'feed_batch' por janela, com no máximo FEED_BATCH_MAX_EVENTS (amostrados)
+    FEED_BATCH_WINDOW_SECONDS = float(os.getenv('FEED_BATCH_WINDOW_SECONDS', '1'))
+    FEED_BATCH_MAX_EVENTS = int(os.getenv('FEED_BATCH_MAX_EVENTS', '50'))
+    
+    # Dano do World Boss: 0/1 = UPDATE atômico direto na linha do evento; N > 1 =
+    # N fatias somadas em current_hp a cada WORLD_BOSS_MERGE_SECONDS (menos disputa no PostgreSQL)
+    WORLD_BOSS_DAMAGE_SHARDS = int(os.getenv('WORLD_BOSS_DAMAGE_SHARDS', '0'))
+    WORLD_BOSS_MERGE_SECONDS = float(os.getenv('WORLD_BOSS_MERGE_SECONDS', '2'))
+    # Ticks por segundo do stream de HP e validade do snapshot do evento ativo no cache
+    WORLD_BOSS_STREAM_HZ = float(os.getenv('WORLD_BOSS_STREAM_HZ', '4'))
+    WORLD_BOSS_SNAPSHOT_SECONDS = int(os.getenv('WORLD_BOSS_SNAPSHOT_SECONDS', '30'))
+    
     @staticmethod
     def get_cache_config():
         """Retorna configuração de cache baseada na disponibilidade do Redis"""
@@ -47,3 +75,6 @@ LEVELS = {
     'Expert': {'min_points': 600, 'insignia': '⭐'},
     'Master': {'min_points': 1000, 'insignia': '👑'}
 }
+
+# Categorias de FAQ criadas na inicialização do banco
+DEFAULT_CATEGORIES = ['Hardware', 'Software', 'Rede', 'Outros', 'Mobile', 'Automation']
@@ -5,6 +5,7 @@ from flask import request, jsonify, flash, redirect, url_for
 from app.services.ai_challenge_service import ai_challenge_service
 from app.models.challenges import Challenge, UserChallenge
 from app.extensions import db
+from app.utils.gamification_utils import award_points
 from flask_login import current_user, login_required
 
 
@@ -46,7 +47,7 @@ def submit_challenge(challenge_id):
         db.session.add(user_challenge)
         
         # Adicionar pontos
-        current_user.points += challenge.points_reward
+        award_points(current_user, challenge.points_reward, 'challenge', challenge.id)
         db.session.commit()
         
         flash(f'✅ {feedback}', 'success')
@@ -85,7 +86,7 @@ def get_challenge_hint(challenge_id):
     )
     
     # Deduzir pontos
-    current_user.points -= challenge.hint_cost
+    award_points(current_user, -challenge.hint_cost, 'hint', challenge.id)
     db.session.commit()
     
     return jsonify({
@@ -16,7 +16,6 @@ import json
 import re
 import random
 import io
-import cloudinary.uploader
 from datetime import datetime, timedelta
 
 from app.extensions import db
@@ -25,6 +24,10 @@ from app.forms import BaseForm
 from app.utils import *
 from app.services.ai_service import ai_service
 from app.services.audit_service import audit_service
+from app.services.team_points import team_points
+from app.services.level_cache import level_cache
+from app.services.world_boss_stream import world_boss_stream
+from app.services.challenge_pipeline import challenge_pipeline
 
 
 def register_routes(app):
@@ -41,15 +44,9 @@ def register_routes(app):
             hunt_progress = UserHuntProgress.query.filter_by(user_id=current_user.id, hunt_id=active_hunt.id).first()
 
         
-        active_event = GlobalEvent.query.filter(
-            GlobalEvent.is_active == True,
-            GlobalEvent.end_date >= datetime.utcnow(),
-            GlobalEvent.current_hp > 0
-        ).first()
-
-        event_progress = 0
-        if active_event:
-            event_progress = ((active_event.total_hp - active_event.current_hp) / active_event.total_hp) * 100
+        # Snapshot em cache, atualizado pelo stream de HP
+        active_event = world_boss_stream.snapshot()
+        event_progress = active_event.progress if active_event else 0
 
         return render_template('dashboard.html', 
                                 daily_challenge=daily_challenge,
@@ -73,25 +70,9 @@ def register_routes(app):
     @app.route('/ranking')
     @login_required
     def ranking():
-        ranked_users = User.query.order_by(User.points.desc()).all()
-        all_teams = Team.query.all()
-        ranked_teams = sorted(all_teams, key=lambda t: t.total_points, reverse=True)
-        start_of_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        monthly_leaders = db.session.query(
-            User, func.sum(Challenge.points_reward).label('monthly_points')
-        ).join(UserChallenge, User.id == UserChallenge.user_id).join(Challenge, Challenge.id == UserChallenge.challenge_id).filter(UserChallenge.completed_at >= start_of_month).group_by(User).order_by(func.sum(Challenge.points_reward).desc()).limit(10).all()
-        start_of_week = datetime.utcnow() - timedelta(days=datetime.utcnow().weekday())
-        start_of_week = start_of_week.replace(hour=0, minute=0, second=0, microsecond=0)
-        weekly_leaders = db.session.query(
-            User, func.sum(Challenge.points_reward).label('weekly_points')
-        ).join(UserChallenge, User.id == UserChallenge.user_id).join(Challenge, Challenge.id == UserChallenge.challenge_id).filter(UserChallenge.completed_at >= start_of_week).group_by(User).order_by(func.sum(Challenge.points_reward).desc()).limit(10).all()
-        return render_template(
-            'ranking.html', 
-            ranked_users=ranked_users, 
-            ranked_teams=ranked_teams,
-            monthly_leaders=monthly_leaders,
-            weekly_leaders=weekly_leaders
-        )
+        from app.services.leaderboard_service import leaderboard
+        page = request.args.get('page', 1, type=int)
+        return render_template('user/ranking.html', **leaderboard.ranking_context(current_user, page=page))
     
     # --- ROTAS DE CHAT ---
     @app.route('/chat-page')
@@ -100,6 +81,32 @@ def register_routes(app):
         session.pop('faq_selection', None)
         return render_template('chat/chat.html')
     
+    def _stream_ai_response(mensagem, stream_id=None):
+        """
+        Modo streaming: respostas em cache voltam inteiras (str); senão os pedaços
+        seguem pela sala user_<id> e o retorno é o JSON de /chat com state='streaming'.
+        Retorna None se a IA não responder a tempo (segue para as FAQs).
+        """
+        from app.services.ai_cache import ai_response_cache
+        from app.services.chat_stream import chat_stream_service
+        if not ai_service.client:
+            return None
+        cached = ai_response_cache.get('chat', ai_response_cache.make_key('chat', mensagem))
+        if cached:
+            return cached
+        stream = ai_service.stream_response(mensagem)
+        if stream is None:
+            return None
+        stream_id = chat_stream_service.start(current_user.id, mensagem, stream, stream_id)
+        return {
+            'text': stream.text,
+            'html': True,
+            'state': 'streaming',
+            'stream_id': stream_id,
+            'options': [],
+            'suggestion': None
+        }
+    
     @app.route('/chat', methods=['POST'])
     @login_required
     def chat():
@@ -122,7 +129,7 @@ def register_routes(app):
                         return jsonify({'text': resposta_caca, 'html': True, 'state': 'normal', 'options': []})
                     else:
                         progress.completed_at = datetime.utcnow()
-                        current_user.points += active_hunt.reward_points
+                        award_points(current_user, active_hunt.reward_points, 'hunt', active_hunt.id)
                         update_user_level(current_user)
                         check_and_award_achievements(current_user)
                         db.session.commit()
@@ -148,32 +155,39 @@ def register_routes(app):
             return jsonify(resposta)
         
         # --- TENTATIVA DE RESPOSTA VIA AI (GEMINI) ---
-        ai_response = ai_service.generate_response(mensagem)
+        # Com prazo: se a IA demorar ou estiver saturada, segue para as FAQs
+        if data.get('stream'):
+            ai_response = _stream_ai_response(mensagem, data.get('stream_id'))
+            if isinstance(ai_response, dict):
+                return jsonify(ai_response)
+        else:
+            ai_response = ai_service.generate_response(mensagem)
         if ai_response:
             resposta['text'] = ai_response
             resposta['html'] = True # AI retorna Markdown que será renderizado
             return jsonify(resposta)
         
         faq_matches = find_faq_by_nlp(mensagem)
+        if not faq_matches:
+            # Nenhum lema em comum: tentar aproximação por similaridade de vetores
+            faq_matches = find_faq_by_similarity(mensagem)
         if faq_matches:
             if len(faq_matches) == 1:
                 faq = faq_matches[0]
                 resposta['text'] = format_faq_response(faq.id, faq.question, faq.answer, faq.image_url, faq.video_url, faq.file_name)
                 resposta['html'] = True
                 
-                from app.utils.faq_utils import nlp
-                if nlp:
-                    doc = nlp(faq.question.lower())
-                    keywords = {token.lemma_ for token in doc if not token.is_stop and not token.is_punct and token.pos_ == 'NOUN'}
-                    if keywords:
-                        relevant_challenge = Challenge.query.filter(Challenge.title.ilike(f'%{next(iter(keywords))}%')).first()
-                        if relevant_challenge:
-                            is_completed = UserChallenge.query.filter_by(user_id=current_user.id, challenge_id=relevant_challenge.id).first()
-                            if not is_completed:
-                                resposta['suggestion'] = {
-                                    'text': f"Parece que você está interessado neste tópico! Que tal tentar o desafio '{relevant_challenge.title}' e ganhar {relevant_challenge.points_reward} pontos?",
-                                    'challenge_id': relevant_challenge.id
-                                }
+                from app.services.lemma_service import lemma_service
+                keywords = lemma_service.analyze_faq(faq).question_nouns
+                if keywords:
+                    relevant_challenge = Challenge.query.filter(Challenge.title.ilike(f'%{keywords[0]}%')).first()
+                    if relevant_challenge:
+                        is_completed = UserChallenge.query.filter_by(user_id=current_user.id, challenge_id=relevant_challenge.id).first()
+                        if not is_completed:
+                            resposta['suggestion'] = {
+                                'text': f"Parece que você está interessado neste tópico! Que tal tentar o desafio '{relevant_challenge.title}' e ganhar {relevant_challenge.points_reward} pontos?",
+                                'challenge_id': relevant_challenge.id
+                            }
             else:
                 faq_ids = [faq.id for faq in faq_matches]
                 session['faq_selection'] = faq_ids
@@ -274,6 +288,7 @@ def register_routes(app):
                 )
                 db.session.add(new_faq)
                 db.session.commit()
+                index_faqs([new_faq])
                 
                 # Registrar log de auditoria
                 audit_service.log_create(
@@ -297,8 +312,8 @@ def register_routes(app):
                     flash('Categoria já existe.', 'warning')
                 return redirect(url_for('admin_faq'))
         
-        all_faqs = FAQ.query.all()
-        return render_template('admin/admin_faq.html', faqs=all_faqs, categories=categories, form=form)
+        faq_page = paginate_request(with_profile(FAQ.query, 'admin_faq'), (FAQ.id,))
+        return render_template('admin/admin_faq.html', faqs=faq_page.items, pagination=faq_page, categories=categories, form=form)
 
     @app.route('/faqs/edit/<int:faq_id>', methods=['GET', 'POST'])
     @login_required
@@ -318,6 +333,7 @@ def register_routes(app):
                 faq.file_name = file.filename
                 faq.file_data = file.read()
             db.session.commit()
+            index_faqs([faq])
             flash('FAQ atualizada com sucesso!', 'success')
             return redirect(url_for('faqs'))
         return redirect(url_for('faqs', edit=faq_id))
@@ -340,6 +356,7 @@ def register_routes(app):
         
         db.session.delete(faq)
         db.session.commit()
+        unindex_faqs([faq_id])
         flash('FAQ excluída com sucesso!', 'success')
         return redirect(url_for('faqs'))
 
@@ -355,6 +372,7 @@ def register_routes(app):
             for faq in FAQs_to_delete:
                 db.session.delete(faq)
             db.session.commit()
+            unindex_faqs(faq_ids)
             flash(f'{len(faq_ids)} FAQs excluídas com sucesso!', 'success')
         else:
             flash('Nenhuma FAQ selecionada para exclusão.', 'error')
@@ -387,12 +405,13 @@ def register_routes(app):
     @app.route('/challenges')
     @login_required
     def list_challenges():
-        if not current_user.level:
+        user_level = level_cache.get(current_user.level_id)
+        if not user_level:
             flash('Não foi possível determinar o seu nível. Contate o suporte.', 'error')
             return redirect(url_for('user.index'))
         form = BaseForm()
         completed_challenges_ids = [uc.challenge_id for uc in current_user.completed_challenges]
-        user_min_points = current_user.level.min_points
+        user_min_points = user_level.min_points
         RequiredLevel = aliased(Level)
         all_challenges_query = db.session.query(Challenge).filter(Challenge.id.notin_(completed_challenges_ids))
         all_challenges_query = all_challenges_query.join(RequiredLevel, Challenge.level_required == RequiredLevel.name)
@@ -410,7 +429,7 @@ def register_routes(app):
         if current_user.points < challenge.hint_cost:
             return jsonify({'error': 'Você não tem pontos suficientes para comprar esta dica.'}), 400
         
-        current_user.points -= challenge.hint_cost
+        award_points(current_user, -challenge.hint_cost, 'hint', challenge.id)
         db.session.commit()
         
         return jsonify({'hint': challenge.hint, 'new_points': current_user.points})
@@ -433,59 +452,20 @@ def register_routes(app):
             is_correct = submitted_answer.lower() == challenge.expected_answer.lower()
 
         if is_correct:
-            existing_completion = UserChallenge.query.filter_by(user_id=current_user.id, challenge_id=challenge_id).first()
-            if not existing_completion:
-                current_user.points += challenge.points_reward
-                flash_message = f'Parabéns! Completou o desafio "{challenge.title}" e ganhou {challenge.points_reward} pontos!'
-                
-                today_challenge_entry = DailyChallenge.query.filter_by(day=date.today()).first()
-                if today_challenge_entry and today_challenge_entry.challenge_id == challenge.id:
-                    current_user.points += today_challenge_entry.bonus_points
-                    flash_message += f' Você ganhou {today_challenge_entry.bonus_points} pontos de bônus por completar o desafio do dia!'
-                
-                completion = UserChallenge(user_id=current_user.id, challenge_id=challenge_id)
-                db.session.add(completion)
-
-                # Lógica do Evento Global (World Boss)
-                active_event = GlobalEvent.query.filter(
-                    GlobalEvent.is_active == True,
-                    GlobalEvent.start_date <= datetime.utcnow(),
-                    GlobalEvent.end_date >= datetime.utcnow(),
-                    GlobalEvent.current_hp > 0
-                ).first()
-
-                if active_event:
-                    damage = challenge.points_reward
-                    active_event.current_hp = max(0, active_event.current_hp - damage)
-                    contribution = GlobalEventContribution.query.filter_by(event_id=active_event.id, user_id=current_user.id).first()
-                    if contribution:
-                        contribution.contribution_points += damage
-                    else:
-                        contribution = GlobalEventContribution(event_id=active_event.id, user_id=current_user.id, contribution_points=damage)
-                        db.session.add(contribution)
-                    flash(f'Você causou {damage} de dano ao Boss Global!', 'success')
-                    if active_event.current_hp == 0:
-                        flash(f'O Boss Global "{active_event.name}" foi derrotado!', 'success')
-
-                # Lógica da Batalha de Equipas
-                if current_user.team:
-                    active_battles = TeamBattle.query.filter(
-                        (TeamBattle.challenging_team_id == current_user.team_id) | (TeamBattle.challenged_team_id == current_user.team_id),
-                        TeamBattle.status == 'active'
-                    ).all()
-
-                    for battle in active_battles:
-                        battle_challenge = TeamBattleChallenge.query.filter_by(battle_id=battle.id, challenge_id=challenge_id).first()
-                        if battle_challenge and not battle_challenge.completed_by_team_id:
-                            battle_challenge.completed_by_team_id = current_user.team_id
-                            battle_challenge.completed_at = datetime.utcnow()
-                            flash(f'A sua equipa marcou pontos na batalha contra "{battle.challenged_team.name if battle.challenging_team_id == current_user.team_id else battle.challenging_team.name}"!', 'info')
-
-                check_and_complete_paths(current_user, challenge_id)
-                update_user_level(current_user)
-                db.session.commit()
-                check_and_award_achievements(current_user)
-                db.session.commit()
+            # Prêmio em uma transação; trilhas, conquistas, notificações e feed
+            # seguem para o executor após o commit
+            challenge_title = challenge.title
+            result = challenge_pipeline.complete(current_user, challenge)
+            if result:
+                flash_message = f'Parabéns! Completou o desafio "{challenge_title}" e ganhou {result.points} pontos!'
+                if result.bonus:
+                    flash_message += f' Você ganhou {result.bonus} pontos de bônus por completar o desafio do dia!'
+                if result.damage and result.damage.damage:
+                    flash(f'Você causou {result.damage.damage} de dano ao Boss Global!', 'success')
+                if result.damage and result.damage.defeated:
+                    flash(f'O Boss Global "{result.boss_name}" foi derrotado!', 'success')
+                for opponent in result.battles:
+                    flash(f'A sua equipa marcou pontos na batalha contra "{opponent}"!', 'info')
                 flash(flash_message, 'success')
             else:
                 flash('Você já completou este desafio.', 'info')
@@ -519,7 +499,9 @@ def register_routes(app):
                 flash(f'Equipe "{team_name}" criada com sucesso!', 'success')
             return redirect(url_for('teams_list'))
                 
-        all_teams = Team.query.all()
+        standings = team_points.standings()
+        all_teams = [team for team, _ in standings]
+        member_counts = {team.id: count for team, count in standings}
         active_battles = []
         if current_user.team:
             active_battles = TeamBattle.query.filter(
@@ -527,7 +509,7 @@ def register_routes(app):
                 TeamBattle.status == 'active'
             ).all()
 
-        return render_template('teams/teams.html', teams=all_teams, form=form, active_battles=active_battles)
+        return render_template('teams/teams.html', teams=all_teams, member_counts=member_counts, form=form, active_battles=active_battles)
 
     @app.route('/team/<int:team_id>')
     @login_required
@@ -622,8 +604,8 @@ def register_routes(app):
             flash('Acesso negado. Apenas administradores podem acessar esta página.', 'error')
             return redirect(url_for('user.index'))
         form = BaseForm()
-        all_users = User.query.order_by(User.name).all()
-        return render_template('admin/admin_users.html', users=all_users, form=form)
+        user_page = paginate_request(with_profile(User.query, 'admin_users'), (User.name, User.id), descending=False)
+        return render_template('admin/admin_users.html', users=user_page.items, pagination=user_page, form=form)
 
     @app.route('/admin/toggle_admin/<int:user_id>', methods=['POST'])
     @login_required
@@ -707,6 +689,8 @@ def register_routes(app):
         UserChallenge.query.filter_by(user_id=user.id).delete()
         UserPathProgress.query.filter_by(user_id=user.id).delete()
         UserHuntProgress.query.filter_by(user_id=user.id).delete()
+        PointsLedger.query.filter_by(user_id=user.id).delete()
+        PointsDailyBucket.query.filter_by(user_id=user.id).delete()
         
         db.session.delete(user)
         db.session.commit()
@@ -760,8 +744,13 @@ def register_routes(app):
             flash('Acesso negado.', 'error')
             return redirect(url_for('user.index'))
         form = BaseForm()
-        all_teams = Team.query.all()
-        return render_template('admin/admin_teams.html', teams=all_teams, form=form)
+        # Cursor pela chave primária: points_total muda a cada desafio concluído e
+        # faria equipes pularem ou repetirem entre as páginas (a classificação por
+        # pontos fica no leaderboard). Membros só das equipes da página
+        team_page = paginate_request(with_profile(Team.query, 'admin_teams'), (Team.id,), descending=False)
+        member_counts = team_points.member_counts([team.id for team in team_page.items])
+        return render_template('admin/admin_teams.html', teams=team_page.items, member_counts=member_counts,
+                               pagination=team_page, form=form)
 
     @app.route('/admin/delete_team/<int:team_id>', methods=['POST'])
     @login_required
@@ -808,11 +797,12 @@ def register_routes(app):
                 insignia_file = request.files.get('insignia_image')
                 insignia_url = None
                 if insignia_file:
-                    upload_result = cloudinary.uploader.upload(insignia_file)
+                    upload_result = upload_image(insignia_file)
                     insignia_url = upload_result['secure_url']
                 level = Level(name=name, min_points=min_points, insignia=insignia_url)
                 db.session.add(level)
                 db.session.commit()
+                level_cache.invalidate()
                 
                 # Registrar log de auditoria
                 audit_service.log_create(
@@ -836,6 +826,7 @@ def register_routes(app):
                             )
                             db.session.add(level)
                         db.session.commit()
+                        level_cache.invalidate()
                         flash('Níveis importados com sucesso!', 'success')
                     except Exception as e:
                         flash(f'Erro ao importar níveis: {str(e)}', 'error')
@@ -868,6 +859,7 @@ def register_routes(app):
         
         db.session.delete(level)
         db.session.commit()
+        level_cache.invalidate()
         flash('Nível excluído com sucesso!', 'success')
         return redirect(url_for('admin_levels'))
 
@@ -1001,9 +993,11 @@ def register_routes(app):
                 else:
                     flash('Por favor, envie um arquivo JSON válido.', 'error')
             return redirect(url_for('admin_paths'))
-        all_paths = LearningPath.query.all()
-        all_challenges = Challenge.query.all()
-        return render_template('admin/admin_paths.html', paths=all_paths, challenges=all_challenges, form=form)
+        path_page = paginate_request(with_profile(LearningPath.query, 'admin_paths'), (LearningPath.id,), descending=False)
+        # O seletor de desafios só usa id e título
+        all_challenges = db.session.query(Challenge.id, Challenge.title).order_by(Challenge.id).all()
+        return render_template('admin/admin_paths.html', paths=path_page.items, challenges=all_challenges,
+                               pagination=path_page, form=form)
 
     @app.route('/path/<int:path_id>')
     @login_required
@@ -1103,7 +1097,7 @@ def register_routes(app):
                 icon_file = request.files.get('icon_image')
                 icon_url = None
                 if icon_file:
-                    upload_result = cloudinary.uploader.upload(icon_file)
+                    upload_result = upload_image(icon_file)
                     icon_url = upload_result['secure_url']
                 achievement = Achievement(
                     name=name,
@@ -1202,7 +1196,7 @@ def register_routes(app):
                 boss_image = request.files.get('boss_image')
                 image_url = None
                 if boss_image:
-                    upload_result = cloudinary.uploader.upload(boss_image)
+                    upload_result = upload_image(boss_image)
                     image_url = upload_result['secure_url']
                 boss = BossFight(
                     name=name,
@@ -1270,8 +1264,9 @@ def register_routes(app):
                 else:
                     flash('Por favor, envie um arquivo JSON válido.', 'error')
             return redirect(url_for('admin_boss_fights'))
-        boss_fights = BossFight.query.all()
-        return render_template('admin/admin_boss_fights.html', boss_fights=boss_fights, form=form)
+        boss_page = paginate_request(with_profile(BossFight.query, 'admin_boss_fights'), (BossFight.id,), descending=False)
+        return render_template('admin/admin_boss_fights.html', boss_fights=boss_page.items,
+                               pagination=boss_page, form=form)
 
     @app.route('/admin/edit_boss_fight/<int:boss_id>', methods=['POST'])
     @login_required
@@ -1553,6 +1548,7 @@ def register_routes(app):
             )
             db.session.add(new_event)
             db.session.commit()
+            world_boss_stream.invalidate()
             flash('Evento Global criado com sucesso!', 'success')
             return redirect(url_for('admin_events'))
 
@@ -1582,6 +1578,7 @@ def register_routes(app):
             event.is_active = 'is_active' in request.form
             
             db.session.commit()
+            world_boss_stream.invalidate()
             flash('Evento Global atualizado com sucesso!', 'success')
             return redirect(url_for('admin_events'))
 
@@ -1601,6 +1598,7 @@ def register_routes(app):
         event = GlobalEvent.query.get_or_404(event_id)
         db.session.delete(event)
         db.session.commit()
+        world_boss_stream.invalidate()
         flash('Evento Global apagado com sucesso.', 'success')
         return redirect(url_for('admin_events'))
 
@@ -1669,8 +1667,8 @@ def register_routes(app):
             flash('Acesso negado.', 'error')
             return redirect(url_for('user.index'))
         
-        battles = TeamBattle.query.order_by(TeamBattle.start_time.desc()).all()
-        return render_template('admin/admin_battles.html', battles=battles, form=BaseForm())
+        battle_page = paginate_request(with_profile(TeamBattle.query, 'admin_battles'), (TeamBattle.start_time, TeamBattle.id))
+        return render_template('admin/admin_battles.html', battles=battle_page.items, pagination=battle_page, form=BaseForm())
 
     @app.route('/admin/battles/delete/<int:battle_id>', methods=['POST'])
     @login_required
@@ -1738,6 +1736,7 @@ def register_routes(app):
             try:
                 content = json.load(file.stream)
                 counts = {'faqs': 0, 'desafios': 0, 'trilhas': 0, 'boss_fights': 0, 'caca_tesouros': 0, 'eventos_globais': 0}
+                imported_faqs = []
 
                 if 'import_faqs' in request.form and 'faqs' in content:
                     existing_questions = {f.question for f in FAQ.query.all()}
@@ -1751,6 +1750,7 @@ def register_routes(app):
                             
                             new_faq = FAQ(category_id=category.id, **{k: v for k, v in faq_data.items() if k != 'category'})
                             db.session.add(new_faq)
+                            imported_faqs.append(new_faq)
                             counts['faqs'] += 1
 
                 if 'import_desafios' in request.form and 'desafios' in content:
@@ -1820,6 +1820,10 @@ def register_routes(app):
                             counts['eventos_globais'] += 1
 
                 db.session.commit()
+                if imported_faqs:
+                    index_faqs(imported_faqs)
+                if counts['eventos_globais']:
+                    world_boss_stream.invalidate()
                 flash(f"Importação concluída! Adicionados: {counts['faqs']} FAQs, {counts['desafios']} Desafios, "
                     f"{counts['trilhas']} Trilhas, {counts['boss_fights']} Boss Fights, "
                     f"{counts['caca_tesouros']} Caças ao Tesouro, {counts['eventos_globais']} Eventos Globais.", 'success')
@@ -0,0 +1,137 @@
+"""
+Migrações versionadas do banco de dados (SQLite e PostgreSQL)
+
+Cada migração roda uma única vez: as versões aplicadas ficam na tabela
+schema_migrations junto com o tempo de execução. Bancos novos são criados
+por db.create_all() já com o esquema atual e apenas marcados como migrados.
+"""
+import time
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+
+Migration = namedtuple('Migration', ['version', 'name', 'upgrade'])
+
+
+class MigrationRunner:
+    """Aplica as migrações pendentes em ordem, cada uma em sua transação"""
+
+    TABLE = 'schema_migrations'
+    # Pares chave/valor do esquema (ex: versão verificada no boot)
+    META_TABLE = 'schema_meta'
+    # Chave do advisory lock do PostgreSQL (evita dois workers migrando ao mesmo tempo)
+    PG_LOCK_KEY = 7421901
+
+    def __init__(self, migrations=None):
+        self._migrations = migrations
+
+    @property
+    def migrations(self):
+        if self._migrations is None:
+            from app.migrations.versions import MIGRATIONS
+            self._migrations = MIGRATIONS
+        return sorted(self._migrations, key=lambda m: m.version)
+
+    @property
+    def latest_version(self):
+        return max((m.version for m in self.migrations), default=0)
+
+    def _ensure_table(self, conn):
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {self.TABLE} ("
+            "version INTEGER PRIMARY KEY, "
+            "name VARCHAR(200) NOT NULL, "
+            "applied_at TIMESTAMP NOT NULL, "
+            "duration_ms FLOAT NOT NULL)"
+        ))
+
+    def applied(self, engine):
+        """
+        Migrações já aplicadas
+
+        Returns:
+            dict: {versão: {'name', 'applied_at', 'duration_ms'}}
+        """
+        with engine.begin() as conn:
+            self._ensure_table(conn)
+            rows = conn.execute(text(f"SELECT version, name, applied_at, duration_ms FROM {self.TABLE}")).all()
+        return {row.version: {'name': row.name, 'applied_at': row.applied_at, 'duration_ms': row.duration_ms} for row in rows}
+
+    def pending(self, engine):
+        applied = self.applied(engine)
+        return [m for m in self.migrations if m.version not in applied]
+
+    def _record(self, conn, migration, duration_ms):
+        conn.execute(
+            text(f"INSERT INTO {self.TABLE} (version, name, applied_at, duration_ms) VALUES (:v, :n, :a, :d)"),
+            {'v': migration.version, 'n': migration.name, 'a': datetime.utcnow(), 'd': duration_ms}
+        )
+
+    def stamp(self, engine):
+        """Marca todas as migrações como aplicadas (banco criado do zero com create_all)"""
+        with engine.begin() as conn:
+            self._ensure_table(conn)
+            done = {row[0] for row in conn.execute(text(f"SELECT version FROM {self.TABLE}"))}
+            for migration in self.migrations:
+                if migration.version not in done:
+                    self._record(conn, migration, 0.0)
+
+    def get_meta(self, engine, key):
+        """Valor gravado para key (None se não existir ou se a tabela ainda não existir)"""
+        try:
+            with engine.connect() as conn:
+                return conn.execute(
+                    text(f"SELECT value FROM {self.META_TABLE} WHERE key = :k"), {'k': key}
+                ).scalar()
+        except SQLAlchemyError:
+            return None
+
+    def set_meta(self, engine, key, value):
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {self.META_TABLE} ("
+                "key VARCHAR(100) PRIMARY KEY, value VARCHAR(200) NOT NULL)"
+            ))
+            conn.execute(text(f"DELETE FROM {self.META_TABLE} WHERE key = :k"), {'k': key})
+            conn.execute(text(f"INSERT INTO {self.META_TABLE} (key, value) VALUES (:k, :v)"), {'k': key, 'v': value})
+
+    def run(self, engine):
+        """
+        Aplica as migrações pendentes
+
+        Returns:
+            list: [{'version', 'name', 'duration_ms'}] das migrações aplicadas agora
+
+        Raises:
+            Exception: A migração que falhar é desfeita e o erro é propagado
+        """
+        if not self.pending(engine):
+            return []
+
+        results = []
+        lock_conn = engine.connect() if engine.dialect.name == 'postgresql' else None
+        if lock_conn is not None:
+            lock_conn.execute(text('SELECT pg_advisory_lock(:k)'), {'k': self.PG_LOCK_KEY})
+        try:
+            # Relê após obter o lock: outro worker pode ter migrado enquanto esperávamos
+            for migration in self.pending(engine):
+                start = time.perf_counter()
+                with engine.begin() as conn:
+                    migration.upgrade(conn)
+                    duration_ms = (time.perf_counter() - start) * 1000
+                    self._record(conn, migration, duration_ms)
+                results.append({'version': migration.version, 'name': migration.name,
+                                'duration_ms': round(duration_ms, 2)})
+                print(f"Migração {migration.version:04d} {migration.name}: {duration_ms:.1f} ms")
+        finally:
+            if lock_conn is not None:
+                lock_conn.execute(text('SELECT pg_advisory_unlock(:k)'), {'k': self.PG_LOCK_KEY})
+                lock_conn.commit()
+                lock_conn.close()
+        return results
+
+
+# Instância global
+migration_runner = MigrationRunner()
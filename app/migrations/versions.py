@@ -0,0 +1,171 @@
+"""
+Lista de migrações do esquema
+
+Cada upgrade recebe uma conexão dentro de transação e deve ser idempotente,
+pois o banco pode já ter parte das mudanças (criadas pelo antigo
+auto-migration do initialize_database ou por db.create_all()).
+"""
+from sqlalchemy import inspect, text
+from app.migrations import Migration
+
+
+def _columns(conn, table):
+    inspector = inspect(conn)
+    if not inspector.has_table(table):
+        return None
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def _timestamp_default(conn):
+    return 'NOW()' if conn.dialect.name == 'postgresql' else 'CURRENT_TIMESTAMP'
+
+
+def _timestamp_type(conn):
+    return 'TIMESTAMP' if conn.dialect.name == 'postgresql' else 'DATETIME'
+
+
+def _delete_duplicates(conn, table, keys):
+    """Mantém apenas a linha de menor id para cada combinação de keys"""
+    key_list = ', '.join(keys)
+    conn.execute(text(
+        f"DELETE FROM {table} WHERE id NOT IN (SELECT MIN(id) FROM {table} GROUP BY {key_list})"
+    ))
+
+
+def _create_indexes(conn, model):
+    for index in model.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+
+# ===== MIGRAÇÕES =====
+
+def add_path_progress_started_at(conn):
+    columns = _columns(conn, 'user_path_progress')
+    if columns is None or 'started_at' in columns:
+        return
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text(
+            f"ALTER TABLE user_path_progress ADD COLUMN started_at {_timestamp_type(conn)} "
+            f"DEFAULT {_timestamp_default(conn)} NOT NULL"
+        ))
+        return
+    # SQLite não aceita ADD COLUMN com default não constante: a coluna entra
+    # anulável e as linhas existentes são preenchidas em seguida
+    conn.execute(text(f"ALTER TABLE user_path_progress ADD COLUMN started_at {_timestamp_type(conn)}"))
+    conn.execute(text(
+        f"UPDATE user_path_progress SET started_at = {_timestamp_default(conn)} WHERE started_at IS NULL"
+    ))
+
+
+def add_team_points_total(conn):
+    columns = _columns(conn, 'team')
+    if columns is not None and 'points_total' not in columns:
+        conn.execute(text("ALTER TABLE team ADD COLUMN points_total INTEGER DEFAULT 0 NOT NULL"))
+    conn.execute(text(
+        'UPDATE team SET points_total = COALESCE('
+        '(SELECT SUM(points) FROM "user" WHERE "user".team_id = team.id), 0)'
+    ))
+
+
+def add_hot_filter_indexes(conn):
+    from app.models import Notification, AdminLog, UserChallenge, TeamBossProgress, GlobalEventContribution
+
+    # Índices únicos exigem remover duplicatas já existentes
+    _delete_duplicates(conn, 'user_challenge', ('user_id', 'challenge_id'))
+    _delete_duplicates(conn, 'team_boss_progress', ('team_id', 'step_id'))
+    # Contribuições duplicadas são somadas na linha que permanece
+    conn.execute(text(
+        "UPDATE global_event_contribution SET contribution_points = ("
+        "SELECT SUM(c.contribution_points) FROM global_event_contribution c "
+        "WHERE c.event_id = global_event_contribution.event_id AND c.user_id = global_event_contribution.user_id) "
+        "WHERE id IN (SELECT MIN(id) FROM global_event_contribution GROUP BY event_id, user_id HAVING COUNT(*) > 1)"
+    ))
+    _delete_duplicates(conn, 'global_event_contribution', ('event_id', 'user_id'))
+
+    for model in (Notification, AdminLog, UserChallenge, TeamBossProgress, GlobalEventContribution):
+        _create_indexes(conn, model)
+
+
+def add_global_notifications(conn):
+    from app.models import GlobalNotification
+    GlobalNotification.__table__.create(conn, checkfirst=True)
+    columns = _columns(conn, 'user')
+    if columns is not None and 'global_read_id' not in columns:
+        conn.execute(text('ALTER TABLE "user" ADD COLUMN global_read_id INTEGER DEFAULT 0 NOT NULL'))
+    # Notificações globais antigas (user_id NULL) passam para a tabela própria
+    conn.execute(text(
+        "INSERT INTO global_notification (type, category, message, data, created_at) "
+        "SELECT type, category, message, data, created_at FROM notification "
+        "WHERE user_id IS NULL ORDER BY created_at, id"
+    ))
+    conn.execute(text("DELETE FROM notification WHERE user_id IS NULL"))
+    # Usuários existentes começam com as globais antigas já lidas
+    conn.execute(text('UPDATE "user" SET global_read_id = (SELECT COALESCE(MAX(id), 0) FROM global_notification)'))
+
+
+def add_user_unread_notifications(conn):
+    columns = _columns(conn, 'user')
+    if columns is not None and 'unread_notifications' not in columns:
+        conn.execute(text('ALTER TABLE "user" ADD COLUMN unread_notifications INTEGER DEFAULT 0 NOT NULL'))
+    conn.execute(text(
+        'UPDATE "user" SET unread_notifications = ('
+        'SELECT COUNT(*) FROM notification WHERE notification.user_id = "user".id AND NOT notification.is_read)'
+    ))
+
+
+def add_global_event_damage_shards(conn):
+    from app.models import GlobalEventDamageShard
+    GlobalEventDamageShard.__table__.create(conn, checkfirst=True)
+
+
+def add_team_points_total_index(conn):
+    # O modelo declara index=True; bancos migrados pela versão 2 ficaram sem ele
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_team_points_total ON team (points_total)'))
+
+
+def backfill_points_daily_buckets(conn):
+    """
+    Semeia os buckets diários com o histórico anterior ao PointsLedger
+
+    Entram os desafios completados (pontos do desafio e bônus do desafio do
+    dia) e as trilhas concluídas, pela data de conclusão. Outras fontes (boss
+    fights, caçadas, batalhas, dicas) não guardam data e ficam de fora. Os
+    dias a partir do primeiro bucket já gravado pelo award_points não são
+    tocados, para não contar duas vezes.
+    """
+    from app.models import PointsLedger, PointsDailyBucket
+    PointsLedger.__table__.create(conn, checkfirst=True)
+    PointsDailyBucket.__table__.create(conn, checkfirst=True)
+
+    cutoff = conn.execute(text('SELECT MIN(day) FROM points_daily_bucket')).scalar()
+    before_cutoff = 'WHERE history.day < :cutoff' if cutoff is not None else ''
+    conn.execute(text(
+        "INSERT INTO points_daily_bucket (user_id, day, earned, spent) "
+        "SELECT history.user_id, history.day, SUM(history.points), 0 FROM ("
+        "SELECT uc.user_id AS user_id, DATE(uc.completed_at) AS day, c.points_reward AS points "
+        "FROM user_challenge uc JOIN challenge c ON c.id = uc.challenge_id "
+        "WHERE uc.completed_at IS NOT NULL AND c.points_reward > 0 "
+        "UNION ALL "
+        "SELECT uc.user_id, DATE(uc.completed_at), dc.bonus_points "
+        "FROM user_challenge uc JOIN daily_challenge dc "
+        "ON dc.challenge_id = uc.challenge_id AND dc.day = DATE(uc.completed_at) "
+        "WHERE dc.bonus_points > 0 "
+        "UNION ALL "
+        "SELECT upp.user_id, DATE(upp.completed_at), lp.reward_points "
+        "FROM user_path_progress upp JOIN learning_path lp ON lp.id = upp.path_id "
+        "WHERE upp.completed_at IS NOT NULL AND lp.reward_points > 0"
+        f") history {before_cutoff} "
+        "GROUP BY history.user_id, history.day"
+    ), {'cutoff': cutoff} if cutoff is not None else {})
+
+
+MIGRATIONS = [
+    Migration(1, 'user_path_progress_started_at', add_path_progress_started_at),
+    Migration(2, 'team_points_total', add_team_points_total),
+    Migration(3, 'hot_filter_indexes', add_hot_filter_indexes),
+    Migration(4, 'global_notifications', add_global_notifications),
+    Migration(5, 'user_unread_notifications', add_user_unread_notifications),
+    Migration(6, 'global_event_damage_shards', add_global_event_damage_shards),
+    Migration(7, 'team_points_total_index', add_team_points_total_index),
+    Migration(8, 'points_daily_buckets_backfill', backfill_points_daily_buckets),
+]
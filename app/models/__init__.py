@@ -2,7 +2,9 @@
 Importa todos os modelos para facilitar o acesso
 """
 from app.models.user import User, InvitationCode
-from app.models.gamification import Level, Achievement, UserAchievement
+from app.models.gamification import (
+    Level, Achievement, UserAchievement, PointsLedger, PointsDailyBucket
+)
 from app.models.content import Category, FAQ
 from app.models.challenges import Challenge, UserChallenge, DailyChallenge
 from app.models.teams import Team, TeamBattle, TeamBattleChallenge
@@ -13,23 +15,23 @@ from app.models.boss_fights import (
 from app.models.learning_paths import LearningPath, PathChallenge, UserPathProgress
 from app.models.events import (
     ScavengerHunt, ScavengerHuntStep, UserHuntProgress,
-    GlobalEvent, GlobalEventContribution
+    GlobalEvent, GlobalEventContribution, GlobalEventDamageShard
 )
 from app.models.chat import ChatMessage, Ticket
-from app.models.notifications import Notification
+from app.models.notifications import Notification, GlobalNotification
 from app.models.admin_log import AdminLog
 from app.models.database_backup import DatabaseBackup
 
 __all__ = [
     'User', 'InvitationCode',
-    'Level', 'Achievement', 'UserAchievement',
+    'Level', 'Achievement', 'UserAchievement', 'PointsLedger', 'PointsDailyBucket',
     'Category', 'FAQ',
     'Challenge', 'UserChallenge', 'DailyChallenge',
     'Team', 'TeamBattle', 'TeamBattleChallenge',
     'BossFight', 'BossFightStage', 'BossFightStep', 'TeamBossProgress', 'TeamBossCompletion',
     'LearningPath', 'PathChallenge', 'UserPathProgress',
     'ScavengerHunt', 'ScavengerHuntStep', 'UserHuntProgress',
-    'GlobalEvent', 'GlobalEventContribution',
+    'GlobalEvent', 'GlobalEventContribution', 'GlobalEventDamageShard',
     'ChatMessage', 'Ticket',
-    'Notification'
+    'Notification', 'GlobalNotification'
 ]
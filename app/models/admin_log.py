@@ -10,6 +10,9 @@ class AdminLog(db.Model):
     """Modelo para logs de auditoria de ações administrativas"""
     
     __tablename__ = 'admin_log'
+    __table_args__ = (
+        db.Index('ix_admin_log_admin_created', 'admin_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     admin_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -13,7 +13,7 @@ class BossFight(db.Model):
     reward_points = db.Column(db.Integer, nullable=False)
     is_active = db.Column(db.Boolean, default=False)
     image_url = db.Column(db.String(255), nullable=True)
-    stages = db.relationship('BossFightStage', backref='boss_fight', lazy='dynamic', order_by='BossFightStage.order')
+    stages = db.relationship('BossFightStage', backref='boss_fight', order_by='BossFightStage.order')
 
 
 class BossFightStage(db.Model):
@@ -22,7 +22,7 @@ class BossFightStage(db.Model):
     boss_fight_id = db.Column(db.Integer, db.ForeignKey('boss_fight.id'), nullable=False)
     name = db.Column(db.String(200), nullable=False)
     order = db.Column(db.Integer, nullable=False)
-    steps = db.relationship('BossFightStep', backref='stage', lazy='dynamic', order_by='BossFightStep.id', cascade='all, delete-orphan')
+    steps = db.relationship('BossFightStep', backref='stage', order_by='BossFightStep.id', cascade='all, delete-orphan')
 
 
 class BossFightStep(db.Model):
@@ -35,6 +35,9 @@ class BossFightStep(db.Model):
 
 class TeamBossProgress(db.Model):
     """Progresso de uma equipe em um Boss Fight"""
+    __table_args__ = (
+        db.Index('ux_team_boss_progress_team_step', 'team_id', 'step_id', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False)
     step_id = db.Column(db.Integer, db.ForeignKey('boss_fight_step.id'), nullable=False)
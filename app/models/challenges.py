@@ -23,6 +23,9 @@ class Challenge(db.Model):
 
 class UserChallenge(db.Model):
     """Registro de desafios completados por usuários"""
+    __table_args__ = (
+        db.Index('ux_user_challenge_user_challenge', 'user_id', 'challenge_id', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     challenge_id = db.Column(db.Integer, db.ForeignKey('challenge.id'), nullable=False)
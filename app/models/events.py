@@ -52,6 +52,9 @@ class GlobalEvent(db.Model):
 
 class GlobalEventContribution(db.Model):
     """Contribuições de usuários em eventos globais"""
+    __table_args__ = (
+        db.Index('ux_global_event_contribution_event_user', 'event_id', 'user_id', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     event_id = db.Column(db.Integer, db.ForeignKey('global_event.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -59,3 +62,21 @@ class GlobalEventContribution(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     event = db.relationship('GlobalEvent', backref=db.backref('contributions', cascade='all, delete-orphan'))
     user = db.relationship('User', backref='event_contributions')
+
+
+class GlobalEventDamageShard(db.Model):
+    """
+    Dano ainda não aplicado a um GlobalEvent, dividido em fatias
+
+    Usado quando WORLD_BOSS_DAMAGE_SHARDS > 1: cada submissão soma em uma fatia
+    aleatória em vez de disputar a linha do evento, e o world_boss aplica a
+    soma em current_hp periodicamente.
+    """
+    __tablename__ = 'global_event_damage_shard'
+    __table_args__ = (
+        db.Index('ux_global_event_damage_shard_event_shard', 'event_id', 'shard', unique=True),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('global_event.id', ondelete='CASCADE'), nullable=False)
+    shard = db.Column(db.Integer, nullable=False)
+    damage = db.Column(db.BigInteger, nullable=False, default=0)
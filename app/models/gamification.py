@@ -1,5 +1,5 @@
 """
-Modelos relacionados a gamificação (níveis e conquistas)
+Modelos relacionados a gamificação (níveis, conquistas e histórico de pontos)
 """
 from datetime import datetime
 from app.extensions import db
@@ -31,3 +31,23 @@ class UserAchievement(db.Model):
     earned_at = db.Column(db.DateTime, default=datetime.utcnow)
     user = db.relationship('User', backref='achievements')
     achievement = db.relationship('Achievement')
+
+
+class PointsLedger(db.Model):
+    """Registro append-only de toda alteração em User.points"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
+    amount = db.Column(db.Integer, nullable=False)
+    source = db.Column(db.String(30), nullable=False)  # challenge, daily_bonus, hint, hunt, boss, path, battle
+    reference_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+class PointsDailyBucket(db.Model):
+    """Pontos agregados por usuário e dia, alimentados pelo PointsLedger"""
+    __table_args__ = (db.UniqueConstraint('user_id', 'day', name='uq_points_bucket_user_day'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    day = db.Column(db.Date, nullable=False, index=True)
+    earned = db.Column(db.Integer, nullable=False, default=0)
+    spent = db.Column(db.Integer, nullable=False, default=0)
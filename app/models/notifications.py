@@ -9,9 +9,13 @@ from app.extensions import db
 class Notification(db.Model):
     """Modelo de notificação persistente"""
     __tablename__ = 'notification'
+    __table_args__ = (
+        # Lista/contagem de notificações do usuário por status, mais recentes primeiro
+        db.Index('ix_notification_user_read_created', 'user_id', 'is_read', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)  # Null para notificações globais
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)  # Globais ficam em GlobalNotification
     type = db.Column(db.String(20), nullable=False)  # success, info, warning, error
     category = db.Column(db.String(50), nullable=False)  # achievement, challenge, level_up, team, boss, system, etc.
     message = db.Column(db.Text, nullable=False)
@@ -32,9 +36,45 @@ class Notification(db.Model):
             'message': self.message,
             'data': self.data or {},
             'is_read': self.is_read,
+            'is_global': False,
             'created_at': self.created_at.isoformat(),
             'timestamp': self.created_at.isoformat()  # Para compatibilidade com frontend
         }
     
     def __repr__(self):
         return f'<Notification {self.id}: {self.category} - {self.type}>'
+
+
+class GlobalNotification(db.Model):
+    """
+    Notificação para todos os usuários, armazenada uma única vez
+
+    A leitura é controlada por usuário com uma marca d'água (User.global_read_id):
+    globais com id acima dela estão não lidas para aquele usuário.
+    """
+    __tablename__ = 'global_notification'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    type = db.Column(db.String(20), nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    data = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def to_dict(self, read_watermark=0):
+        """Converte para o formato de Notification.to_dict() do ponto de vista de um usuário"""
+        return {
+            'id': self.id,
+            'user_id': None,
+            'type': self.type,
+            'category': self.category,
+            'message': self.message,
+            'data': self.data or {},
+            'is_read': self.id <= (read_watermark or 0),
+            'is_global': True,
+            'created_at': self.created_at.isoformat(),
+            'timestamp': self.created_at.isoformat()
+        }
+    
+    def __repr__(self):
+        return f'<GlobalNotification {self.id}: {self.category} - {self.type}>'
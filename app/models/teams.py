@@ -11,13 +11,15 @@ class Team(db.Model):
     name = db.Column(db.String(100), unique=True, nullable=False)
     owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Soma dos pontos dos membros, mantida por TeamPointsService a cada flush
+    points_total = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
     owner = db.relationship('User', foreign_keys=[owner_id])
     members = db.relationship('User', foreign_keys='User.team_id', backref='team', lazy='dynamic')
     
     @property
     def total_points(self):
-        """Calcula pontos totais da equipe"""
-        return sum(member.points for member in self.members)
+        """Pontos totais da equipe (coluna desnormalizada, sem consultar os membros)"""
+        return self.points_total or 0
 
 
 class TeamBattle(db.Model):
@@ -31,3 +31,10 @@ class User(UserMixin, db.Model):
     level = db.relationship('Level', backref='users')
     team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=True)
     avatar_url = db.Column(db.String(255), nullable=True)
+    # Maior id de GlobalNotification já lido; novos usuários começam na última global existente
+    global_read_id = db.Column(
+        db.Integer, nullable=False, server_default='0',
+        default=db.text('(SELECT COALESCE(MAX(id), 0) FROM global_notification)')
+    )
+    # Notificações pessoais não lidas (mantida pelo unread_counter)
+    unread_notifications = db.Column(db.Integer, nullable=False, default=0, server_default='0')
@@ -236,10 +236,14 @@ def system_status():
     # STATUS DA IA
     from app.services.ai_service import ai_service
     ai_status = {'online': False, 'api_key_configured': ai_service.client is not None}
+    ai_status['latency'] = ai_service.latency.snapshot()
+    ai_status['ttfb'] = ai_service.ttfb.snapshot()
+    from app.services.ai_cache import ai_response_cache
+    ai_status['cache'] = ai_response_cache.stats()
     if ai_service.client:
         try:
             start = datetime.now()
-            response = ai_service.generate_response('teste', '')
+            response = ai_service.generate_response('teste', '', use_cache=False)
             ai_status['online'] = response is not None
             ai_status['response_time'] = (datetime.now() - start).total_seconds() * 1000
         except:
@@ -270,3 +274,28 @@ def system_status():
         'server': server_status,
         'timestamp': datetime.now().isoformat()
     })
+
+
+@admin_api_bp.route('/ai-cache')
+@login_required
+def ai_cache_stats():
+    '''Retorna os contadores do cache de respostas da IA'''
+    if not current_user.is_admin:
+        return jsonify({'error': 'Acesso negado'}), 403
+    
+    from app.services.ai_cache import ai_response_cache
+    return jsonify(ai_response_cache.stats())
+
+
+@admin_api_bp.route('/ai-cache/purge', methods=['POST'])
+@login_required
+def purge_ai_cache():
+    '''Invalida todas as respostas da IA em cache (em todos os workers)'''
+    if not current_user.is_admin:
+        return jsonify({'error': 'Acesso negado'}), 403
+    
+    from app.services.ai_cache import ai_response_cache
+    from app.services.audit_service import AuditService
+    generation = ai_response_cache.purge()
+    AuditService.log_action(current_user.id, 'DELETE', 'AICache', None, 'Limpou o cache de respostas da IA')
+    return jsonify({'success': True, 'generation': generation})
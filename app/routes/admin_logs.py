@@ -56,21 +56,26 @@ def api_list_logs():
     if date_to:
         filters['date_to'] = datetime.fromisoformat(date_to)
     
-    # Paginação
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 50))
-    offset = (page - 1) * per_page
+    # Paginação por cursor (created_at, id)
+    cursor = request.args.get('cursor') or None
+    per_page = min(max(request.args.get('per_page', 50, type=int), 1), 200)
     
     # Buscar logs
-    result = audit_service.get_logs(filters=filters, limit=per_page, offset=offset)
+    try:
+        result = audit_service.get_logs_page(filters=filters, cursor=cursor, per_page=per_page)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     
     return jsonify({
         'success': True,
         'logs': result['logs'],
         'total': result['total'],
-        'page': page,
+        'total_is_exact': result['total_is_exact'],
         'per_page': per_page,
-        'total_pages': (result['total'] + per_page - 1) // per_page
+        'next_cursor': result['next_cursor'],
+        'prev_cursor': result['prev_cursor'],
+        'has_next': result['has_next'],
+        'has_prev': result['has_prev']
     })
 
 
@@ -24,10 +24,14 @@ def system_status():
     # STATUS DA IA
     from app.services.ai_service import ai_service
     ai_status = {'online': False, 'api_key_configured': ai_service.client is not None}
+    ai_status['latency'] = ai_service.latency.snapshot()
+    ai_status['ttfb'] = ai_service.ttfb.snapshot()
+    from app.services.ai_cache import ai_response_cache
+    ai_status['cache'] = ai_response_cache.stats()
     if ai_service.client:
         try:
             start = datetime.now()
-            response = ai_service.generate_response('teste', '')
+            response = ai_service.generate_response('teste', '', use_cache=False)
             ai_status['online'] = response is not None
             ai_status['response_time'] = (datetime.now() - start).total_seconds() * 1000
         except:
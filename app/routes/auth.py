@@ -8,8 +8,9 @@ from datetime import datetime
 import uuid
 
 from app.extensions import db
-from app.models import User, InvitationCode, Level
+from app.models import User, InvitationCode
 from app.forms import BaseForm
+from app.services.level_cache import level_cache
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -66,7 +67,7 @@ def register():
             flash('Email já registrado.', 'error')
             return redirect(url_for('auth.register'))
         
-        initial_level = Level.query.order_by(Level.min_points).first()
+        initial_level = level_cache.initial()
         if not initial_level:
             flash('Erro de sistema: Nenhum nível inicial encontrado. Contate o administrador.', 'error')
             return redirect(url_for('auth.register'))
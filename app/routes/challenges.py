@@ -7,6 +7,8 @@ from flask_login import login_required, current_user
 from app.extensions import db
 from app.models.challenges import Challenge, UserChallenge
 from app.services.ai_challenge_service import ai_challenge_service
+from app.services.level_cache import level_cache
+from app.utils.gamification_utils import award_points
 
 # Criar blueprint
 challenges_bp = Blueprint('challenges', __name__, url_prefix='/challenges')
@@ -107,16 +109,13 @@ def submit_challenge(challenge_id):
         db.session.add(user_challenge)
         
         # Adicionar pontos
-        current_user.points += challenge.points_reward
+        award_points(current_user, challenge.points_reward, 'challenge', challenge.id)
         
         # Atualizar nível se necessário
-        from app.models.gamification import Level
-        new_level = Level.query.filter(
-            Level.min_points <= current_user.points
-        ).order_by(Level.min_points.desc()).first()
+        new_level = level_cache.for_points(current_user.points)
         
         level_up = False
-        if new_level and (not current_user.level or new_level.id != current_user.level_id):
+        if new_level and new_level.id != current_user.level_id:
             current_user.level_id = new_level.id
             level_up = True
             flash(f'🎉 Parabéns! Você subiu para o nível {new_level.name}!', 'success')
@@ -181,7 +180,7 @@ def get_hint(challenge_id):
     )
     
     # Deduzir pontos
-    current_user.points -= challenge.hint_cost
+    award_points(current_user, -challenge.hint_cost, 'hint', challenge.id)
     db.session.commit()
     
     return jsonify({
@@ -217,6 +216,40 @@ def api_validate(challenge_id):
     })
 
 
+@challenges_bp.route('/api/validate-batch', methods=['POST'])
+@login_required
+def api_validate_batch():
+    """API para validar vários pares (desafio, resposta) com uma única chamada à IA"""
+    data = request.get_json() or {}
+    items = data.get('items') or []
+    
+    if not items:
+        return jsonify({'error': 'Nenhum item enviado'}), 400
+    if len(items) > ai_challenge_service.MAX_BATCH_SIZE:
+        return jsonify({'error': f'Máximo de {ai_challenge_service.MAX_BATCH_SIZE} itens por lote'}), 400
+    
+    challenge_ids = {item.get('challenge_id') for item in items}
+    challenges = {c.id: c for c in Challenge.query.filter(Challenge.id.in_(challenge_ids)).all()}
+    
+    pairs, positions, results = [], [], []
+    for item in items:
+        challenge = challenges.get(item.get('challenge_id'))
+        user_answer = str(item.get('answer') or '').strip()
+        if challenge is None:
+            results.append({'challenge_id': item.get('challenge_id'), 'error': 'Desafio não encontrado'})
+        elif not user_answer:
+            results.append({'challenge_id': challenge.id, 'error': 'Resposta vazia'})
+        else:
+            results.append({'challenge_id': challenge.id})
+            pairs.append((challenge, user_answer))
+            positions.append(len(results) - 1)
+    
+    for position, validation in zip(positions, ai_challenge_service.validate_answers(pairs, use_ai=True)):
+        results[position].update(validation)
+    
+    return jsonify({'results': results})
+
+
 # ===== ROTAS ADMIN =====
 
 @challenges_bp.route('/admin/generate', methods=['GET', 'POST'])
@@ -21,28 +21,32 @@ def notifications_page():
 @notifications_bp.route('/api/list')
 @login_required
 def api_list_notifications():
-    """API: Lista notificações do usuário com paginação e filtros"""
+    """API: Lista notificações do usuário com paginação por cursor e filtros"""
     filter_type = request.args.get('filter', 'all')  # all, unread, read
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 20))
+    cursor = request.args.get('cursor') or None
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
     
-    offset = (page - 1) * per_page
-    
-    result = notification_service.get_user_notifications(
-        current_user.id,
-        filter_type=filter_type,
-        limit=per_page,
-        offset=offset
-    )
+    try:
+        result = notification_service.get_notifications_page(
+            current_user.id,
+            filter_type=filter_type,
+            cursor=cursor,
+            per_page=per_page
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     
     return jsonify({
         'success': True,
         'notifications': result['notifications'],
         'total': result['total'],
+        'total_is_exact': result['total_is_exact'],
         'unread_count': result['unread_count'],
-        'page': page,
         'per_page': per_page,
-        'total_pages': (result['total'] + per_page - 1) // per_page
+        'next_cursor': result['next_cursor'],
+        'prev_cursor': result['prev_cursor'],
+        'has_next': result['has_next'],
+        'has_prev': result['has_prev']
     })
 
 
@@ -63,6 +67,23 @@ def api_mark_as_read(notification_id):
         return jsonify({'success': False, 'error': 'Notificação não encontrada'}), 404
 
 
+@notifications_bp.route('/api/global/<int:notification_id>/read', methods=['POST'])
+@login_required
+def api_mark_global_as_read(notification_id):
+    """API: Marca notificação global como lida (e as globais anteriores a ela)"""
+    form = BaseForm()
+    if not form.validate_on_submit():
+        return jsonify({'success': False, 'error': 'Erro de validação CSRF'}), 400
+    
+    success = notification_service.mark_global_as_read(notification_id, current_user.id)
+    
+    if success:
+        unread_count = notification_service.get_unread_count(current_user.id)
+        return jsonify({'success': True, 'unread_count': unread_count})
+    else:
+        return jsonify({'success': False, 'error': 'Notificação não encontrada'}), 404
+
+
 @notifications_bp.route('/api/<int:notification_id>/unread', methods=['POST'])
 @login_required
 def api_mark_as_unread(notification_id):
@@ -169,20 +190,26 @@ def admin_broadcast_notification():
         if not notification_service:
             return jsonify({'success': False, 'error': 'Serviço de notificações não disponível'}), 500
         
-        # Enviar notificação broadcast
+        # Enviar notificação broadcast; com persist=true ela é salva uma única
+        # vez como global e aparece na lista de cada usuário (fan-out na leitura)
+        persist = bool(data.get('persist'))
         notification_service.notify_all(
             event_type=event_type,
             message=message,
             category=category,
-            save_to_db=False  # Broadcast não salva no DB
+            save_to_db=persist
         )
+        recipients_count = 0
+        if persist:
+            from app.models import User
+            recipients_count = User.query.count()
         
         # Registrar log de auditoria
         from app.services.audit_service import audit_service
         audit_service.log_broadcast(
             admin_id=current_user.id,
             message=message,
-            recipients_count=0  # TODO: contar usuários conectados
+            recipients_count=recipients_count
         )
         
         return jsonify({'success': True, 'message': 'Notificação enviada com sucesso'})
@@ -202,6 +229,8 @@ def admin_notification_stats():
         return jsonify({'success': False, 'error': 'Acesso negado'}), 403
     
     from app.models import Notification, User
+    from app.services.broadcast_aggregator import broadcast_aggregator
+    from app.services.world_boss_stream import world_boss_stream
     
     total_notifications = Notification.query.count()
     unread_notifications = Notification.query.filter_by(is_read=False).count()
@@ -220,6 +249,8 @@ def admin_notification_stats():
             'total_notifications': total_notifications,
             'unread_notifications': unread_notifications,
             'total_users': total_users,
-            'categories': [{'category': cat, 'count': count} for cat, count in category_stats]
+            'categories': [{'category': cat, 'count': count} for cat, count in category_stats],
+            'feed': broadcast_aggregator.stats(),
+            'world_boss': world_boss_stream.stats()
         }
     })
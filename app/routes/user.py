@@ -1,15 +1,15 @@
 """
 Rotas de usuário (dashboard, perfil, ranking)
 """
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
 from sqlalchemy import func
-import cloudinary.uploader
 
 from app.extensions import db
 from app.models import User, Team, Challenge, UserChallenge, ScavengerHunt, UserHuntProgress, GlobalEvent
-from app.utils import get_or_create_daily_challenge
+from app.utils import get_or_create_daily_challenge, upload_image
+from app.services.world_boss_stream import world_boss_stream
 
 user_bp = Blueprint('user', __name__)
 
@@ -24,15 +24,9 @@ def index():
     if active_hunt:
         hunt_progress = UserHuntProgress.query.filter_by(user_id=current_user.id, hunt_id=active_hunt.id).first()
     
-    active_event = GlobalEvent.query.filter(
-        GlobalEvent.is_active == True,
-        GlobalEvent.end_date >= datetime.utcnow(),
-        GlobalEvent.current_hp > 0
-    ).first()
-
-    event_progress = 0
-    if active_event:
-        event_progress = ((active_event.total_hp - active_event.current_hp) / active_event.total_hp) * 100
+    # Snapshot em cache, atualizado pelo stream de HP
+    active_event = world_boss_stream.snapshot()
+    event_progress = active_event.progress if active_event else 0
 
     return render_template('user/dashboard.html', 
                             daily_challenge=daily_challenge,
@@ -51,7 +45,7 @@ def profile():
         file = request.files.get('avatar')
         if file and file.filename:
             try:
-                upload_result = cloudinary.uploader.upload(file, folder="avatars")
+                upload_result = upload_image(file, folder="avatars")
                 current_user.avatar_url = upload_result['secure_url']
             except Exception as e:
                 flash(f'Erro ao fazer upload do avatar: {e}', 'error')
@@ -65,34 +59,36 @@ def profile():
 @login_required
 def ranking():
     """Ranking de usuários e equipes"""
-    ranked_users = User.query.order_by(User.points.desc()).all()
-    all_teams = Team.query.all()
-    ranked_teams = sorted(all_teams, key=lambda t: t.total_points, reverse=True)
-    
-    start_of_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    monthly_leaders = db.session.query(
-        User, func.sum(Challenge.points_reward).label('monthly_points')
-    ).join(UserChallenge, User.id == UserChallenge.user_id)\
-     .join(Challenge, Challenge.id == UserChallenge.challenge_id)\
-     .filter(UserChallenge.completed_at >= start_of_month)\
-     .group_by(User).order_by(func.sum(Challenge.points_reward).desc()).limit(10).all()
-    
-    start_of_week = datetime.utcnow() - timedelta(days=datetime.utcnow().weekday())
-    start_of_week = start_of_week.replace(hour=0, minute=0, second=0, microsecond=0)
-    weekly_leaders = db.session.query(
-        User, func.sum(Challenge.points_reward).label('weekly_points')
-    ).join(UserChallenge, User.id == UserChallenge.user_id)\
-     .join(Challenge, Challenge.id == UserChallenge.challenge_id)\
-     .filter(UserChallenge.completed_at >= start_of_week)\
-     .group_by(User).order_by(func.sum(Challenge.points_reward).desc()).limit(10).all()
-    
-    return render_template(
-        'user/ranking.html', 
-        ranked_users=ranked_users, 
-        ranked_teams=ranked_teams,
-        monthly_leaders=monthly_leaders,
-        weekly_leaders=weekly_leaders
-    )
+    from app.services.leaderboard_service import leaderboard
+    page = request.args.get('page', 1, type=int)
+    return render_template('user/ranking.html', **leaderboard.ranking_context(current_user, page=page))
+
+
+@user_bp.route('/api/ranking/<board>')
+@login_required
+def api_ranking(board):
+    """Janela paginada de um ranking (users, teams, monthly, weekly) e a posição do usuário"""
+    from app.services.leaderboard_service import leaderboard
+    boards = {
+        'users': leaderboard.USERS,
+        'teams': leaderboard.TEAMS,
+        'monthly': leaderboard.monthly_board(),
+        'weekly': leaderboard.weekly_board()
+    }
+    if board not in boards:
+        return jsonify({'error': 'Ranking inválido'}), 404
+    page = request.args.get('page', 1, type=int)
+    per_page = min(100, max(1, request.args.get('per_page', 50, type=int)))
+    rows, total = leaderboard.page(boards[board], page, per_page)
+    member = current_user.team_id if board == 'teams' else current_user.id
+    my_rank, my_points = leaderboard.rank_of(boards[board], member) if member else (None, None)
+    return jsonify({
+        'entries': [{'rank': rank, 'id': member_id, 'points': points} for rank, member_id, points in rows],
+        'total': total,
+        'page': max(1, page),
+        'per_page': per_page,
+        'me': {'rank': my_rank, 'points': my_points}
+    })
 
 
 @user_bp.route('/hunt/start/<int:hunt_id>', methods=['POST'])
@@ -0,0 +1,222 @@
+"""
+Cache de Respostas da IA
+Duas camadas: LRU em memória do processo e, em seguida, o backend do
+Flask-Caching configurado (Redis ou SimpleCache). As chaves usam o prompt
+normalizado (lematizado, em minúsculas e sem acentos) mais o contexto, para
+que perguntas equivalentes reaproveitem a mesma resposta do Gemini. As
+stopwords ficam na chave: "não", "sem" e "mais" mudam o sentido da pergunta.
+"""
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from flask import has_app_context
+from app.extensions import cache
+
+
+def _fold(text):
+    """Remove os acentos ("não" e "nao" geram a mesma chave)"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+@lru_cache(maxsize=4)
+def _folded_stop_words(stop_words):
+    return frozenset(_fold(word) for word in stop_words)
+
+
+class AIResponseCache:
+    """Cache em camadas (memória -> Flask-Caching) para respostas da IA"""
+
+    MAX_ENTRIES = 2048
+    KEY_PREFIX = 'ai_cache'
+    # TTL por tipo de resposta, em segundos
+    DEFAULT_TTL = 3600
+    TTLS = {
+        'chat': 6 * 3600,
+        'feedback': 3600,
+        'hint': 24 * 3600,
+        'verdict': 7 * 24 * 3600
+    }
+    # Intervalo para reler a geração do cache compartilhado (purga feita por outro worker)
+    GENERATION_CHECK_SECONDS = 5
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._generation = 0
+        self._generation_checked_at = 0.0
+        self._counters = {}
+
+    # ===== CHAVES =====
+
+    @staticmethod
+    def normalize(text):
+        """
+        Lemas em minúsculas e sem acentos, seguidos das stopwords da frase
+
+        terms() descarta as stopwords, então elas são recolocadas na ordem em que
+        aparecem: "posso X?" e "não posso X?" precisam de chaves diferentes.
+        """
+        if not text:
+            return ''
+        from app.services.lemma_service import lemma_service
+        text = str(text)
+        stop_words = _folded_stop_words(frozenset(lemma_service.stop_words()))
+        kept = [word for word in re.findall(r'\w+', _fold(text.lower())) if word in stop_words]
+        return _fold(' '.join(lemma_service.terms(text))) + ' | ' + ' '.join(kept)
+
+    def make_key(self, namespace, prompt, context='', normalize=True):
+        """Monta a chave do cache a partir do prompt e do contexto"""
+        if normalize:
+            prompt, context = self.normalize(prompt), self.normalize(context)
+        digest = hashlib.sha1(f'{prompt}\x00{context}'.encode('utf-8')).hexdigest()
+        return f'{namespace}:{digest}'
+
+    # ===== CAMADA COMPARTILHADA =====
+
+    def _shared_available(self):
+        return has_app_context()
+
+    def _generation_key(self):
+        return f'{self.KEY_PREFIX}:generation'
+
+    def _current_generation(self):
+        if not self._shared_available():
+            return self._generation
+        now = time.monotonic()
+        if now - self._generation_checked_at >= self.GENERATION_CHECK_SECONDS:
+            try:
+                generation = cache.get(self._generation_key()) or 0
+            except Exception as e:
+                print(f"Erro ao ler geração do cache de IA: {e}")
+                generation = self._generation
+            with self._lock:
+                if generation != self._generation:
+                    self._entries.clear()
+                    self._generation = generation
+                self._generation_checked_at = now
+        return self._generation
+
+    def _shared_key(self, key, generation):
+        return f'{self.KEY_PREFIX}:{generation}:{key}'
+
+    # ===== CONTADORES =====
+
+    def _count(self, namespace, event):
+        with self._lock:
+            counters = self._counters.setdefault(namespace, {'memory_hits': 0, 'shared_hits': 0, 'misses': 0})
+            counters[event] += 1
+
+    def stats(self):
+        """Contadores de acertos/erros por tipo de resposta"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'generation': self._generation,
+                'namespaces': {namespace: dict(counters) for namespace, counters in self._counters.items()}
+            }
+
+    # ===== API =====
+
+    def get(self, namespace, key):
+        """Procura na memória e depois no cache compartilhado; retorna None se ausente"""
+        generation = self._current_generation()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._count(namespace, 'memory_hits')
+                    return value
+                del self._entries[key]
+
+        if self._shared_available():
+            try:
+                value = cache.get(self._shared_key(key, generation))
+            except Exception as e:
+                print(f"Erro ao ler cache de IA: {e}")
+                value = None
+            if value is not None:
+                self._remember(key, value, self.TTLS.get(namespace, self.DEFAULT_TTL))
+                self._count(namespace, 'shared_hits')
+                return value
+
+        self._count(namespace, 'misses')
+        return None
+
+    def set(self, namespace, key, value, ttl=None):
+        """Grava nas duas camadas"""
+        ttl = ttl or self.TTLS.get(namespace, self.DEFAULT_TTL)
+        self._remember(key, value, ttl)
+        if self._shared_available():
+            try:
+                cache.set(self._shared_key(key, self._current_generation()), value, timeout=ttl)
+            except Exception as e:
+                print(f"Erro ao gravar cache de IA: {e}")
+
+    def _remember(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, namespace, key, compute, ttl=None):
+        """
+        Retorna a resposta em cache ou a calcula uma única vez
+
+        Requisições idênticas simultâneas no mesmo processo aguardam a primeira,
+        em vez de chamar a API em paralelo. Respostas None não são armazenadas.
+        """
+        value = self.get(namespace, key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            key_lock = self._inflight.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                self._count(namespace, 'memory_hits')
+                return entry[0]
+            try:
+                value = compute()
+                if value is not None:
+                    self.set(namespace, key, value, ttl)
+                return value
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+
+    def purge(self):
+        """
+        Invalida todas as respostas: limpa a memória e avança a geração no
+        cache compartilhado, o que torna obsoletas as chaves de todos os workers
+        """
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self._generation_checked_at = time.monotonic()
+            generation = self._generation
+        if self._shared_available():
+            try:
+                current = cache.get(self._generation_key()) or 0
+                generation = max(generation, current + 1)
+                cache.set(self._generation_key(), generation, timeout=0)
+                with self._lock:
+                    self._generation = generation
+            except Exception as e:
+                print(f"Erro ao purgar cache de IA: {e}")
+        return generation
+
+
+# Instância global
+ai_response_cache = AIResponseCache()
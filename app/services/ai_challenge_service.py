@@ -2,8 +2,10 @@
 Serviço de IA para Desafios
 Fornece validação inteligente, feedback personalizado e geração de dicas
 """
+import hashlib
+import json
 import os
-from google import genai
+import re
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,12 +16,28 @@ class AIChallengeService:
     
     def __init__(self):
         self.api_key = os.getenv('GEMINI_API_KEY')
-        self.client = None
-        if self.api_key:
-            try:
-                self.client = genai.Client(api_key=self.api_key)
-            except Exception as e:
-                print(f"Erro ao inicializar cliente Gemini: {e}")
+        self._client = None
+        self._client_ready = False
+
+    @property
+    def client(self):
+        # Criado na primeira chamada, evitando importar o SDK no boot
+        if not self._client_ready:
+            from app.services.ai_service import create_gemini_client
+            self._client = create_gemini_client(self.api_key)
+            self._client_ready = True
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
+        self._client_ready = True
+    
+    @staticmethod
+    def _challenge_fingerprint(challenge):
+        """Hash do conteúdo do desafio: editar o desafio invalida as respostas em cache"""
+        content = '\x00'.join(str(value or '') for value in (challenge.title, challenge.description, challenge.expected_answer))
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
     
     def validate_answer(self, challenge, user_answer, use_ai=True):
         """
@@ -48,8 +66,13 @@ class AIChallengeService:
                 'explanation': 'Resposta exata!'
             }
         
-        # Validação com IA (semântica)
+        # Validação com IA (semântica), reaproveitando veredictos anteriores
         if use_ai and self.client:
+            from app.services.ai_cache import ai_response_cache
+            key = self._verdict_key(challenge, user_answer)
+            cached = ai_response_cache.get('verdict', key)
+            if cached is not None:
+                return dict(cached)
             try:
                 prompt = f"""
                 Você é um avaliador de respostas técnicas. Analise se a resposta do usuário está correta.
@@ -88,7 +111,8 @@ class AIChallengeService:
                         result_text = result_text[4:]
                     result_text = result_text.strip()
                 
-                result = json.loads(result_text)
+                result = self._normalize_verdict(json.loads(result_text))
+                ai_response_cache.set('verdict', key, result)
                 return result
                 
             except Exception as e:
@@ -107,6 +131,137 @@ class AIChallengeService:
             'explanation': 'Resposta não corresponde exatamente à esperada.'
         }
     
+    # ===== CACHE DE VEREDICTOS E VALIDAÇÃO EM LOTE =====
+    
+    # Máximo de pares (desafio, resposta) por requisição ao modelo
+    MAX_BATCH_SIZE = 20
+    
+    @staticmethod
+    def normalize_answer(user_answer):
+        """
+        Normaliza a resposta para o cache de veredictos: minúsculas, sem
+        pontuação e espaços extras. Não remove stopwords ("não" muda o sentido).
+        """
+        return ' '.join(re.findall(r'\w+', (user_answer or '').lower()))
+    
+    def _verdict_key(self, challenge, user_answer):
+        """Chave por desafio + resposta normalizada; mudar a resposta esperada invalida"""
+        from app.services.ai_cache import ai_response_cache
+        return ai_response_cache.make_key(
+            'verdict',
+            self.normalize_answer(user_answer),
+            f'{challenge.id}:{self._challenge_fingerprint(challenge)}',
+            normalize=False
+        )
+    
+    @staticmethod
+    def _normalize_verdict(result):
+        """Garante o formato {'is_correct', 'confidence', 'explanation'}"""
+        try:
+            confidence = min(1.0, max(0.0, float(result.get('confidence', 0.0))))
+        except (TypeError, ValueError):
+            confidence = 0.0
+        return {
+            'is_correct': bool(result.get('is_correct')),
+            'confidence': confidence,
+            'explanation': str(result.get('explanation', ''))
+        }
+    
+    def validate_answers(self, items, use_ai=True):
+        """
+        Valida vários pares (desafio, resposta) com uma única requisição ao modelo
+        
+        Respostas exatas e veredictos em cache não vão para o modelo; respostas
+        repetidas no mesmo lote são avaliadas uma vez só.
+        
+        Args:
+            items: Lista de tuplas (challenge, user_answer)
+            use_ai: Se True, usa IA para validação semântica
+            
+        Returns:
+            list: Um dict no formato de validate_answer para cada item, na mesma ordem
+        """
+        from app.services.ai_cache import ai_response_cache
+        results = [None] * len(items)
+        pending = {}
+        
+        for position, (challenge, user_answer) in enumerate(items):
+            if challenge.expected_answer.strip().lower() == user_answer.strip().lower():
+                results[position] = {'is_correct': True, 'confidence': 1.0, 'explanation': 'Resposta exata!'}
+                continue
+            if not (use_ai and self.client):
+                results[position] = {
+                    'is_correct': False,
+                    'confidence': 0.3,
+                    'explanation': 'Resposta não corresponde exatamente à esperada.'
+                }
+                continue
+            key = self._verdict_key(challenge, user_answer)
+            cached = ai_response_cache.get('verdict', key)
+            if cached is not None:
+                results[position] = dict(cached)
+                continue
+            pending.setdefault(key, (challenge, user_answer, []))[2].append(position)
+        
+        pending_items = list(pending.items())
+        for start in range(0, len(pending_items), self.MAX_BATCH_SIZE):
+            chunk = pending_items[start:start + self.MAX_BATCH_SIZE]
+            verdicts = self._request_verdicts([(challenge, answer) for _, (challenge, answer, _) in chunk])
+            for (key, (_, _, positions)), verdict in zip(chunk, verdicts):
+                if verdict is None:
+                    verdict = {
+                        'is_correct': False,
+                        'confidence': 0.5,
+                        'explanation': 'Não foi possível validar com IA. Tente novamente.'
+                    }
+                else:
+                    ai_response_cache.set('verdict', key, verdict)
+                for position in positions:
+                    results[position] = dict(verdict)
+        return results
+    
+    def _request_verdicts(self, pairs):
+        """Avalia N pares em um único prompt; None nas posições que o modelo não devolveu"""
+        blocks = []
+        for number, (challenge, user_answer) in enumerate(pairs, start=1):
+            blocks.append(f"""
+                ### Item {number}
+                **Desafio:** {challenge.title}
+                **Descrição:** {challenge.description}
+                **Resposta Esperada:** {challenge.expected_answer}
+                **Resposta do Usuário:** {user_answer}""")
+        prompt = f"""
+                Você é um avaliador de respostas técnicas. Analise se cada resposta do usuário está correta
+                (mesmo que com palavras diferentes), parcialmente correta ou incorreta.
+                {''.join(blocks)}
+                
+                Responda APENAS com uma lista JSON, um objeto por item:
+                [
+                    {{"item": 1, "is_correct": true/false, "confidence": 0.0-1.0, "explanation": "explicação breve"}}
+                ]
+                """
+        try:
+            response = self.client.models.generate_content(
+                model='gemini-2.0-flash-exp',
+                contents=prompt
+            )
+            result_text = response.text.strip()
+            if result_text.startswith('```'):
+                result_text = result_text.split('```')[1]
+                if result_text.startswith('json'):
+                    result_text = result_text[4:]
+                result_text = result_text.strip()
+            
+            verdicts = [None] * len(pairs)
+            for entry in json.loads(result_text):
+                number = int(entry.get('item', 0))
+                if 1 <= number <= len(pairs):
+                    verdicts[number - 1] = self._normalize_verdict(entry)
+            return verdicts
+        except Exception as e:
+            print(f"Erro na validação em lote com IA: {e}")
+            return [None] * len(pairs)
+    
     def generate_feedback(self, challenge, user_answer, is_correct):
         """
         Gera feedback personalizado baseado na resposta
@@ -124,6 +279,23 @@ class AIChallengeService:
                 return "✅ Parabéns! Resposta correta!"
             return "❌ Resposta incorreta. Tente novamente!"
         
+        from app.services.ai_cache import ai_response_cache
+        key = ai_response_cache.make_key(
+            'feedback',
+            user_answer,
+            f'{challenge.id}:{self._challenge_fingerprint(challenge)}:{bool(is_correct)}'
+        )
+        feedback = ai_response_cache.get_or_compute(
+            'feedback', key, lambda: self._request_feedback(challenge, user_answer, is_correct)
+        )
+        if feedback:
+            return feedback
+        if is_correct:
+            return "✅ **Excelente!** Você dominou este desafio!"
+        return "❌ **Quase lá!** Revise o conceito e tente novamente."
+    
+    def _request_feedback(self, challenge, user_answer, is_correct):
+        """Chama o Gemini para gerar o feedback (None em caso de erro)"""
         try:
             prompt = f"""
             Você é o Oráculo Nexus, um mentor de TI cyberpunk.
@@ -150,9 +322,7 @@ class AIChallengeService:
             
         except Exception as e:
             print(f"Erro ao gerar feedback: {e}")
-            if is_correct:
-                return "✅ **Excelente!** Você dominou este desafio!"
-            return "❌ **Quase lá!** Revise o conceito e tente novamente."
+            return None
     
     def generate_hint(self, challenge, user_attempts=0):
         """
@@ -172,6 +342,16 @@ class AIChallengeService:
         if not self.client:
             return challenge.hint or "💡 Releia a descrição do desafio com atenção."
         
+        # Mesma dica para o mesmo desafio e número de tentativas: nunca chama a API duas vezes
+        from app.services.ai_cache import ai_response_cache
+        key = ai_response_cache.make_key(
+            'hint', f'{challenge.id}:{user_attempts}', self._challenge_fingerprint(challenge), normalize=False
+        )
+        hint = ai_response_cache.get_or_compute('hint', key, lambda: self._request_hint(challenge, user_attempts))
+        return hint or challenge.hint or "💡 Pense nos conceitos fundamentais relacionados ao tema."
+    
+    def _request_hint(self, challenge, user_attempts):
+        """Chama o Gemini para gerar a dica (None em caso de erro)"""
         try:
             difficulty = "sutil" if user_attempts < 2 else "mais direta"
             
@@ -200,7 +380,7 @@ class AIChallengeService:
             
         except Exception as e:
             print(f"Erro ao gerar dica: {e}")
-            return challenge.hint or "💡 Pense nos conceitos fundamentais relacionados ao tema."
+            return None
     
     def generate_challenge(self, topic, difficulty='medium', challenge_type='text'):
         """
@@ -1,54 +1,277 @@
 import os
-from google import genai
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from dotenv import load_dotenv
+from app.utils.metrics import LatencyHistogram
 
 # Carregar variáveis de ambiente do arquivo .env
 load_dotenv()
 
+
+class ResponseStream:
+    """
+    Resposta do Gemini entregue em pedaços
+
+    O produtor roda no pool do OraculoAI e publica os pedaços em uma fila;
+    o consumidor espera o primeiro pedaço com prazo e depois itera o restante.
+    """
+
+    _END = object()
+
+    def __init__(self, started_at):
+        self._queue = queue.Queue()
+        self.started_at = started_at
+        self.chunks = []
+        self.failed = False
+        self.finished = False
+        self.timed_out = False
+        self.ttfb_ms = None
+
+    @property
+    def text(self):
+        return ''.join(self.chunks)
+
+    def _put(self, chunk):
+        self._queue.put(chunk)
+
+    def _close(self, failed=False):
+        self.failed = failed
+        self._queue.put(self._END)
+
+    def _next(self, timeout):
+        try:
+            chunk = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            self.timed_out = True
+            return None
+        if chunk is self._END:
+            self.finished = True
+            return None
+        if self.ttfb_ms is None:
+            self.ttfb_ms = (time.perf_counter() - self.started_at) * 1000
+        self.chunks.append(chunk)
+        return chunk
+
+    def first_chunk(self, timeout):
+        """Espera o primeiro pedaço; None se o prazo expirar ou a chamada falhar"""
+        return self._next(timeout)
+
+    def iter_chunks(self, idle_timeout):
+        """Itera os pedaços seguintes; para se o modelo ficar idle_timeout segundos sem enviar nada"""
+        while not self.finished and not self.timed_out:
+            chunk = self._next(idle_timeout)
+            if chunk is None:
+                break
+            yield chunk
+
+
+_UNSET = object()
+
+
+def create_gemini_client(api_key):
+    """
+    Cria o cliente do Gemini importando o google-genai sob demanda
+
+    O SDK leva quase um segundo para importar; adiar a importação para a
+    primeira chamada tira esse custo do boot de cada worker.
+
+    Returns:
+        genai.Client ou None (sem chave ou em caso de erro)
+    """
+    if not api_key:
+        return None
+    try:
+        from google import genai
+        return genai.Client(api_key=api_key)
+    except Exception as e:
+        print(f"Erro ao inicializar cliente Gemini: {e}")
+        return None
+
+
 class OraculoAI:
-    def __init__(self):
+    """
+    Cliente do Gemini com execução cooperativa
+
+    As chamadas rodam em um pool limitado (sob o worker eventlet as threads são
+    green threads), de modo que uma resposta lenta do modelo não trava as demais
+    requisições. Cada chamada tem um prazo: se expirar, o chamador recebe None e
+    segue para o motor de FAQs.
+    """
+
+    MODEL = 'gemini-flash-latest'
+    DEFAULT_TIMEOUT = 8.0
+    DEFAULT_MAX_CONCURRENCY = 4
+
+    def __init__(self, client=None, timeout=None, max_concurrency=None):
         self.api_key = os.getenv('GEMINI_API_KEY')
-        self.client = None
-        if self.api_key:
-            try:
-                self.client = genai.Client(api_key=self.api_key)
-            except Exception as e:
-                print(f"Erro ao inicializar cliente Gemini: {e}")
-
-    def generate_response(self, user_message, context=""):
-        """
-        Gera uma resposta usando o Gemini (via google-genai SDK).
-        Retorna None se a API não estiver configurada ou falhar.
-        """
-        if not self.client:
-            return None
+        self._client = client if client is not None else _UNSET
+        self.timeout = timeout or self.DEFAULT_TIMEOUT
+        self.latency = LatencyHistogram()
+        self.ttfb = LatencyHistogram()
+        self._executor = None
+        self._configure_pool(max_concurrency or self.DEFAULT_MAX_CONCURRENCY)
 
-        try:
-            system_prompt = """
+    @property
+    def client(self):
+        # O SDK só é importado na primeira chamada à IA
+        if self._client is _UNSET:
+            self._client = create_gemini_client(self.api_key)
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
+
+    def init_app(self, app):
+        """Lê AI_TIMEOUT_SECONDS e AI_MAX_CONCURRENCY da configuração"""
+        self.timeout = app.config.get('AI_TIMEOUT_SECONDS', self.timeout)
+        max_concurrency = app.config.get('AI_MAX_CONCURRENCY', self.max_concurrency)
+        if max_concurrency != self.max_concurrency:
+            self._configure_pool(max_concurrency)
+
+    def _configure_pool(self, max_concurrency):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='oraculo-ai')
+
+    def _build_prompt(self, user_message, context):
+        system_prompt = """
             Você é o Oráculo Nexus, uma inteligência artificial avançada e guardiã do conhecimento de TI.
             Sua persona é sábia, futurista, levemente enigmática mas extremamente útil.
-            
+
             Diretrizes:
             1. Responda de forma concisa e direta, mas com um tom "cyberpunk/tech".
             2. Use formatação Markdown (negrito, listas, código) para estruturar a resposta.
             3. Se a pergunta for técnica, dê a solução passo a passo.
             4. Se não souber a resposta, admita com elegância (ex: "Meus bancos de dados não contêm essa informação no momento").
             5. Mantenha o contexto de suporte técnico (TI, Hardware, Software, Redes).
-            
+
             Contexto Adicional:
             {context}
             """
-            
-            full_prompt = f"{system_prompt}\n\nUsuário: {user_message}\nOráculo:"
-            
+        return f"{system_prompt}\n\nUsuário: {user_message}\nOráculo:"
+
+    def _run(self, prompt):
+        """Executa a chamada ao modelo dentro do pool, liberando o slot ao final"""
+        start = time.perf_counter()
+        try:
             response = self.client.models.generate_content(
-                model='gemini-flash-latest',
-                contents=full_prompt
+                model=self.MODEL,
+                contents=prompt
             )
+            self.latency.observe((time.perf_counter() - start) * 1000, 'ok')
             return response.text
         except Exception as e:
+            self.latency.observe((time.perf_counter() - start) * 1000, 'error')
             print(f"Erro na API do Gemini: {e}")
             return None
+        finally:
+            self._slots.release()
+
+    def _run_stream(self, prompt, stream):
+        """Produtor do streaming: publica cada pedaço assim que o modelo o envia"""
+        start = time.perf_counter()
+        try:
+            for chunk in self.client.models.generate_content_stream(
+                model=self.MODEL,
+                contents=prompt
+            ):
+                if chunk.text:
+                    stream._put(chunk.text)
+            self.latency.observe((time.perf_counter() - start) * 1000, 'ok')
+            stream._close()
+        except Exception as e:
+            self.latency.observe((time.perf_counter() - start) * 1000, 'error')
+            print(f"Erro no streaming da API do Gemini: {e}")
+            stream._close(failed=True)
+        finally:
+            self._slots.release()
+
+    def _submit(self, user_message, context, wait, target=None, *args):
+        acquired = self._slots.acquire(timeout=wait) if wait else self._slots.acquire(blocking=False)
+        if not acquired:
+            self.latency.observe((wait or 0) * 1000, 'rejected')
+            return None
+        try:
+            return self._executor.submit(target or self._run, self._build_prompt(user_message, context), *args)
+        except RuntimeError:
+            self._slots.release()
+            return None
+
+    def generate_response_async(self, user_message, context=""):
+        """
+        Dispara a geração sem bloquear o chamador
+
+        Returns:
+            Future com o texto (ou None em caso de erro), ou None se a API
+            não estiver configurada ou todos os slots estiverem ocupados
+        """
+        if not self.client:
+            return None
+        return self._submit(user_message, context, wait=None)
+
+    def generate_response(self, user_message, context="", timeout=None, use_cache=True):
+        """
+        Gera uma resposta usando o Gemini (via google-genai SDK).
+        Retorna None se a API não estiver configurada, falhar ou não responder
+        dentro do prazo (timeout em segundos, padrão AI_TIMEOUT_SECONDS).
+
+        Perguntas equivalentes (mesmos lemas e contexto) são respondidas pelo
+        cache de respostas; use_cache=False força a chamada (ex: health check).
+        """
+        if not self.client:
+            return None
+        if not use_cache:
+            return self._generate(user_message, context, timeout)
+
+        from app.services.ai_cache import ai_response_cache
+        key = ai_response_cache.make_key('chat', user_message, context)
+        return ai_response_cache.get_or_compute(
+            'chat', key, lambda: self._generate(user_message, context, timeout)
+        )
+
+    def stream_response(self, user_message, context="", timeout=None):
+        """
+        Inicia a geração em modo streaming
+
+        Espera o primeiro pedaço por até timeout segundos (padrão
+        AI_TIMEOUT_SECONDS) e registra o tempo até o primeiro byte.
+
+        Returns:
+            ResponseStream com o primeiro pedaço já recebido, ou None se a API
+            não estiver configurada, estiver saturada, falhar ou estourar o prazo
+        """
+        if not self.client:
+            return None
+        timeout = timeout or self.timeout
+        deadline = time.monotonic() + timeout
+        stream = ResponseStream(time.perf_counter())
+        if self._submit(user_message, context, timeout, self._run_stream, stream) is None:
+            return None
+        if stream.first_chunk(max(0.0, deadline - time.monotonic())) is None:
+            # A chamada continua no pool e libera o slot quando terminar
+            outcome = 'timeout' if stream.timed_out else ('error' if stream.failed else 'empty')
+            self.ttfb.observe((time.perf_counter() - stream.started_at) * 1000, outcome)
+            return None
+        self.ttfb.observe(stream.ttfb_ms, 'ok')
+        return stream
+
+    def _generate(self, user_message, context, timeout):
+        timeout = timeout or self.timeout
+        deadline = time.monotonic() + timeout
+        future = self._submit(user_message, context, wait=timeout)
+        if future is None:
+            return None
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            # A chamada continua no pool e libera o slot quando terminar
+            self.latency.observe(timeout * 1000, 'timeout')
+            return None
 
 # Instância global
 ai_service = OraculoAI()
@@ -7,6 +7,7 @@ from flask_login import current_user
 from datetime import datetime, timedelta
 from app.extensions import db
 from app.models.admin_log import AdminLog
+from app.utils.pagination import keyset_paginate, estimate_count, page_metadata
 
 
 class AuditService:
@@ -191,18 +192,8 @@ class AuditService:
         )
     
     @staticmethod
-    def get_logs(filters=None, limit=50, offset=0):
-        """
-        Busca logs com filtros
-        
-        Args:
-            filters: Dicionário com filtros (admin_id, action, resource_type, date_from, date_to)
-            limit: Número máximo de resultados
-            offset: Offset para paginação
-        
-        Returns:
-            dict: {'logs': [...], 'total': int}
-        """
+    def _filtered_query(filters=None):
+        """Query de AdminLog com os filtros (admin_id, action, resource_type, date_from, date_to)"""
         query = AdminLog.query
         
         if filters:
@@ -221,6 +212,23 @@ class AuditService:
             if 'date_to' in filters and filters['date_to']:
                 query = query.filter(AdminLog.created_at <= filters['date_to'])
         
+        return query
+    
+    @staticmethod
+    def get_logs(filters=None, limit=50, offset=0):
+        """
+        Busca logs com filtros
+        
+        Args:
+            filters: Dicionário com filtros (admin_id, action, resource_type, date_from, date_to)
+            limit: Número máximo de resultados
+            offset: Offset para paginação
+        
+        Returns:
+            dict: {'logs': [...], 'total': int}
+        """
+        query = AuditService._filtered_query(filters)
+        
         total = query.count()
         logs = query.order_by(AdminLog.created_at.desc()).limit(limit).offset(offset).all()
         
@@ -229,6 +237,30 @@ class AuditService:
             'total': total
         }
     
+    @staticmethod
+    def get_logs_page(filters=None, cursor=None, per_page=50):
+        """
+        Busca uma página de logs por cursor (created_at, id), do mais recente ao mais antigo
+        
+        Args:
+            filters: Dicionário com filtros (admin_id, action, resource_type, date_from, date_to)
+            cursor: Token next_cursor/prev_cursor da página anterior (None = primeira página)
+            per_page: Logs por página
+        
+        Returns:
+            dict: {'logs': [...], 'next_cursor', 'prev_cursor', 'has_next', 'has_prev',
+                   'total', 'total_is_exact'}
+        
+        Raises:
+            ValueError: Se o cursor for inválido
+        """
+        query = AuditService._filtered_query(filters)
+        page = keyset_paginate(query, (AdminLog.created_at, AdminLog.id), cursor=cursor, per_page=per_page)
+        
+        result = {'logs': [log.to_dict() for log in page.items]}
+        result.update(page_metadata(page, estimate_count(query)))
+        return result
+    
     @staticmethod
     def get_user_activity(admin_id, days=30):
         """Retorna atividade de um admin nos últimos N dias"""
@@ -1,12 +1,17 @@
 """
 Agendador de Backups Automáticos
 Configura backups periódicos usando APScheduler
+
+Os jobs rodam fora de requisições, só com o app_context: as notificações saem
+pelo socketio da aplicação e, com SOCKETIO_MESSAGE_QUEUE, chegam aos clientes
+de todos os workers. Com vários workers, rode o agendador em um único processo
+(`flask run-scheduler`) para não duplicar os backups.
 """
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from datetime import datetime
+from app.extensions import db
 from app.services.backup_service import backup_service
-from app.services.notification_service import notification_service
 
 
 class BackupScheduler:
@@ -34,6 +39,13 @@ class BackupScheduler:
             self.scheduler.start()
             print("✓ Agendador de backups iniciado")
     
+    @staticmethod
+    def _notify_admins(event_type, message):
+        # Buscado na hora: o serviço é criado por create_app depois deste import
+        from app.services.notification_service import notification_service
+        if notification_service:
+            notification_service.notify_admins(event_type=event_type, message=message, category='system')
+    
     def _run_scheduled_backup(self):
         """Executa backup agendado"""
         if not self.app:
@@ -49,31 +61,20 @@ class BackupScheduler:
                 )
                 
                 # Notificar admins
-                notification_service.notify_admins(
-                    event_type='success',
-                    message=f'✓ Backup automático criado com sucesso ({backup.to_dict()["size_mb"]} MB)',
-                    category='system'
-                )
+                self._notify_admins('success', f'✓ Backup automático criado com sucesso ({backup.to_dict()["size_mb"]} MB)')
                 
                 # Limpar backups antigos (manter últimos 30 backups ou 90 dias)
                 removed = backup_service.cleanup_old_backups(keep_count=30, keep_days=90)
                 
                 if removed > 0:
-                    notification_service.notify_admins(
-                        event_type='info',
-                        message=f'🗑️ {removed} backups antigos foram removidos automaticamente',
-                        category='system'
-                    )
+                    self._notify_admins('info', f'🗑️ {removed} backups antigos foram removidos automaticamente')
                 
                 print(f"✓ Backup automático criado: {backup.filename}")
                 
             except Exception as e:
                 # Notificar admins sobre erro
-                notification_service.notify_admins(
-                    event_type='error',
-                    message=f'✗ Erro ao criar backup automático: {str(e)}',
-                    category='system'
-                )
+                db.session.rollback()
+                self._notify_admins('error', f'✗ Erro ao criar backup automático: {str(e)}')
                 print(f"✗ Erro no backup automático: {e}")
     
     def shutdown(self):
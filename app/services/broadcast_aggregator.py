@@ -0,0 +1,143 @@
+"""
+Agregador de Broadcasts do Feed
+Conclusões de desafio, subidas de nível, conquistas e bosses derrotados são
+anunciados a todos os clientes. Em vez de um evento por ação, os anúncios
+ficam em um buffer e saem juntos em um único evento 'feed_batch' por janela
+(FEED_BATCH_WINDOW_SECONDS). Se chegarem mais anúncios do que cabem em um lote
+(FEED_BATCH_MAX_EVENTS), o lote leva uma amostra uniforme (reservoir sampling)
+e informa quantos foram descartados.
+"""
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+
+class BroadcastAggregator:
+    """Buffer de anúncios globais emitido em lotes"""
+
+    EVENT_NAME = 'feed_batch'
+    WINDOW_SECONDS = 1.0
+    MAX_EVENTS_PER_BATCH = 50
+    # Janela das taxas informadas em stats()
+    RATE_WINDOW_SECONDS = 60
+
+    def __init__(self, socketio=None):
+        self.socketio = socketio
+        self.window = self.WINDOW_SECONDS
+        self.max_events = self.MAX_EVENTS_PER_BATCH
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._seen = 0
+        self._running = False
+        self._history = deque()
+        self.received = 0
+        self.emitted_events = 0
+        self.batches = 0
+        self.dropped = 0
+
+    def init_app(self, app, socketio):
+        """Configura a janela, o tamanho dos lotes e o socketio usado nos emits"""
+        self.socketio = socketio
+        self.window = float(app.config.get('FEED_BATCH_WINDOW_SECONDS', self.WINDOW_SECONDS))
+        self.max_events = int(app.config.get('FEED_BATCH_MAX_EVENTS', self.MAX_EVENTS_PER_BATCH))
+
+    # ===== BUFFER =====
+
+    def publish(self, event_type, message, category='general', data=None):
+        """
+        Enfileira um anúncio para o próximo lote
+
+        Returns:
+            bool: False se o anúncio ficou fora da amostra do lote
+        """
+        item = {
+            'type': event_type,
+            'category': category,
+            'message': message,
+            'timestamp': datetime.now().isoformat(),
+            'data': data or {}
+        }
+        with self._lock:
+            self.received += 1
+            self._seen += 1
+            kept = True
+            if len(self._buffer) < self.max_events:
+                self._buffer.append(item)
+            else:
+                # Reservoir sampling: cada anúncio da janela tem a mesma chance de sair
+                self.dropped += 1
+                slot = random.randrange(self._seen)
+                kept = slot < self.max_events
+                if kept:
+                    self._buffer[slot] = item
+            start = not self._running
+            self._running = True
+        if start:
+            self.socketio.start_background_task(self._run)
+        return kept
+
+    def flush(self):
+        """
+        Emite o lote pendente (se houver)
+
+        Returns:
+            int: Anúncios emitidos
+        """
+        with self._lock:
+            events, seen = self._buffer, self._seen
+            self._buffer, self._seen = [], 0
+        if not events:
+            return 0
+        events.sort(key=lambda item: item['timestamp'])
+        self.socketio.emit(self.EVENT_NAME, {
+            'events': events,
+            'total': seen,
+            'dropped': seen - len(events),
+            'window_seconds': self.window
+        }, namespace='/')
+        with self._lock:
+            self.batches += 1
+            self.emitted_events += len(events)
+            self._history.append((time.monotonic(), len(events)))
+        return len(events)
+
+    def _run(self):
+        """Emite um lote por janela enquanto houver anúncios; encerra quando fica ocioso"""
+        while True:
+            self.socketio.sleep(self.window)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Erro ao emitir lote do feed: {e}")
+            with self._lock:
+                if not self._buffer:
+                    self._running = False
+                    return
+
+    # ===== MÉTRICAS =====
+
+    def stats(self):
+        """Profundidade da fila, totais e taxas de emissão no último minuto"""
+        now = time.monotonic()
+        with self._lock:
+            while self._history and now - self._history[0][0] > self.RATE_WINDOW_SECONDS:
+                self._history.popleft()
+            recent_events = sum(count for _, count in self._history)
+            return {
+                'queue_depth': len(self._buffer),
+                'pending': self._seen,
+                'received': self.received,
+                'emitted_events': self.emitted_events,
+                'batches': self.batches,
+                'dropped': self.dropped,
+                'emitted_events_per_second': round(recent_events / self.RATE_WINDOW_SECONDS, 3),
+                'batches_per_second': round(len(self._history) / self.RATE_WINDOW_SECONDS, 3),
+                'window_seconds': self.window,
+                'max_events_per_batch': self.max_events
+            }
+
+
+# Instância global
+broadcast_aggregator = BroadcastAggregator()
@@ -0,0 +1,262 @@
+"""
+Pipeline de Submissão de Desafios
+A conclusão de um desafio é dividida em duas etapas:
+
+1. Prêmio principal, em uma única transação: uma consulta verifica a
+   conclusão anterior e o bônus do desafio do dia, os pontos são concedidos,
+   o dano no World Boss usa o evento do snapshot em cache e as batalhas de
+   equipe são marcadas com um SELECT + UPDATE condicional.
+2. Efeitos colaterais após o commit (trilhas, conquistas, notificações e
+   feed), executados em tarefas de fundo do Socket.IO (green threads sob o
+   eventlet). Cada usuário tem uma fila com no máximo uma tarefa drenando-a,
+   então os efeitos de um mesmo usuário rodam em ordem e nunca em paralelo.
+"""
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import date, datetime
+from flask import current_app
+from sqlalchemy import case, exists, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+from app.extensions import db
+from app.utils.metrics import LatencyHistogram
+
+
+# bonus: pontos do desafio do dia (0 se não for); damage: DamageResult ou None;
+# battles: equipes adversárias das batalhas pontuadas; level: LevelInfo se subiu de nível
+SubmissionResult = namedtuple('SubmissionResult', 'points bonus damage boss_name battles level')
+
+
+class ChallengePipeline:
+    """Conclusão de desafios em uma transação, com efeitos colaterais adiados"""
+
+    def __init__(self, socketio=None):
+        self.socketio = socketio
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        # Filas por usuário; a presença da chave indica uma tarefa drenando a fila
+        self._queues = {}
+        self._pending = 0
+        self.side_effects_latency = LatencyHistogram()
+
+    def init_app(self, app, socketio):
+        """Usa o SocketIO da aplicação para iniciar as tarefas de fundo"""
+        self.socketio = socketio
+
+    # ===== PRÊMIO PRINCIPAL =====
+
+    def complete(self, user, challenge):
+        """
+        Registra a conclusão do desafio e concede o prêmio em uma transação
+
+        Args:
+            user: Usuário (current_user)
+            challenge: Desafio respondido corretamente
+
+        Returns:
+            SubmissionResult, ou None se o usuário já havia completado o desafio
+        """
+        from app.models import UserChallenge, DailyChallenge
+        from app.services.world_boss import world_boss
+        from app.services.world_boss_stream import world_boss_stream
+        from app.utils.gamification_utils import award_points, update_user_level
+
+        already_completed, bonus = db.session.execute(select(
+            exists().where(UserChallenge.user_id == user.id, UserChallenge.challenge_id == challenge.id),
+            select(DailyChallenge.bonus_points)
+            .where(DailyChallenge.day == date.today(), DailyChallenge.challenge_id == challenge.id)
+            .scalar_subquery()
+        )).one()
+        if already_completed:
+            return None
+        # Lidos antes do commit, que expira os objetos da sessão
+        user_id, challenge_id, points = user.id, challenge.id, challenge.points_reward
+
+        # A conclusão é gravada antes de qualquer prêmio: uma submissão concorrente
+        # do mesmo desafio falha aqui, no índice único, e não no autoflush de um
+        # execute do prêmio, do dano ou das batalhas
+        db.session.add(UserChallenge(user_id=user_id, challenge_id=challenge_id))
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            return None
+
+        award_points(user, points, 'challenge', challenge_id)
+        if bonus:
+            award_points(user, bonus, 'daily_bonus', challenge_id)
+
+        damage, boss_name = None, None
+        active_event = world_boss_stream.snapshot()
+        if active_event:
+            damage = world_boss.apply_damage(active_event.id, user_id, points)
+            boss_name = active_event.name
+
+        battles = self._score_battles(user.team_id, challenge_id) if user.team_id else []
+        level = update_user_level(user)
+
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Submissão concorrente do mesmo desafio: a outra já concedeu o prêmio
+            db.session.rollback()
+            return None
+
+        self.defer(user_id, challenge_id, level.name if level else None,
+                   boss_name if damage is not None and damage.defeated else None)
+        return SubmissionResult(points, bonus or 0, damage, boss_name, battles, level)
+
+    @staticmethod
+    def _score_battles(team_id, challenge_id):
+        """
+        Marca o desafio nas batalhas ativas da equipe em que ainda está livre
+
+        Returns:
+            list: Nome da equipe adversária de cada batalha pontuada
+        """
+        from app.models import Team, TeamBattle, TeamBattleChallenge
+        opponent = aliased(Team)
+        rows = db.session.execute(
+            select(TeamBattleChallenge.id, opponent.name)
+            .join(TeamBattle, TeamBattle.id == TeamBattleChallenge.battle_id)
+            .join(opponent, opponent.id == case(
+                (TeamBattle.challenging_team_id == team_id, TeamBattle.challenged_team_id),
+                else_=TeamBattle.challenging_team_id
+            ))
+            .where(
+                TeamBattleChallenge.challenge_id == challenge_id,
+                TeamBattleChallenge.completed_by_team_id.is_(None),
+                TeamBattle.status == 'active',
+                or_(TeamBattle.challenging_team_id == team_id, TeamBattle.challenged_team_id == team_id)
+            )
+        ).all()
+        if not rows:
+            return []
+        # A condição no UPDATE garante um único vencedor por desafio da batalha
+        scored = set(db.session.execute(
+            update(TeamBattleChallenge)
+            .where(TeamBattleChallenge.id.in_([row_id for row_id, _ in rows]),
+                   TeamBattleChallenge.completed_by_team_id.is_(None))
+            .values(completed_by_team_id=team_id, completed_at=datetime.utcnow())
+            .returning(TeamBattleChallenge.id)
+            .execution_options(synchronize_session=False)
+        ).scalars())
+        return [name for row_id, name in rows if row_id in scored]
+
+    # ===== EFEITOS COLATERAIS =====
+
+    def defer(self, user_id, challenge_id, level_name=None, defeated_boss=None):
+        """Enfileira os efeitos colaterais da conclusão na fila do usuário"""
+        app = current_app._get_current_object()
+        job = (user_id, challenge_id, level_name, defeated_boss)
+        with self._lock:
+            self._pending += 1
+            queue = self._queues.get(user_id)
+            start = queue is None
+            if start:
+                queue = self._queues[user_id] = deque()
+            queue.append(job)
+        if not start:
+            return
+        if self.socketio is None:
+            self._drain_user(app, user_id)
+        else:
+            self.socketio.start_background_task(self._drain_user, app, user_id)
+
+    def _drain_user(self, app, user_id):
+        """Executa a fila do usuário em ordem; encerra (e libera a fila) quando esvazia"""
+        while True:
+            with self._lock:
+                queue = self._queues[user_id]
+                if not queue:
+                    del self._queues[user_id]
+                    return
+                job = queue.popleft()
+            try:
+                self._run(app, *job)
+            finally:
+                with self._lock:
+                    self._pending -= 1
+                    if not self._pending:
+                        self._idle.notify_all()
+
+    def _run(self, app, user_id, challenge_id, level_name, defeated_boss):
+        start = time.perf_counter()
+        with app.app_context():
+            try:
+                self.side_effects(user_id, challenge_id, level_name, defeated_boss)
+                outcome = 'ok'
+            except Exception as e:
+                db.session.rollback()
+                print(f"Erro nos efeitos colaterais do desafio {challenge_id} (usuário {user_id}): {e}")
+                outcome = 'error'
+        self.side_effects_latency.observe((time.perf_counter() - start) * 1000, outcome)
+
+    def side_effects(self, user_id, challenge_id, level_name=None, defeated_boss=None):
+        """
+        Trilhas, conquistas, notificações e feed de uma conclusão já confirmada
+
+        Args:
+            user_id: Usuário que completou o desafio
+            challenge_id: Desafio completado
+            level_name: Nível alcançado no prêmio principal (se subiu)
+            defeated_boss: Nome do World Boss derrotado por esta submissão
+        """
+        from app.models import User, Challenge
+        from app.utils.gamification_utils import (
+            check_and_complete_paths, check_and_award_achievements, update_user_level
+        )
+        from app.services.notification_service import notification_service
+
+        user = db.session.get(User, user_id)
+        challenge = db.session.get(Challenge, challenge_id)
+        if user is None or challenge is None:
+            return
+
+        paths = check_and_complete_paths(user, challenge_id)
+        if paths:
+            # Os pontos das trilhas também podem subir o nível
+            level = update_user_level(user)
+            level_name = level.name if level else level_name
+        achievements = check_and_award_achievements(user)
+
+        if not notification_service:
+            db.session.commit()
+            return
+        # Trilhas, conquistas e notificações pessoais saem em um único commit
+        with notification_service.batch():
+            notification_service.notify_challenge_completed(user.name, user.id, challenge.title, challenge.points_reward)
+            if level_name:
+                notification_service.notify_level_up(user.name, user.id, level_name)
+            for path in paths:
+                notification_service.notify_user(
+                    user.id,
+                    'success',
+                    f'🎓 Trilha "{path.name}" concluída! Você ganhou {path.reward_points} pontos de bônus!',
+                    category='path',
+                    data={'path': path.name, 'points': path.reward_points}
+                )
+            for achievement in achievements:
+                notification_service.notify_achievement_unlocked(user.name, user.id, achievement.name)
+            if defeated_boss:
+                notification_service.notify_boss_defeated(defeated_boss, user.name, user.id)
+
+    # ===== CONTROLE =====
+
+    def drain(self, timeout=None):
+        """Espera os efeitos colaterais pendentes (testes e desligamento)"""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout=timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending_side_effects': self._pending,
+                'active_users': len(self._queues),
+                'side_effects': self.side_effects_latency.snapshot()
+            }
+
+
+# Instância global
+challenge_pipeline = ChallengePipeline()
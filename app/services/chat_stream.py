@@ -0,0 +1,70 @@
+"""
+Streaming do Chat via SocketIO
+Envia os pedaços da resposta da IA para a sala user_<id> à medida que chegam
+e finaliza com o mesmo formato JSON retornado por /chat
+"""
+import time
+import uuid
+from flask import current_app
+
+
+class ChatStreamService:
+    """Encaminha um ResponseStream do OraculoAI para o navegador do usuário"""
+
+    CHUNK_EVENT = 'chat_chunk'
+    DONE_EVENT = 'chat_done'
+
+    def start(self, user_id, message, stream, stream_id=None):
+        """
+        Dispara a tarefa de fundo que publica os pedaços e a resposta final
+
+        Args:
+            user_id: ID do usuário (sala user_<id>)
+            message: Mensagem original (chave do cache de respostas)
+            stream: ResponseStream com o primeiro pedaço já recebido
+            stream_id: Identificador escolhido pelo cliente (opcional)
+
+        Returns:
+            str: stream_id usado nos eventos
+        """
+        stream_id = str(stream_id or uuid.uuid4().hex)[:64]
+        app = current_app._get_current_object()
+        app.socketio.start_background_task(self._pump, app, user_id, message, stream, stream_id)
+        return stream_id
+
+    def _pump(self, app, user_id, message, stream, stream_id):
+        from app.services.ai_service import ai_service
+        socketio = app.socketio
+        room = f'user_{user_id}'
+
+        # O primeiro pedaço já foi recebido por stream_response
+        index = 0
+        socketio.emit(self.CHUNK_EVENT, {'stream_id': stream_id, 'index': index, 'text': stream.text}, room=room)
+        for chunk in stream.iter_chunks(idle_timeout=ai_service.timeout):
+            index += 1
+            socketio.emit(self.CHUNK_EVENT, {'stream_id': stream_id, 'index': index, 'text': chunk}, room=room)
+
+        complete = stream.finished and not stream.failed
+        text = stream.text
+        if complete:
+            from app.services.ai_cache import ai_response_cache
+            with app.app_context():
+                ai_response_cache.set('chat', ai_response_cache.make_key('chat', message), text)
+
+        socketio.emit(self.DONE_EVENT, {
+            'stream_id': stream_id,
+            'complete': complete,
+            'ttfb_ms': round(stream.ttfb_ms, 2),
+            'total_ms': round((time.perf_counter() - stream.started_at) * 1000, 2),
+            'response': {
+                'text': text,
+                'html': True,
+                'state': 'normal',
+                'options': [],
+                'suggestion': None
+            }
+        }, room=room)
+
+
+# Instância global
+chat_stream_service = ChatStreamService()
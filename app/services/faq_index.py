@@ -0,0 +1,299 @@
+"""
+Índice Invertido de FAQs com ranqueamento BM25
+Mantém em memória listas de postings por lema para que a busca do chat
+consulte apenas as FAQs que compartilham termos com a mensagem do usuário
+
+Cada worker tem o seu índice. Quem altera as FAQs grava uma nova marca de
+versão em schema_meta, no banco compartilhado por todos os processos; os
+workers comparam essa marca (a cada VERSION_CHECK_SECONDS) e reconstroem o
+índice a partir do banco quando ela muda.
+"""
+import heapq
+import math
+import threading
+import time
+import uuid
+from array import array
+from collections import defaultdict
+from flask import has_app_context
+from sqlalchemy.exc import SQLAlchemyError
+from app.extensions import db
+from app.models import FAQ
+
+
+class FAQIndex:
+    """
+    Índice invertido lema -> {slot: (tf_pergunta, tf_resposta)} ranqueado por BM25F
+
+    Cada FAQ ocupa um slot denso; o id da FAQ e o tamanho de cada campo ficam em
+    arrays compactos indexados pelo slot. A frequência de documento de um lema é
+    o tamanho da sua posting list.
+    """
+
+    # Pesos por campo: a pergunta vale o dobro da resposta
+    QUESTION_WEIGHT = 2.0
+    ANSWER_WEIGHT = 1.0
+
+    # Parâmetros BM25
+    K1 = 1.2
+    B_QUESTION = 0.75
+    B_ANSWER = 0.75
+
+    # Chave em schema_meta com a marca da última alteração de FAQs
+    VERSION_KEY = 'faq_index_version'
+    # Intervalo para reler a versão compartilhada (FAQs alteradas em outro worker)
+    VERSION_CHECK_SECONDS = 5
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = None
+        self._version_checked_at = 0.0
+        self._reset()
+
+    def _reset(self):
+        self._postings = defaultdict(dict)
+        self._slot_terms = []
+        self._slot_of = {}
+        self._free_slots = []
+        self._faq_ids = array('l')
+        self._question_len = array('f')
+        self._answer_len = array('f')
+        self._total_question_len = 0.0
+        self._total_answer_len = 0.0
+        # Fatores de normalização BM25 por slot (peso do campo / norma de tamanho),
+        # recalculados sob demanda quando o tamanho médio muda
+        self._question_factor = array('f')
+        self._answer_factor = array('f')
+        self._factors_dirty = True
+        self._built = False
+
+    # ===== EXTRAÇÃO DE LEMAS =====
+
+    @staticmethod
+    def extract_terms(text):
+        """
+        Extrai a lista de lemas relevantes de um texto (com repetições)
+
+        Usa o spaCy quando disponível (ignorando stopwords e pontuação);
+        caso contrário, cai para tokens em minúsculas. O resultado fica no
+        cache do serviço de lematização.
+        """
+        from app.services.lemma_service import lemma_service
+        return lemma_service.terms(text)
+
+    @classmethod
+    def extract_lemmas(cls, text):
+        """Extrai o conjunto de lemas relevantes de um texto"""
+        return set(cls.extract_terms(text))
+
+    # ===== CONSTRUÇÃO E ATUALIZAÇÃO =====
+
+    def build(self, faqs=None):
+        """
+        Reconstrói o índice completo
+
+        Args:
+            faqs: Lista de FAQs (opcional, padrão: todas do banco)
+
+        Returns:
+            int: Número de FAQs indexadas
+        """
+        # Versão lida antes das FAQs: uma alteração concorrente força outra reconstrução
+        version = self._shared_version()
+        if faqs is None:
+            faqs = FAQ.query.all()
+        analyses = self._analyze(faqs)
+        with self._lock:
+            self._reset()
+            for faq in faqs:
+                self._index_document(faq.id, analyses[faq.id])
+            self._built = True
+            self._version = version
+            self._version_checked_at = time.monotonic()
+        return len(self)
+
+    def add_or_update(self, faq):
+        """Indexa (ou reindexa) uma FAQ após criação/edição"""
+        self.add_many([faq])
+
+    def add_many(self, faqs):
+        """Indexa várias FAQs (ex: após importação) e avisa os outros workers"""
+        analyses = self._analyze(faqs)
+        with self._lock:
+            for faq in faqs:
+                self._remove_document(faq.id)
+                self._index_document(faq.id, analyses[faq.id])
+        self._publish()
+
+    def remove(self, faq_id):
+        """Remove uma FAQ do índice"""
+        self.remove_many([faq_id])
+
+    def remove_many(self, faq_ids):
+        """Remove várias FAQs do índice e avisa os outros workers"""
+        with self._lock:
+            for faq_id in faq_ids:
+                self._remove_document(int(faq_id))
+        self._publish()
+
+    # ===== SINCRONIZAÇÃO ENTRE WORKERS =====
+
+    def _shared_version(self):
+        """Marca da última alteração de FAQs (None sem contexto da aplicação ou sem marca)"""
+        if not has_app_context():
+            return None
+        from app.migrations import migration_runner
+        return migration_runner.get_meta(db.engine, self.VERSION_KEY)
+
+    def _publish(self):
+        """
+        Grava uma nova marca após uma alteração local (chamado depois do commit)
+
+        A versão local não é atualizada: se outro worker publicou ao mesmo
+        tempo, a próxima verificação reconstrói este índice com as duas
+        alterações.
+        """
+        if not has_app_context():
+            return
+        from app.migrations import migration_runner
+        try:
+            migration_runner.set_meta(db.engine, self.VERSION_KEY, uuid.uuid4().hex)
+        except SQLAlchemyError as e:
+            print(f"Erro ao publicar versão do índice de FAQs: {e}")
+
+    def _sync(self):
+        """Reconstrói o índice se as FAQs foram alteradas (neste ou em outro worker)"""
+        now = time.monotonic()
+        if now - self._version_checked_at < self.VERSION_CHECK_SECONDS:
+            return
+        self._version_checked_at = now
+        version = self._shared_version()
+        if version is not None and version != self._version:
+            self.build()
+
+    @staticmethod
+    def _analyze(faqs):
+        """Lematiza as FAQs em lote (apenas as que não estão no cache)"""
+        from app.services.lemma_service import lemma_service
+        return lemma_service.analyze_faqs(faqs)
+
+    def _index_document(self, faq_id, analysis):
+        question_terms = analysis.question_terms
+        answer_terms = analysis.answer_terms
+
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._faq_ids[slot] = faq_id
+            self._question_len[slot] = len(question_terms)
+            self._answer_len[slot] = len(answer_terms)
+        else:
+            slot = len(self._faq_ids)
+            self._faq_ids.append(faq_id)
+            self._question_len.append(len(question_terms))
+            self._answer_len.append(len(answer_terms))
+            self._slot_terms.append(())
+        self._slot_of[faq_id] = slot
+        self._factors_dirty = True
+        self._total_question_len += len(question_terms)
+        self._total_answer_len += len(answer_terms)
+
+        frequencies = defaultdict(lambda: [0, 0])
+        for term in question_terms:
+            frequencies[term][0] += 1
+        for term in answer_terms:
+            frequencies[term][1] += 1
+        for term, (tf_question, tf_answer) in frequencies.items():
+            self._postings[term][slot] = (tf_question, tf_answer)
+        self._slot_terms[slot] = tuple(frequencies)
+
+    def _remove_document(self, faq_id):
+        slot = self._slot_of.pop(faq_id, None)
+        if slot is None:
+            return
+        for term in self._slot_terms[slot]:
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(slot, None)
+            if not posting:
+                del self._postings[term]
+        self._total_question_len -= self._question_len[slot]
+        self._total_answer_len -= self._answer_len[slot]
+        self._slot_terms[slot] = ()
+        self._faq_ids[slot] = -1
+        self._question_len[slot] = 0
+        self._answer_len[slot] = 0
+        self._free_slots.append(slot)
+        self._factors_dirty = True
+
+    def _refresh_factors(self):
+        doc_count = len(self._slot_of)
+        avg_question_len = (self._total_question_len / doc_count) or 1.0
+        avg_answer_len = (self._total_answer_len / doc_count) or 1.0
+        self._question_factor = array('f', (
+            self.QUESTION_WEIGHT / (1.0 - self.B_QUESTION + self.B_QUESTION * length / avg_question_len)
+            for length in self._question_len
+        ))
+        self._answer_factor = array('f', (
+            self.ANSWER_WEIGHT / (1.0 - self.B_ANSWER + self.B_ANSWER * length / avg_answer_len)
+            for length in self._answer_len
+        ))
+        self._factors_dirty = False
+
+    # ===== BUSCA =====
+
+    def search(self, message, limit=5, min_ratio=None):
+        """
+        Busca FAQs percorrendo apenas as postings dos lemas da mensagem
+
+        Args:
+            message: Mensagem do usuário
+            limit: Número máximo de resultados (top-k)
+            min_ratio: Descarta resultados com score abaixo de min_ratio * melhor score
+
+        Returns:
+            list: Tuplas (faq_id, score) ordenadas por relevância
+        """
+        if not self._built:
+            self.build()
+        else:
+            self._sync()
+        query_terms = set(self.extract_terms(message))
+        if not query_terms:
+            return []
+
+        with self._lock:
+            doc_count = len(self._slot_of)
+            if doc_count == 0:
+                return []
+            if self._factors_dirty:
+                self._refresh_factors()
+            question_factor = self._question_factor
+            answer_factor = self._answer_factor
+            k1 = self.K1
+
+            scores = defaultdict(float)
+            for term in query_terms:
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                df = len(posting)
+                idf = math.log(1.0 + (doc_count - df + 0.5) / (df + 0.5))
+                for slot, (tf_question, tf_answer) in posting.items():
+                    tf = tf_question * question_factor[slot] + tf_answer * answer_factor[slot]
+                    scores[slot] += idf * tf / (k1 + tf)
+
+            top = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -self._faq_ids[item[0]]))
+            results = [(self._faq_ids[slot], score) for slot, score in top]
+
+        if min_ratio and results:
+            cutoff = results[0][1] * min_ratio
+            results = [(faq_id, score) for faq_id, score in results if score >= cutoff]
+        return results
+
+    def __len__(self):
+        return len(self._slot_of)
+
+
+# Instância global
+faq_index = FAQIndex()
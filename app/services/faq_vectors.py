@@ -0,0 +1,291 @@
+"""
+Vetores Semânticos de FAQs
+Cada FAQ é projetada em um vetor denso (bag-of-lemmas com hashing + trigramas
+de caracteres) e todas ficam em uma única matriz NumPy contígua. A consulta é
+ranqueada com um único produto matriz-vetor (similaridade de cosseno).
+
+A matriz é persistida em .npy ao lado do banco de dados e aberta com
+memory-map, de modo que os workers do gunicorn compartilham as mesmas páginas
+em vez de cada um recalcular os embeddings. O arquivo guarda dois arrays
+.npy em sequência, a matriz (N, DIMENSIONS) contígua e os ids, e é trocado
+com um único rename: um worker nunca combina os ids de uma versão com a
+matriz de outra. As alterações (ler, modificar e regravar) acontecem sob um
+flock, para que dois workers editando FAQs não percam as linhas um do outro.
+"""
+import math
+import os
+import threading
+import zlib
+from contextlib import contextmanager
+import numpy as np
+from app.models import FAQ
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: sem lock entre processos (desenvolvimento com um único worker)
+    fcntl = None
+
+
+class FAQVectorStore:
+    """Matriz de embeddings das FAQs com busca por similaridade de cosseno"""
+
+    DIMENSIONS = 256
+    QUESTION_WEIGHT = 2.0
+    ANSWER_WEIGHT = 1.0
+    # Trigramas de caracteres aproximam variações de grafia ("impresora" ~ "impressora")
+    NGRAM_SIZE = 3
+    NGRAM_WEIGHT = 1.0
+
+    MATRIX_FILENAME = 'faq_vectors.npy'
+    LOCK_FILENAME = 'faq_vectors.lock'
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._directory = None
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._matrix = np.zeros((0, self.DIMENSIONS), dtype=np.float32)
+        self._loaded_version = None
+        self._built = False
+
+    def init_app(self, app):
+        """
+        Define onde a matriz é persistida: ao lado do arquivo SQLite ou,
+        para bancos em memória/servidor, no diretório instance da aplicação
+        """
+        from app.utils.file_utils import get_data_dir
+        self._directory = get_data_dir(app)
+
+    # ===== EMBEDDINGS =====
+
+    @staticmethod
+    def _bucket(feature):
+        """Hash estável entre processos (hash() do Python é randomizado por processo)"""
+        value = zlib.crc32(feature.encode('utf-8'))
+        sign = 1.0 if value & 0x80000000 else -1.0
+        return value % FAQVectorStore.DIMENSIONS, sign
+
+    @classmethod
+    def _accumulate(cls, vector, terms, weight):
+        for term in terms:
+            bucket, sign = cls._bucket(term)
+            vector[bucket] += sign * weight
+            padded = f'<{term}>'
+            ngram_weight = weight * cls.NGRAM_WEIGHT / math.sqrt(max(1, len(padded) - cls.NGRAM_SIZE + 1))
+            for i in range(len(padded) - cls.NGRAM_SIZE + 1):
+                bucket, sign = cls._bucket('#' + padded[i:i + cls.NGRAM_SIZE])
+                vector[bucket] += sign * ngram_weight
+
+    @classmethod
+    def embed(cls, question, answer=''):
+        """Projeta um texto (pergunta e resposta opcionais) em um vetor unitário"""
+        from app.services.faq_index import FAQIndex
+        answer_terms = FAQIndex.extract_terms(answer) if answer else []
+        return cls.embed_terms(FAQIndex.extract_terms(question), answer_terms)
+
+    @classmethod
+    def embed_terms(cls, question_terms, answer_terms=()):
+        """Projeta lemas já extraídos em um vetor unitário"""
+        vector = np.zeros(cls.DIMENSIONS, dtype=np.float32)
+        cls._accumulate(vector, question_terms, cls.QUESTION_WEIGHT)
+        cls._accumulate(vector, answer_terms, cls.ANSWER_WEIGHT)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    @staticmethod
+    def _analyze(faqs):
+        from app.services.lemma_service import lemma_service
+        return lemma_service.analyze_faqs(faqs)
+
+    # ===== PERSISTÊNCIA =====
+
+    def _path(self):
+        return self._directory / self.MATRIX_FILENAME
+
+    @staticmethod
+    def _file_version(path):
+        # O rename troca o inode; o mtime sozinho pode coincidir entre duas escritas
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_ino
+
+    @contextmanager
+    def _file_lock(self):
+        """Lock exclusivo entre processos para ler, modificar e regravar a matriz"""
+        if self._directory is None or fcntl is None:
+            yield
+            return
+        self._directory.mkdir(parents=True, exist_ok=True)
+        with open(self._directory / self.LOCK_FILENAME, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save(self):
+        """Grava a matriz e os ids (chamado sob _file_lock)"""
+        if self._directory is None:
+            return
+        self._directory.mkdir(parents=True, exist_ok=True)
+        path = self._path()
+        # Escrita atômica: outros workers nunca veem um arquivo pela metade
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(self._matrix, dtype=np.float32))
+            np.save(f, np.ascontiguousarray(self._ids, dtype=np.int64))
+        os.replace(tmp_path, path)
+        self._load()
+
+    def _load(self):
+        path = self._path()
+        # Versão lida antes do arquivo: uma troca no meio só causa outra recarga
+        version = self._file_version(path)
+        with open(path, 'rb') as f:
+            major, _ = np.lib.format.read_magic(f)
+            read_header = np.lib.format.read_array_header_1_0 if major == 1 else np.lib.format.read_array_header_2_0
+            shape, fortran_order, dtype = read_header(f)
+            if dtype != np.float32 or fortran_order or len(shape) != 2 or shape[1] != self.DIMENSIONS:
+                raise ValueError(f'formato inesperado em {path.name}')
+            offset = f.tell()
+            f.seek(offset + shape[0] * shape[1] * dtype.itemsize)
+            try:
+                ids = np.load(f)
+            except (EOFError, ValueError):
+                raise ValueError(f'ids ausentes em {path.name}')
+        if ids.dtype != np.int64 or ids.shape != (shape[0],):
+            raise ValueError(f'ids inconsistentes em {path.name}')
+        if shape[0]:
+            self._matrix = np.memmap(path, dtype=np.float32, mode='r', offset=offset, shape=shape)
+        else:
+            self._matrix = np.zeros((0, self.DIMENSIONS), dtype=np.float32)
+        self._ids = ids
+        self._loaded_version = version
+
+    def _reload_if_changed(self):
+        """Recarrega a matriz se outro worker a regravou"""
+        if self._directory is None:
+            return
+        try:
+            version = self._file_version(self._path())
+        except OSError:
+            return
+        if version != self._loaded_version:
+            self._load()
+
+    # ===== CONSTRUÇÃO E SINCRONIZAÇÃO =====
+
+    def load_or_build(self):
+        """
+        Abre a matriz persistida se ela corresponde às FAQs do banco;
+        caso contrário, recalcula e grava
+
+        Returns:
+            int: Número de FAQs na matriz
+        """
+        with self._lock:
+            if self._directory is not None:
+                if self._path().exists():
+                    try:
+                        self._load()
+                        db_ids = {faq_id for (faq_id,) in FAQ.query.with_entities(FAQ.id).all()}
+                        if set(self._ids.tolist()) == db_ids and self._matrix.shape[1] == self.DIMENSIONS:
+                            self._built = True
+                            return len(self)
+                    except (OSError, ValueError) as e:
+                        print(f"Matriz de vetores inválida, recalculando: {e}")
+            return self.build()
+
+    def build(self, faqs=None):
+        """Recalcula a matriz completa"""
+        if faqs is None:
+            faqs = FAQ.query.all()
+        analyses = self._analyze(faqs)
+        matrix = np.zeros((len(faqs), self.DIMENSIONS), dtype=np.float32)
+        for row, faq in enumerate(faqs):
+            analysis = analyses[faq.id]
+            matrix[row] = self.embed_terms(analysis.question_terms, analysis.answer_terms)
+        with self._lock, self._file_lock():
+            self._ids = np.array([faq.id for faq in faqs], dtype=np.int64)
+            self._matrix = matrix
+            self._built = True
+            self._save()
+        return len(self)
+
+    def add_many(self, faqs):
+        """Insere ou substitui os vetores das FAQs criadas/editadas/importadas"""
+        if not faqs:
+            return
+        analyses = self._analyze(faqs)
+        vectors = {
+            faq.id: self.embed_terms(analyses[faq.id].question_terms, analyses[faq.id].answer_terms)
+            for faq in faqs
+        }
+        with self._lock, self._file_lock():
+            # Sob o lock: parte sempre da última versão gravada por qualquer worker
+            self._reload_if_changed()
+            ids = self._ids.tolist()
+            row_of = {faq_id: row for row, faq_id in enumerate(ids)}
+            matrix = np.array(self._matrix, dtype=np.float32)
+            new_rows, new_ids = [], []
+            for faq_id, vector in vectors.items():
+                if faq_id in row_of:
+                    matrix[row_of[faq_id]] = vector
+                else:
+                    new_rows.append(vector)
+                    new_ids.append(faq_id)
+            if new_rows:
+                matrix = np.vstack([matrix, np.array(new_rows, dtype=np.float32)])
+                ids = ids + new_ids
+            self._matrix = matrix
+            self._ids = np.array(ids, dtype=np.int64)
+            self._save()
+
+    def remove_many(self, faq_ids):
+        """Remove os vetores das FAQs excluídas"""
+        removed = {int(faq_id) for faq_id in faq_ids}
+        with self._lock, self._file_lock():
+            self._reload_if_changed()
+            keep = ~np.isin(self._ids, list(removed))
+            if keep.all():
+                return
+            self._matrix = np.array(self._matrix[keep], dtype=np.float32)
+            self._ids = self._ids[keep]
+            self._save()
+
+    # ===== BUSCA =====
+
+    def search(self, message, limit=5, min_similarity=0.3):
+        """
+        Ranqueia as FAQs por similaridade de cosseno com a mensagem
+
+        Args:
+            message: Mensagem do usuário
+            limit: Número máximo de resultados
+            min_similarity: Similaridade mínima para considerar um resultado
+
+        Returns:
+            list: Tuplas (faq_id, similaridade) ordenadas por relevância
+        """
+        if not self._built:
+            self.load_or_build()
+        query = self.embed(message)
+        if not query.any():
+            return []
+        with self._lock:
+            self._reload_if_changed()
+            if len(self._ids) == 0:
+                return []
+            similarities = self._matrix @ query
+            k = min(limit, len(similarities))
+            top = np.argpartition(-similarities, k - 1)[:k]
+            top = top[np.argsort(-similarities[top], kind='stable')]
+            return [(int(self._ids[row]), float(similarities[row])) for row in top if similarities[row] >= min_similarity]
+
+    def __len__(self):
+        return len(self._ids)
+
+
+# Instância global
+faq_vectors = FAQVectorStore()
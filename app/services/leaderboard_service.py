@@ -0,0 +1,458 @@
+"""
+Serviço de Leaderboard
+Mantém os rankings (geral, equipes, mensal e semanal) ordenados e atualizados
+incrementalmente a cada commit que altera pontos ou equipe de usuários.
+Usa sorted sets do Redis quando REDIS_URL está configurado e, caso contrário,
+um array ordenado em memória com busca binária.
+"""
+import bisect
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session, joinedload
+from app.extensions import db
+
+
+class MemoryLeaderboardBackend:
+    """
+    Rankings em memória: array ordenado por (-pontos, id) + dicionário de pontos
+
+    Posição e inserção usam busca binária (O(log n) para localizar); empates
+    são desempatados pelo menor id.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._boards = {}
+
+    def _board(self, board):
+        return self._boards.setdefault(board, ([], {}))
+
+    def _discard(self, keys, scores, member):
+        score = scores.pop(member, None)
+        if score is not None:
+            index = bisect.bisect_left(keys, (-score, member))
+            if index < len(keys) and keys[index] == (-score, member):
+                del keys[index]
+        return score
+
+    def incr(self, board, member, delta):
+        with self._lock:
+            keys, scores = self._board(board)
+            score = (self._discard(keys, scores, member) or 0) + delta
+            scores[member] = score
+            bisect.insort(keys, (-score, member))
+            return score
+
+    def set(self, board, member, score):
+        with self._lock:
+            keys, scores = self._board(board)
+            self._discard(keys, scores, member)
+            scores[member] = score
+            bisect.insort(keys, (-score, member))
+
+    def remove(self, board, member):
+        with self._lock:
+            keys, scores = self._board(board)
+            self._discard(keys, scores, member)
+
+    def replace(self, board, mapping, ttl=None):
+        with self._lock:
+            self._boards[board] = (sorted((-score, member) for member, score in mapping.items()), dict(mapping))
+
+    def exists(self, board):
+        with self._lock:
+            return board in self._boards
+
+    def range(self, board, start, stop):
+        with self._lock:
+            keys, _ = self._board(board)
+            return [(member, -score) for score, member in keys[start:stop]]
+
+    def rank(self, board, member):
+        with self._lock:
+            keys, scores = self._board(board)
+            score = scores.get(member)
+            if score is None:
+                return None
+            return bisect.bisect_left(keys, (-score, member))
+
+    def score(self, board, member):
+        with self._lock:
+            return self._board(board)[1].get(member)
+
+    def count(self, board):
+        with self._lock:
+            return len(self._board(board)[0])
+
+    def prune(self, keep):
+        """Descarta rankings de períodos encerrados"""
+        with self._lock:
+            for board in list(self._boards):
+                if board not in keep:
+                    del self._boards[board]
+
+
+class RedisLeaderboardBackend:
+    """
+    Rankings em sorted sets do Redis (ZINCRBY / ZREVRANGE / ZREVRANK)
+
+    Compartilhado por todos os workers. Em caso de empate, o Redis ordena pelo
+    membro em ordem lexicográfica decrescente.
+    """
+
+    def __init__(self, client, prefix='leaderboard'):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, board):
+        return f'{self.prefix}:{board}'
+
+    def incr(self, board, member, delta):
+        return int(self.client.zincrby(self._key(board), delta, member))
+
+    def set(self, board, member, score):
+        self.client.zadd(self._key(board), {member: score})
+
+    def remove(self, board, member):
+        self.client.zrem(self._key(board), member)
+
+    def replace(self, board, mapping, ttl=None):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(self._key(board))
+        if mapping:
+            pipe.zadd(self._key(board), {member: score for member, score in mapping.items()})
+        if ttl:
+            pipe.expire(self._key(board), ttl)
+        pipe.execute()
+
+    def exists(self, board):
+        return bool(self.client.exists(self._key(board)))
+
+    def acquire(self, name, ttl):
+        """Lock entre workers (SET NX com expiração); retorna o token ou None"""
+        token = uuid.uuid4().hex
+        return token if self.client.set(self._key(name), token, nx=True, ex=ttl) else None
+
+    def release(self, name, token):
+        # Só apaga o lock se ainda for nosso (pode ter expirado e sido tomado)
+        self.client.eval(
+            "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0",
+            1, self._key(name), token
+        )
+
+    def range(self, board, start, stop):
+        if stop <= start:
+            return []
+        rows = self.client.zrevrange(self._key(board), start, stop - 1, withscores=True)
+        return [(int(member), int(score)) for member, score in rows]
+
+    def rank(self, board, member):
+        return self.client.zrevrank(self._key(board), member)
+
+    def score(self, board, member):
+        score = self.client.zscore(self._key(board), member)
+        return None if score is None else int(score)
+
+    def count(self, board):
+        return self.client.zcard(self._key(board))
+
+    def prune(self, keep):
+        # Rankings de períodos expiram pelo TTL
+        pass
+
+
+class LeaderboardService:
+    """Rankings pré-calculados com páginas e consulta de posição em O(log n)"""
+
+    USERS = 'users'
+    TEAMS = 'teams'
+    # Rankings mensais/semanais expiram depois que o período acaba
+    PERIOD_TTL = 40 * 24 * 3600
+    # Sem Redis, cada worker tem sua cópia: reconstruir periodicamente
+    # para incorporar commits feitos por outros processos
+    MEMORY_REBUILD_SECONDS = 300
+    # Validade do lock da reconstrução no Redis (caso o worker morra no meio)
+    REBUILD_LOCK_SECONDS = 120
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.backend = MemoryLeaderboardBackend()
+        self._built_at = None
+
+    def init_app(self, app):
+        """Escolhe o backend (Redis se REDIS_URL estiver configurado) e registra os eventos"""
+        self.backend = MemoryLeaderboardBackend()
+        self._built_at = None
+        redis_url = app.config.get('REDIS_URL')
+        if redis_url:
+            try:
+                import redis
+                client = redis.Redis.from_url(redis_url)
+                client.ping()
+                self.backend = RedisLeaderboardBackend(client)
+            except Exception as e:
+                print(f"Redis indisponível para o leaderboard, usando memória: {e}")
+        _register_session_events()
+
+    @property
+    def is_shared(self):
+        return isinstance(self.backend, RedisLeaderboardBackend)
+
+    # ===== PERÍODOS =====
+
+    @staticmethod
+    def period_starts(now=None):
+        """Início do mês e da semana (segunda-feira) correntes"""
+        now = now or datetime.utcnow()
+        start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        start_of_week = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+        return start_of_month, start_of_week
+
+    @classmethod
+    def monthly_board(cls, when=None):
+        return f"monthly:{cls.period_starts(when)[0]:%Y-%m}"
+
+    @classmethod
+    def weekly_board(cls, when=None):
+        return f"weekly:{cls.period_starts(when)[1]:%Y-%m-%d}"
+
+    # ===== CONSTRUÇÃO =====
+
+    def boards(self):
+        """Rankings mantidos no período corrente"""
+        return [self.USERS, self.TEAMS, self.monthly_board(), self.weekly_board()]
+
+    def rebuild(self, boards=None):
+        """
+        Recalcula os rankings a partir do banco (todos, ou só os indicados)
+
+        No Redis, substituir um ranking descarta os ZINCRBY que outros workers
+        aplicarem entre a leitura do banco e a troca; a reconstrução completa
+        fica para o comando repair-team-points (ver warm()).
+        """
+        from app.models import User, Team
+        from app.utils.gamification_utils import points_in_window
+        start_of_month, start_of_week = self.period_starts()
+        with self._lock:
+            for board in boards or self.boards():
+                if board == self.USERS:
+                    self.backend.replace(board, {
+                        user_id: points or 0 for user_id, points in db.session.query(User.id, User.points).all()
+                    })
+                elif board == self.TEAMS:
+                    self.backend.replace(board, {
+                        team_id: total or 0 for team_id, total in db.session.query(Team.id, Team.points_total).all()
+                    })
+                else:
+                    # Soma dos buckets diários: no máximo ~31 linhas por usuário
+                    start = start_of_month if board == self.monthly_board() else start_of_week
+                    self.backend.replace(board, points_in_window(start), ttl=self.PERIOD_TTL)
+            self.backend.prune(set(self.boards()))
+            self._built_at = time.monotonic()
+
+    def warm(self):
+        """
+        Prepara os rankings no boot do worker
+
+        Em memória, reconstrói tudo. No Redis, os rankings são compartilhados e
+        mantidos pelos ZINCRBY de todos os workers: só os que não existem são
+        reconstruídos, por um único worker (lock SET NX).
+        """
+        if not self.is_shared:
+            self.rebuild()
+            return
+        with self._lock:
+            if any(not self.backend.exists(board) for board in self.boards()):
+                token = self.backend.acquire('rebuild-lock', self.REBUILD_LOCK_SECONDS)
+                if token:
+                    try:
+                        # Outro worker pode ter reconstruído antes de pegarmos o lock
+                        missing = [board for board in self.boards() if not self.backend.exists(board)]
+                        if missing:
+                            self.rebuild(missing)
+                    finally:
+                        self.backend.release('rebuild-lock', token)
+            self._built_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if self._built_at is None:
+            self.warm()
+        elif not self.is_shared and time.monotonic() - self._built_at > self.MEMORY_REBUILD_SECONDS:
+            self.rebuild()
+
+    # ===== ATUALIZAÇÃO INCREMENTAL =====
+
+    def apply_changes(self, changes):
+        """Aplica as mudanças coletadas em um commit (ver _register_session_events)"""
+        if self._built_at is None:
+            return
+        try:
+            with self._lock:
+                for change in changes:
+                    kind = change[0]
+                    if kind == 'user':
+                        _, user_id, old_points, new_points, old_team, new_team, deleted = change
+                        if deleted:
+                            self.backend.remove(self.USERS, user_id)
+                        elif new_points != old_points or self.backend.score(self.USERS, user_id) is None:
+                            self.backend.incr(self.USERS, user_id, new_points - old_points)
+                        if old_team == new_team:
+                            if old_team and new_points != old_points:
+                                self.backend.incr(self.TEAMS, old_team, new_points - old_points)
+                        else:
+                            if old_team:
+                                self.backend.incr(self.TEAMS, old_team, -old_points)
+                            if new_team:
+                                self.backend.incr(self.TEAMS, new_team, new_points)
+                    elif kind == 'team':
+                        _, team_id, deleted = change
+                        if deleted:
+                            self.backend.remove(self.TEAMS, team_id)
+                        elif self.backend.score(self.TEAMS, team_id) is None:
+                            self.backend.set(self.TEAMS, team_id, 0)
+                    elif kind == 'earned':
+                        _, user_id, points, earned_at = change
+                        for board in (self.monthly_board(), self.weekly_board()):
+                            if board in (self.monthly_board(earned_at), self.weekly_board(earned_at)):
+                                self.backend.incr(board, user_id, points)
+        except Exception as e:
+            print(f"Erro ao atualizar leaderboard: {e}")
+
+    # ===== CONSULTAS =====
+
+    def page(self, board, page=1, per_page=50):
+        """
+        Janela paginada de um ranking
+
+        Returns:
+            tuple: (lista de (posição, id, pontos), total de membros)
+        """
+        self._ensure_fresh()
+        page = max(1, int(page))
+        start = (page - 1) * per_page
+        rows = self.backend.range(board, start, start + per_page)
+        return [(start + i + 1, member, score) for i, (member, score) in enumerate(rows)], self.backend.count(board)
+
+    def rank_of(self, board, member):
+        """Posição (1 = primeiro) e pontos de um membro; (None, None) se ausente"""
+        self._ensure_fresh()
+        rank = self.backend.rank(board, member)
+        if rank is None:
+            return None, None
+        return rank + 1, self.backend.score(board, member)
+
+    def ranking_context(self, user, page=1, per_page=50, leaders=10):
+        """Dados do template de ranking: uma página do geral, equipes, líderes e posição do usuário"""
+        from app.models import User, Team
+        board_rows = {
+            'users': self.page(self.USERS, page, per_page),
+            'teams': self.page(self.TEAMS, 1, per_page),
+            'monthly': self.page(self.monthly_board(), 1, leaders),
+            'weekly': self.page(self.weekly_board(), 1, leaders),
+        }
+        user_ids = {member for key in ('users', 'monthly', 'weekly') for _, member, _ in board_rows[key][0]}
+        users = {u.id: u for u in User.query.options(joinedload(User.level)).filter(User.id.in_(user_ids)).all()} if user_ids else {}
+        team_ids = [member for _, member, _ in board_rows['teams'][0]]
+        teams = {t.id: t for t in Team.query.filter(Team.id.in_(team_ids)).all()} if team_ids else {}
+        member_counts = dict(
+            db.session.query(User.team_id, func.count(User.id)).filter(User.team_id.in_(team_ids)).group_by(User.team_id).all()
+        ) if team_ids else {}
+
+        def user_entries(rows):
+            return [{'rank': rank, 'user': users[member], 'points': score} for rank, member, score in rows if member in users]
+
+        users_rows, total_users = board_rows['users']
+        my_rank, my_points = self.rank_of(self.USERS, user.id) if user is not None else (None, None)
+        return {
+            'ranked_users': user_entries(users_rows),
+            'ranked_teams': [
+                {'rank': rank, 'team': teams[member], 'points': score, 'members': member_counts.get(member, 0)}
+                for rank, member, score in board_rows['teams'][0] if member in teams
+            ],
+            'monthly_leaders': user_entries(board_rows['monthly'][0]),
+            'weekly_leaders': user_entries(board_rows['weekly'][0]),
+            'my_rank': my_rank,
+            'my_points': my_points,
+            'page': max(1, int(page)),
+            'per_page': per_page,
+            'total_users': total_users,
+            'has_next': max(1, int(page)) * per_page < total_users
+        }
+
+
+# Instância global
+leaderboard = LeaderboardService()
+
+
+# ===== EVENTOS DA SESSÃO =====
+
+_events_registered = False
+
+
+def _collect_changes(session, flush_context):
+    """
+    Após cada flush, registra em session.info as mudanças de pontos/equipe
+    (aplicadas ao leaderboard somente se o commit acontecer)
+    """
+    from app.models import User, Team, PointsLedger
+    changes = session.info.setdefault('leaderboard_changes', [])
+
+    for obj in session.new:
+        if isinstance(obj, User):
+            changes.append(('user', obj.id, 0, obj.points or 0, None, obj.team_id, False))
+        elif isinstance(obj, Team):
+            changes.append(('team', obj.id, False))
+        elif isinstance(obj, PointsLedger) and obj.amount > 0:
+            # Rankings do período contam apenas pontos ganhos (gastos com dicas não descontam)
+            changes.append(('earned', obj.user_id, obj.amount, obj.created_at or datetime.utcnow()))
+
+    for obj in session.dirty:
+        if not isinstance(obj, User):
+            continue
+        state = inspect(obj)
+        points_history = state.attrs.points.history
+        team_history = state.attrs.team_id.history
+        if not points_history.has_changes() and not team_history.has_changes():
+            continue
+        new_points = obj.points or 0
+        old_points = (points_history.deleted[0] or 0) if points_history.deleted else new_points
+        old_team = team_history.deleted[0] if team_history.deleted else obj.team_id
+        changes.append(('user', obj.id, old_points, new_points, old_team, obj.team_id, False))
+
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            changes.append(('user', obj.id, obj.points or 0, 0, obj.team_id, None, True))
+        elif isinstance(obj, Team):
+            changes.append(('team', obj.id, True))
+
+
+def _apply_changes(session):
+    changes = session.info.pop('leaderboard_changes', None)
+    if changes:
+        leaderboard.apply_changes(changes)
+
+
+def _discard_changes(session, *args):
+    session.info.pop('leaderboard_changes', None)
+
+
+def _noop_set(target, value, oldvalue, initiator):
+    return value
+
+
+def _register_session_events():
+    global _events_registered
+    if _events_registered:
+        return
+    from app.models import User
+    # active_history carrega o valor anterior mesmo se o atributo expirou após um
+    # commit, para que o histórico do flush tenha o valor antigo
+    for attribute in (User.points, User.team_id):
+        event.listen(attribute, 'set', _noop_set, active_history=True)
+    event.listen(Session, 'after_flush', _collect_changes)
+    event.listen(Session, 'after_commit', _apply_changes)
+    event.listen(Session, 'after_rollback', _discard_changes)
+    _events_registered = True
@@ -0,0 +1,266 @@
+"""
+Serviço de Lematização
+Extrai lemas em lote com nlp.pipe (apenas os componentes necessários) e
+mantém um cache LRU por FAQ (id + hash do conteúdo) com persistência em disco,
+para que textos que não mudaram nunca passem de novo pelo spaCy
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+from collections import OrderedDict, namedtuple
+
+# Lemas da pergunta e da resposta (com repetições) e substantivos da pergunta
+FAQAnalysis = namedtuple('FAQAnalysis', 'question_terms answer_terms question_nouns')
+
+
+def run_pipeline(nlp, texts, batch_size=64, disabled_pipes=('parser', 'ner')):
+    """
+    Lemas e substantivos de cada texto (regex quando não há modelo do spaCy)
+
+    Returns:
+        list: Tuplas (lemas, substantivos) na mesma ordem dos textos
+    """
+    if nlp is None:
+        return [(re.findall(r'\w+', text.lower()), []) for text in texts]
+    disabled = [name for name in disabled_pipes if name in nlp.pipe_names]
+    results = []
+    for doc in nlp.pipe((text.lower() for text in texts), batch_size=batch_size, disable=disabled):
+        terms = [token.lemma_ for token in doc if not token.is_stop and not token.is_punct]
+        nouns = [token.lemma_ for token in doc if not token.is_stop and not token.is_punct and token.pos_ == 'NOUN']
+        results.append((terms, nouns))
+    return results
+
+
+class LemmaService:
+    """Lematização em lote com cache LRU em memória e cache persistente em disco"""
+
+    MAX_CACHE_ENTRIES = 4096
+    MAX_MESSAGE_CACHE_ENTRIES = 1024
+    BATCH_SIZE = 64
+    # O parser e o NER não são usados para lemas/POS
+    DISABLED_PIPES = ('parser', 'ner')
+    SPILL_FILENAME = 'lemma_cache.sqlite3'
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._cache = OrderedDict()
+        self._message_cache = OrderedDict()
+        self._spill_path = None
+        self._sidecar = None
+        self._stop_words = None
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    def init_app(self, app):
+        """
+        Configura o arquivo de cache em disco (desativado para bancos em memória)
+        e, se NLP_SIDECAR_SOCKET estiver definido, o cliente do sidecar de NLP
+        """
+        from app.utils.file_utils import get_data_dir
+        socket_path = app.config.get('NLP_SIDECAR_SOCKET')
+        if socket_path:
+            from app.services.nlp_sidecar import NLPSidecarClient
+            self._sidecar = NLPSidecarClient(socket_path)
+        else:
+            self._sidecar = None
+        data_dir = get_data_dir(app)
+        self._spill_path = None
+        if data_dir is not None:
+            data_dir.mkdir(parents=True, exist_ok=True)
+            self._spill_path = str(data_dir / self.SPILL_FILENAME)
+            with self._connect() as conn:
+                conn.execute('CREATE TABLE IF NOT EXISTS lemma_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+
+    # ===== PIPELINE =====
+
+    @staticmethod
+    def _get_nlp():
+        from app.utils.faq_utils import get_nlp
+        return get_nlp()
+
+    def _analyzer_id(self):
+        """Identifica o analisador para que lemas de pipelines diferentes não se misturem"""
+        if self._sidecar is not None:
+            analyzer_id = self._sidecar.analyzer_id()
+            if analyzer_id:
+                return analyzer_id
+        from app.utils.faq_utils import nlp_analyzer_id
+        return nlp_analyzer_id()
+
+    def _run_pipeline(self, texts):
+        """
+        Analisa vários textos de uma vez
+
+        Com o sidecar configurado (NLP_SIDECAR_SOCKET), a análise é feita pelo
+        processo compartilhado; se ele não responder, o modelo é carregado aqui.
+
+        Returns:
+            list: Tuplas (lemas, substantivos) na mesma ordem dos textos
+        """
+        if self._sidecar is not None:
+            results = self._sidecar.analyze(texts)
+            if results is not None:
+                return results
+        return run_pipeline(self._get_nlp(), texts, self.BATCH_SIZE, self.DISABLED_PIPES)
+
+    # ===== CACHE =====
+
+    @staticmethod
+    def _content_hash(*parts):
+        return hashlib.sha1('\x00'.join(parts).encode('utf-8')).hexdigest()
+
+    def _faq_key(self, analyzer_id, faq_id, question, answer):
+        return f'{faq_id}:{self._content_hash(analyzer_id, question or "", answer or "")}'
+
+    def _remember(self, cache, key, value, max_entries):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > max_entries:
+            cache.popitem(last=False)
+
+    def _connect(self):
+        return sqlite3.connect(self._spill_path, timeout=5)
+
+    def _load_from_disk(self, keys):
+        if not self._spill_path or not keys:
+            return {}
+        found = {}
+        try:
+            with self._connect() as conn:
+                keys = list(keys)
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start:start + 500]
+                    placeholders = ','.join('?' * len(chunk))
+                    for key, value in conn.execute(f'SELECT key, value FROM lemma_cache WHERE key IN ({placeholders})', chunk):
+                        found[key] = FAQAnalysis(*json.loads(value))
+        except sqlite3.Error as e:
+            print(f"Erro ao ler cache de lemas: {e}")
+        return found
+
+    def _save_to_disk(self, entries):
+        if not self._spill_path or not entries:
+            return
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO lemma_cache (key, value) VALUES (?, ?)',
+                    [(key, json.dumps(list(value), ensure_ascii=False)) for key, value in entries.items()]
+                )
+        except sqlite3.Error as e:
+            print(f"Erro ao gravar cache de lemas: {e}")
+
+    # ===== API =====
+
+    def analyze_faqs(self, faqs, force=False):
+        """
+        Retorna a análise de várias FAQs, processando em lote apenas as que não estão em cache
+
+        Args:
+            faqs: Lista de FAQs (ou objetos com id, question, answer)
+            force: Ignora o cache e relematiza tudo (ex: após importação)
+
+        Returns:
+            dict: faq_id -> FAQAnalysis
+        """
+        # O modelo só é carregado se alguma FAQ não estiver em cache
+        analyzer_id = self._analyzer_id()
+        keys = {faq.id: self._faq_key(analyzer_id, faq.id, faq.question, faq.answer) for faq in faqs}
+        results = {}
+        pending = []
+
+        with self._lock:
+            for faq in faqs:
+                key = keys[faq.id]
+                if not force and key in self._cache:
+                    self._cache.move_to_end(key)
+                    results[faq.id] = self._cache[key]
+                    self.hits += 1
+                else:
+                    pending.append(faq)
+
+        if pending and not force:
+            from_disk = self._load_from_disk({keys[faq.id] for faq in pending})
+            if from_disk:
+                with self._lock:
+                    for faq in pending:
+                        analysis = from_disk.get(keys[faq.id])
+                        if analysis is not None:
+                            results[faq.id] = analysis
+                            self._remember(self._cache, keys[faq.id], analysis, self.MAX_CACHE_ENTRIES)
+                            self.disk_hits += 1
+                pending = [faq for faq in pending if faq.id not in results]
+
+        if pending:
+            texts = []
+            for faq in pending:
+                texts.append(faq.question or '')
+                texts.append(faq.answer or '')
+            analyzed = self._run_pipeline(texts)
+            computed = {}
+            with self._lock:
+                for i, faq in enumerate(pending):
+                    question_terms, question_nouns = analyzed[2 * i]
+                    answer_terms, _ = analyzed[2 * i + 1]
+                    analysis = FAQAnalysis(question_terms, answer_terms, question_nouns)
+                    results[faq.id] = analysis
+                    computed[keys[faq.id]] = analysis
+                    self._remember(self._cache, keys[faq.id], analysis, self.MAX_CACHE_ENTRIES)
+                    self.misses += 1
+            # Se o modelo anunciado pelos metadados não carregou, não persiste lemas sob a chave errada
+            if self._analyzer_id() == analyzer_id:
+                self._save_to_disk(computed)
+        return results
+
+    def analyze_faq(self, faq):
+        """Retorna a análise de uma única FAQ"""
+        return self.analyze_faqs([faq])[faq.id]
+
+    def relemmatize(self, faqs):
+        """Relematiza em lote FAQs importadas/alteradas, renovando o cache"""
+        return self.analyze_faqs(faqs, force=True)
+
+    def terms(self, text):
+        """Lemas (com repetições) de um texto avulso, como a mensagem do usuário"""
+        if not text:
+            return []
+        key = self._content_hash(self._analyzer_id(), text)
+        with self._lock:
+            if key in self._message_cache:
+                self._message_cache.move_to_end(key)
+                return self._message_cache[key]
+        terms, _ = self._run_pipeline([text])[0]
+        with self._lock:
+            self._remember(self._message_cache, key, terms, self.MAX_MESSAGE_CACHE_ENTRIES)
+        return terms
+
+    def stop_words(self):
+        """Stopwords descartadas por terms() (lista do spaCy para pt; vazia sem spaCy)"""
+        if self._stop_words is None:
+            try:
+                from spacy.lang.pt.stop_words import STOP_WORDS
+                self._stop_words = frozenset(STOP_WORDS)
+            except ImportError:
+                self._stop_words = frozenset()
+        return self._stop_words
+
+    def clear(self):
+        """Esvazia o cache em memória"""
+        with self._lock:
+            self._cache.clear()
+            self._message_cache.clear()
+
+    def stats(self):
+        """Estatísticas do cache"""
+        return {
+            'entries': len(self._cache),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses
+        }
+
+
+# Instância global
+lemma_service = LemmaService()
@@ -0,0 +1,156 @@
+"""
+Cache da Tabela de Níveis
+Os níveis quase nunca mudam: ficam em memória como um array ordenado por
+min_points e são resolvidos com busca binária, sem consultar o banco.
+Cada invalidação avança uma versão compartilhada no Flask-Caching para que
+os demais workers recarreguem a tabela.
+"""
+import bisect
+import threading
+import time
+from collections import namedtuple
+from flask import has_app_context
+from app.extensions import cache, db
+
+
+# Cópia imutável de um Level (desacoplada da sessão do SQLAlchemy)
+LevelInfo = namedtuple('LevelInfo', ['id', 'name', 'min_points', 'insignia'])
+
+# Níveis, limiares e índice por id de uma mesma carga: trocados juntos, de uma
+# vez, para que uma recarga concorrente nunca misture duas versões da tabela
+LevelTable = namedtuple('LevelTable', ['levels', 'thresholds', 'by_id'])
+
+
+class LevelCache:
+    """Tabela de níveis em memória com versão"""
+
+    VERSION_KEY = 'level_cache:version'
+    # Intervalo para reler a versão compartilhada (invalidação feita por outro worker)
+    VERSION_CHECK_SECONDS = 30
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._table = None
+        self._version = 0
+        self._version_checked_at = 0.0
+
+    def init_app(self, app):
+        """Descarta a tabela carregada (cada app pode apontar para outro banco)"""
+        with self._lock:
+            self._reset()
+
+    # ===== VERSÃO =====
+
+    def _shared_version(self):
+        try:
+            return cache.get(self.VERSION_KEY) or 0
+        except Exception as e:
+            print(f"Erro ao ler versão do cache de níveis: {e}")
+            return self._version
+
+    def _check_version(self):
+        if not has_app_context():
+            return
+        now = time.monotonic()
+        if now - self._version_checked_at < self.VERSION_CHECK_SECONDS:
+            return
+        version = self._shared_version()
+        with self._lock:
+            if version != self._version:
+                self._table = None
+                self._version = version
+            self._version_checked_at = now
+
+    @property
+    def version(self):
+        return self._version
+
+    # ===== CARGA =====
+
+    def _load(self):
+        """LevelTable atual; os chamadores usam só esta tupla, nunca atributos soltos"""
+        from app.models import Level
+        self._check_version()
+        with self._lock:
+            table = self._table
+            if table is not None:
+                return table
+            rows = db.session.query(Level.id, Level.name, Level.min_points, Level.insignia)\
+                .order_by(Level.min_points).all()
+            levels = tuple(LevelInfo(row.id, row.name, int(row.min_points), row.insignia) for row in rows)
+            table = LevelTable(levels, tuple(level.min_points for level in levels),
+                               {level.id: level for level in levels})
+            self._table = table
+            return table
+
+    def invalidate(self):
+        """Descarta a tabela e avança a versão compartilhada (chamar após alterar níveis)"""
+        with self._lock:
+            self._table = None
+            self._version += 1
+            self._version_checked_at = time.monotonic()
+        if has_app_context():
+            try:
+                version = max(self._version, self._shared_version() + 1)
+                cache.set(self.VERSION_KEY, version, timeout=0)
+                with self._lock:
+                    self._version = version
+            except Exception as e:
+                print(f"Erro ao invalidar cache de níveis: {e}")
+
+    # ===== CONSULTAS =====
+
+    def all(self):
+        """Todos os níveis em ordem crescente de min_points"""
+        return list(self._load().levels)
+
+    def get(self, level_id):
+        """Nível pelo ID (None se não existir)"""
+        return self._load().by_id.get(level_id)
+
+    def initial(self):
+        """Nível de menor pontuação (atribuído a novos usuários)"""
+        levels = self._load().levels
+        return levels[0] if levels else None
+
+    def for_points(self, points):
+        """Maior nível cujo min_points é <= points"""
+        levels, thresholds, _ = self._load()
+        index = bisect.bisect_right(thresholds, points or 0) - 1
+        return levels[index] if index >= 0 else None
+
+    def next_after(self, level):
+        """Nível seguinte ao informado (None se já for o último)"""
+        levels, thresholds, _ = self._load()
+        if level is None:
+            return levels[0] if levels else None
+        index = bisect.bisect_right(thresholds, level.min_points)
+        return levels[index] if index < len(levels) else None
+
+    def progress(self, level_id, points):
+        """
+        Progresso até o próximo nível
+
+        Returns:
+            dict: {'percentage': 0-100, 'next_level_points': int ou None}
+        """
+        progress = {'percentage': 0, 'next_level_points': None}
+        current_level = self.get(level_id)
+        if current_level is None:
+            return progress
+        next_level = self.next_after(current_level)
+        if next_level:
+            points_for_level = next_level.min_points - current_level.min_points
+            points_achieved = (points or 0) - current_level.min_points
+            progress['percentage'] = max(0, min(100, (points_achieved / points_for_level) * 100 if points_for_level > 0 else 100))
+            progress['next_level_points'] = next_level.min_points
+        else:
+            progress['percentage'] = 100
+        return progress
+
+
+# Instância global
+level_cache = LevelCache()
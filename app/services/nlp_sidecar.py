@@ -0,0 +1,305 @@
+"""
+Sidecar de NLP
+Um único processo carrega o spaCy e atende a lematização de todos os workers
+por um socket Unix. Requisições que chegam juntas (de workers diferentes) são
+agrupadas em uma só passada do nlp.pipe.
+
+Uso:
+    python -m app.services.nlp_sidecar --socket /tmp/oraculo-nlp.sock
+
+Os workers usam o sidecar quando NLP_SIDECAR_SOCKET aponta para o socket; se
+ele não responder, a análise volta a ser feita no próprio processo.
+"""
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+_HEADER = struct.Struct('!I')
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+
+# ===== PROTOCOLO =====
+# Cada mensagem é um JSON precedido do tamanho (4 bytes, big-endian)
+
+def _send(sock, payload):
+    data = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            raise ConnectionError('Conexão encerrada pelo outro lado')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _recv(sock):
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if size > MAX_MESSAGE_BYTES:
+        raise ValueError('Mensagem grande demais')
+    return json.loads(_recv_exact(sock, size).decode('utf-8'))
+
+
+# ===== SERVIDOR =====
+
+class _PendingBatch:
+    """Textos de uma requisição aguardando a próxima passada do pipeline"""
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.results = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class NLPSidecarServer:
+    """Servidor do sidecar: uma thread por conexão e uma única thread rodando o spaCy"""
+
+    # Espera opcional para juntar mais requisições; com 0, a passada leva o que
+    # chegou enquanto a anterior rodava (sem latência extra com pouca carga)
+    BATCH_WAIT_SECONDS = 0.0
+    MAX_BATCH_TEXTS = 512
+    PIPE_BATCH_SIZE = 64
+
+    def __init__(self, socket_path, nlp=None):
+        self.socket_path = socket_path
+        self._nlp = nlp
+        self._queue = queue.Queue()
+        self._server = None
+        self._worker = None
+        self._running = False
+        self.batches = 0
+        self.texts = 0
+
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            from app.utils.faq_utils import get_nlp
+            self._nlp = get_nlp()
+        return self._nlp
+
+    def analyzer_id(self):
+        if self.nlp is None:
+            return 'regex'
+        return f"spacy:{self.nlp.meta.get('name')}:{self.nlp.meta.get('version')}"
+
+    def analyze(self, texts):
+        """Enfileira os textos e espera o resultado da passada em lote"""
+        pending = _PendingBatch(texts)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.results
+
+    def _run_batches(self):
+        from app.services.lemma_service import run_pipeline
+        while self._running:
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            batch = [first]
+            total = len(first.texts)
+            deadline = time.monotonic() + self.BATCH_WAIT_SECONDS
+            while total < self.MAX_BATCH_TEXTS:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+                total += len(item.texts)
+
+            texts = [text for item in batch for text in item.texts]
+            try:
+                results = run_pipeline(self.nlp, texts, self.PIPE_BATCH_SIZE)
+                offset = 0
+                for item in batch:
+                    item.results = results[offset:offset + len(item.texts)]
+                    offset += len(item.texts)
+            except Exception as e:
+                for item in batch:
+                    item.error = e
+            self.batches += 1
+            self.texts += len(texts)
+            for item in batch:
+                item.done.set()
+
+    def _handler(self):
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                while True:
+                    try:
+                        request = _recv(self.request)
+                    except (ConnectionError, OSError, ValueError):
+                        return
+                    op = request.get('op')
+                    try:
+                        if op == 'analyze':
+                            response = {'results': server.analyze(request.get('texts') or [])}
+                        elif op == 'info':
+                            response = {'analyzer': server.analyzer_id(), 'batches': server.batches, 'texts': server.texts}
+                        else:
+                            response = {'error': f'Operação desconhecida: {op}'}
+                    except Exception as e:
+                        response = {'error': str(e)}
+                    try:
+                        _send(self.request, response)
+                    except OSError:
+                        return
+
+        return Handler
+
+    def _remove_stale_socket(self):
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            os.unlink(self.socket_path)
+        else:
+            raise RuntimeError(f'Já existe um sidecar ouvindo em {self.socket_path}')
+        finally:
+            probe.close()
+
+    def start(self):
+        """Carrega o modelo e começa a atender em segundo plano"""
+        self._remove_stale_socket()
+        self.analyzer_id()  # carrega o modelo antes de aceitar conexões
+        self._running = True
+        self._worker = threading.Thread(target=self._run_batches, name='nlp-sidecar-batch', daemon=True)
+        self._worker.start()
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='nlp-sidecar', daemon=True).start()
+
+    def serve_forever(self):
+        self.start()
+        try:
+            while self._running:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        self._running = False
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+# ===== CLIENTE =====
+
+class NLPSidecarClient:
+    """
+    Cliente usado pelos workers
+
+    Mantém uma conexão por thread. Se o sidecar não responder, analyze()
+    devolve None (o chamador analisa no próprio processo) e novas tentativas
+    só acontecem após RETRY_SECONDS.
+    """
+
+    TIMEOUT_SECONDS = 10.0
+    RETRY_SECONDS = 30.0
+
+    def __init__(self, socket_path, timeout=None):
+        self.socket_path = socket_path
+        self.timeout = timeout or self.TIMEOUT_SECONDS
+        self._local = threading.local()
+        self._down_until = 0.0
+        self._analyzer_id = None
+        self.failures = 0
+
+    @property
+    def available(self):
+        return time.monotonic() >= self._down_until
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.settimeout(self.timeout)
+            conn.connect(self.socket_path)
+            self._local.conn = conn
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def _call(self, payload):
+        if not self.available:
+            return None
+        try:
+            conn = self._connection()
+            _send(conn, payload)
+            response = _recv(conn)
+        except (OSError, ValueError) as e:
+            self._drop_connection()
+            self.failures += 1
+            self._down_until = time.monotonic() + self.RETRY_SECONDS
+            print(f"Sidecar de NLP indisponível ({e}); usando análise local")
+            return None
+        if 'error' in response:
+            print(f"Erro no sidecar de NLP: {response['error']}")
+            return None
+        return response
+
+    def analyzer_id(self):
+        """Analisador carregado pelo sidecar (None se indisponível)"""
+        if self._analyzer_id is None:
+            response = self._call({'op': 'info'})
+            if response is not None:
+                self._analyzer_id = response['analyzer']
+        return self._analyzer_id if self.available else None
+
+    def analyze(self, texts):
+        """
+        Lemas e substantivos de cada texto
+
+        Returns:
+            list: Tuplas (lemas, substantivos) ou None se o sidecar falhar
+        """
+        if not texts:
+            return []
+        response = self._call({'op': 'analyze', 'texts': list(texts)})
+        if response is None:
+            return None
+        return [(terms, nouns) for terms, nouns in response['results']]
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Sidecar de NLP compartilhado pelos workers')
+    parser.add_argument('--socket', default=os.getenv('NLP_SIDECAR_SOCKET', '/tmp/oraculo-nlp.sock'))
+    args = parser.parse_args()
+    server = NLPSidecarServer(args.socket)
+    print(f"Sidecar de NLP ({server.analyzer_id()}) ouvindo em {args.socket}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,17 +3,47 @@ Serviço de Notificações em Tempo Real
 Gerencia notificações via WebSocket usando Flask-SocketIO
 Agora com persistência em banco de dados
 """
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from flask import current_app
 from flask_socketio import emit
 from datetime import datetime
+from sqlalchemy import false, func, insert, literal, select, true, union_all
 from app.extensions import db
-from app.models.notifications import Notification
+from app.models.notifications import Notification, GlobalNotification
+from app.services.unread_counter import unread_counter
+from app.services.broadcast_aggregator import broadcast_aggregator
+from app.utils.pagination import keyset_paginate, estimate_count, page_metadata
+
+
+def _notification_payload(notification_id, user_id, event_type, category, message, data, created_at):
+    """Mesmo formato de Notification.to_dict(), sem carregar o objeto"""
+    return {
+        'id': notification_id,
+        'user_id': user_id,
+        'type': event_type,
+        'category': category,
+        'message': message,
+        'data': data or {},
+        'is_read': False,
+        'created_at': created_at.isoformat(),
+        'timestamp': created_at.isoformat()
+    }
 
 
 class NotificationService:
     """Serviço para enviar notificações em tempo real e persistentes"""
     
+    # Notificações por INSERT/commit em fan-outs grandes
+    BULK_CHUNK_SIZE = 1000
+    # Acima disso o fan-out roda em tarefa de fundo, sem segurar a requisição
+    BACKGROUND_THRESHOLD = 1000
+    
     def __init__(self, socketio):
         self.socketio = socketio
+        # Lote de notify_user aberto por batch() na thread atual
+        self._local = threading.local()
     
     def _save_notification(self, user_id, event_type, category, message, data=None):
         """
@@ -40,6 +70,142 @@ class NotificationService:
         db.session.commit()
         return notification
     
+    def _insert_notifications(self, user_ids, event_type, category, message, data=None):
+        """
+        Salva a mesma notificação para vários usuários com um único INSERT
+        (executemany) e um único commit, incrementando os contadores de não lidas
+        
+        Returns:
+            list: Dicionários das notificações criadas (formato de to_dict, com unread_count)
+        """
+        return self._insert_rows([(user_id, event_type, category, message, data) for user_id in user_ids])
+    
+    def _insert_rows(self, items):
+        """
+        Salva notificações pessoais [(user_id, tipo, categoria, mensagem, dados)]
+        com um único INSERT (executemany) e um único commit
+        
+        Returns:
+            list: Dicionários das notificações criadas, na ordem de items, com unread_count
+        """
+        created_at = datetime.utcnow()
+        rows = [{
+            'user_id': user_id,
+            'type': event_type,
+            'category': category,
+            'message': message,
+            'data': data or {},
+            'is_read': False,
+            'created_at': created_at
+        } for user_id, event_type, category, message, data in items]
+        if not rows:
+            return []
+        result = db.session.execute(
+            insert(Notification).returning(Notification.id, Notification.user_id, sort_by_parameter_order=True),
+            rows
+        )
+        created = result.all()
+        # Um UPDATE relativo por quantidade de notificações novas por usuário
+        by_delta = {}
+        for user_id, delta in Counter(row.user_id for row in created).items():
+            by_delta.setdefault(delta, []).append(user_id)
+        unread = {}
+        for delta, user_ids in by_delta.items():
+            unread.update(unread_counter.add(user_ids, delta))
+        db.session.commit()
+        payloads = []
+        for row, (_, event_type, category, message, data) in zip(created, items):
+            payload = _notification_payload(row.id, row.user_id, event_type, category, message, data, created_at)
+            payload['unread_count'] = unread.get(row.user_id, 0)
+            payloads.append(payload)
+        return payloads
+    
+    @contextmanager
+    def batch(self):
+        """
+        Agrupa as notificações pessoais (notify_user) enviadas dentro do bloco
+        
+        No fim do bloco elas são gravadas com um único INSERT, no mesmo commit
+        do que estiver pendente na sessão, e só então emitidas. Se o bloco
+        falhar, nada é gravado nem emitido.
+        """
+        if getattr(self._local, 'items', None) is not None:
+            # Lote já aberto nesta thread: o bloco externo grava tudo
+            yield
+            return
+        self._local.items = []
+        try:
+            yield
+            items = self._local.items
+        finally:
+            self._local.items = None
+        if not items:
+            db.session.commit()
+            return
+        for payload in self._insert_rows(items):
+            self.socketio.emit('notification', payload, room=f"user_{payload['user_id']}")
+    
+    def _push_unread(self, totals):
+        """Envia a contagem de não lidas atualizada para a sala de cada usuário"""
+        for user_id, count in totals.items():
+            self.socketio.emit('unread_count', {'unread_count': count}, room=f'user_{user_id}')
+    
+    def _fan_out(self, user_ids, event_type, category, message, data, save_to_db):
+        """Persiste e emite em lotes; cada lote só é emitido depois do seu commit"""
+        for start in range(0, len(user_ids), self.BULK_CHUNK_SIZE):
+            chunk = user_ids[start:start + self.BULK_CHUNK_SIZE]
+            if save_to_db:
+                payloads = self._insert_notifications(chunk, event_type, category, message, data)
+            else:
+                timestamp = datetime.now().isoformat()
+                payloads = [{
+                    'user_id': user_id,
+                    'type': event_type,
+                    'category': category,
+                    'message': message,
+                    'timestamp': timestamp,
+                    'data': data or {}
+                } for user_id in chunk]
+            for payload in payloads:
+                self.socketio.emit('notification', payload, room=f"user_{payload['user_id']}")
+    
+    def notify_many(self, user_ids, event_type, message, category='general', data=None, save_to_db=True, background=None):
+        """
+        Envia a mesma notificação para vários usuários
+        
+        Args:
+            user_ids: IDs dos destinatários
+            event_type: Tipo do evento
+            message: Mensagem da notificação
+            category: Categoria da notificação
+            data: Dados adicionais (opcional)
+            save_to_db: Se True, salva no banco de dados
+            background: Roda em tarefa de fundo (padrão: acima de BACKGROUND_THRESHOLD destinatários)
+        
+        Returns:
+            int: Número de destinatários
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        if background is None:
+            background = len(user_ids) > self.BACKGROUND_THRESHOLD
+        
+        if not background:
+            self._fan_out(user_ids, event_type, category, message, data, save_to_db)
+            return len(user_ids)
+        
+        app = current_app._get_current_object()
+        
+        def run():
+            with app.app_context():
+                try:
+                    self._fan_out(user_ids, event_type, category, message, data, save_to_db)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Erro no envio de notificações em lote: {e}")
+        
+        self.socketio.start_background_task(run)
+        return len(user_ids)
+    
     def notify_all(self, event_type, message, category='general', data=None, save_to_db=True):
         """
         Envia notificação para todos os usuários conectados
@@ -59,12 +225,21 @@ class NotificationService:
             'data': data or {}
         }
         
-        # Salvar no banco se solicitado (notificações globais não são salvas por padrão)
+        # Salvar no banco se solicitado: uma única linha em GlobalNotification,
+        # lida por cada usuário através da sua marca d'água (fan-out na leitura)
         if save_to_db:
-            # Para notificações broadcast, podemos criar uma entrada global
-            self._save_notification(None, event_type, category, message, data)
+            notification = GlobalNotification(
+                type=event_type,
+                category=category,
+                message=message,
+                data=data or {}
+            )
+            db.session.add(notification)
+            db.session.commit()
+            unread_counter.global_added(notification.id)
+            notification_data = notification.to_dict()
         
-        # Emitir para todos os clientes conectados
+        # Emitir para todos os clientes conectados (que somam a global ao contador)
         self.socketio.emit('notification', notification_data, namespace='/')
     
     def notify_user(self, user_id, event_type, message, category='general', data=None, save_to_db=True):
@@ -79,10 +254,17 @@ class NotificationService:
             data: Dados adicionais (opcional)
             save_to_db: Se True, salva no banco de dados
         """
+        items = getattr(self._local, 'items', None)
+        if save_to_db and items is not None:
+            # Dentro de batch(): gravada e emitida no fim do bloco
+            items.append((user_id, event_type, category, message, data))
+            return
+        
         # Salvar no banco de dados
         if save_to_db:
             notification = self._save_notification(user_id, event_type, category, message, data)
             notification_data = notification.to_dict()
+            notification_data['unread_count'] = unread_counter.get(user_id)
         else:
             notification_data = {
                 'type': event_type,
@@ -114,20 +296,66 @@ class NotificationService:
             'data': data or {}
         }
         
-        # Salvar no banco para todos os admins
+        # Salvar no banco para todos os admins (um INSERT e um commit)
         if save_to_db:
             from app.models import User
-            admins = User.query.filter_by(is_admin=True).all()
-            for admin in admins:
-                self._save_notification(admin.id, event_type, category, message, data)
+            admin_ids = [admin_id for (admin_id,) in db.session.query(User.id).filter(User.is_admin == True)]
+            payloads = self._insert_notifications(admin_ids, event_type, category, message, data)
+            self._push_unread({payload['user_id']: payload['unread_count'] for payload in payloads})
         
         self.socketio.emit('admin_notification', notification_data, room='admins')
     
     # ===== MÉTODOS DE GERENCIAMENTO =====
     
+    @staticmethod
+    def _feed_query(user_id, filter_type='all'):
+        """
+        Notificações pessoais e globais do usuário em uma única consulta (UNION ALL)
+        
+        As globais são lidas/não lidas conforme a marca d'água User.global_read_id.
+        """
+        from app.models import User
+        watermark = select(User.global_read_id).where(User.id == user_id).scalar_subquery()
+        
+        personal = select(
+            literal('u').label('kind'), Notification.id, Notification.type, Notification.category,
+            Notification.message, Notification.data, Notification.is_read, Notification.created_at
+        ).where(Notification.user_id == user_id)
+        shared = select(
+            literal('g').label('kind'), GlobalNotification.id, GlobalNotification.type, GlobalNotification.category,
+            GlobalNotification.message, GlobalNotification.data,
+            (GlobalNotification.id <= watermark).label('is_read'), GlobalNotification.created_at
+        )
+        
+        if filter_type == 'unread':
+            personal = personal.where(Notification.is_read == false())
+            shared = shared.where(GlobalNotification.id > watermark)
+        elif filter_type == 'read':
+            personal = personal.where(Notification.is_read == true())
+            shared = shared.where(GlobalNotification.id <= watermark)
+        
+        feed = union_all(personal, shared).subquery('feed')
+        return db.session.query(feed), feed
+    
+    @staticmethod
+    def _feed_item(row, user_id):
+        is_global = row.kind == 'g'
+        return {
+            'id': row.id,
+            'user_id': None if is_global else user_id,
+            'type': row.type,
+            'category': row.category,
+            'message': row.message,
+            'data': row.data or {},
+            'is_read': bool(row.is_read),
+            'is_global': is_global,
+            'created_at': row.created_at.isoformat(),
+            'timestamp': row.created_at.isoformat()
+        }
+    
     def get_user_notifications(self, user_id, filter_type='all', limit=50, offset=0):
         """
-        Obtém notificações de um usuário
+        Obtém notificações de um usuário (pessoais e globais)
         
         Args:
             user_id: ID do usuário
@@ -138,28 +366,53 @@ class NotificationService:
         Returns:
             dict: Notificações e contagem total
         """
-        query = Notification.query.filter_by(user_id=user_id)
-        
-        if filter_type == 'unread':
-            query = query.filter_by(is_read=False)
-        elif filter_type == 'read':
-            query = query.filter_by(is_read=True)
+        query, feed = self._feed_query(user_id, filter_type)
         
         total = query.count()
-        notifications = query.order_by(Notification.created_at.desc()).limit(limit).offset(offset).all()
+        rows = query.order_by(feed.c.created_at.desc(), feed.c.kind, feed.c.id.desc()).limit(limit).offset(offset).all()
         
         return {
-            'notifications': [n.to_dict() for n in notifications],
+            'notifications': [self._feed_item(row, user_id) for row in rows],
             'total': total,
-            'unread_count': Notification.query.filter_by(user_id=user_id, is_read=False).count()
+            'unread_count': self.get_unread_count(user_id)
         }
     
+    def get_notifications_page(self, user_id, filter_type='all', cursor=None, per_page=20):
+        """
+        Obtém uma página de notificações (pessoais e globais) por cursor
+        (created_at, tipo, id), das mais recentes às mais antigas
+        
+        Args:
+            user_id: ID do usuário
+            filter_type: 'all', 'unread', 'read'
+            cursor: Token next_cursor/prev_cursor da página anterior (None = primeira página)
+            per_page: Notificações por página
+        
+        Returns:
+            dict: Notificações, cursores e contagens (limitadas em tabelas grandes)
+        
+        Raises:
+            ValueError: Se o cursor for inválido
+        """
+        query, feed = self._feed_query(user_id, filter_type)
+        
+        page = keyset_paginate(query, (feed.c.created_at, feed.c.kind, feed.c.id), cursor=cursor, per_page=per_page)
+        total, total_is_exact = estimate_count(query)
+        
+        result = {
+            'notifications': [self._feed_item(row, user_id) for row in page.items],
+            'unread_count': self.get_unread_count(user_id)
+        }
+        result.update(page_metadata(page, (total, total_is_exact)))
+        return result
+    
     def mark_as_read(self, notification_id, user_id):
         """Marca notificação como lida"""
         notification = Notification.query.filter_by(id=notification_id, user_id=user_id).first()
         if notification:
             notification.is_read = True
             db.session.commit()
+            self._push_unread(unread_counter.get_many([user_id]))
             return True
         return False
     
@@ -169,13 +422,31 @@ class NotificationService:
         if notification:
             notification.is_read = False
             db.session.commit()
+            self._push_unread(unread_counter.get_many([user_id]))
             return True
         return False
     
+    def mark_global_as_read(self, notification_id, user_id):
+        """
+        Marca uma notificação global como lida avançando a marca d'água do
+        usuário (as globais anteriores a ela também ficam lidas)
+        """
+        from app.models import User
+        if db.session.get(GlobalNotification, notification_id) is None:
+            return False
+        unread = unread_counter.update([user_id], User.global_read_id < notification_id, global_read_id=notification_id)
+        db.session.commit()
+        self._push_unread(unread)
+        return True
+    
     def mark_all_as_read(self, user_id):
-        """Marca todas as notificações do usuário como lidas"""
+        """Marca todas as notificações do usuário (pessoais e globais) como lidas"""
+        from app.models import User
         Notification.query.filter_by(user_id=user_id, is_read=False).update({'is_read': True})
+        latest_global = select(func.coalesce(func.max(GlobalNotification.id), 0)).scalar_subquery()
+        unread = unread_counter.update([user_id], unread_notifications=0, global_read_id=latest_global)
         db.session.commit()
+        self._push_unread(unread)
         return True
     
     def delete_notification(self, notification_id, user_id):
@@ -184,18 +455,25 @@ class NotificationService:
         if notification:
             db.session.delete(notification)
             db.session.commit()
+            self._push_unread(unread_counter.get_many([user_id]))
             return True
         return False
     
     def clear_read_notifications(self, user_id):
-        """Deleta todas as notificações lidas do usuário"""
+        """Deleta todas as notificações lidas do usuário (a contagem de não lidas não muda)"""
         Notification.query.filter_by(user_id=user_id, is_read=True).delete()
         db.session.commit()
         return True
     
     def get_unread_count(self, user_id):
-        """Obtém contagem de notificações não lidas"""
-        return Notification.query.filter_by(user_id=user_id, is_read=False).count()
+        """
+        Obtém contagem de notificações não lidas (pessoais e globais)
+        
+        Lida do cache do unread_counter; sem cache, uma consulta pela chave
+        primária do usuário (coluna unread_notifications + globais acima da
+        marca d'água), sem COUNT sobre as notificações pessoais.
+        """
+        return unread_counter.get(user_id)
     
     # ===== EVENTOS ESPECÍFICOS =====
     
@@ -233,8 +511,8 @@ class NotificationService:
             }
         )
         
-        # Broadcast para todos (sem salvar no DB para evitar spam)
-        self.notify_all(
+        # Anúncio para todos, agrupado com os demais no próximo 'feed_batch'
+        broadcast_aggregator.publish(
             'success',
             f'🎉 {username} completou o desafio "{challenge_title}" e ganhou {points} pontos!',
             category='challenge',
@@ -242,8 +520,7 @@ class NotificationService:
                 'username': username,
                 'challenge': challenge_title,
                 'points': points
-            },
-            save_to_db=False
+            }
         )
     
     def notify_level_up(self, username, user_id, new_level):
@@ -260,16 +537,15 @@ class NotificationService:
             }
         )
         
-        # Broadcast para todos (sem salvar no DB)
-        self.notify_all(
+        # Anúncio para todos, agrupado com os demais no próximo 'feed_batch'
+        broadcast_aggregator.publish(
             'success',
             f'🎊 {username} subiu para o nível {new_level}!',
             category='level_up',
             data={
                 'username': username,
                 'level': new_level
-            },
-            save_to_db=False
+            }
         )
     
     def notify_boss_defeated(self, boss_name, username, user_id):
@@ -286,16 +562,15 @@ class NotificationService:
             }
         )
         
-        # Broadcast para todos (sem salvar no DB)
-        self.notify_all(
+        # Anúncio para todos, agrupado com os demais no próximo 'feed_batch'
+        broadcast_aggregator.publish(
             'success',
             f'⚔️ {username} derrotou o boss "{boss_name}"!',
             category='boss',
             data={
                 'username': username,
                 'boss': boss_name
-            },
-            save_to_db=False
+            }
         )
     
     def notify_team_created(self, team_name, owner_name, owner_id):
@@ -312,16 +587,15 @@ class NotificationService:
             }
         )
         
-        # Broadcast para todos (sem salvar no DB)
-        self.notify_all(
+        # Anúncio para todos, agrupado com os demais no próximo 'feed_batch'
+        broadcast_aggregator.publish(
             'info',
             f'👥 Novo time criado: "{team_name}" por {owner_name}',
             category='team',
             data={
                 'team': team_name,
                 'owner': owner_name
-            },
-            save_to_db=False
+            }
         )
     
     def notify_event_update(self, event_name, progress):
@@ -351,16 +625,15 @@ class NotificationService:
             }
         )
         
-        # Broadcast para todos (sem salvar no DB)
-        self.notify_all(
+        # Anúncio para todos, agrupado com os demais no próximo 'feed_batch'
+        broadcast_aggregator.publish(
             'success',
             f'🏆 {username} desbloqueou a conquista "{achievement_name}"!',
             category='achievement',
             data={
                 'username': username,
                 'achievement': achievement_name
-            },
-            save_to_db=False
+            }
         )
     
     def notify_system_alert(self, message, severity='warning'):
@@ -5,7 +5,6 @@ Detecta atividades suspeitas e envia alertas para super-admins
 from datetime import datetime, timedelta
 from app.extensions import db
 from app.models import AdminLog, User
-from app.services.notification_service import notification_service
 from sqlalchemy import func
 
 
@@ -131,28 +130,34 @@ class SecurityMonitor:
             message += f"{i}. {reason}\n"
         
         # Buscar todos os super-admins (exceto o próprio admin suspeito)
-        super_admins = User.query.filter(
+        super_admin_ids = [user_id for (user_id,) in db.session.query(User.id).filter(
             User.is_admin == True,
             User.id != alert_data['admin_id']
-        ).all()
+        )]
+        
+        # A instância é criada em create_app: buscar no módulo, não na importação
+        from app.services.notification_service import notification_service
+        if not notification_service:
+            return
+        
+        # Alerta detalhado para cada super-admin: um INSERT, um commit e os
+        # eventos emitidos depois do commit
+        notification_service.notify_many(
+            super_admin_ids,
+            event_type='warning',
+            message=message,
+            category='security',
+            data=alert_data,
+            save_to_db=True
+        )
         
-        # Enviar notificação para cada super-admin
-        for super_admin in super_admins:
-            notification_service.notify_user(
-                user_id=super_admin.id,
-                event_type='warning',
-                message=message,
-                category='security',
-                data=alert_data,
-                save_to_db=True
-            )
-        
-        # Também enviar broadcast para admins conectados
+        # Também enviar broadcast para admins conectados (já persistido acima)
         notification_service.notify_admins(
             event_type='warning',
             message=f"🔒 Atividade suspeita detectada de {admin_name}",
             category='security',
-            data={'severity': alert_data['severity']}
+            data={'severity': alert_data['severity']},
+            save_to_db=False
         )
     
     @staticmethod
@@ -0,0 +1,231 @@
+"""
+Fila de Mensagens do Socket.IO
+Permite rodar vários workers (ou máquinas): cada emit é publicado em uma fila
+compartilhada e todo processo entrega aos clientes conectados a ele.
+
+- redis://, rediss://, kafka://, zmq+... ou amqp://: gerenciadores do python-socketio
+- unix:///caminho.sock: hub local por socket Unix (testes e máquina única),
+  iniciado com `python -m app.services.socketio_queue --socket /caminho.sock`
+
+Processos sem servidor Socket.IO (agendadores, scripts) usam create_emitter()
+para publicar na mesma fila.
+"""
+import os
+import socket
+import socketserver
+import threading
+import time
+
+import socketio
+
+DEFAULT_CHANNEL = 'oraculo-socketio'
+UNIX_PREFIX = 'unix://'
+
+
+# ===== HUB LOCAL =====
+
+class PubSubHub:
+    """
+    Repassa cada mensagem publicada a todos os assinantes conectados
+
+    Protocolo: a primeira linha da conexão é SUB ou PUB; depois, uma mensagem
+    JSON por linha.
+    """
+
+    SEND_TIMEOUT_SECONDS = 5.0
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._server = None
+        self.messages = 0
+
+    @property
+    def subscribers(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def _subscribe(self, conn):
+        conn.settimeout(self.SEND_TIMEOUT_SECONDS)
+        with self._lock:
+            self._subscribers[conn] = threading.Lock()
+
+    def _unsubscribe(self, conn):
+        with self._lock:
+            self._subscribers.pop(conn, None)
+
+    def _broadcast(self, line):
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+            self.messages += 1
+        for conn, send_lock in subscribers:
+            try:
+                with send_lock:
+                    conn.sendall(line)
+            except OSError:
+                # Assinante lento ou desconectado: é removido e reconecta sozinho
+                self._unsubscribe(conn)
+
+    def _handler(self):
+        hub = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                role = self.rfile.readline().strip()
+                if role == b'SUB':
+                    hub._subscribe(self.request)
+                    try:
+                        # Só para detectar o fechamento da conexão
+                        while self.rfile.readline():
+                            pass
+                    finally:
+                        hub._unsubscribe(self.request)
+                elif role == b'PUB':
+                    for line in self.rfile:
+                        hub._broadcast(line)
+
+        return Handler
+
+    def start(self):
+        """Começa a atender em segundo plano"""
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='socketio-hub', daemon=True).start()
+
+    def serve_forever(self):
+        self.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        for conn in subscribers:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class UnixSocketManager(socketio.PubSubManager):
+    """Gerenciador de clientes do python-socketio sobre o PubSubHub"""
+
+    name = 'unix'
+    RECONNECT_SECONDS = 1.0
+
+    def __init__(self, url=UNIX_PREFIX + '/tmp/oraculo-socketio.sock', channel=DEFAULT_CHANNEL,
+                 write_only=False, logger=None, json=None):
+        self.socket_path = url[len(UNIX_PREFIX):] if url.startswith(UNIX_PREFIX) else url
+        self._local = threading.local()
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+
+    def _connect(self, role):
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            conn.connect(self.socket_path)
+            conn.sendall(role + b'\n')
+        except OSError:
+            conn.close()
+            raise
+        return conn
+
+    def _publish(self, data):
+        line = (self.json.dumps([self.channel, data]) + '\n').encode('utf-8')
+        for attempt in range(2):
+            conn = getattr(self._local, 'conn', None)
+            try:
+                if conn is None:
+                    conn = self._local.conn = self._connect(b'PUB')
+                conn.sendall(line)
+                return
+            except OSError as e:
+                self._local.conn = None
+                if conn is not None:
+                    conn.close()
+                if attempt:
+                    self._get_logger().error(f'Falha ao publicar no hub do Socket.IO: {e}')
+
+    def _listen(self):
+        while True:
+            try:
+                conn = self._connect(b'SUB')
+            except OSError:
+                time.sleep(self.RECONNECT_SECONDS)
+                continue
+            try:
+                for line in conn.makefile('rb'):
+                    try:
+                        channel, data = self.json.loads(line)
+                    except ValueError:
+                        continue
+                    if channel == self.channel:
+                        yield data
+            except OSError:
+                pass
+            finally:
+                conn.close()
+            time.sleep(self.RECONNECT_SECONDS)
+
+
+# ===== CONFIGURAÇÃO =====
+
+def socketio_options(url, channel=DEFAULT_CHANNEL, write_only=False):
+    """
+    Argumentos de SocketIO() para a fila indicada
+
+    Args:
+        url: SOCKETIO_MESSAGE_QUEUE (None = processo único, sem fila)
+        channel: Canal compartilhado pelos processos da mesma aplicação
+        write_only: Apenas publica (processos sem clientes conectados)
+
+    Returns:
+        dict: message_queue/channel ou client_manager
+    """
+    if not url:
+        return {}
+    if url.startswith(UNIX_PREFIX):
+        return {'message_queue': url, 'client_manager': UnixSocketManager(url, channel=channel, write_only=write_only)}
+    return {'message_queue': url, 'channel': channel}
+
+
+def create_emitter(url, channel=DEFAULT_CHANNEL):
+    """
+    SocketIO somente de escrita para publicar de fora dos workers web
+
+    Uso:
+        emitter = create_emitter(app.config['SOCKETIO_MESSAGE_QUEUE'])
+        emitter.emit('notification', data, room='user_1')
+    """
+    from flask_socketio import SocketIO
+    if not url:
+        raise ValueError('SOCKETIO_MESSAGE_QUEUE não configurado')
+    return SocketIO(**socketio_options(url, channel, write_only=True))
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Hub local da fila de mensagens do Socket.IO')
+    parser.add_argument('--socket', default='/tmp/oraculo-socketio.sock')
+    args = parser.parse_args()
+    hub = PubSubHub(args.socket)
+    print(f"Hub do Socket.IO ouvindo em {args.socket}")
+    hub.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
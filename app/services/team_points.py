@@ -0,0 +1,139 @@
+"""
+Serviço de Pontos das Equipes
+Mantém a coluna desnormalizada Team.points_total na mesma transação que altera
+os pontos ou a equipe de um usuário, e recalcula os totais com um único SUM
+agrupado quando é preciso reparar inconsistências.
+"""
+from sqlalchemy import event, func, inspect, update
+from sqlalchemy.orm import Session
+from app.extensions import db
+
+
+class TeamPointsService:
+    """Totais de pontos por equipe sem iterar os membros"""
+
+    def __init__(self):
+        self._events_registered = False
+
+    def init_app(self, app):
+        """Registra o listener de flush que aplica as variações de pontos"""
+        if self._events_registered:
+            return
+        from app.models import User
+        # active_history garante o valor anterior no histórico do flush
+        for attribute in (User.points, User.team_id):
+            event.listen(attribute, 'set', _keep_value, active_history=True)
+        event.listen(Session, 'after_flush', _apply_deltas)
+        self._events_registered = True
+
+    @staticmethod
+    def collect_deltas(session):
+        """
+        Variações de Team.points_total causadas pelos objetos do flush
+
+        Returns:
+            dict: {team_id: variação}
+        """
+        from app.models import User
+        deltas = {}
+
+        def add(team_id, amount):
+            if team_id and amount:
+                deltas[team_id] = deltas.get(team_id, 0) + amount
+
+        for obj in session.new:
+            if isinstance(obj, User):
+                add(obj.team_id, obj.points or 0)
+
+        for obj in list(session.dirty) + list(session.deleted):
+            if not isinstance(obj, User):
+                continue
+            state = inspect(obj)
+            points_history = state.attrs.points.history
+            team_history = state.attrs.team_id.history
+            new_points = obj.points or 0
+            old_points = (points_history.deleted[0] or 0) if points_history.deleted else new_points
+            old_team = team_history.deleted[0] if team_history.deleted else obj.team_id
+            if obj in session.deleted:
+                add(old_team, -old_points)
+            elif old_team == obj.team_id:
+                add(old_team, new_points - old_points)
+            else:
+                add(old_team, -old_points)
+                add(obj.team_id, new_points)
+        return deltas
+
+    def recompute(self, team_ids=None):
+        """
+        Recalcula Team.points_total com um SUM agrupado e corrige as divergências
+
+        Args:
+            team_ids: Restringe a estas equipes (padrão: todas)
+
+        Returns:
+            dict: {team_id: (valor antigo, valor correto)} das equipes corrigidas
+        """
+        from app.models import User, Team
+        query = db.session.query(Team.id, Team.points_total, func.coalesce(func.sum(User.points), 0))\
+            .outerjoin(User, User.team_id == Team.id).group_by(Team.id, Team.points_total)
+        if team_ids is not None:
+            query = query.filter(Team.id.in_(team_ids))
+        fixed = {}
+        for team_id, stored, actual in query.all():
+            if (stored or 0) != int(actual):
+                fixed[team_id] = (stored, int(actual))
+                db.session.execute(update(Team).where(Team.id == team_id).values(points_total=int(actual)))
+        if fixed:
+            db.session.commit()
+        return fixed
+
+    def member_counts(self, team_ids):
+        """Quantidade de membros por equipe, em uma consulta agrupada"""
+        from app.models import User
+        if not team_ids:
+            return {}
+        rows = db.session.query(User.team_id, func.count(User.id))\
+            .filter(User.team_id.in_(team_ids)).group_by(User.team_id).all()
+        return {team_id: count for team_id, count in rows}
+
+    def standings(self, *options):
+        """
+        Equipes ordenadas por pontos, com a contagem de membros, em uma consulta
+
+        Args:
+            *options: Estratégias de carregamento (ex.: selectinload(Team.owner))
+
+        Returns:
+            list: [(Team, quantidade de membros)]
+        """
+        from app.models import User, Team
+        return db.session.query(Team, func.count(User.id))\
+            .options(*options)\
+            .outerjoin(User, User.team_id == Team.id)\
+            .group_by(Team.id)\
+            .order_by(Team.points_total.desc(), Team.id).all()
+
+
+# Instância global
+team_points = TeamPointsService()
+
+
+def _keep_value(target, value, oldvalue, initiator):
+    return value
+
+
+def _apply_deltas(session, flush_context):
+    """Aplica as variações como UPDATE relativo, dentro da transação do flush"""
+    from app.models import Team
+    deltas = TeamPointsService.collect_deltas(session)
+    if not deltas:
+        return
+    connection = session.connection()
+    for team_id, delta in deltas.items():
+        connection.execute(
+            update(Team).where(Team.id == team_id).values(points_total=Team.points_total + delta)
+        )
+    # Equipes já carregadas na sessão releem o total no próximo acesso
+    for obj in session.identity_map.values():
+        if isinstance(obj, Team) and obj.id in deltas:
+            session.expire(obj, ['points_total'])
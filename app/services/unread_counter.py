@@ -0,0 +1,268 @@
+"""
+Contador de Notificações Não Lidas
+Cada usuário guarda a quantidade de notificações pessoais não lidas na coluna
+desnormalizada User.unread_notifications, ajustada com UPDATE relativo na mesma
+transação que cria, lê, desmarca ou apaga notificações. O próprio UPDATE devolve
+(RETURNING) o novo valor e as globais acima da marca d'água do usuário; depois
+do commit o total vai para o Flask-Caching (Redis quando configurado), de onde
+as leituras saem sem COUNT no banco.
+"""
+from sqlalchemy import event, false, func, inspect, select, update
+from sqlalchemy.orm import Session
+from app.extensions import cache, db
+
+
+class UnreadCounter:
+    """Contagem de não lidas por usuário com leitura O(1)"""
+
+    KEY = 'unread:{}'
+    # Última GlobalNotification conhecida: entradas calculadas antes dela são
+    # recalculadas na próxima leitura
+    GLOBAL_LATEST_KEY = 'unread:global_latest'
+    TIMEOUT = 24 * 3600
+    # Usuários por UPDATE/SELECT em lote
+    CHUNK_SIZE = 1000
+
+    def __init__(self):
+        self._events_registered = False
+
+    def init_app(self, app):
+        """Registra os listeners que mantêm a coluna e o cache"""
+        if self._events_registered:
+            return
+        from app.models import Notification
+        # active_history garante o valor anterior de is_read no histórico do flush
+        event.listen(Notification.is_read, 'set', _keep_value, active_history=True)
+        event.listen(Session, 'before_flush', _load_deleted_state)
+        event.listen(Session, 'after_flush', _apply_flush_deltas)
+        event.listen(Session, 'after_commit', _store_pending)
+        event.listen(Session, 'after_soft_rollback', _discard_pending)
+        self._events_registered = True
+
+    # ===== CONSULTAS =====
+
+    @staticmethod
+    def _columns():
+        from app.models import User, GlobalNotification
+        shared = select(func.count(GlobalNotification.id))\
+            .where(GlobalNotification.id > User.global_read_id)\
+            .correlate(User)\
+            .scalar_subquery()
+        latest = select(func.coalesce(func.max(GlobalNotification.id), 0)).scalar_subquery()
+        return User.id, User.unread_notifications, User.global_read_id, shared, latest
+
+    @staticmethod
+    def _entry(row):
+        """(pessoais, marca d'água, globais não lidas, última global)"""
+        return (int(row[1] or 0), int(row[2] or 0), int(row[3] or 0), int(row[4] or 0))
+
+    def _key(self, user_id):
+        return self.KEY.format(user_id)
+
+    def _load(self, user_ids):
+        """Lê os contadores da coluna (uma consulta por lote) e guarda no cache"""
+        from app.models import User
+        entries = {}
+        for start in range(0, len(user_ids), self.CHUNK_SIZE):
+            chunk = user_ids[start:start + self.CHUNK_SIZE]
+            rows = db.session.execute(select(*self._columns()).where(User.id.in_(chunk)))
+            entries.update({row[0]: self._entry(row) for row in rows})
+        self._store(entries)
+        return entries
+
+    def _store(self, entries):
+        if not entries:
+            return
+        values = {self._key(user_id): entry for user_id, entry in entries.items()}
+        try:
+            cache.set_many(values, timeout=self.TIMEOUT)
+            # Só inicializa: quem avança a última global é global_added
+            cache.add(self.GLOBAL_LATEST_KEY, max(entry[3] for entry in entries.values()), timeout=self.TIMEOUT)
+        except Exception as e:
+            print(f"Erro ao gravar contadores de não lidas: {e}")
+
+    def get_many(self, user_ids):
+        """
+        Total de não lidas (pessoais + globais) de vários usuários
+
+        Returns:
+            dict: {user_id: total}; usuários inexistentes ficam de fora
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return {}
+        try:
+            cached = cache.get_many(self.GLOBAL_LATEST_KEY, *[self._key(user_id) for user_id in user_ids])
+        except Exception as e:
+            print(f"Erro ao ler contadores de não lidas: {e}")
+            cached = [None] * (len(user_ids) + 1)
+        latest, cached = cached[0], cached[1:]
+
+        totals = {}
+        missing = []
+        for user_id, entry in zip(user_ids, cached):
+            if entry is not None and latest is not None and entry[3] >= latest:
+                totals[user_id] = entry[0] + entry[2]
+            else:
+                missing.append(user_id)
+        if missing:
+            for user_id, entry in self._load(missing).items():
+                totals[user_id] = entry[0] + entry[2]
+        return totals
+
+    def get(self, user_id):
+        """Total de não lidas (pessoais + globais) de um usuário"""
+        return self.get_many([user_id]).get(user_id, 0)
+
+    # ===== ATUALIZAÇÃO =====
+
+    def update(self, user_ids, *criteria, **values):
+        """
+        Aplica um UPDATE em User (contador e/ou marca d'água) na transação
+        atual; o cache é atualizado quando ela for confirmada
+
+        Args:
+            user_ids: Usuários afetados
+            *criteria: Condições extras do WHERE
+            **values: Colunas de User a alterar
+
+        Returns:
+            dict: {user_id: total de não lidas} após a alteração
+        """
+        return _execute_update(db.session, user_ids, criteria, values)
+
+    def add(self, user_ids, delta=1):
+        """Soma delta ao contador pessoal de cada usuário (ver update)"""
+        from app.models import User
+        return self.update(user_ids, unread_notifications=User.unread_notifications + delta)
+
+    def global_added(self, notification_id):
+        """Registra uma GlobalNotification recém-criada (chamar após o commit)"""
+        try:
+            cache.set(self.GLOBAL_LATEST_KEY, notification_id, timeout=self.TIMEOUT)
+        except Exception as e:
+            print(f"Erro ao atualizar contadores de não lidas: {e}")
+
+    def recompute(self, user_ids=None):
+        """
+        Recalcula User.unread_notifications com um COUNT agrupado e corrige as divergências
+
+        Args:
+            user_ids: Restringe a estes usuários (padrão: todos)
+
+        Returns:
+            dict: {user_id: (valor antigo, valor correto)} dos usuários corrigidos
+        """
+        from app.models import User, Notification
+        actual = select(func.count(Notification.id))\
+            .where(Notification.user_id == User.id, Notification.is_read == false())\
+            .correlate(User)\
+            .scalar_subquery()
+        query = db.session.query(User.id, User.unread_notifications, actual)
+        if user_ids is not None:
+            query = query.filter(User.id.in_(user_ids))
+        fixed = {}
+        for user_id, stored, count in query.all():
+            if (stored or 0) != count:
+                fixed[user_id] = (stored, count)
+                db.session.execute(update(User).where(User.id == user_id).values(unread_notifications=count))
+        if fixed:
+            db.session.commit()
+            try:
+                cache.delete_many(*[self._key(user_id) for user_id in fixed])
+            except Exception as e:
+                print(f"Erro ao invalidar contadores de não lidas: {e}")
+        return fixed
+
+
+# Instância global
+unread_counter = UnreadCounter()
+
+
+# ===== LISTENERS =====
+
+_PENDING_KEY = 'unread_counter_pending'
+
+
+def _execute_update(session, user_ids, criteria, values):
+    from app.models import User
+    user_ids = list(dict.fromkeys(user_id for user_id in user_ids if user_id is not None))
+    connection = session.connection()
+    entries = {}
+    for start in range(0, len(user_ids), UnreadCounter.CHUNK_SIZE):
+        chunk = user_ids[start:start + UnreadCounter.CHUNK_SIZE]
+        statement = update(User).where(User.id.in_(chunk), *criteria).values(**values)\
+            .returning(*UnreadCounter._columns())
+        entries.update({row[0]: UnreadCounter._entry(row) for row in connection.execute(statement)})
+    if entries:
+        session.info.setdefault(_PENDING_KEY, {}).update(entries)
+        # Usuários já carregados na sessão releem os contadores no próximo acesso
+        for obj in session.identity_map.values():
+            if isinstance(obj, User) and obj.id in entries:
+                session.expire(obj, ['unread_notifications', 'global_read_id'])
+    return {user_id: entry[0] + entry[2] for user_id, entry in entries.items()}
+
+
+def _keep_value(target, value, oldvalue, initiator):
+    return value
+
+
+def _load_deleted_state(session, flush_context, instances):
+    """Carrega is_read das notificações a apagar enquanto a linha ainda existe"""
+    from app.models import Notification
+    for obj in session.deleted:
+        if isinstance(obj, Notification):
+            obj.is_read
+
+
+def _collect_deltas(session):
+    """
+    Variações de User.unread_notifications causadas pelos objetos do flush
+
+    Returns:
+        dict: {user_id: variação}
+    """
+    from app.models import Notification
+    deltas = {}
+
+    def add(user_id, amount):
+        if user_id and amount:
+            deltas[user_id] = deltas.get(user_id, 0) + amount
+
+    for obj in session.new:
+        if isinstance(obj, Notification) and not obj.is_read:
+            add(obj.user_id, 1)
+
+    for obj in list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, Notification):
+            continue
+        history = inspect(obj).attrs.is_read.history
+        was_unread = not (history.deleted[0] if history.deleted else obj.is_read)
+        if obj in session.deleted:
+            add(obj.user_id, -1 if was_unread else 0)
+        elif was_unread != (not obj.is_read):
+            add(obj.user_id, -1 if was_unread else 1)
+    return deltas
+
+
+def _apply_flush_deltas(session, flush_context):
+    """Aplica as variações como UPDATE relativo, dentro da transação do flush"""
+    from app.models import User
+    by_delta = {}
+    for user_id, delta in _collect_deltas(session).items():
+        by_delta.setdefault(delta, []).append(user_id)
+    for delta, user_ids in by_delta.items():
+        _execute_update(session, user_ids, (), {'unread_notifications': User.unread_notifications + delta})
+
+
+def _store_pending(session):
+    """Depois do commit, grava no cache os contadores devolvidos pelos UPDATEs"""
+    entries = session.info.pop(_PENDING_KEY, None)
+    if entries:
+        unread_counter._store(entries)
+
+
+def _discard_pending(session, previous_transaction):
+    """Descarta os contadores pendentes quando a transação externa é desfeita"""
+    if not session.in_transaction():
+        session.info.pop(_PENDING_KEY, None)
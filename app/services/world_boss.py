@@ -0,0 +1,216 @@
+"""
+Serviço do World Boss (GlobalEvent)
+Aplica o dano das submissões sem ler e regravar a linha do evento em Python:
+current_hp desce com um UPDATE atômico limitado a zero e a contribuição do
+usuário é somada com upsert (INSERT ... ON CONFLICT DO UPDATE), de modo que
+submissões concorrentes não perdem dano.
+
+Com WORLD_BOSS_DAMAGE_SHARDS > 1, o dano vai para uma de N fatias
+(GlobalEventDamageShard) e é aplicado em current_hp de tempos em tempos
+(WORLD_BOSS_MERGE_SECONDS), evitando que todas as submissões esperem pelo
+bloqueio da mesma linha no PostgreSQL. O merge acontece na submissão seguinte
+ou no tick do stream de HP, que continua ativo enquanto houver dano nas fatias.
+
+Cada dano aplicado fica registrado em session.info e, depois do commit, segue
+para o stream de HP (world_boss_stream).
+"""
+import random
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import case, delete, func, select, update
+from app.extensions import db
+
+
+# damage: dano aplicado; current_hp: HP após o dano (None se ainda está nas fatias);
+# defeated: esta operação levou o HP a zero
+DamageResult = namedtuple('DamageResult', 'event_id damage current_hp defeated')
+
+# Danos da transação atual: [(event_id, dano, current_hp ou None)], lidos após o commit
+PENDING_KEY = 'world_boss_damage'
+
+
+def _stash(event_id, damage, current_hp):
+    db.session.info.setdefault(PENDING_KEY, []).append((event_id, damage, current_hp))
+
+
+class WorldBossService:
+    """Dano e contribuições dos eventos globais, seguros sob concorrência"""
+
+    MERGE_SECONDS = 2.0
+
+    def __init__(self):
+        self.shards = 0
+        self.merge_seconds = self.MERGE_SECONDS
+        self._lock = threading.Lock()
+        self._last_merge = {}
+
+    def init_app(self, app):
+        """Lê a configuração das fatias de dano"""
+        self.shards = int(app.config.get('WORLD_BOSS_DAMAGE_SHARDS', 0) or 0)
+        self.merge_seconds = float(app.config.get('WORLD_BOSS_MERGE_SECONDS', self.MERGE_SECONDS))
+        with self._lock:
+            self._last_merge = {}
+
+    # ===== CONSULTAS =====
+
+    @staticmethod
+    def active_event(now=None):
+        """Evento global ativo, dentro do período e com HP (None se não houver)"""
+        from app.models import GlobalEvent
+        now = now or datetime.utcnow()
+        return GlobalEvent.query.filter(
+            GlobalEvent.is_active == True,
+            GlobalEvent.start_date <= now,
+            GlobalEvent.end_date >= now,
+            GlobalEvent.current_hp > 0
+        ).first()
+
+    @staticmethod
+    def pending_damage(event_id):
+        """Dano nas fatias ainda não aplicado em current_hp"""
+        from app.models import GlobalEventDamageShard
+        return db.session.query(func.coalesce(func.sum(GlobalEventDamageShard.damage), 0))\
+            .filter(GlobalEventDamageShard.event_id == event_id).scalar() or 0
+
+    # ===== ESCRITA =====
+
+    @staticmethod
+    def _upsert(model, index_elements, values, increment):
+        """
+        INSERT ... ON CONFLICT DO UPDATE somando a coluna increment
+
+        Em bancos sem ON CONFLICT, tenta o UPDATE relativo e insere se nenhuma
+        linha existir.
+        """
+        dialect = db.session.get_bind().dialect.name
+        column = getattr(model, increment)
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            statement = insert(model).values(**values)
+            statement = statement.on_conflict_do_update(
+                index_elements=index_elements,
+                set_={increment: column + statement.excluded[increment]}
+            )
+            db.session.execute(statement)
+            return
+        criteria = [getattr(model, name) == values[name] for name in index_elements]
+        result = db.session.execute(
+            update(model).where(*criteria).values({increment: column + values[increment]})
+            .execution_options(synchronize_session=False)
+        )
+        if not result.rowcount:
+            db.session.add(model(**values))
+            db.session.flush()
+
+    @staticmethod
+    def _subtract_hp(event_id, damage):
+        """UPDATE atômico com piso em zero; None se o evento já estava derrotado"""
+        from app.models import GlobalEvent
+        return db.session.execute(
+            update(GlobalEvent)
+            .where(GlobalEvent.id == event_id, GlobalEvent.current_hp > 0)
+            .values(current_hp=case((GlobalEvent.current_hp > damage, GlobalEvent.current_hp - damage), else_=0))
+            .returning(GlobalEvent.current_hp)
+        ).scalar()
+
+    def add_contribution(self, event_id, user_id, points):
+        """Soma pontos à contribuição do usuário no evento (upsert)"""
+        from app.models import GlobalEventContribution
+        self._upsert(
+            GlobalEventContribution, ('event_id', 'user_id'),
+            {'event_id': event_id, 'user_id': user_id, 'contribution_points': points,
+             'created_at': datetime.utcnow()},
+            'contribution_points'
+        )
+
+    def apply_damage(self, event_id, user_id, damage):
+        """
+        Aplica o dano de uma submissão na transação atual (o commit é do chamador)
+
+        Args:
+            event_id: ID do GlobalEvent
+            user_id: Usuário que causou o dano
+            damage: Pontos de dano
+
+        Returns:
+            DamageResult: damage 0 se o evento já estava derrotado
+        """
+        if damage <= 0:
+            return DamageResult(event_id, 0, None, False)
+
+        if self.shards > 1:
+            from app.models import GlobalEvent, GlobalEventDamageShard
+            # Evento derrotado (ou removido): nada de dano nem contribuição nas fatias
+            current_hp = db.session.execute(
+                select(GlobalEvent.current_hp).where(GlobalEvent.id == event_id)
+            ).scalar()
+            if (current_hp or 0) <= 0:
+                return DamageResult(event_id, 0, 0, False)
+            self._upsert(
+                GlobalEventDamageShard, ('event_id', 'shard'),
+                {'event_id': event_id, 'shard': random.randrange(self.shards), 'damage': damage},
+                'damage'
+            )
+            self.add_contribution(event_id, user_id, damage)
+            _stash(event_id, damage, None)
+            merged = self.merge_if_due(event_id)
+            if merged is not None:
+                return DamageResult(event_id, damage, merged.current_hp, merged.defeated)
+            return DamageResult(event_id, damage, None, False)
+
+        current_hp = self._subtract_hp(event_id, damage)
+        if current_hp is None:
+            return DamageResult(event_id, 0, 0, False)
+        self.add_contribution(event_id, user_id, damage)
+        _stash(event_id, damage, current_hp)
+        return DamageResult(event_id, damage, current_hp, current_hp == 0)
+
+    # ===== FATIAS =====
+
+    def merge_if_due(self, event_id):
+        """merge() se já passou WORLD_BOSS_MERGE_SECONDS desde o último (None caso contrário)"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_merge.get(event_id, 0.0) < self.merge_seconds:
+                return None
+            self._last_merge[event_id] = now
+        return self.merge(event_id)
+
+    def merge(self, event_id):
+        """
+        Aplica em current_hp o dano acumulado nas fatias (na transação atual)
+
+        As fatias são removidas com DELETE ... RETURNING, então cada unidade de
+        dano é aplicada uma única vez mesmo com merges concorrentes.
+
+        Returns:
+            DamageResult: Dano aplicado, HP resultante e se o evento foi derrotado
+        """
+        from app.models import GlobalEvent, GlobalEventDamageShard
+        damage = sum(db.session.execute(
+            delete(GlobalEventDamageShard)
+            .where(GlobalEventDamageShard.event_id == event_id)
+            .returning(GlobalEventDamageShard.damage)
+        ).scalars())
+        if not damage:
+            current_hp = db.session.execute(
+                select(GlobalEvent.current_hp).where(GlobalEvent.id == event_id)
+            ).scalar() or 0
+            _stash(event_id, 0, current_hp)
+            return DamageResult(event_id, 0, current_hp, False)
+        current_hp = self._subtract_hp(event_id, damage)
+        if current_hp is None:
+            _stash(event_id, 0, 0)
+            return DamageResult(event_id, 0, 0, False)
+        # O dano já foi registrado por submissão; aqui só o HP real
+        _stash(event_id, 0, current_hp)
+        return DamageResult(event_id, damage, current_hp, current_hp == 0)
+
+
+# Instância global
+world_boss = WorldBossService()
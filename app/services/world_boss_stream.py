@@ -0,0 +1,291 @@
+"""
+Stream de HP do World Boss
+Os danos confirmados (após o commit) ficam acumulados por evento e saem em um
+único 'world_boss_hp' por tick (WORLD_BOSS_STREAM_HZ por segundo) para a sala
+'world_boss', com o HP atual e o dano somado desde o tick anterior.
+
+Com o dano em fatias (WORLD_BOSS_DAMAGE_SHARDS), o tick também chama
+world_boss.merge_if_due() e continua ativo até o dano registrado chegar a
+current_hp, mesmo que não haja novas submissões.
+
+O mesmo tick mantém um snapshot do evento ativo no Flask-Caching: os
+dashboards e os clientes que acabam de se inscrever leem o snapshot em vez de
+consultar GlobalEvent.
+"""
+import threading
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.extensions import cache, db
+
+
+class EventSnapshot(namedtuple('EventSnapshot', [
+        'id', 'name', 'description', 'total_hp', 'current_hp', 'start_date', 'end_date', 'reward_points_on_win'])):
+    """Cópia imutável de um GlobalEvent (desacoplada da sessão do SQLAlchemy)"""
+    __slots__ = ()
+
+    @property
+    def progress(self):
+        """Percentual do HP já retirado"""
+        if not self.total_hp:
+            return 0
+        return ((self.total_hp - self.current_hp) / self.total_hp) * 100
+
+    def to_dict(self):
+        return {
+            'event_id': self.id,
+            'name': self.name,
+            'description': self.description,
+            'total_hp': self.total_hp,
+            'current_hp': self.current_hp,
+            'progress': round(self.progress, 2),
+            'end_date': self.end_date.isoformat() if self.end_date else None
+        }
+
+
+class WorldBossStream:
+    """Atualizações de HP limitadas por tick e snapshot do evento ativo"""
+
+    EVENT_NAME = 'world_boss_hp'
+    SNAPSHOT_EVENT = 'world_boss_snapshot'
+    ROOM = 'world_boss'
+    SNAPSHOT_KEY = 'world_boss:snapshot'
+    HZ = 4.0
+    SNAPSHOT_SECONDS = 30
+    # Percentuais anunciados a todos com notify_event_update
+    MILESTONES = (25, 50, 75)
+
+    def __init__(self, socketio=None, app=None):
+        self.socketio = socketio
+        self.app = app
+        self.interval = 1.0 / self.HZ
+        self.snapshot_timeout = self.SNAPSHOT_SECONDS
+        self._lock = threading.Lock()
+        self._pending = {}
+        # Dano registrado nas fatias e ainda não aplicado em current_hp, por evento
+        self._unmerged = {}
+        self._running = False
+        self._events_registered = False
+        self.received = 0
+        self.ticks = 0
+        self.emitted = 0
+
+    def init_app(self, app, socketio):
+        """Configura a taxa do stream e registra o listener de commit"""
+        self.app = app
+        self.socketio = socketio
+        self.interval = 1.0 / float(app.config.get('WORLD_BOSS_STREAM_HZ', self.HZ))
+        self.snapshot_timeout = int(app.config.get('WORLD_BOSS_SNAPSHOT_SECONDS', self.SNAPSHOT_SECONDS))
+        if not self._events_registered:
+            event.listen(Session, 'after_commit', _record_committed)
+            event.listen(Session, 'after_soft_rollback', _discard_pending)
+            self._events_registered = True
+
+    # ===== SNAPSHOT =====
+
+    @staticmethod
+    def _snapshot_of(global_event):
+        if global_event is None:
+            return None
+        return EventSnapshot(
+            global_event.id, global_event.name, global_event.description, global_event.total_hp,
+            global_event.current_hp, global_event.start_date, global_event.end_date,
+            global_event.reward_points_on_win
+        )
+
+    def _cached(self):
+        try:
+            return cache.get(self.SNAPSHOT_KEY)
+        except Exception as e:
+            print(f"Erro ao ler snapshot do World Boss: {e}")
+            return None
+
+    def _store(self, snapshot):
+        try:
+            cache.set(self.SNAPSHOT_KEY, {'event': snapshot}, timeout=self.snapshot_timeout)
+        except Exception as e:
+            print(f"Erro ao gravar snapshot do World Boss: {e}")
+
+    def snapshot(self, now=None):
+        """
+        Evento global ativo a partir do cache (consulta o banco só quando expira)
+
+        Returns:
+            EventSnapshot ou None se não houver evento ativo com HP
+        """
+        entry = self._cached()
+        if entry is None:
+            from app.services.world_boss import world_boss
+            current = self._snapshot_of(world_boss.active_event(now))
+            self._store(current)
+        else:
+            current = entry['event']
+        now = now or datetime.utcnow()
+        if current is None or current.current_hp <= 0 or current.end_date < now:
+            return None
+        return current
+
+    def invalidate(self):
+        """Descarta o snapshot (evento criado, editado ou apagado)"""
+        try:
+            cache.delete(self.SNAPSHOT_KEY)
+        except Exception as e:
+            print(f"Erro ao invalidar snapshot do World Boss: {e}")
+
+    def snapshot_payload(self):
+        current = self.snapshot()
+        return {'event': current.to_dict() if current else None}
+
+    # ===== STREAM =====
+
+    def record(self, event_id, damage, current_hp=None):
+        """
+        Acumula um dano confirmado para o próximo tick
+
+        Args:
+            event_id: ID do GlobalEvent
+            damage: Dano causado
+            current_hp: HP devolvido pelo UPDATE (None se o dano ainda está nas fatias)
+        """
+        with self._lock:
+            self.received += 1
+            pending = self._pending.get(event_id)
+            if pending is None:
+                pending = self._pending[event_id] = [0, None]
+            pending[0] += damage
+            if current_hp is not None:
+                pending[1] = current_hp if pending[1] is None else min(pending[1], current_hp)
+                self._unmerged.pop(event_id, None)
+            else:
+                self._unmerged[event_id] = self._unmerged.get(event_id, 0) + damage
+            start = not self._running
+            self._running = True
+        if start:
+            self.socketio.start_background_task(self._run)
+
+    def flush(self):
+        """
+        Emite um 'world_boss_hp' por evento com dano acumulado
+
+        Returns:
+            int: Eventos atualizados
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            unmerged = dict(self._unmerged)
+        if unmerged:
+            with self.app.app_context():
+                self._merge(unmerged)
+        if not pending:
+            return 0
+        with self.app.app_context():
+            updates = [self._apply(event_id, damage, current_hp, unmerged.get(event_id, 0))
+                       for event_id, (damage, current_hp) in pending.items()]
+        updates = [update for update in updates if update]
+        for payload in updates:
+            self.socketio.emit(self.EVENT_NAME, payload, room=self.ROOM, namespace='/')
+        with self._lock:
+            self.ticks += 1
+            self.emitted += len(updates)
+        return len(updates)
+
+    def _merge(self, event_ids):
+        """Aplica o dano das fatias em current_hp; o HP real chega no próximo tick"""
+        from app.services.world_boss import world_boss
+        for event_id in event_ids:
+            try:
+                if world_boss.merge_if_due(event_id) is not None:
+                    db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Erro ao aplicar as fatias de dano do evento {event_id}: {e}")
+
+    def _apply(self, event_id, damage, current_hp, unmerged=0):
+        """
+        Atualiza o snapshot com o dano do tick e monta o payload
+
+        O snapshot só guarda HP real (devolvido pelo UPDATE ou pelo merge). O dano
+        ainda nas fatias (unmerged) entra apenas no HP exibido, que não chega a
+        zero: 'defeated' só é anunciado com o HP real.
+        """
+        entry = self._cached()
+        previous = entry['event'] if entry else None
+        if previous is None or previous.id != event_id:
+            from app.models import GlobalEvent
+            previous = self._snapshot_of(db.session.get(GlobalEvent, event_id))
+            if previous is None:
+                return None
+        defeated = current_hp == 0
+        if current_hp is None:
+            current_hp = previous.current_hp
+        current_hp = min(current_hp, previous.current_hp)
+        updated = previous._replace(current_hp=current_hp)
+
+        if current_hp == 0:
+            # O próximo snapshot volta ao banco (pode haver outro evento ativo)
+            self.invalidate()
+        elif entry is None or entry['event'] is None or entry['event'].id == event_id:
+            self._store(updated)
+
+        crossed = [m for m in self.MILESTONES if previous.progress < m <= updated.progress]
+        if crossed and current_hp > 0:
+            from app.services.notification_service import notification_service
+            if notification_service:
+                notification_service.notify_event_update(updated.name, crossed[-1])
+
+        displayed = updated
+        if unmerged and current_hp > 0:
+            displayed = updated._replace(current_hp=max(1, current_hp - unmerged))
+        payload = displayed.to_dict()
+        payload.update({'damage': damage, 'defeated': defeated})
+        return payload
+
+    def _run(self):
+        """Emite um tick por intervalo enquanto houver dano (ou fatias por aplicar); encerra após um tick ocioso"""
+        while True:
+            self.socketio.sleep(self.interval)
+            try:
+                if self.flush():
+                    continue
+            except Exception as e:
+                print(f"Erro ao emitir HP do World Boss: {e}")
+            with self._lock:
+                if not self._pending and not self._unmerged:
+                    self._running = False
+                    return
+
+    # ===== MÉTRICAS =====
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending_events': len(self._pending),
+                'unmerged_events': len(self._unmerged),
+                'received': self.received,
+                'ticks': self.ticks,
+                'emitted': self.emitted,
+                'hz': round(1.0 / self.interval, 3)
+            }
+
+
+# Instância global
+world_boss_stream = WorldBossStream()
+
+
+# ===== LISTENERS =====
+
+def _record_committed(session):
+    """Depois do commit, passa os danos da transação para o stream"""
+    from app.services.world_boss import PENDING_KEY
+    damages = session.info.pop(PENDING_KEY, None)
+    if damages and world_boss_stream.socketio is not None:
+        for event_id, damage, current_hp in damages:
+            world_boss_stream.record(event_id, damage, current_hp)
+
+
+def _discard_pending(session, previous_transaction):
+    """Descarta os danos pendentes quando a transação externa é desfeita"""
+    from app.services.world_boss import PENDING_KEY
+    if not session.in_transaction():
+        session.info.pop(PENDING_KEY, None)
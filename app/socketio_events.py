@@ -65,3 +65,10 @@ def register_socketio_events(socketio):
             if user_id == current_user.id:
                 leave_room(f'user_{user_id}')
                 emit('room_left', {'room': f'user_{user_id}'})
+    
+    @socketio.on('subscribe_world_boss')
+    def handle_subscribe_world_boss():
+        """Inscreve o cliente no stream de HP do World Boss e envia o snapshot atual"""
+        from app.services.world_boss_stream import world_boss_stream
+        join_room(world_boss_stream.ROOM)
+        emit(world_boss_stream.SNAPSHOT_EVENT, world_boss_stream.snapshot_payload())
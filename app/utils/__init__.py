@@ -3,22 +3,38 @@ Utilitários compartilhados
 """
 from app.utils.ticket_utils import process_ticket_command, suggest_solution
 from app.utils.faq_utils import (
-    find_faq_by_nlp, find_faqs_by_keywords, format_faq_response,
-    is_image_url, is_video_url
+    find_faq_by_nlp, find_faqs_by_keywords, find_faq_by_similarity,
+    format_faq_response, is_image_url, is_video_url,
+    index_faqs, unindex_faqs
 )
 from app.utils.gamification_utils import (
     update_user_level, check_and_award_achievements,
     check_boss_fight_completion, check_and_complete_paths,
-    get_or_create_daily_challenge, finalize_ended_battles
+    get_or_create_daily_challenge, finalize_ended_battles,
+    award_points, points_in_window
 )
-from app.utils.file_utils import extract_faqs_from_pdf
+from app.utils.file_utils import extract_faqs_from_pdf, upload_image
+from app.utils.metrics import LatencyHistogram
+from app.utils.query_profile import LOADER_PROFILES, with_profile, get_query_count, init_query_counter
+from app.utils.pagination import (
+    KeysetPage, encode_cursor, decode_cursor, keyset_paginate, paginate_request,
+    estimate_count, page_metadata
+)
+from app.utils.startup_profile import StartupTimer, parse_importtime, profile_startup
 
 __all__ = [
     'process_ticket_command', 'suggest_solution',
-    'find_faq_by_nlp', 'find_faqs_by_keywords', 'format_faq_response',
-    'is_image_url', 'is_video_url',
+    'find_faq_by_nlp', 'find_faqs_by_keywords', 'find_faq_by_similarity',
+    'format_faq_response', 'is_image_url', 'is_video_url',
+    'index_faqs', 'unindex_faqs',
     'update_user_level', 'check_and_award_achievements',
     'check_boss_fight_completion', 'check_and_complete_paths',
     'get_or_create_daily_challenge', 'finalize_ended_battles',
-    'extract_faqs_from_pdf'
+    'award_points', 'points_in_window',
+    'extract_faqs_from_pdf', 'upload_image',
+    'LatencyHistogram',
+    'LOADER_PROFILES', 'with_profile', 'get_query_count', 'init_query_counter',
+    'KeysetPage', 'encode_cursor', 'decode_cursor', 'keyset_paginate', 'paginate_request',
+    'estimate_count', 'page_metadata',
+    'StartupTimer', 'parse_importtime', 'profile_startup'
 ]
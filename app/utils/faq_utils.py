@@ -1,18 +1,63 @@
 """
 Utilitários para processamento e busca de FAQs
 """
+import importlib.util
 import re
+import threading
+from importlib import metadata
 from app.models import FAQ
-try:
-    import spacy
-    SPACY_AVAILABLE = True
+
+# O spaCy (e o modelo) só é carregado na primeira análise que precisar dele:
+# importar este módulo não custa quase nada no boot
+SPACY_MODEL = 'pt_core_news_sm'
+SPACY_AVAILABLE = importlib.util.find_spec('spacy') is not None
+_nlp = None
+_nlp_loaded = False
+_nlp_lock = threading.Lock()
+
+
+def get_nlp():
+    """Pipeline do spaCy carregado sob demanda (None se spaCy/modelo indisponível)"""
+    global _nlp, _nlp_loaded
+    if not _nlp_loaded:
+        with _nlp_lock:
+            if not _nlp_loaded:
+                if SPACY_AVAILABLE:
+                    try:
+                        import spacy
+                        _nlp = spacy.load(SPACY_MODEL)
+                    except (ImportError, OSError):
+                        print(f"Modelo {SPACY_MODEL} não encontrado.")
+                        _nlp = None
+                _nlp_loaded = True
+    return _nlp
+
+
+def nlp_analyzer_id():
+    """
+    Identifica o analisador de texto sem carregar o modelo
+
+    Antes do primeiro uso, a versão vem dos metadados do pacote do modelo; assim
+    os caches de lemas podem ser consultados sem importar o spaCy.
+    """
+    if _nlp_loaded:
+        if _nlp is None:
+            return 'regex'
+        return f"spacy:{_nlp.meta.get('name')}:{_nlp.meta.get('version')}"
+    if not SPACY_AVAILABLE:
+        return 'regex'
     try:
-        nlp = spacy.load('pt_core_news_sm')
-    except OSError:
-        nlp = None
-except ImportError:
-    SPACY_AVAILABLE = False
-    nlp = None
+        version = metadata.version(SPACY_MODEL)
+    except metadata.PackageNotFoundError:
+        return 'regex'
+    return f"spacy:{SPACY_MODEL.split('_', 1)[1]}:{version}"
+
+
+def __getattr__(name):
+    # Compatibilidade com o antigo atributo faq_utils.nlp
+    if name == 'nlp':
+        return get_nlp()
+    raise AttributeError(name)
 
 
 def is_image_url(url):
@@ -86,57 +131,92 @@ def format_faq_response(faq_id, question, answer, image_url=None, video_url=None
     return formatted_response
 
 
-def find_faqs_by_keywords(message):
+# FAQs com score abaixo desta fração do melhor resultado não são oferecidas
+# como alternativas no chat (evita o estado "várias FAQs" quando há um vencedor claro)
+AMBIGUITY_RATIO = 0.75
+
+
+def _load_ranked_faqs(ranked):
+    """Carrega as FAQs ranqueadas (faq_id, score) preservando a ordem"""
+    if not ranked:
+        return []
+    faq_ids = [faq_id for faq_id, _ in ranked]
+    faqs_by_id = {faq.id: faq for faq in FAQ.query.filter(FAQ.id.in_(faq_ids)).all()}
+    return [faqs_by_id[faq_id] for faq_id in faq_ids if faq_id in faqs_by_id]
+
+
+def find_faqs_by_keywords(message, limit=5):
     """
-    Busca FAQs por palavras-chave
+    Busca FAQs por palavras-chave com ranqueamento BM25
     
     Args:
         message: Mensagem do usuário
+        limit: Número máximo de FAQs retornadas
         
     Returns:
         Lista de FAQs ordenadas por relevância
     """
-    search_words = set(message.lower().split())
-    if not search_words:
-        return []
-    faqs = FAQ.query.all()
-    matches = []
-    for faq in faqs:
-        question_words = set(faq.question.lower().split())
-        answer_words = set(faq.answer.lower().split())
-        score = len(search_words.intersection(question_words)) * 2
-        score += len(search_words.intersection(answer_words))
-        if score > 0:
-            matches.append((faq, score))
-    matches.sort(key=lambda x: x[1], reverse=True)
-    return [match[0] for match in matches]
-
-
-def find_faq_by_nlp(message):
+    from app.services.faq_index import faq_index
+    return _load_ranked_faqs(faq_index.search(message, limit=limit))
+
+
+def find_faq_by_nlp(message, limit=5):
     """
-    Busca FAQs usando NLP (se disponível) ou fallback para keywords
+    Busca FAQs usando o índice invertido de lemas (NLP se disponível)
+    
+    Retorna apenas os resultados próximos do melhor score, de modo que uma
+    FAQ claramente mais relevante seja respondida diretamente.
     
     Args:
         message: Mensagem do usuário
+        limit: Número máximo de FAQs retornadas
         
     Returns:
         Lista de FAQs ordenadas por relevância
     """
-    if nlp is None:
-        return find_faqs_by_keywords(message)
+    from app.services.faq_index import faq_index
+    return _load_ranked_faqs(faq_index.search(message, limit=limit, min_ratio=AMBIGUITY_RATIO))
+
+
+def find_faq_by_similarity(message, limit=5):
+    """
+    Busca FAQs por similaridade de vetores (fallback quando nenhum lema coincide)
     
-    doc = nlp(message.lower())
-    keywords = {token.lemma_ for token in doc if not token.is_stop and not token.is_punct}
-    if not keywords:
-        return []
-    faqs = FAQ.query.all()
-    matches = []
-    for faq in faqs:
-        faq_text = f"{faq.question.lower()} {faq.answer.lower()}"
-        faq_doc = nlp(faq_text)
-        faq_keywords = {token.lemma_ for token in faq_doc if not token.is_stop and not token.is_punct}
-        score = len(keywords.intersection(faq_keywords))
-        if score > 0:
-            matches.append((faq, score))
-    matches.sort(key=lambda x: x[1], reverse=True)
-    return [match[0] for match in matches]
+    Args:
+        message: Mensagem do usuário
+        limit: Número máximo de FAQs retornadas
+        
+    Returns:
+        Lista de FAQs ordenadas por similaridade
+    """
+    from app.services.faq_vectors import faq_vectors
+    return _load_ranked_faqs(faq_vectors.search(message, limit=limit))
+
+
+def index_faqs(faqs):
+    """
+    Atualiza as estruturas de busca após criar, editar ou importar FAQs
+    
+    Args:
+        faqs: Lista de FAQs já persistidas (com id)
+    """
+    from app.services.faq_index import faq_index
+    from app.services.faq_vectors import faq_vectors
+    from app.services.lemma_service import lemma_service
+    # Uma única passada do nlp.pipe; índice e vetores reaproveitam o cache
+    lemma_service.relemmatize(faqs)
+    faq_index.add_many(faqs)
+    faq_vectors.add_many(faqs)
+
+
+def unindex_faqs(faq_ids):
+    """
+    Remove FAQs excluídas das estruturas de busca
+    
+    Args:
+        faq_ids: IDs das FAQs removidas
+    """
+    from app.services.faq_index import faq_index
+    from app.services.faq_vectors import faq_vectors
+    faq_index.remove_many(faq_ids)
+    faq_vectors.remove_many(faq_ids)
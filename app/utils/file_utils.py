@@ -1,8 +1,57 @@
 """
 Utilitários para processamento de arquivos
 """
-from PyPDF2 import PdfReader
-from flask import flash
+from pathlib import Path
+from flask import current_app, flash
+
+
+def get_data_dir(app):
+    """
+    Retorna o diretório onde artefatos derivados do banco são gravados
+    
+    Para SQLite em arquivo, o diretório do próprio banco; para bancos em
+    servidor, o diretório instance da aplicação; para SQLite em memória, None
+    (nada deve ser persistido).
+    
+    Args:
+        app: Aplicação Flask
+        
+    Returns:
+        Path ou None
+    """
+    db_uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+    if db_uri in ('sqlite://', 'sqlite:///:memory:'):
+        return None
+    if db_uri.startswith('sqlite:///'):
+        db_path = Path(db_uri.replace('sqlite:///', '', 1))
+        if not db_path.is_absolute():
+            db_path = Path(app.instance_path) / db_path
+        return db_path.parent
+    return Path(app.instance_path)
+
+
+def upload_image(file, **options):
+    """
+    Envia um arquivo ao Cloudinary
+    
+    O SDK é importado e configurado no primeiro upload, não no boot.
+    
+    Args:
+        file: Arquivo enviado (FileStorage) ou caminho
+        **options: Opções repassadas ao cloudinary.uploader.upload (ex: folder)
+        
+    Returns:
+        dict: Resposta do Cloudinary (com 'secure_url')
+    """
+    import cloudinary
+    import cloudinary.uploader
+    cloudinary.config(
+        cloud_name=current_app.config['CLOUDINARY_CLOUD_NAME'],
+        api_key=current_app.config['CLOUDINARY_API_KEY'],
+        api_secret=current_app.config['CLOUDINARY_API_SECRET'],
+        secure=True
+    )
+    return cloudinary.uploader.upload(file, **options)
 
 
 def extract_faqs_from_pdf(file_path):
@@ -15,6 +64,7 @@ def extract_faqs_from_pdf(file_path):
     Returns:
         Lista de dicionários com perguntas e respostas
     """
+    from PyPDF2 import PdfReader
     try:
         faqs = []
         pdf_reader = PdfReader(file_path)
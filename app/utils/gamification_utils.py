@@ -2,16 +2,88 @@
 Utilitários para sistema de gamificação
 """
 from datetime import datetime, date, timedelta
-from flask import flash
+from flask import flash, has_request_context
 import random
 from sqlalchemy import func
 from app.models import (
     User, Level, Achievement, UserAchievement, Challenge, UserChallenge,
     DailyChallenge, Team, BossFight, BossFightStep, BossFightStage,
     TeamBossProgress, TeamBossCompletion, LearningPath, PathChallenge,
-    UserPathProgress, TeamBattle, TeamBattleChallenge
+    UserPathProgress, TeamBattle, TeamBattleChallenge, PointsLedger, PointsDailyBucket
 )
 from app.extensions import db
+from app.services.level_cache import level_cache
+
+
+def _flash(message, category):
+    """flash() só existe dentro de uma requisição (os efeitos adiados rodam fora dela)"""
+    if has_request_context():
+        flash(message, category)
+
+
+def _bucket_insert(bind):
+    """INSERT com suporte a ON CONFLICT do dialeto em uso (SQLite ou PostgreSQL)"""
+    if bind.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(PointsDailyBucket)
+
+
+def award_points(user, amount, source, reference_id=None):
+    """
+    Altera os pontos do usuário registrando a operação no histórico
+
+    Toda mudança em User.points deve passar por aqui: grava uma linha no
+    PointsLedger e soma o valor ao PointsDailyBucket do dia (upsert atômico).
+    Não faz commit; a alteração segue a transação de quem chamou.
+
+    Args:
+        user: Objeto User
+        amount: Pontos ganhos (positivo) ou gastos (negativo)
+        source: Origem (challenge, daily_bonus, hint, hunt, boss, path, battle)
+        reference_id: ID do objeto que originou os pontos (opcional)
+    """
+    amount = int(amount or 0)
+    if not amount:
+        return
+    if user.id is None:
+        db.session.flush()
+    now = datetime.utcnow()
+    user.points = (user.points or 0) + amount
+    db.session.add(PointsLedger(user_id=user.id, amount=amount, source=source,
+                                reference_id=reference_id, created_at=now))
+
+    earned, spent = (amount, 0) if amount > 0 else (0, -amount)
+    stmt = _bucket_insert(db.session.get_bind()).values(user_id=user.id, day=now.date(), earned=earned, spent=spent)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=['user_id', 'day'],
+        set_={'earned': PointsDailyBucket.earned + earned, 'spent': PointsDailyBucket.spent + spent}
+    ))
+
+
+def points_in_window(start, end=None, user_ids=None):
+    """
+    Pontos ganhos por usuário entre dois dias (inclusive), somando os buckets diários
+
+    Args:
+        start: Primeiro dia (date ou datetime)
+        end: Último dia (padrão: hoje)
+        user_ids: Restringe a estes usuários (opcional)
+
+    Returns:
+        dict: {user_id: pontos ganhos no período}
+    """
+    start = start.date() if isinstance(start, datetime) else start
+    end = end or date.today()
+    end = end.date() if isinstance(end, datetime) else end
+    query = db.session.query(PointsDailyBucket.user_id, func.sum(PointsDailyBucket.earned))\
+        .filter(PointsDailyBucket.day >= start, PointsDailyBucket.day <= end)
+    if user_ids is not None:
+        if not user_ids:
+            return {}
+        query = query.filter(PointsDailyBucket.user_id.in_(user_ids))
+    return {user_id: int(total or 0) for user_id, total in query.group_by(PointsDailyBucket.user_id).all()}
 
 
 def update_user_level(user):
@@ -20,12 +92,17 @@ def update_user_level(user):
     
     Args:
         user: Objeto User
+
+    Returns:
+        LevelInfo do novo nível, ou None se o nível não mudou
     """
     current_level_id = user.level_id
-    new_level = Level.query.filter(Level.min_points <= user.points).order_by(Level.min_points.desc()).first()
+    new_level = level_cache.for_points(user.points)
     if new_level and new_level.id != current_level_id:
         user.level_id = new_level.id
-        flash(f'Subiu de nível! Você agora é {new_level.name}!', 'success')
+        _flash(f'Subiu de nível! Você agora é {new_level.name}!', 'success')
+        return new_level
+    return None
 
 
 def check_and_award_achievements(user):
@@ -34,15 +111,19 @@ def check_and_award_achievements(user):
     
     Args:
         user: Objeto User
+
+    Returns:
+        list: Conquistas desbloqueadas agora
     """
     user_achievements_ids = {ua.achievement_id for ua in user.achievements}
     potential_achievements = Achievement.query.filter(Achievement.id.notin_(user_achievements_ids)).all()
     if not potential_achievements:
-        return
+        return []
     
-    challenges_completed_count = len(user.completed_challenges)
+    challenges_completed_count = UserChallenge.query.filter_by(user_id=user.id).count()
     paths_completed_count = UserPathProgress.query.filter_by(user_id=user.id).count()
     
+    unlocked_achievements = []
     for achievement in potential_achievements:
         unlocked = False
         if achievement.trigger_type == 'challenges_completed':
@@ -61,7 +142,9 @@ def check_and_award_achievements(user):
         if unlocked:
             user_achievement = UserAchievement(user_id=user.id, achievement_id=achievement.id)
             db.session.add(user_achievement)
-            flash(f'Nova conquista desbloqueada: {achievement.name}!', 'success')
+            unlocked_achievements.append(achievement)
+            _flash(f'Nova conquista desbloqueada: {achievement.name}!', 'success')
+    return unlocked_achievements
 
 
 def check_boss_fight_completion(team_id, boss_id):
@@ -87,7 +170,7 @@ def check_boss_fight_completion(team_id, boss_id):
     
     if total_steps_required > 0 and steps_completed_by_team >= total_steps_required:
         for member in team.members:
-            member.points += boss.reward_points
+            award_points(member, boss.reward_points, 'boss', boss.id)
             update_user_level(member)
         completion_record = TeamBossCompletion(team_id=team_id, boss_fight_id=boss_id)
         db.session.add(completion_record)
@@ -98,30 +181,43 @@ def check_boss_fight_completion(team_id, boss_id):
 def check_and_complete_paths(user, completed_challenge_id):
     """
     Verifica se o usuário completou alguma trilha de aprendizagem
-    
+
+    Concede os pontos das trilhas concluídas sem fazer commit; quem chama
+    confirma a transação e verifica as conquistas em seguida.
+
     Args:
         user: Objeto User
         completed_challenge_id: ID do desafio completado
+
+    Returns:
+        list: Trilhas (LearningPath) concluídas agora
     """
-    paths_containing_challenge = PathChallenge.query.filter_by(challenge_id=completed_challenge_id).all()
-    if not paths_containing_challenge:
-        return
-    
-    user_completed_challenges = {uc.challenge_id for uc in user.completed_challenges}
-    
-    for pc in paths_containing_challenge:
-        path = pc.path
-        if UserPathProgress.query.filter_by(user_id=user.id, path_id=path.id).first():
-            continue
-        
-        all_challenges_in_path = {c.challenge_id for c in path.challenges}
-        if all_challenges_in_path.issubset(user_completed_challenges):
-            user.points += path.reward_points
-            progress = UserPathProgress(user_id=user.id, path_id=path.id)
-            db.session.add(progress)
-            db.session.commit()
-            check_and_award_achievements(user)
-            flash(f'Trilha "{path.name}" concluída! Você ganhou {path.reward_points} pontos de bônus!', 'success')
+    path_ids = [path_id for (path_id,) in db.session.query(PathChallenge.path_id)
+                .filter(PathChallenge.challenge_id == completed_challenge_id).distinct()]
+    if not path_ids:
+        return []
+
+    finished = {path_id for (path_id,) in db.session.query(UserPathProgress.path_id)
+                .filter(UserPathProgress.user_id == user.id, UserPathProgress.path_id.in_(path_ids))}
+    required = {}
+    for path_id, challenge_id in db.session.query(PathChallenge.path_id, PathChallenge.challenge_id)\
+            .filter(PathChallenge.path_id.in_(set(path_ids) - finished)):
+        required.setdefault(path_id, set()).add(challenge_id)
+    if not required:
+        return []
+
+    needed = set().union(*required.values())
+    user_completed_challenges = {challenge_id for (challenge_id,) in db.session.query(UserChallenge.challenge_id)
+                                 .filter(UserChallenge.user_id == user.id, UserChallenge.challenge_id.in_(needed))}
+
+    completed_paths = []
+    for path in LearningPath.query.filter(LearningPath.id.in_(list(required))).order_by(LearningPath.id):
+        if required[path.id].issubset(user_completed_challenges):
+            award_points(user, path.reward_points, 'path', path.id)
+            db.session.add(UserPathProgress(user_id=user.id, path_id=path.id))
+            completed_paths.append(path)
+            _flash(f'Trilha "{path.name}" concluída! Você ganhou {path.reward_points} pontos de bônus!', 'success')
+    return completed_paths
 
 
 def get_or_create_daily_challenge():
@@ -188,7 +284,7 @@ def finalize_ended_battles():
             battle.winner_team_id = winner.id
             # Distribuir os pontos para cada membro da equipa vencedora
             for member in winner.members:
-                member.points += battle.reward_points
+                award_points(member, battle.reward_points, 'battle', battle.id)
                 update_user_level(member)
             flash(f'A equipa "{winner.name}" venceu a batalha contra "{battle.challenged_team.name if winner.id == battle.challenging_team_id else battle.challenging_team.name}"!', 'success')
         
@@ -0,0 +1,68 @@
+"""
+Métricas em memória (histogramas de latência)
+"""
+import threading
+from collections import deque
+
+
+class LatencyHistogram:
+    """
+    Histograma de latência com buckets fixos (estilo Prometheus) e contagem por desfecho
+
+    Os percentis são calculados sobre uma janela das amostras mais recentes,
+    para refletir o comportamento atual e não o histórico desde o boot.
+    """
+
+    DEFAULT_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+    WINDOW_SIZE = 1024
+
+    def __init__(self, buckets_ms=None):
+        self._lock = threading.Lock()
+        self.buckets_ms = tuple(buckets_ms or self.DEFAULT_BUCKETS_MS)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * (len(self.buckets_ms) + 1)
+            self._outcomes = {}
+            self._count = 0
+            self._sum_ms = 0.0
+            self._recent = deque(maxlen=self.WINDOW_SIZE)
+
+    def observe(self, duration_ms, outcome='ok'):
+        """Registra uma amostra (em milissegundos) com o seu desfecho"""
+        with self._lock:
+            index = len(self.buckets_ms)
+            for i, bound in enumerate(self.buckets_ms):
+                if duration_ms <= bound:
+                    index = i
+                    break
+            self._counts[index] += 1
+            self._outcomes[outcome] = self._outcomes.get(outcome, 0) + 1
+            self._count += 1
+            self._sum_ms += duration_ms
+            self._recent.append(duration_ms)
+
+    def percentile(self, pct):
+        """Percentil (0-100) das amostras recentes, em milissegundos"""
+        with self._lock:
+            ordered = sorted(self._recent)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+    def snapshot(self):
+        """Retorna o estado do histograma em formato serializável (JSON)"""
+        with self._lock:
+            buckets = {f'<={bound}': count for bound, count in zip(self.buckets_ms, self._counts)}
+            buckets['+inf'] = self._counts[-1]
+            data = {
+                'count': self._count,
+                'sum_ms': round(self._sum_ms, 2),
+                'buckets': buckets,
+                'outcomes': dict(self._outcomes)
+            }
+        p50, p95 = self.percentile(50), self.percentile(95)
+        data['p50_ms'] = round(p50, 2) if p50 is not None else None
+        data['p95_ms'] = round(p95, 2) if p95 is not None else None
+        return data
@@ -0,0 +1,150 @@
+"""
+Paginação por cursor (keyset)
+
+Em vez de OFFSET, cada página continua a partir da última chave vista, por
+exemplo (created_at, id) ou (name, id). O custo de uma página não depende de
+quão fundo o usuário navegou. Os cursores são opacos (JSON em base64) e
+carregam a direção: 'n' para a próxima página e 'p' para a anterior.
+"""
+import base64
+import json
+from collections import namedtuple
+from datetime import date, datetime
+from sqlalchemy import bindparam, func, select, tuple_
+
+
+KeysetPage = namedtuple('KeysetPage', ['items', 'next_cursor', 'prev_cursor', 'has_next', 'has_prev'])
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        raise ValueError('Valor de cursor inválido')
+    return value
+
+
+def encode_cursor(values, direction='n'):
+    """Gera o token opaco para a chave (tupla de valores) e a direção"""
+    payload = json.dumps([direction, [_encode_value(v) for v in values]], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Lê um token gerado por encode_cursor
+
+    Returns:
+        tuple: (direção, tupla de valores)
+
+    Raises:
+        ValueError: Se o token estiver malformado
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except Exception:
+        raise ValueError('Cursor inválido')
+    if direction not in ('n', 'p') or not isinstance(values, list):
+        raise ValueError('Cursor inválido')
+    return direction, tuple(_decode_value(v) for v in values)
+
+
+def keyset_paginate(query, columns, cursor=None, per_page=20, descending=True):
+    """
+    Uma página de query ordenada pelas colunas da chave
+
+    Args:
+        query: Query do SQLAlchemy (sem order_by/limit/offset)
+        columns: Colunas da chave, a última deve ser única (ex.: (Model.created_at, Model.id))
+        cursor: Token recebido do cliente (None = primeira página)
+        per_page: Itens por página
+        descending: Ordem decrescente (mais recentes primeiro)
+
+    Returns:
+        KeysetPage
+
+    Raises:
+        ValueError: Se o cursor for inválido
+    """
+    direction, values = decode_cursor(cursor) if cursor else ('n', None)
+    if values is not None and len(values) != len(columns):
+        raise ValueError('Cursor inválido')
+
+    # Para voltar uma página, percorre a ordem invertida e desfaz no final
+    backwards = direction == 'p'
+    reverse = descending != backwards
+    if values is not None:
+        key = tuple_(*columns)
+        # Cada valor com o tipo da coluna (ex.: DateTime no formato do SQLite)
+        bound = tuple_(*[bindparam(None, value, type_=column.type) for column, value in zip(columns, values)])
+        query = query.filter(key < bound if reverse else key > bound)
+    query = query.order_by(*[column.desc() if reverse else column.asc() for column in columns])
+    rows = query.limit(per_page + 1).all()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def key_of(item):
+        return tuple(getattr(item, column.key) for column in columns)
+
+    has_next = has_more if not backwards else values is not None
+    has_prev = has_more if backwards else values is not None
+    return KeysetPage(
+        items=rows,
+        next_cursor=encode_cursor(key_of(rows[-1]), 'n') if rows and has_next else None,
+        prev_cursor=encode_cursor(key_of(rows[0]), 'p') if rows and has_prev else None,
+        has_next=has_next,
+        has_prev=has_prev
+    )
+
+
+def paginate_request(query, columns, per_page=50, descending=True):
+    """
+    keyset_paginate com o cursor do parâmetro ?cursor= da requisição atual
+
+    Responde 400 se o cursor for inválido.
+    """
+    from flask import abort, request
+    try:
+        return keyset_paginate(query, columns, cursor=request.args.get('cursor') or None,
+                               per_page=per_page, descending=descending)
+    except ValueError:
+        abort(400)
+
+
+def estimate_count(query, cap=1000):
+    """
+    Contagem limitada: conta no máximo cap + 1 linhas em vez de varrer a tabela
+
+    Returns:
+        tuple: (quantidade, exata) - exata é False quando há mais de cap linhas
+    """
+    limited = query.order_by(None).limit(cap + 1).subquery()
+    total = query.session.execute(select(func.count()).select_from(limited)).scalar() or 0
+    return min(total, cap), total <= cap
+
+
+def page_metadata(page, total=None):
+    """Campos de paginação para respostas JSON"""
+    data = {
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+        'has_next': page.has_next,
+        'has_prev': page.has_prev
+    }
+    if total is not None:
+        data['total'], data['total_is_exact'] = total
+    return data
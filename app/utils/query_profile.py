@@ -0,0 +1,109 @@
+"""
+Perfis de carregamento por view e contador de consultas por requisição
+
+Cada página de listagem declara em LOADER_PROFILES quais relacionamentos o
+template percorre; with_profile() aplica as estratégias correspondentes
+(selectinload/joinedload) para que a página rode um número fixo de consultas,
+independente do tamanho das tabelas.
+"""
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.orm import defer, joinedload, selectinload
+
+
+def _admin_users():
+    from app.models import User
+    return [joinedload(User.level)]
+
+
+def _admin_teams():
+    from app.models import Team
+    return [selectinload(Team.owner)]
+
+
+def _admin_battles():
+    from app.models import TeamBattle
+    return [
+        joinedload(TeamBattle.challenging_team),
+        joinedload(TeamBattle.challenged_team),
+        joinedload(TeamBattle.winner_team)
+    ]
+
+
+def _admin_boss_fights():
+    from app.models import BossFight, BossFightStage
+    return [selectinload(BossFight.stages).selectinload(BossFightStage.steps)]
+
+
+def _admin_paths():
+    from app.models import LearningPath, PathChallenge
+    return [selectinload(LearningPath.challenges).joinedload(PathChallenge.challenge)]
+
+
+def _admin_faq():
+    from app.models import FAQ
+    # file_data é um blob: a listagem só precisa de file_name
+    return [joinedload(FAQ.category), defer(FAQ.file_data)]
+
+
+# Estratégias de carregamento declaradas por view
+LOADER_PROFILES = {
+    'admin_users': _admin_users,
+    'admin_teams': _admin_teams,
+    'admin_battles': _admin_battles,
+    'admin_boss_fights': _admin_boss_fights,
+    'admin_paths': _admin_paths,
+    'admin_faq': _admin_faq,
+}
+
+
+def with_profile(query, profile):
+    """
+    Aplica à consulta as estratégias de carregamento do perfil
+
+    Args:
+        query: Query do SQLAlchemy
+        profile: Nome do perfil (chave de LOADER_PROFILES)
+
+    Returns:
+        Query com as opções aplicadas
+    """
+    return query.options(*LOADER_PROFILES[profile]())
+
+
+# ===== CONTADOR POR REQUISIÇÃO =====
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g._query_count = g.get('_query_count', 0) + 1
+
+
+def get_query_count():
+    """Consultas SQL executadas até agora na requisição atual"""
+    return g.get('_query_count', 0) if has_request_context() else 0
+
+
+def init_query_counter(app, engine):
+    """
+    Conta as consultas de cada requisição
+
+    Com QUERY_COUNT_HEADER (ativo em testes) o total vai no cabeçalho
+    X-Query-Count; acima de QUERY_COUNT_WARN a requisição é registrada no log.
+    """
+    if not event.contains(engine, 'before_cursor_execute', _count_query):
+        event.listen(engine, 'before_cursor_execute', _count_query)
+
+    @app.before_request
+    def reset_query_count():
+        g._query_count = 0
+
+    @app.after_request
+    def report_query_count(response):
+        count = get_query_count()
+        if app.config.get('QUERY_COUNT_HEADER', app.testing):
+            response.headers['X-Query-Count'] = str(count)
+        warn_at = app.config.get('QUERY_COUNT_WARN', 50)
+        if warn_at and count > warn_at:
+            from flask import request
+            app.logger.warning(f"{request.method} {request.path} executou {count} consultas")
+        return response
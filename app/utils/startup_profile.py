@@ -0,0 +1,118 @@
+"""
+Perfil de inicialização da aplicação
+
+create_app registra o tempo de cada etapa em um StartupTimer; o comando
+`flask startup-profile` sobe a aplicação em um processo novo (boot a frio) com
+`python -X importtime` e junta as duas visões: quanto custou importar cada
+pacote e quanto custou cada etapa da inicialização.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+
+# Módulos pesados que não devem ser importados no boot
+DEFERRED_MODULES = ('spacy', 'google.genai', 'cloudinary', 'PyPDF2')
+
+_REPORT_PREFIX = 'STARTUP_PROFILE '
+
+
+class StartupTimer:
+    """Cronometra as etapas de create_app"""
+
+    def __init__(self):
+        self.phases = []
+        self.schema_checked = None
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, round((time.perf_counter() - start) * 1000, 2)))
+
+    @property
+    def total_ms(self):
+        return round(sum(ms for _, ms in self.phases), 2)
+
+
+def parse_importtime(output, top=15):
+    """
+    Agrupa a saída de `python -X importtime` por pacote raiz
+
+    Soma o tempo próprio (self) de cada módulo no pacote raiz dele, de modo que
+    o custo de um submódulo não é contado também em quem o importou.
+
+    Returns:
+        list: [(pacote, ms)] do mais lento para o mais rápido
+    """
+    totals = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        try:
+            self_us = int(parts[0])
+        except ValueError:
+            continue
+        root = parts[2].strip().split('.')[0]
+        totals[root] = totals.get(root, 0) + self_us
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+    return [(name, round(us / 1000, 1)) for name, us in ranked[:top]]
+
+
+def _report_script():
+    return (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        "from app import create_app\n"
+        "imported = time.perf_counter()\n"
+        "app = create_app()\n"
+        "done = time.perf_counter()\n"
+        "timer = app.startup_profile\n"
+        f"print({_REPORT_PREFIX!r} + json.dumps({{\n"
+        "    'import_ms': round((imported - start) * 1000, 2),\n"
+        "    'create_app_ms': round((done - imported) * 1000, 2),\n"
+        "    'phases': timer.phases,\n"
+        "    'schema_checked': timer.schema_checked,\n"
+        f"    'deferred_loaded': [m for m in {DEFERRED_MODULES!r} if m in sys.modules],\n"
+        "}))\n"
+    )
+
+
+def profile_startup(env=None, top=15, cwd=None, timeout=300):
+    """
+    Sobe a aplicação em um processo novo e mede o boot a frio
+
+    Args:
+        env: Variáveis de ambiente extras (ex: DATABASE_URL)
+        top: Quantos pacotes listar no ranking de importação
+        cwd: Diretório do projeto (padrão: raiz do repositório)
+        timeout: Limite em segundos para o processo filho
+
+    Returns:
+        dict: import_ms, create_app_ms, phases, schema_checked, deferred_loaded e imports
+
+    Raises:
+        RuntimeError: Se o processo filho falhar
+    """
+    cwd = cwd or os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    child_env = dict(os.environ, **(env or {}))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _report_script()],
+        cwd=cwd, env=child_env, capture_output=True, text=True, timeout=timeout
+    )
+    report = None
+    for line in result.stdout.splitlines():
+        if line.startswith(_REPORT_PREFIX):
+            report = json.loads(line[len(_REPORT_PREFIX):])
+    if result.returncode != 0 or report is None:
+        raise RuntimeError(f"Falha ao medir a inicialização: {result.stderr[-2000:]}")
+    report['imports'] = parse_importtime(result.stderr, top=top)
+    return report
@@ -0,0 +1,149 @@
+"""
+Benchmark de relevância e latência da busca de FAQs
+
+Compara o ranqueamento legado (contagem de interseção de palavras) com o
+índice BM25 (app/services/faq_index.py) sobre:
+  - data/faqs.json
+  - corpora sintéticos de 10k e 100k FAQs
+
+Uso:
+    python scripts/benchmark_faq_search.py [--sizes 10000 100000] [--queries 200]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+from collections import namedtuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.faq_index import FAQIndex
+from app.utils.faq_utils import AMBIGUITY_RATIO
+
+FakeFAQ = namedtuple('FakeFAQ', 'id question answer')
+
+DATA_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'faqs.json')
+
+
+def load_real_faqs():
+    with open(DATA_FILE, encoding='utf-8') as f:
+        data = json.load(f)
+    return [FakeFAQ(i + 1, item['question'], item['answer']) for i, item in enumerate(data)]
+
+
+def build_synthetic_faqs(size, seed=42):
+    """Gera FAQs com vocabulário Zipf a partir das palavras de data/faqs.json"""
+    rng = random.Random(seed)
+    base_words = sorted({w for faq in load_real_faqs() for w in re.findall(r'\w+', f'{faq.question} {faq.answer}'.lower())})
+    vocabulary = base_words + [f'termo{i}' for i in range(max(2000, size // 5))]
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+    faqs = []
+    for faq_id in range(1, size + 1):
+        question = rng.choices(vocabulary, weights, k=rng.randint(5, 12))
+        question += rng.sample(vocabulary[len(base_words):], 2)  # termos raros identificam a FAQ
+        answer = rng.choices(vocabulary, weights, k=rng.randint(20, 60))
+        faqs.append(FakeFAQ(faq_id, ' '.join(question), ' '.join(answer)))
+    return faqs
+
+
+def build_queries(faqs, count, seed=7):
+    """Cada consulta usa parte das palavras da pergunta de uma FAQ (a resposta esperada)"""
+    rng = random.Random(seed)
+    queries = []
+    for faq in rng.sample(faqs, min(count, len(faqs))):
+        words = faq.question.split()
+        sample = rng.sample(words, max(1, min(len(words), rng.randint(3, 5))))
+        queries.append((' '.join(sample), faq.id))
+    return queries
+
+
+class LegacyScorer:
+    """
+    Reproduz o ranqueamento antigo por interseção de conjuntos
+
+    Como no código antigo, o texto de cada FAQ é tokenizado a cada consulta
+    (o tempo de FAQ.query.all() não entra na medição).
+    """
+
+    def __init__(self, faqs):
+        self.faqs = faqs
+
+    def search(self, message):
+        search_words = set(message.lower().split())
+        matches = []
+        for faq in self.faqs:
+            question_words = set(faq.question.lower().split())
+            answer_words = set(faq.answer.lower().split())
+            score = len(search_words & question_words) * 2 + len(search_words & answer_words)
+            if score > 0:
+                matches.append((faq.id, score))
+        matches.sort(key=lambda x: x[1], reverse=True)
+        return matches
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def evaluate(name, search, queries, ambiguous):
+    latencies, reciprocal_ranks, hits, ambiguous_count = [], [], 0, 0
+    for query, expected_id in queries:
+        start = time.perf_counter()
+        results = search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ranked_ids = [faq_id for faq_id, _ in results]
+        if ranked_ids[:1] == [expected_id]:
+            hits += 1
+        reciprocal_ranks.append(1.0 / (ranked_ids.index(expected_id) + 1) if expected_id in ranked_ids[:5] else 0.0)
+        if ambiguous(results):
+            ambiguous_count += 1
+    total = len(queries)
+    print(f"  {name:<8} hit@1={hits / total:6.1%}  MRR@5={sum(reciprocal_ranks) / total:.3f}  "
+          f"selecao_varias_faqs={ambiguous_count / total:6.1%}  "
+          f"p50={percentile(latencies, 50):8.2f}ms  p95={percentile(latencies, 95):8.2f}ms")
+
+
+def legacy_is_ambiguous(results):
+    # O chat antigo mostrava a seleção sempre que havia mais de um resultado
+    return len(results) > 1
+
+
+def bm25_is_ambiguous(results):
+    if len(results) < 2:
+        return False
+    return results[1][1] >= results[0][1] * AMBIGUITY_RATIO
+
+
+def run_corpus(label, faqs, query_count):
+    print(f"\n=== {label}: {len(faqs)} FAQs ===")
+    start = time.perf_counter()
+    index = FAQIndex()
+    index.build(faqs)
+    print(f"  build do indice BM25: {time.perf_counter() - start:.2f}s")
+
+    queries = build_queries(faqs, query_count)
+    legacy = LegacyScorer(faqs)
+    # O legado é O(N) por consulta; limitar o número de consultas nos corpora grandes
+    legacy_queries = queries if len(faqs) <= 10000 else queries[:max(10, query_count // 10)]
+    evaluate('legado', legacy.search, legacy_queries, legacy_is_ambiguous)
+    evaluate('bm25', lambda q: index.search(q, limit=5), queries, bm25_is_ambiguous)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da busca de FAQs')
+    parser.add_argument('--sizes', type=int, nargs='*', default=[10000, 100000])
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    real_faqs = load_real_faqs()
+    run_corpus('data/faqs.json', real_faqs, len(real_faqs))
+    for size in args.sizes:
+        run_corpus(f'sintetico {size}', build_synthetic_faqs(size), args.queries)
+
+
+if __name__ == '__main__':
+    main()
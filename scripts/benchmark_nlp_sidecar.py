@@ -0,0 +1,146 @@
+"""
+Benchmark do sidecar de NLP: memória (RSS) e latência p95 por número de workers
+
+Para 1, 4 e 8 workers, compara:
+  - local: cada worker carrega o próprio spaCy (comportamento padrão)
+  - sidecar: um processo app.services.nlp_sidecar atende todos pelo socket Unix
+
+Cada worker lematiza as perguntas de data/faqs.json, uma mensagem por vez
+(como as mensagens do chat), e todos começam ao mesmo tempo. O RSS total soma
+os workers e, no modo sidecar, o próprio sidecar.
+
+Uso:
+    python scripts/benchmark_nlp_sidecar.py [--workers 1 4 8] [--requests 200]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+DATA_FILE = os.path.join(ROOT, 'data', 'faqs.json')
+
+
+def rss_mb(pid='self'):
+    """RSS do processo em MB (lido de /proc)"""
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def load_messages():
+    with open(DATA_FILE, encoding='utf-8') as f:
+        return [item['question'] for item in json.load(f)]
+
+
+def worker(mode, socket_path, messages, requests, start_event, results):
+    from app.services.lemma_service import run_pipeline
+    if mode == 'sidecar':
+        from app.services.nlp_sidecar import NLPSidecarClient
+        client = NLPSidecarClient(socket_path)
+        analyze = client.analyze
+        client.analyzer_id()
+    else:
+        from app.utils.faq_utils import get_nlp
+        nlp = get_nlp()
+        analyze = lambda texts: run_pipeline(nlp, texts)  # noqa: E731
+    analyze(['aquecimento'])
+
+    start_event.wait()
+    latencies = []
+    for i in range(requests):
+        started = time.perf_counter()
+        if analyze([messages[i % len(messages)]]) is None:
+            raise RuntimeError('Sidecar não respondeu')
+        latencies.append((time.perf_counter() - started) * 1000)
+    results.put({'rss_mb': rss_mb(), 'latencies': latencies})
+
+
+def wait_for_socket(path, process, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if os.path.exists(path):
+            return
+        if process.poll() is not None:
+            raise RuntimeError('O sidecar encerrou antes de abrir o socket')
+        time.sleep(0.1)
+    raise RuntimeError('Tempo esgotado aguardando o sidecar')
+
+
+def run(mode, workers, requests, messages):
+    ctx = multiprocessing.get_context('spawn')
+    sidecar = None
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = os.path.join(tmp, 'nlp.sock')
+        if mode == 'sidecar':
+            sidecar = subprocess.Popen(
+                [sys.executable, '-m', 'app.services.nlp_sidecar', '--socket', socket_path],
+                cwd=ROOT, stdout=subprocess.DEVNULL
+            )
+            wait_for_socket(socket_path, sidecar)
+        try:
+            start_event = ctx.Event()
+            results = ctx.Queue()
+            processes = [
+                ctx.Process(target=worker, args=(mode, socket_path, messages, requests, start_event, results))
+                for _ in range(workers)
+            ]
+            for process in processes:
+                process.start()
+            # Todos os workers prontos (modelo/cliente carregado) antes de medir
+            time.sleep(0.5)
+            start_event.set()
+            reports = [results.get(timeout=600) for _ in processes]
+            for process in processes:
+                process.join()
+            sidecar_rss = rss_mb(sidecar.pid) if sidecar is not None else 0.0
+        finally:
+            if sidecar is not None:
+                sidecar.terminate()
+                sidecar.wait()
+
+    latencies = [value for report in reports for value in report['latencies']]
+    return {
+        'rss_total_mb': sum(report['rss_mb'] for report in reports) + sidecar_rss,
+        'sidecar_rss_mb': sidecar_rss,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--requests', type=int, default=200, help='Mensagens por worker')
+    args = parser.parse_args()
+
+    from app.utils.faq_utils import nlp_analyzer_id
+    analyzer = nlp_analyzer_id()
+    print(f"Analisador: {analyzer}")
+    if analyzer == 'regex':
+        print("Atenção: pt_core_news_sm não está instalado; os números refletem o fallback por regex.")
+
+    messages = load_messages()
+    print(f"\n{'workers':>7} {'modo':>8} {'RSS total':>11} {'sidecar':>9} {'p50':>9} {'p95':>9}")
+    for workers in args.workers:
+        for mode in ('local', 'sidecar'):
+            result = run(mode, workers, args.requests, messages)
+            print(f"{workers:>7} {mode:>8} {result['rss_total_mb']:>8.1f} MB {result['sidecar_rss_mb']:>6.1f} MB "
+                  f"{result['p50_ms']:>6.2f} ms {result['p95_ms']:>6.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""
+Benchmark da submissão de desafios: fluxo antigo x pipeline
+
+Mede a latência por requisição de POST /challenges/submit/<id> (pipeline:
+uma transação e efeitos adiados) e de uma rota com o fluxo antigo (dois
+commits, consultas sequenciais, trilhas e conquistas na requisição), sobre o
+mesmo banco SQLite em arquivo semeado com trilhas, conquistas, desafio do dia,
+batalhas ativas e um World Boss.
+
+Cada modo usa usuários próprios, então toda submissão é uma conclusão nova.
+Por padrão as submissões chegam em ritmo fixo (--rate), deixando intervalos
+para os efeitos adiados; com --rate 0 vão uma atrás da outra e o mesmo
+processo disputa CPU e o bloqueio de escrita do SQLite com os efeitos.
+Informa p50/p95/máx por requisição, consultas por requisição e, no pipeline,
+quanto tempo os efeitos adiados levaram para esvaziar a fila.
+
+Com --async-mode eventlet (como no Procfile), o processo recebe o
+monkey-patch e os efeitos adiados rodam em green threads, só nos intervalos
+em que a requisição cede a vez; com threading, em threads do sistema.
+
+Uso:
+    python scripts/benchmark_submit_challenge.py [--users 10] [--challenges 40] [--rate 10]
+                                                 [--async-mode eventlet]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def legacy_complete_paths(user, completed_challenge_id):
+    """check_and_complete_paths antes do pipeline (commit e conquistas por trilha)"""
+    from flask import flash
+    from app.extensions import db
+    from app.models import PathChallenge, UserPathProgress
+    from app.utils import award_points, check_and_award_achievements
+    paths_containing_challenge = PathChallenge.query.filter_by(challenge_id=completed_challenge_id).all()
+    if not paths_containing_challenge:
+        return
+    user_completed_challenges = {uc.challenge_id for uc in user.completed_challenges}
+    for pc in paths_containing_challenge:
+        path = pc.path
+        if UserPathProgress.query.filter_by(user_id=user.id, path_id=path.id).first():
+            continue
+        all_challenges_in_path = {c.challenge_id for c in path.challenges}
+        if all_challenges_in_path.issubset(user_completed_challenges):
+            award_points(user, path.reward_points, 'path', path.id)
+            db.session.add(UserPathProgress(user_id=user.id, path_id=path.id))
+            db.session.commit()
+            check_and_award_achievements(user)
+            flash(f'Trilha "{path.name}" concluída!', 'success')
+
+
+def register_legacy_route(app):
+    """Rota com o corpo antigo de submit_challenge (resposta sempre correta)"""
+    from flask import flash, redirect
+    from flask_login import login_required, current_user
+    from app.extensions import db
+    from app.models import (Challenge, UserChallenge, DailyChallenge, GlobalEvent, GlobalEventContribution,
+                            TeamBattle, TeamBattleChallenge)
+    from app.utils import award_points, update_user_level, check_and_award_achievements
+
+    @app.route('/bench/legacy-submit/<int:challenge_id>', methods=['POST'])
+    @login_required
+    def legacy_submit(challenge_id):
+        challenge = Challenge.query.get_or_404(challenge_id)
+        existing_completion = UserChallenge.query.filter_by(user_id=current_user.id, challenge_id=challenge_id).first()
+        if not existing_completion:
+            award_points(current_user, challenge.points_reward, 'challenge', challenge.id)
+            today_challenge_entry = DailyChallenge.query.filter_by(day=date.today()).first()
+            if today_challenge_entry and today_challenge_entry.challenge_id == challenge.id:
+                award_points(current_user, today_challenge_entry.bonus_points, 'daily_bonus', challenge.id)
+            db.session.add(UserChallenge(user_id=current_user.id, challenge_id=challenge_id))
+
+            active_event = GlobalEvent.query.filter(
+                GlobalEvent.is_active == True,
+                GlobalEvent.end_date >= datetime.utcnow(),
+                GlobalEvent.current_hp > 0
+            ).first()
+            if active_event:
+                active_event.current_hp = max(0, active_event.current_hp - challenge.points_reward)
+                contribution = GlobalEventContribution.query.filter_by(
+                    user_id=current_user.id, event_id=active_event.id).first()
+                if contribution:
+                    contribution.contribution_points += challenge.points_reward
+                else:
+                    db.session.add(GlobalEventContribution(user_id=current_user.id, event_id=active_event.id,
+                                                           contribution_points=challenge.points_reward))
+
+            if current_user.team:
+                active_battles = TeamBattle.query.filter(
+                    (TeamBattle.challenging_team_id == current_user.team_id) | (TeamBattle.challenged_team_id == current_user.team_id),
+                    TeamBattle.status == 'active'
+                ).all()
+                for battle in active_battles:
+                    battle_challenge = TeamBattleChallenge.query.filter_by(battle_id=battle.id, challenge_id=challenge_id).first()
+                    if battle_challenge and not battle_challenge.completed_by_team_id:
+                        battle_challenge.completed_by_team_id = current_user.team_id
+                        battle_challenge.completed_at = datetime.utcnow()
+                        flash(f'Pontos na batalha contra "{battle.challenged_team.name}"!', 'info')
+
+            legacy_complete_paths(current_user, challenge_id)
+            update_user_level(current_user)
+            db.session.commit()
+            check_and_award_achievements(current_user)
+            db.session.commit()
+        return redirect('/challenges')
+
+
+def seed(app, users, challenges):
+    """Dois grupos de usuários (um por modo) em equipes com batalhas ativas"""
+    from app.extensions import db
+    from app.models import (User, Team, Challenge, DailyChallenge, GlobalEvent, TeamBattle, TeamBattleChallenge,
+                            LearningPath, PathChallenge, Achievement)
+    with app.app_context():
+        db.create_all()
+        db.session.bulk_insert_mappings(User, [
+            {'name': f'Bench {i}', 'email': f'submit-bench-{i}@example.com', 'password': 'x'} for i in range(users * 2)
+        ])
+        user_ids = [user_id for (user_id,) in db.session.query(User.id).order_by(User.id)]
+        db.session.bulk_insert_mappings(Team, [
+            {'name': f'Equipe {i}', 'owner_id': user_ids[i]} for i in range(8)
+        ])
+        team_ids = [team_id for (team_id,) in db.session.query(Team.id).order_by(Team.id)]
+        for index, user_id in enumerate(user_ids):
+            db.session.query(User).filter_by(id=user_id).update({'team_id': team_ids[index % len(team_ids)]})
+
+        db.session.bulk_insert_mappings(Challenge, [
+            {'title': f'Desafio {i}', 'description': '?', 'expected_answer': 'ok', 'points_reward': 10}
+            for i in range(challenges)
+        ])
+        challenge_ids = [challenge_id for (challenge_id,) in db.session.query(Challenge.id).order_by(Challenge.id)]
+        db.session.add(DailyChallenge(day=date.today(), challenge_id=challenge_ids[0], bonus_points=20))
+
+        db.session.bulk_insert_mappings(LearningPath, [
+            {'name': f'Trilha {i}', 'reward_points': 50} for i in range(challenges // 5)
+        ])
+        path_ids = [path_id for (path_id,) in db.session.query(LearningPath.id).order_by(LearningPath.id)]
+        db.session.bulk_insert_mappings(PathChallenge, [
+            {'path_id': path_ids[i // 5], 'challenge_id': challenge_id, 'step': i % 5}
+            for i, challenge_id in enumerate(challenge_ids[:len(path_ids) * 5])
+        ])
+        db.session.bulk_insert_mappings(Achievement, [
+            {'name': f'Desafios {n}', 'description': '-', 'trigger_type': 'challenges_completed', 'trigger_value': n}
+            for n in (1, 5, 10, 25, 50)
+        ] + [
+            {'name': f'Trilhas {n}', 'description': '-', 'trigger_type': 'paths_completed', 'trigger_value': n}
+            for n in (1, 3, 5)
+        ] + [
+            {'name': f'Pontos {n}', 'description': '-', 'trigger_type': 'points_earned', 'trigger_value': n}
+            for n in (100, 500, 1000)
+        ])
+
+        end = datetime.utcnow() + timedelta(days=1)
+        for i in range(0, len(team_ids), 2):
+            battle = TeamBattle(challenging_team_id=team_ids[i], challenged_team_id=team_ids[i + 1], end_time=end)
+            db.session.add(battle)
+            db.session.flush()
+            db.session.bulk_insert_mappings(TeamBattleChallenge, [
+                {'battle_id': battle.id, 'challenge_id': challenge_id} for challenge_id in challenge_ids[::3]
+            ])
+        now = datetime.utcnow()
+        db.session.add(GlobalEvent(name='Benchmark Boss', description='-', total_hp=10 ** 9, current_hp=10 ** 9,
+                                   start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+                                   is_active=True))
+        db.session.commit()
+        return user_ids[:users], user_ids[users:], challenge_ids
+
+
+def run(app, url, user_ids, challenge_ids, rate=0):
+    """Submete cada desafio por cada usuário; com rate > 0, em ritmo fixo (req/s)"""
+    latencies, queries = [], []
+    client = app.test_client()
+    interval = 1.0 / rate if rate else 0
+    next_at = time.perf_counter()
+    for challenge_id in challenge_ids:
+        for user_id in user_ids:
+            with client.session_transaction() as sess:
+                sess['_user_id'] = str(user_id)
+            if interval:
+                next_at += interval
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            started = time.perf_counter()
+            response = client.post(url.format(challenge_id), data={'answer': 'ok'})
+            latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(int(response.headers.get('X-Query-Count', 0)))
+            assert response.status_code == 302, response.status_code
+    return latencies, queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10, help='Usuários por modo')
+    parser.add_argument('--challenges', type=int, default=40, help='Desafios submetidos por usuário')
+    parser.add_argument('--rate', type=float, default=10,
+                        help='Submissões por segundo (0 = uma atrás da outra, processo saturado)')
+    parser.add_argument('--async-mode', choices=('eventlet', 'threading'), default='eventlet',
+                        help='Modo do Flask-SocketIO para as tarefas de fundo')
+    args = parser.parse_args()
+    if args.async_mode == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+
+    from app import create_app
+    from app.config import Config
+    from app.services.challenge_pipeline import challenge_pipeline
+
+    tmp = tempfile.TemporaryDirectory()
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp.name, 'submit.db')}"
+        SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 60}}
+        SOCKETIO_MESSAGE_QUEUE = None
+        SOCKETIO_ASYNC_MODE = args.async_mode
+        WTF_CSRF_ENABLED = False
+        QUERY_COUNT_HEADER = True
+
+    app = create_app(BenchmarkConfig)
+    register_legacy_route(app)
+    legacy_users, pipeline_users, challenge_ids = seed(app, args.users, args.challenges)
+    # Aquece caches (snapshot do boss, níveis) e a rota antes de medir
+    run(app, '/bench/legacy-submit/{}', legacy_users[:1], challenge_ids[-1:])
+    run(app, '/challenges/submit/{}', pipeline_users[:1], challenge_ids[-1:])
+    challenge_pipeline.drain()
+
+    pace = f"{args.rate:g} req/s" if args.rate else "sem intervalo"
+    print(f"{args.users} usuários x {args.challenges} desafios por modo (SQLite, {pace}, {args.async_mode})")
+    print(f"\n{'modo':>10} {'p50':>9} {'p95':>9} {'máx':>9} {'consultas':>10}")
+    results = {}
+    for mode, url, users in (('antigo', '/bench/legacy-submit/{}', legacy_users),
+                             ('pipeline', '/challenges/submit/{}', pipeline_users)):
+        started = time.perf_counter()
+        latencies, queries = run(app, url, users, challenge_ids[:-1], args.rate)
+        requests_done = time.perf_counter()
+        if mode == 'pipeline':
+            challenge_pipeline.drain()
+        drained = time.perf_counter()
+        results[mode] = percentile(latencies, 95)
+        print(f"{mode:>10} {percentile(latencies, 50):>6.2f} ms {results[mode]:>6.2f} ms "
+              f"{max(latencies):>6.2f} ms {sum(queries) / len(queries):>10.1f}")
+        if mode == 'pipeline':
+            print(f"{'':>10} efeitos adiados concluídos {(drained - requests_done) * 1000:.0f} ms após a última "
+                  f"requisição (total {(drained - started):.1f} s)")
+    if results.get('antigo'):
+        print(f"\np95: {results['antigo']:.2f} ms -> {results['pipeline']:.2f} ms "
+              f"({(1 - results['pipeline'] / results['antigo']) * 100:.0f}% menor)")
+    tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
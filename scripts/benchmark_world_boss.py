@@ -0,0 +1,197 @@
+"""
+Benchmark do dano no World Boss com submissões concorrentes
+
+Para cada banco (SQLite em arquivo e, com --postgres, um PostgreSQL local),
+roda N submissores simultâneos (threads, cada um com a própria sessão e o
+próprio usuário) aplicando dano ao mesmo GlobalEvent, em três modos:
+
+  - legacy:  lê current_hp, grava max(0, hp - dano) em Python e faz
+             ler-modificar-gravar na contribuição (comportamento antigo)
+  - atomic:  world_boss.apply_damage (UPDATE com piso + upsert)
+  - sharded: atomic com WORLD_BOSS_DAMAGE_SHARDS fatias somadas no merge
+
+Informa submissões/s, latência p95 por submissão, erros (ex.: "database is
+locked") e o dano perdido (esperado - aplicado).
+
+Uso:
+    python scripts/benchmark_world_boss.py [--submitters 200] [--submissions 10]
+    python scripts/benchmark_world_boss.py --postgres postgresql://localhost/oraculo_bench
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+DAMAGE = 10
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def make_app(database_url):
+    from sqlalchemy.pool import NullPool
+    from app import create_app
+    from app.config import Config
+
+    engine_options = {'pool_size': 20, 'max_overflow': 60, 'pool_timeout': 120}
+    if database_url.startswith('sqlite'):
+        engine_options = {'poolclass': NullPool, 'connect_args': {'timeout': 60}}
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        SQLALCHEMY_ENGINE_OPTIONS = engine_options
+        SOCKETIO_MESSAGE_QUEUE = None
+        SOCKETIO_ASYNC_MODE = 'threading'
+
+    return create_app(BenchmarkConfig)
+
+
+def prepare(app, submitters):
+    """Cria os usuários do benchmark e um evento com HP de sobra"""
+    from app.extensions import db
+    from app.models import User, GlobalEvent
+    with app.app_context():
+        db.create_all()
+        emails = [f'boss-bench-{i}@example.com' for i in range(submitters)]
+        existing = {email for (email,) in db.session.query(User.email).filter(User.email.in_(emails))}
+        db.session.bulk_insert_mappings(User, [
+            {'name': f'Bench {email}', 'email': email, 'password': 'x'} for email in emails if email not in existing
+        ])
+        db.session.commit()
+        user_ids = [user_id for (user_id,) in db.session.query(User.id).filter(User.email.in_(emails))]
+        event = GlobalEvent.query.filter_by(name='Benchmark Boss').first()
+        if event is None:
+            now = datetime.utcnow()
+            event = GlobalEvent(name='Benchmark Boss', description='Benchmark', total_hp=0, current_hp=0,
+                                start_date=now - timedelta(days=1), end_date=now + timedelta(days=1), is_active=True)
+            db.session.add(event)
+            db.session.commit()
+        return event.id, user_ids
+
+
+def reset(app, event_id, hp):
+    from app.extensions import db
+    from app.models import GlobalEvent, GlobalEventContribution, GlobalEventDamageShard
+    with app.app_context():
+        GlobalEventContribution.query.filter_by(event_id=event_id).delete()
+        GlobalEventDamageShard.query.filter_by(event_id=event_id).delete()
+        event = db.session.get(GlobalEvent, event_id)
+        event.total_hp = event.current_hp = hp
+        db.session.commit()
+
+
+def legacy_submit(event_id, user_id):
+    from app.extensions import db
+    from app.models import GlobalEvent, GlobalEventContribution
+    event = db.session.get(GlobalEvent, event_id)
+    event.current_hp = max(0, event.current_hp - DAMAGE)
+    contribution = GlobalEventContribution.query.filter_by(event_id=event_id, user_id=user_id).first()
+    if contribution:
+        contribution.contribution_points += DAMAGE
+    else:
+        db.session.add(GlobalEventContribution(event_id=event_id, user_id=user_id, contribution_points=DAMAGE))
+
+
+def atomic_submit(event_id, user_id):
+    from app.services.world_boss import world_boss
+    world_boss.apply_damage(event_id, user_id, DAMAGE)
+
+
+def run(app, mode, event_id, user_ids, submissions, shards):
+    from app.extensions import db
+    from app.models import GlobalEvent, GlobalEventContribution
+    from app.services.world_boss import world_boss
+
+    hp = DAMAGE * len(user_ids) * submissions * 10
+    reset(app, event_id, hp)
+    world_boss.shards = shards if mode == 'sharded' else 0
+    world_boss.merge_seconds = 0.5
+    world_boss._last_merge = {}
+    submit = legacy_submit if mode == 'legacy' else atomic_submit
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    start_event = threading.Event()
+
+    def submitter(user_id):
+        with app.app_context():
+            start_event.wait()
+            for _ in range(submissions):
+                started = time.perf_counter()
+                try:
+                    submit(event_id, user_id)
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    with lock:
+                        errors.append(type(e).__name__)
+                    continue
+                with lock:
+                    latencies.append((time.perf_counter() - started) * 1000)
+            db.session.remove()
+
+    threads = [threading.Thread(target=submitter, args=(user_id,)) for user_id in user_ids]
+    for thread in threads:
+        thread.start()
+    started = time.perf_counter()
+    start_event.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        if mode == 'sharded':
+            world_boss.merge(event_id)
+            db.session.commit()
+        final_hp = db.session.get(GlobalEvent, event_id).current_hp
+        contributed = db.session.query(db.func.coalesce(db.func.sum(GlobalEventContribution.contribution_points), 0))\
+            .filter(GlobalEventContribution.event_id == event_id).scalar()
+    world_boss.shards = 0
+
+    committed = len(latencies)
+    return {
+        'throughput': committed / elapsed if elapsed else 0.0,
+        'p95_ms': percentile(latencies, 95) if latencies else 0.0,
+        'errors': len(errors),
+        'lost_damage': committed * DAMAGE - (hp - final_hp),
+        'lost_contribution': committed * DAMAGE - contributed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--submitters', type=int, default=200)
+    parser.add_argument('--submissions', type=int, default=10, help='Submissões por submissor')
+    parser.add_argument('--shards', type=int, default=16)
+    parser.add_argument('--postgres', help='URL de um PostgreSQL local (o banco é usado para tabelas de teste)')
+    parser.add_argument('--modes', nargs='+', default=['legacy', 'atomic', 'sharded'])
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    databases = [('sqlite', f"sqlite:///{os.path.join(tmp.name, 'boss.db')}")]
+    if args.postgres:
+        databases.append(('postgresql', args.postgres))
+
+    print(f"{args.submitters} submissores x {args.submissions} submissões (dano {DAMAGE})")
+    print(f"\n{'banco':>10} {'modo':>8} {'subm/s':>9} {'p95':>10} {'erros':>6} {'dano perdido':>13} {'contrib. perdida':>17}")
+    for name, url in databases:
+        app = make_app(url)
+        event_id, user_ids = prepare(app, args.submitters)
+        for mode in args.modes:
+            result = run(app, mode, event_id, user_ids, args.submissions, args.shards)
+            print(f"{name:>10} {mode:>8} {result['throughput']:>9.1f} {result['p95_ms']:>7.1f} ms "
+                  f"{result['errors']:>6} {result['lost_damage']:>13} {result['lost_contribution']:>17}")
+    tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
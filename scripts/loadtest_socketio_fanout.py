@@ -0,0 +1,149 @@
+"""
+Teste de carga do fan-out do Socket.IO entre vários workers
+
+Sobe N processos worker (servidor Socket.IO em threading, cada um na sua porta)
+ligados à mesma fila de mensagens, conecta clientes distribuídos entre eles
+(cada um na sala user_<i>) e publica de um processo externo, como faria o
+BackupScheduler. Mede quantos eventos chegaram por worker e a latência entre
+publicação e recebimento.
+
+Uso:
+    python scripts/loadtest_socketio_fanout.py [--workers 4] [--clients 100] [--rounds 5]
+    python scripts/loadtest_socketio_fanout.py --queue redis://localhost:6379/0
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def worker(url, ports):
+    import logging
+    from flask import Flask
+    from flask_socketio import SocketIO, join_room
+    from werkzeug.serving import make_server
+    from app.services.socketio_queue import socketio_options
+
+    app = Flask(__name__)
+    socketio = SocketIO(app, async_mode='threading', **socketio_options(url))
+
+    @socketio.on('join')
+    def handle_join(data):
+        join_room(data['room'])
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    http = make_server('127.0.0.1', 0, app, threaded=True)
+    ports.put(http.server_port)
+    http.serve_forever()
+
+
+def connect_clients(ports, count):
+    import socketio
+    clients = []
+    received = []
+    lock = threading.Lock()
+
+    for i in range(count):
+        port = ports[i % len(ports)]
+        client = socketio.Client()
+
+        def on_event(event, data, port=port):
+            with lock:
+                received.append((port, event, time.time() - data['sent_at']))
+
+        client.on('*', on_event)
+        client.connect(f'http://127.0.0.1:{port}', transports=['polling'])
+        client.call('join', {'room': f'user_{i}'})
+        clients.append(client)
+    return clients, received, lock
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=100, help='Clientes no total (divididos entre os workers)')
+    parser.add_argument('--rounds', type=int, default=5, help='Rodadas de publicação')
+    parser.add_argument('--queue', help='URL da fila (padrão: hub local por socket Unix)')
+    args = parser.parse_args()
+
+    from app.services.socketio_queue import PubSubHub, create_emitter
+
+    tmp = tempfile.TemporaryDirectory()
+    hub = None
+    url = args.queue
+    if not url:
+        socket_path = os.path.join(tmp.name, 'socketio.sock')
+        hub = PubSubHub(socket_path)
+        hub.start()
+        url = 'unix://' + socket_path
+
+    ctx = multiprocessing.get_context('spawn')
+    port_queue = ctx.Queue()
+    processes = [ctx.Process(target=worker, args=(url, port_queue), daemon=True) for _ in range(args.workers)]
+    for process in processes:
+        process.start()
+    ports = [port_queue.get(timeout=60) for _ in processes]
+
+    clients, received, lock = connect_clients(ports, args.clients)
+    if hub is not None:
+        # Cada worker assina a fila quando recebe o primeiro cliente
+        deadline = time.monotonic() + 10
+        while hub.subscribers < args.workers and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    # Por rodada: um evento para a sala de cada cliente e um broadcast
+    emitter = create_emitter(url)
+    expected = args.rounds * args.clients * 2
+    started = time.perf_counter()
+    for round_number in range(args.rounds):
+        for i in range(args.clients):
+            emitter.emit('notification', {'round': round_number, 'sent_at': time.time()}, room=f'user_{i}')
+        emitter.emit('feed', {'round': round_number, 'sent_at': time.time()})
+    published_after = time.perf_counter() - started
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        with lock:
+            if len(received) >= expected:
+                break
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - started
+
+    for client in clients:
+        client.disconnect()
+    for process in processes:
+        process.terminate()
+    if hub is not None:
+        hub.shutdown()
+    tmp.cleanup()
+
+    with lock:
+        events = list(received)
+    latencies = [latency * 1000 for _, _, latency in events]
+    print(f"Fila: {url}")
+    print(f"Workers: {args.workers}, clientes: {args.clients}, rodadas: {args.rounds}")
+    print(f"\n{'worker':>6} {'porta':>6} {'recebidos':>10} {'esperados':>10}")
+    for index, port in enumerate(ports):
+        clients_here = len(range(index, args.clients, len(ports)))
+        count = sum(1 for event_port, _, _ in events if event_port == port)
+        print(f"{index + 1:>6} {port:>6} {count:>10} {clients_here * args.rounds * 2:>10}")
+    print(f"\nEntregues: {len(events)}/{expected} em {elapsed:.2f} s "
+          f"(publicação: {published_after:.2f} s, {len(events) / elapsed:.0f} eventos/s)")
+    if latencies:
+        print(f"Latência: p50 {percentile(latencies, 50):.1f} ms, p95 {percentile(latencies, 95):.1f} ms")
+    sys.exit(0 if len(events) == expected else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,7 +7,9 @@ class AdminLogsManager {
     constructor() {
         this.currentPage = 1;
         this.perPage = 50;
-        this.totalPages = 1;
+        this.cursor = null;
+        this.nextCursor = null;
+        this.prevCursor = null;
         this.filters = {};
 
         this.init();
@@ -34,15 +36,18 @@ class AdminLogsManager {
         });
 
         // Paginacao
+        // Paginacao por cursor: cada pagina continua a partir da anterior
         document.getElementById('prevPage')?.addEventListener('click', () => {
-            if (this.currentPage > 1) {
+            if (this.prevCursor) {
+                this.cursor = this.prevCursor;
                 this.currentPage--;
                 this.loadLogs();
             }
         });
 
         document.getElementById('nextPage')?.addEventListener('click', () => {
-            if (this.currentPage < this.totalPages) {
+            if (this.nextCursor) {
+                this.cursor = this.nextCursor;
                 this.currentPage++;
                 this.loadLogs();
             }
@@ -62,6 +67,7 @@ class AdminLogsManager {
         if (resourceType) this.filters.resource_type = resourceType;
 
         this.currentPage = 1;
+        this.cursor = null;
         this.loadLogs();
     }
 
@@ -71,6 +77,7 @@ class AdminLogsManager {
         document.getElementById('filterAction').value = '';
         document.getElementById('filterResource').value = '';
         this.currentPage = 1;
+        this.cursor = null;
         this.loadLogs();
     }
 
@@ -80,10 +87,10 @@ class AdminLogsManager {
 
         try {
             const params = new URLSearchParams({
-                page: this.currentPage,
                 per_page: this.perPage,
                 ...this.filters
             });
+            if (this.cursor) params.set('cursor', this.cursor);
 
             const response = await fetch(`/admin/logs/api/list?${params}`);
             const data = await response.json();
@@ -129,16 +136,18 @@ class AdminLogsManager {
     }
 
     updatePagination(data) {
-        this.totalPages = data.total_pages;
-        this.currentPage = data.page;
+        this.nextCursor = data.next_cursor;
+        this.prevCursor = data.prev_cursor;
+        if (!data.has_prev) this.currentPage = 1;
 
         const prevBtn = document.getElementById('prevPage');
         const nextBtn = document.getElementById('nextPage');
         const info = document.getElementById('paginationInfo');
+        const total = data.total_is_exact ? data.total : `${data.total}+`;
 
-        if (prevBtn) prevBtn.disabled = this.currentPage <= 1;
-        if (nextBtn) nextBtn.disabled = this.currentPage >= this.totalPages;
-        if (info) info.textContent = `Pagina ${this.currentPage} de ${this.totalPages}`;
+        if (prevBtn) prevBtn.disabled = !data.has_prev;
+        if (nextBtn) nextBtn.disabled = !data.has_next;
+        if (info) info.textContent = `Pagina ${this.currentPage} (${total} logs)`;
     }
 
     async showDetails(logId) {
@@ -8,7 +8,10 @@ class NotificationPageManager {
         this.currentFilter = 'all';
         this.currentPage = 1;
         this.perPage = 20;
-        this.totalPages = 1;
+        this.cursor = null;
+        this.nextCursor = null;
+        this.prevCursor = null;
+        this.unreadCount = null;
         this.csrfToken = document.querySelector('input[name="csrf_token"]')?.value || '';
 
         this.init();
@@ -18,8 +21,12 @@ class NotificationPageManager {
         this.setupEventListeners();
         this.loadNotifications();
 
-        // Atualizar a cada 30 segundos
-        setInterval(() => this.loadNotifications(), 30000);
+        // Recarregar quando o servidor avisar que a contagem de não lidas mudou
+        document.addEventListener('notifications:unread', (e) => {
+            if (e.detail.unread_count !== this.unreadCount) {
+                this.loadNotifications();
+            }
+        });
     }
 
     setupEventListeners() {
@@ -40,15 +47,18 @@ class NotificationPageManager {
         });
 
         // Paginação
+        // Paginação por cursor: cada página continua a partir da anterior
         document.getElementById('prevPage')?.addEventListener('click', () => {
-            if (this.currentPage > 1) {
+            if (this.prevCursor) {
+                this.cursor = this.prevCursor;
                 this.currentPage--;
                 this.loadNotifications();
             }
         });
 
         document.getElementById('nextPage')?.addEventListener('click', () => {
-            if (this.currentPage < this.totalPages) {
+            if (this.nextCursor) {
+                this.cursor = this.nextCursor;
                 this.currentPage++;
                 this.loadNotifications();
             }
@@ -58,6 +68,7 @@ class NotificationPageManager {
     setFilter(filter) {
         this.currentFilter = filter;
         this.currentPage = 1;
+        this.cursor = null;
 
         // Atualizar UI dos filtros
         document.querySelectorAll('.filter-btn').forEach(btn => {
@@ -77,9 +88,9 @@ class NotificationPageManager {
         emptyState.style.display = 'none';
 
         try {
-            const response = await fetch(
-                `/notifications/api/list?filter=${this.currentFilter}&page=${this.currentPage}&per_page=${this.perPage}`
-            );
+            const params = new URLSearchParams({ filter: this.currentFilter, per_page: this.perPage });
+            if (this.cursor) params.set('cursor', this.cursor);
+            const response = await fetch(`/notifications/api/list?${params}`);
 
             if (!response.ok) throw new Error('Erro ao carregar notificações');
 
@@ -131,17 +142,21 @@ class NotificationPageManager {
                         </div>
                     </div>
                     <div class="notification-actions">
-                        ${notification.is_read
-                    ? `<button class="notification-action-btn" onclick="notificationPageManager.markAsUnread(${notification.id})" title="Marcar como não lida">
+                        ${notification.is_global
+                    ? (notification.is_read ? '' : `<button class="notification-action-btn" onclick="notificationPageManager.markGlobalAsRead(${notification.id})" title="Marcar como lida">
+                                <i class="fas fa-check"></i>
+                               </button>`)
+                    : `${notification.is_read
+                        ? `<button class="notification-action-btn" onclick="notificationPageManager.markAsUnread(${notification.id})" title="Marcar como não lida">
                                 <i class="fas fa-envelope"></i>
                                </button>`
-                    : `<button class="notification-action-btn" onclick="notificationPageManager.markAsRead(${notification.id})" title="Marcar como lida">
+                        : `<button class="notification-action-btn" onclick="notificationPageManager.markAsRead(${notification.id})" title="Marcar como lida">
                                 <i class="fas fa-check"></i>
-                               </button>`
-                }
+                               </button>`}
                         <button class="notification-action-btn delete" onclick="notificationPageManager.deleteNotification(${notification.id})" title="Excluir">
                             <i class="fas fa-trash"></i>
-                        </button>
+                        </button>`
+                }
                     </div>
                 </div>
             `;
@@ -195,9 +210,11 @@ class NotificationPageManager {
     }
 
     updateCounts(data) {
-        document.getElementById('count-all').textContent = data.total;
+        const suffix = data.total_is_exact ? '' : '+';
+        document.getElementById('count-all').textContent = `${data.total}${suffix}`;
+        this.unreadCount = data.unread_count;
         document.getElementById('count-unread').textContent = data.unread_count;
-        document.getElementById('count-read').textContent = data.total - data.unread_count;
+        document.getElementById('count-read').textContent = data.total_is_exact ? data.total - data.unread_count : '—';
 
         // Atualizar badge do navbar se existir
         if (window.notificationManager) {
@@ -206,16 +223,17 @@ class NotificationPageManager {
     }
 
     updatePagination(data) {
-        this.totalPages = data.total_pages;
-        this.currentPage = data.page;
+        this.nextCursor = data.next_cursor;
+        this.prevCursor = data.prev_cursor;
+        if (!data.has_prev) this.currentPage = 1;
 
         const prevBtn = document.getElementById('prevPage');
         const nextBtn = document.getElementById('nextPage');
         const info = document.getElementById('paginationInfo');
 
-        if (prevBtn) prevBtn.disabled = this.currentPage <= 1;
-        if (nextBtn) nextBtn.disabled = this.currentPage >= this.totalPages;
-        if (info) info.textContent = `Página ${this.currentPage} de ${this.totalPages}`;
+        if (prevBtn) prevBtn.disabled = !data.has_prev;
+        if (nextBtn) nextBtn.disabled = !data.has_next;
+        if (info) info.textContent = `Página ${this.currentPage}`;
     }
 
     async markAsRead(notificationId) {
@@ -236,6 +254,24 @@ class NotificationPageManager {
         }
     }
 
+    async markGlobalAsRead(notificationId) {
+        try {
+            const response = await fetch(`/notifications/api/global/${notificationId}/read`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': this.csrfToken
+                }
+            });
+
+            if (response.ok) {
+                this.loadNotifications();
+            }
+        } catch (error) {
+            console.error('Erro ao marcar como lida:', error);
+        }
+    }
+
     async markAsUnread(notificationId) {
         try {
             const response = await fetch(`/notifications/api/${notificationId}/unread`, {
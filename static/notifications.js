@@ -9,6 +9,7 @@ class NotificationManager {
         this.container = null;
         this.notifications = [];
         this.maxNotifications = 5;
+        this.unreadCount = 0;
         this.init();
     }
 
@@ -40,6 +41,30 @@ class NotificationManager {
         // Listener para notificações gerais
         this.socket.on('notification', (data) => {
             this.showNotification(data);
+            if (data.unread_count !== undefined) {
+                this.setUnreadCount(data.unread_count);
+            } else if (data.is_global && data.id) {
+                // Globais persistidas são enviadas a todos: cada cliente soma ao próprio contador
+                this.setUnreadCount(this.unreadCount + 1);
+            }
+        });
+
+        // Anúncios do feed chegam agrupados (um lote por janela)
+        this.socket.on('feed_batch', (batch) => {
+            this.showFeedBatch(batch);
+        });
+
+        // HP do World Boss: snapshot ao se inscrever e atualizações em ticks
+        this.socket.on('world_boss_snapshot', (data) => {
+            this.updateWorldBoss(data.event);
+        });
+        this.socket.on('world_boss_hp', (data) => {
+            this.updateWorldBoss(data);
+        });
+
+        // Contagem de não lidas enviada pelo servidor sempre que muda
+        this.socket.on('unread_count', (data) => {
+            this.setUnreadCount(data.unread_count);
         });
 
         // Listener para notificações admin
@@ -62,6 +87,11 @@ class NotificationManager {
             if (isAdmin) {
                 this.socket.emit('join_admin_room');
             }
+
+            // Páginas com o painel do World Boss recebem o HP em tempo real
+            if (document.getElementById('world-boss-panel')) {
+                this.socket.emit('subscribe_world_boss');
+            }
         });
 
         this.socket.on('disconnect', () => {
@@ -162,10 +192,60 @@ class NotificationManager {
         }
     }
 
+    showFeedBatch(batch) {
+        /**
+         * Mostra os anúncios de um lote; acima do limite de toasts, mostra um resumo
+         */
+        const events = batch.events || [];
+        const shown = events.slice(-(this.maxNotifications - 1));
+        shown.forEach((event) => this.showNotification(event));
+        const hidden = (batch.total || events.length) - shown.length;
+        if (hidden > 0) {
+            this.showNotification({
+                type: 'info',
+                message: `+${hidden} novidade(s) no feed`,
+                timestamp: new Date().toISOString()
+            });
+        }
+    }
+
+    updateWorldBoss(data) {
+        /**
+         * Atualiza o painel do World Boss (o HP só desce dentro de um evento)
+         */
+        const panel = document.getElementById('world-boss-panel');
+        if (!panel || !data || String(data.event_id) !== panel.dataset.eventId) {
+            return;
+        }
+        const shown = Number(panel.dataset.currentHp ?? Infinity);
+        if (data.current_hp > shown) {
+            return;
+        }
+        panel.dataset.currentHp = data.current_hp;
+        const hp = document.getElementById('world-boss-hp');
+        if (hp) {
+            hp.textContent = data.current_hp.toLocaleString('en-US');
+        }
+        const bar = document.getElementById('world-boss-bar');
+        if (bar) {
+            bar.style.width = `${100 - data.progress}%`;
+        }
+        document.dispatchEvent(new CustomEvent('world_boss:hp', { detail: data }));
+    }
+
+    setUnreadCount(count) {
+        /**
+         * Atualiza o contador e avisa a página de notificações (se aberta)
+         */
+        this.updateBadge(count);
+        document.dispatchEvent(new CustomEvent('notifications:unread', { detail: { unread_count: count } }));
+    }
+
     updateBadge(count) {
         /**
          * Atualiza o badge de notificações não lidas no navbar
          */
+        this.unreadCount = count;
         const badge = document.getElementById('notificationBadge');
         if (badge) {
             if (count > 0) {
@@ -199,16 +279,12 @@ class NotificationManager {
 let notificationManager;
 document.addEventListener('DOMContentLoaded', () => {
     notificationManager = new NotificationManager();
+    window.notificationManager = notificationManager;
 
-    // Buscar contagem inicial de notificações não lidas
+    // Buscar contagem ao (re)conectar; depois o servidor envia 'unread_count' a cada mudança
     if (notificationManager.socket) {
         notificationManager.socket.on('connect', () => {
             notificationManager.fetchUnreadCount();
         });
     }
-
-    // Atualizar contagem a cada 60 segundos
-    setInterval(() => {
-        notificationManager.fetchUnreadCount();
-    }, 60000);
 });
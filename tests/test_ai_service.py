@@ -0,0 +1,278 @@
+import unittest
+import sys
+import os
+import threading
+import time
+from unittest import mock
+
+# Add the project root to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import FAQ, Category, User
+from app.services.ai_cache import AIResponseCache, ai_response_cache
+from app.services.ai_challenge_service import AIChallengeService
+from app.services.ai_service import OraculoAI, ai_service
+from app.services.faq_index import faq_index
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGeminiClient:
+    """Simula o cliente google-genai: respostas lentas, falhas e bloqueio controlado"""
+
+    def __init__(self, text='Resposta simulada', delay=0.0, fail=False, release=None, chunks=None):
+        self.text = text
+        self.delay = delay
+        self.fail = fail
+        self.release = release
+        self.chunks = chunks or [text]
+        self.calls = 0
+        self.models = self
+
+    def generate_content_stream(self, model, contents):
+        """Gerador que entrega a resposta em pedaços, como o SDK em modo streaming"""
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        for i, chunk in enumerate(self.chunks):
+            if self.fail and i > 0:
+                raise RuntimeError('falha simulada no meio do streaming')
+            yield FakeResponse(chunk)
+
+    def generate_content(self, model, contents):
+        self.calls += 1
+        if self.release is not None:
+            self.release.wait(5)
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError('falha simulada')
+        return FakeResponse(self.text)
+
+
+class FakeChallenge:
+    def __init__(self, id=1, title='Portas', description='Qual a porta do SSH?', expected_answer='22', hint=None):
+        self.id = id
+        self.title = title
+        self.description = description
+        self.expected_answer = expected_answer
+        self.hint = hint
+
+
+class OraculoAITestCase(unittest.TestCase):
+    def setUp(self):
+        ai_response_cache.purge()
+
+    def test_fast_response_is_returned(self):
+        service = OraculoAI(client=FakeGeminiClient(), timeout=1)
+        self.assertEqual(service.generate_response('Olá'), 'Resposta simulada')
+        self.assertEqual(service.latency.snapshot()['outcomes'], {'ok': 1})
+
+    def test_slow_response_hits_deadline(self):
+        service = OraculoAI(client=FakeGeminiClient(delay=1.0), timeout=0.1)
+        start = time.monotonic()
+        self.assertIsNone(service.generate_response('Olá'))
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(service.latency.snapshot()['outcomes'].get('timeout'), 1)
+
+    def test_failing_client_returns_none(self):
+        service = OraculoAI(client=FakeGeminiClient(fail=True), timeout=1)
+        self.assertIsNone(service.generate_response('Olá'))
+        self.assertEqual(service.latency.snapshot()['outcomes'], {'error': 1})
+
+    def test_concurrency_is_bounded(self):
+        release = threading.Event()
+        service = OraculoAI(client=FakeGeminiClient(release=release), timeout=0.1, max_concurrency=1)
+        in_flight = service.generate_response_async('primeira')
+        self.assertIsNotNone(in_flight)
+        self.assertIsNone(service.generate_response_async('segunda'))
+        self.assertIsNone(service.generate_response('terceira'))
+        self.assertEqual(service.latency.snapshot()['outcomes'].get('rejected'), 2)
+
+        release.set()
+        self.assertEqual(in_flight.result(timeout=1), 'Resposta simulada')
+        self.assertIsNotNone(service.generate_response_async('quarta'))
+
+    def test_stream_waits_for_first_chunk_with_deadline(self):
+        service = OraculoAI(client=FakeGeminiClient(chunks=['a', 'b', 'c']), timeout=1)
+        stream = service.stream_response('Olá')
+        self.assertEqual(stream.text, 'a')
+        self.assertEqual(list(stream.iter_chunks(idle_timeout=1)), ['b', 'c'])
+        self.assertTrue(stream.finished)
+        self.assertEqual(service.ttfb.snapshot()['outcomes'], {'ok': 1})
+
+        slow = OraculoAI(client=FakeGeminiClient(delay=1.0), timeout=0.1)
+        self.assertIsNone(slow.stream_response('Olá'))
+        self.assertEqual(slow.ttfb.snapshot()['outcomes'], {'timeout': 1})
+
+    def test_equivalent_questions_share_cached_answer(self):
+        client = FakeGeminiClient()
+        service = OraculoAI(client=client, timeout=1)
+        service.generate_response('Como configurar a impressora?')
+        self.assertEqual(service.generate_response('como configurar a IMPRESSORA'), 'Resposta simulada')
+        self.assertEqual(client.calls, 1)
+        service.generate_response('Como configurar a impressora?', use_cache=False)
+        self.assertEqual(client.calls, 2)
+
+    def test_negated_question_misses_cache(self):
+        from app.services.lemma_service import lemma_service
+        stop_words = lemma_service.stop_words() or {'não'}
+
+        def terms_without_stopwords(text):
+            # Como o spaCy: lemas sem stopwords ("não" some)
+            return [word for word in text.lower().strip('?').split() if word not in stop_words]
+
+        client = FakeGeminiClient()
+        service = OraculoAI(client=client, timeout=1)
+        with mock.patch.object(lemma_service, 'terms', side_effect=terms_without_stopwords), \
+                mock.patch.object(lemma_service, 'stop_words', return_value=stop_words):
+            self.assertEqual(terms_without_stopwords('posso reiniciar'), terms_without_stopwords('não posso reiniciar'))
+            service.generate_response('Posso reiniciar o servidor?')
+            service.generate_response('Não posso reiniciar o servidor?')
+            self.assertEqual(client.calls, 2)
+            service.generate_response('não posso reiniciar o servidor')
+            self.assertEqual(client.calls, 2)
+
+    def test_failed_answers_are_not_cached(self):
+        client = FakeGeminiClient(fail=True)
+        service = OraculoAI(client=client, timeout=1)
+        service.generate_response('Olá')
+        client.fail = False
+        self.assertEqual(service.generate_response('Olá'), 'Resposta simulada')
+
+    def test_hint_requested_once_per_challenge_and_attempt(self):
+        service = AIChallengeService()
+        service.client = FakeGeminiClient(text='💡 Pense no protocolo seguro')
+        challenge = FakeChallenge()
+        self.assertEqual(service.generate_hint(challenge, 1), '💡 Pense no protocolo seguro')
+        service.generate_hint(challenge, 1)
+        self.assertEqual(service.client.calls, 1)
+        service.generate_hint(challenge, 2)
+        self.assertEqual(service.client.calls, 2)
+
+        # Editar o desafio invalida a dica
+        challenge.expected_answer = '2222'
+        service.generate_hint(challenge, 1)
+        self.assertEqual(service.client.calls, 3)
+
+    def test_verdicts_cached_per_normalized_answer(self):
+        service = AIChallengeService()
+        service.client = FakeGeminiClient(text='{"is_correct": true, "confidence": 0.9, "explanation": "ok"}')
+        challenge = FakeChallenge()
+        self.assertEqual(service.validate_answer(challenge, 'Porta 22!')['confidence'], 0.9)
+        self.assertTrue(service.validate_answer(challenge, '  porta   22 ')['is_correct'])
+        self.assertEqual(service.client.calls, 1)
+
+        # Mudar a resposta esperada invalida os veredictos do desafio
+        challenge.expected_answer = 'TCP 22'
+        service.validate_answer(challenge, 'porta 22')
+        self.assertEqual(service.client.calls, 2)
+
+    def test_batch_validation_uses_one_model_request(self):
+        service = AIChallengeService()
+        service.client = FakeGeminiClient(text=(
+            '```json\n[{"item": 1, "is_correct": true, "confidence": 0.8, "explanation": "ok"},'
+            ' {"item": 2, "is_correct": false, "confidence": 0.9, "explanation": "não"}]\n```'
+        ))
+        ssh, dns = FakeChallenge(id=1), FakeChallenge(id=2, title='DNS', expected_answer='53')
+        results = service.validate_answers([(ssh, 'porta vinte e dois'), (dns, '80'), (ssh, 'Porta vinte e dois'), (dns, '53')])
+        self.assertEqual(service.client.calls, 1)
+        self.assertEqual([r['is_correct'] for r in results], [True, False, True, True])
+        self.assertEqual(results[3]['explanation'], 'Resposta exata!')
+
+        service.validate_answers([(dns, '80')])
+        self.assertEqual(service.client.calls, 1)
+
+
+class AIIntegrationTestCase(unittest.TestCase):
+    def setUp(self):
+        class TestConfig:
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+            WTF_CSRF_ENABLED = False
+            SECRET_KEY = 'test-key'
+            CLOUDINARY_CLOUD_NAME = 'test'
+            CLOUDINARY_API_KEY = 'test'
+            CLOUDINARY_API_SECRET = 'test'
+            CACHE_TYPE = 'NullCache'
+
+        self.app_instance = create_app(TestConfig)
+        self.app = self.app_instance.test_client()
+        self.app_context = self.app_instance.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        category = Category.query.filter_by(name='Software').first()
+        db.session.add(FAQ(category_id=category.id, question='Como configurar a impressora?',
+                           answer='Abra o painel de controle.'))
+        user = User(name='Teste', email='teste@example.com', password='x')
+        db.session.add(user)
+        db.session.commit()
+        faq_index.build()
+        with self.app.session_transaction() as sess:
+            sess['_user_id'] = str(user.id)
+
+        self.original_client, self.original_timeout = ai_service.client, ai_service.timeout
+
+    def tearDown(self):
+        ai_service.client, ai_service.timeout = self.original_client, self.original_timeout
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_shared_layer_and_purge_across_workers(self):
+        worker_a, worker_b = AIResponseCache(), AIResponseCache()
+        worker_a.GENERATION_CHECK_SECONDS = worker_b.GENERATION_CHECK_SECONDS = 0
+        key = worker_a.make_key('chat', 'Como configurar a impressora?')
+        worker_a.set('chat', key, 'resposta')
+
+        self.assertEqual(worker_b.get('chat', key), 'resposta')
+        self.assertEqual(worker_b.stats()['namespaces']['chat']['shared_hits'], 1)
+        self.assertEqual(worker_b.get('chat', key), 'resposta')
+        self.assertEqual(worker_b.stats()['namespaces']['chat']['memory_hits'], 1)
+
+        worker_a.purge()
+        self.assertIsNone(worker_b.get('chat', key))
+        self.assertEqual(worker_b.stats()['namespaces']['chat']['misses'], 1)
+
+    def test_streaming_chat_pushes_chunks_to_user_room(self):
+        ai_response_cache.purge()
+        ai_service.client = FakeGeminiClient(chunks=['Reinicie ', 'o ', 'roteador.'])
+        socket_client = self.app_instance.socketio.test_client(self.app_instance, flask_test_client=self.app)
+
+        response = self.app.post('/chat', json={'mensagem': 'internet caiu', 'stream': True, 'stream_id': 's1'})
+        data = response.get_json()
+        self.assertEqual((data['state'], data['stream_id'], data['text']), ('streaming', 's1', 'Reinicie '))
+
+        events, deadline = [], time.monotonic() + 5
+        while not any(event['name'] == 'chat_done' for event in events) and time.monotonic() < deadline:
+            events += socket_client.get_received()
+            self.app_instance.socketio.sleep(0.01)  # cede a vez para a tarefa de fundo
+        chunks = [event['args'][0]['text'] for event in events if event['name'] == 'chat_chunk']
+        done = next(event['args'][0] for event in events if event['name'] == 'chat_done')
+        self.assertEqual(chunks, ['Reinicie ', 'o ', 'roteador.'])
+        self.assertTrue(done['complete'])
+        self.assertGreaterEqual(done['ttfb_ms'], 0)
+        self.assertEqual(set(done['response']), {'text', 'html', 'state', 'options', 'suggestion'})
+        self.assertEqual(done['response']['text'], 'Reinicie o roteador.')
+
+        # A resposta completa fica em cache: a próxima pergunta igual volta inteira
+        response = self.app.post('/chat', json={'mensagem': 'internet caiu', 'stream': True})
+        self.assertEqual(response.get_json()['text'], 'Reinicie o roteador.')
+        self.assertEqual(ai_service.client.calls, 1)
+        socket_client.disconnect()
+
+    def test_chat_falls_through_to_faq_on_timeout(self):
+        ai_service.client = FakeGeminiClient(delay=1.0)
+        ai_service.timeout = 0.1
+        response = self.app.post('/chat', json={'mensagem': 'configurar impressora'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('painel de controle', response.get_json()['text'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import sys
+import os
+import threading
+import time
+
+# Add the project root to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.broadcast_aggregator import BroadcastAggregator
+
+
+class FakeSocketIO:
+    """Registra os emits e roda tarefas de fundo em threads"""
+
+    def __init__(self):
+        self.emitted = []
+        self.tasks = []
+
+    def emit(self, event_name, payload, room=None, namespace=None):
+        self.emitted.append((event_name, payload))
+
+    def start_background_task(self, target):
+        thread = threading.Thread(target=target)
+        self.tasks.append(thread)
+        thread.start()
+        return thread
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class BroadcastAggregatorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.socketio = FakeSocketIO()
+        self.aggregator = BroadcastAggregator(self.socketio)
+        # Sem laço de fundo: os testes chamam flush() diretamente
+        self.aggregator._running = True
+
+    def test_events_in_a_window_become_one_batch(self):
+        for i in range(10):
+            self.aggregator.publish('success', f'Usuário {i} completou um desafio', category='challenge')
+        self.assertEqual(self.socketio.emitted, [])
+        self.assertEqual(self.aggregator.stats()['queue_depth'], 10)
+
+        self.assertEqual(self.aggregator.flush(), 10)
+        self.assertEqual(self.aggregator.flush(), 0)
+        [(event_name, batch)] = self.socketio.emitted
+        self.assertEqual(event_name, 'feed_batch')
+        self.assertEqual((len(batch['events']), batch['total'], batch['dropped']), (10, 10, 0))
+
+        stats = self.aggregator.stats()
+        self.assertEqual((stats['queue_depth'], stats['batches'], stats['emitted_events']), (0, 1, 10))
+
+    def test_overflow_is_sampled(self):
+        self.aggregator.max_events = 5
+        for i in range(100):
+            self.aggregator.publish('success', f'Evento {i}')
+        self.aggregator.flush()
+        [(_, batch)] = self.socketio.emitted
+        self.assertEqual((len(batch['events']), batch['total'], batch['dropped']), (5, 100, 95))
+        self.assertEqual(len({event['message'] for event in batch['events']}), 5)
+        self.assertEqual(self.aggregator.stats()['dropped'], 95)
+
+    def test_background_loop_flushes_and_stops_when_idle(self):
+        self.aggregator._running = False
+        self.aggregator.window = 0.05
+        for i in range(3):
+            self.aggregator.publish('success', f'Nível {i}', category='level_up')
+        self.assertEqual(len(self.socketio.tasks), 1)
+        self.socketio.tasks[0].join(timeout=5)
+        self.assertFalse(self.socketio.tasks[0].is_alive())
+        self.assertEqual([len(batch['events']) for _, batch in self.socketio.emitted], [3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,192 @@
+import unittest
+import sys
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+# Add the project root to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import create_app, db
+from app.extensions import cache
+from app.models import (
+    User, Team, Challenge, UserChallenge, DailyChallenge, GlobalEvent, GlobalEventContribution,
+    TeamBattle, TeamBattleChallenge, LearningPath, PathChallenge, UserPathProgress,
+    Achievement, UserAchievement, Notification
+)
+from app.services.challenge_pipeline import challenge_pipeline
+from app.services.level_cache import level_cache
+from app.services.world_boss_stream import world_boss_stream
+
+
+class ChallengePipelineTestCase(unittest.TestCase):
+    # Consultas da submissão com caches aquecidos: usuário, desafio, verificação em
+    # lote, escritas do prêmio, dano no boss e batalhas
+    QUERY_BUDGET = 13
+
+    def setUp(self):
+        # Banco em arquivo: os efeitos adiados rodam em outra thread, com a própria conexão
+        self.tmp = tempfile.TemporaryDirectory()
+        database_path = self.database_path = os.path.join(self.tmp.name, 'pipeline.db')
+
+        class TestConfig:
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{database_path}'
+            WTF_CSRF_ENABLED = False
+            SECRET_KEY = 'test-key'
+            # Tarefas de fundo em threads (em produção, green threads do eventlet)
+            SOCKETIO_ASYNC_MODE = 'threading'
+
+        self.app_instance = create_app(TestConfig)
+        self.app_context = self.app_instance.app_context()
+        self.app_context.push()
+        db.create_all()
+        cache.clear()
+
+        player = User(name='Jogador', email='jogador@example.com', password='x')
+        rival = User(name='Rival', email='rival@example.com', password='x')
+        db.session.add_all([player, rival])
+        db.session.flush()
+        home, away = Team(name='Casa', owner_id=player.id), Team(name='Visitante', owner_id=rival.id)
+        db.session.add_all([home, away])
+        db.session.flush()
+        player.team_id, rival.team_id = home.id, away.id
+
+        first = Challenge(title='Primeiro', description='?', expected_answer='um', points_reward=30)
+        second = Challenge(title='Segundo', description='?', expected_answer='dois', points_reward=20)
+        db.session.add_all([first, second])
+        db.session.flush()
+        path = LearningPath(name='Trilha', reward_points=100)
+        db.session.add(path)
+        db.session.flush()
+        db.session.add_all([
+            PathChallenge(path_id=path.id, challenge_id=first.id, step=1),
+            PathChallenge(path_id=path.id, challenge_id=second.id, step=2),
+            DailyChallenge(day=date.today(), challenge_id=second.id, bonus_points=15),
+            Achievement(name='Dupla', description='Dois desafios', trigger_type='challenges_completed', trigger_value=2),
+            Achievement(name='Trilheiro', description='Uma trilha', trigger_type='paths_completed', trigger_value=1),
+        ])
+        battle = TeamBattle(challenging_team_id=home.id, challenged_team_id=away.id,
+                            end_time=datetime.utcnow() + timedelta(days=1))
+        now = datetime.utcnow()
+        boss = GlobalEvent(name='Dragão', description='Boss', total_hp=1000, current_hp=1000,
+                           start_date=now - timedelta(hours=1), end_date=now + timedelta(hours=1), is_active=True)
+        db.session.add_all([battle, boss])
+        db.session.flush()
+        db.session.add(TeamBattleChallenge(battle_id=battle.id, challenge_id=first.id))
+        db.session.commit()
+        self.user_id, self.home_id, self.event_id = player.id, home.id, boss.id
+        self.first_id, self.second_id, self.path_id = first.id, second.id, path.id
+
+        # Snapshot do evento e tabela de níveis já em cache, como em produção
+        world_boss_stream.snapshot()
+        level_cache.all()
+
+        self.client = self.app_instance.test_client()
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = str(self.user_id)
+
+    def tearDown(self):
+        challenge_pipeline.drain(timeout=10)
+        # O tick do HP roda em thread: espera encerrar antes de apagar o banco
+        deadline = time.monotonic() + 5
+        while world_boss_stream._running and time.monotonic() < deadline:
+            time.sleep(0.05)
+        cache.clear()
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+        self.app_context.pop()
+        self.tmp.cleanup()
+
+    def _submit(self, challenge_id, answer):
+        request_thread = threading.get_ident()
+        commits = []
+
+        def count_commit(session):
+            if threading.get_ident() == request_thread:
+                commits.append(session)
+
+        event.listen(Session, 'after_commit', count_commit)
+        try:
+            response = self.client.post(f'/challenges/submit/{challenge_id}', data={'answer': answer})
+        finally:
+            event.remove(Session, 'after_commit', count_commit)
+        self.assertEqual(response.status_code, 302)
+        return response, len(commits)
+
+    def test_core_award_commits_once_and_side_effects_run_after(self):
+        response, commits = self._submit(self.first_id, 'UM')
+        self.assertEqual(commits, 1)
+        self.assertLessEqual(int(response.headers['X-Query-Count']), self.QUERY_BUDGET)
+        self.assertTrue(challenge_pipeline.drain(timeout=10))
+
+        db.session.expire_all()
+        self.assertEqual(db.session.get(User, self.user_id).points, 30)
+        self.assertEqual(db.session.get(GlobalEvent, self.event_id).current_hp, 970)
+        self.assertEqual(GlobalEventContribution.query.one().contribution_points, 30)
+        self.assertEqual(TeamBattleChallenge.query.one().completed_by_team_id, self.home_id)
+        self.assertEqual(UserPathProgress.query.count(), 0)
+
+        response, commits = self._submit(self.second_id, 'dois')
+        self.assertEqual(commits, 1)
+        self.assertTrue(challenge_pipeline.drain(timeout=10))
+
+        # Desafio (20) + bônus do dia (15) + trilha concluída em segundo plano (100)
+        db.session.expire_all()
+        self.assertEqual(db.session.get(User, self.user_id).points, 30 + 20 + 15 + 100)
+        self.assertEqual(UserPathProgress.query.filter_by(user_id=self.user_id, path_id=self.path_id).count(), 1)
+        unlocked = {name for (name,) in db.session.query(Achievement.name).join(UserAchievement)}
+        self.assertEqual(unlocked, {'Dupla', 'Trilheiro'})
+        categories = {category for (category,) in db.session.query(Notification.category)
+                      .filter(Notification.user_id == self.user_id)}
+        self.assertTrue({'challenge', 'path', 'achievement'} <= categories)
+
+    def test_repeated_submission_awards_nothing(self):
+        self._submit(self.first_id, 'um')
+        self._submit(self.first_id, 'um')
+        self.assertTrue(challenge_pipeline.drain(timeout=10))
+
+        db.session.expire_all()
+        self.assertEqual(db.session.get(User, self.user_id).points, 30)
+        self.assertEqual(UserChallenge.query.count(), 1)
+        self.assertEqual(db.session.get(GlobalEvent, self.event_id).current_hp, 970)
+
+    def test_concurrent_duplicate_with_active_event_awards_nothing(self):
+        # A outra submissão grava a conclusão logo depois da verificação desta
+        seen = []
+
+        def race(conn, cursor, statement, parameters, context, executemany):
+            if seen == ['check']:
+                seen.append('raced')
+                other = sqlite3.connect(self.database_path)
+                other.execute('INSERT INTO user_challenge (user_id, challenge_id, completed_at) VALUES (?, ?, ?)',
+                              (self.user_id, self.first_id, datetime.utcnow().isoformat(' ')))
+                other.commit()
+                other.close()
+            elif not seen and 'EXISTS' in statement and 'user_challenge' in statement:
+                seen.append('check')
+
+        event.listen(db.engine, 'before_cursor_execute', race)
+        try:
+            self._submit(self.first_id, 'um')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', race)
+        self.assertEqual(seen, ['check', 'raced'])
+        self.assertTrue(challenge_pipeline.drain(timeout=10))
+
+        db.session.expire_all()
+        self.assertEqual(db.session.get(User, self.user_id).points, 0)
+        self.assertEqual(UserChallenge.query.count(), 1)
+        self.assertEqual(db.session.get(GlobalEvent, self.event_id).current_hp, 1000)
+        self.assertEqual(GlobalEventContribution.query.count(), 0)
+        self.assertIsNone(TeamBattleChallenge.query.one().completed_by_team_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,234 @@
+import unittest
+import sys
+import os
+import tempfile
+import threading
+from unittest import mock
+
+# Add the project root to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import FAQ, Category
+from app.services.faq_index import FAQIndex, faq_index
+from app.services.faq_vectors import FAQVectorStore, faq_vectors
+from app.services.lemma_service import LemmaService
+from app.utils.faq_utils import (
+    find_faq_by_nlp, find_faqs_by_keywords, find_faq_by_similarity,
+    index_faqs, unindex_faqs
+)
+
+
+class FAQSearchTestCase(unittest.TestCase):
+    def setUp(self):
+        class TestConfig:
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+            WTF_CSRF_ENABLED = False
+            SECRET_KEY = 'test-key'
+            CLOUDINARY_CLOUD_NAME = 'test'
+            CLOUDINARY_API_KEY = 'test'
+            CLOUDINARY_API_SECRET = 'test'
+            CACHE_TYPE = 'NullCache'
+
+        self.app_instance = create_app(TestConfig)
+        self.app_context = self.app_instance.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        category = Category.query.filter_by(name='Software').first()
+        self.faqs = [
+            FAQ(category_id=category.id, question='Como configurar a impressora?',
+                answer='Abra o painel de controle e adicione a impressora pela rede.'),
+            FAQ(category_id=category.id, question='Como trocar a senha do email?',
+                answer='Acesse o portal e escolha a opção de redefinir senha.'),
+            FAQ(category_id=category.id, question='A rede wifi está lenta',
+                answer='Reinicie o roteador e verifique a impressora compartilhada.'),
+        ]
+        db.session.add_all(self.faqs)
+        db.session.commit()
+        faq_index.build()
+        faq_vectors.build()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_question_matches_rank_above_answer_matches(self):
+        results = find_faqs_by_keywords('impressora')
+        self.assertEqual([faq.id for faq in results], [self.faqs[0].id, self.faqs[2].id])
+
+    def test_clear_winner_is_returned_alone(self):
+        results = find_faq_by_nlp('como configurar a impressora')
+        self.assertEqual([faq.id for faq in results], [self.faqs[0].id])
+
+    def test_results_limited_to_top_k(self):
+        category = Category.query.filter_by(name='Software').first()
+        db.session.add_all([
+            FAQ(category_id=category.id, question=f'Senha bloqueada {i}', answer='Procure o suporte.')
+            for i in range(10)
+        ])
+        db.session.commit()
+        faq_index.build()
+        self.assertEqual(len(find_faqs_by_keywords('senha')), 5)
+        self.assertEqual(len(find_faqs_by_keywords('senha', limit=3)), 3)
+
+    def test_incremental_update_and_remove(self):
+        faq = self.faqs[1]
+        faq.question = 'Como instalar o antivírus?'
+        db.session.commit()
+        faq_index.add_or_update(faq)
+        self.assertEqual([f.id for f in find_faq_by_nlp('antivírus')], [faq.id])
+        self.assertNotIn(faq.id, [f.id for f in find_faq_by_nlp('email')])
+
+        faq_index.remove(faq.id)
+        self.assertEqual(find_faq_by_nlp('antivírus'), [])
+
+    def test_other_worker_rebuilds_after_shared_version_changes(self):
+        # A marca fica no banco: vale mesmo com o cache por processo (NullCache aqui)
+        other = FAQIndex()
+        other.VERSION_CHECK_SECONDS = 0
+        other.build()
+
+        faq = self.faqs[1]
+        faq.question = 'Como instalar o antivírus?'
+        db.session.commit()
+        index_faqs([faq])
+        self.assertEqual([faq_id for faq_id, _ in other.search('antivírus')], [faq.id])
+
+        db.session.delete(faq)
+        db.session.commit()
+        unindex_faqs([faq.id])
+        self.assertEqual(other.search('antivírus'), [])
+
+    def test_unknown_terms_return_nothing(self):
+        self.assertEqual(find_faq_by_nlp('xyzzy'), [])
+        self.assertEqual(find_faq_by_similarity('xyzzy'), [])
+
+    def test_similarity_fallback_tolerates_misspelling(self):
+        self.assertEqual(find_faq_by_nlp('impresora'), [])
+        results = find_faq_by_similarity('configurar impresora')
+        self.assertEqual([faq.id for faq in results][:1], [self.faqs[0].id])
+
+    def test_index_helpers_keep_vectors_in_sync(self):
+        category = Category.query.filter_by(name='Hardware').first()
+        faq = FAQ(category_id=category.id, question='Monitor sem imagem', answer='Verifique o cabo HDMI.')
+        db.session.add(faq)
+        db.session.commit()
+        index_faqs([faq])
+        self.assertEqual(len(faq_vectors), 4)
+        self.assertEqual([f.id for f in find_faq_by_similarity('monitor sem imagem')][:1], [faq.id])
+
+        unindex_faqs([str(faq.id)])
+        self.assertEqual(len(faq_vectors), 3)
+        self.assertNotIn(faq.id, [f.id for f in find_faq_by_similarity('monitor sem imagem')])
+
+    def test_vectors_persisted_next_to_database(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.app_instance.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_dir}/nexus.db'
+            store = FAQVectorStore()
+            store.init_app(self.app_instance)
+            store.build(self.faqs)
+            self.assertTrue(os.path.exists(os.path.join(tmp_dir, FAQVectorStore.MATRIX_FILENAME)))
+
+            # Outro worker abre a mesma matriz via memory-map
+            other = FAQVectorStore()
+            other.init_app(self.app_instance)
+            self.assertEqual(other.load_or_build(), 3)
+            self.assertIsInstance(other._matrix, __import__('numpy').memmap)
+            self.assertTrue(other._matrix.flags['C_CONTIGUOUS'])
+
+    def test_other_worker_reloads_ids_and_vectors_together(self):
+        import numpy as np
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.app_instance.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_dir}/nexus.db'
+            # Arquivo no formato antigo (só a matriz) é descartado e recalculado
+            np.save(os.path.join(tmp_dir, FAQVectorStore.MATRIX_FILENAME),
+                    np.zeros((3, FAQVectorStore.DIMENSIONS), dtype=np.float32))
+            store = FAQVectorStore()
+            store.init_app(self.app_instance)
+            self.assertEqual(store.load_or_build(), 3)
+            other = FAQVectorStore()
+            other.init_app(self.app_instance)
+            other.load_or_build()
+
+            category = Category.query.filter_by(name='Hardware').first()
+            faq = FAQ(category_id=category.id, question='Monitor sem imagem', answer='Verifique o cabo HDMI.')
+            db.session.add(faq)
+            db.session.commit()
+            store.add_many([faq])
+            store.remove_many([self.faqs[0].id])
+
+            results = other.search('monitor sem imagem')
+            self.assertEqual(len(other), 3)
+            self.assertEqual(results[0][0], faq.id)
+            self.assertNotIn(self.faqs[0].id, [faq_id for faq_id, _ in other.search('configurar impressora')])
+
+    def test_concurrent_workers_keep_each_others_rows(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.app_instance.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_dir}/nexus.db'
+            workers = [FAQVectorStore(), FAQVectorStore()]
+            for store in workers:
+                store.init_app(self.app_instance)
+                store.load_or_build()
+
+            category = Category.query.filter_by(name='Hardware').first()
+            batches = [[FAQ(category_id=category.id, question=f'Pergunta {worker} {i}', answer='Resposta')
+                        for i in range(10)] for worker in range(2)]
+            db.session.add_all(batches[0] + batches[1])
+            db.session.commit()
+            for faq in batches[0] + batches[1]:
+                faq.question, faq.answer  # carrega antes de usar nas threads
+
+            def edit(store, faqs):
+                with self.app_instance.app_context():
+                    for faq in faqs:
+                        store.add_many([faq])
+
+            threads = [threading.Thread(target=edit, args=(store, faqs)) for store, faqs in zip(workers, batches)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            fresh = FAQVectorStore()
+            fresh.init_app(self.app_instance)
+            fresh._load()
+            self.assertEqual(set(fresh._ids.tolist()),
+                             {faq.id for faq in self.faqs + batches[0] + batches[1]})
+
+    def test_lemma_cache_skips_unchanged_faqs(self):
+        service = LemmaService()
+        service.analyze_faqs(self.faqs)
+        self.assertEqual(service.misses, 3)
+        service.analyze_faqs(self.faqs)
+        self.assertEqual((service.hits, service.misses), (3, 3))
+
+        # Conteúdo alterado gera outra chave e é relematizado
+        self.faqs[0].question = 'Como instalar a impressora?'
+        analysis = service.analyze_faq(self.faqs[0])
+        self.assertIn('instalar', analysis.question_terms)
+        self.assertEqual(service.misses, 4)
+
+    def test_lemma_cache_evicts_and_spills_to_disk(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.app_instance.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_dir}/nexus.db'
+            service = LemmaService()
+            service.MAX_CACHE_ENTRIES = 2
+            service.init_app(self.app_instance)
+            service.analyze_faqs(self.faqs)
+            self.assertEqual(service.stats()['entries'], 2)
+
+            # A entrada despejada da memória volta do disco sem passar pelo NLP
+            service.analyze_faq(self.faqs[0])
+            self.assertEqual((service.disk_hits, service.misses), (1, 3))
+
+            other = LemmaService()
+            other.init_app(self.app_instance)
+            other.analyze_faqs(self.faqs)
+            self.assertEqual((other.disk_hits, other.misses), (3, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import unittest
+import sys
+import os
+import random
+from datetime import date, timedelta
+from unittest import mock
+
+# Add the project root to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import User, Team, Challenge, PointsLedger, PointsDailyBucket
+from app.services.leaderboard_service import MemoryLeaderboardBackend, RedisLeaderboardBackend, leaderboard
+from app.utils import award_points, points_in_window
+
+
+class LeaderboardTestCase(unittest.TestCase):
+    def setUp(self):
+        class TestConfig:
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+            WTF_CSRF_ENABLED = False
+            SECRET_KEY = 'test-key'
+            CLOUDINARY_CLOUD_NAME = 'test'
+            CLOUDINARY_API_KEY = 'test'
+            CLOUDINARY_API_SECRET = 'test'
+            CACHE_TYPE = 'NullCache'
+
+        self.app_instance = create_app(TestConfig)
+        self.app = self.app_instance.test_client()
+        self.app_context = self.app_instance.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.users = [User(name=f'Usuário {i}', email=f'u{i}@example.com', password='x', points=points)
+                      for i, points in enumerate([50, 300, 120, 10])]
+        db.session.add_all(self.users)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def ranked_ids(self, board, per_page=10):
+        rows, _ = leaderboard.page(board, 1, per_page)
+        return [member for _, member, _ in rows]
+
+    def test_pages_and_my_rank(self):
+        rows, total = leaderboard.page(leaderboard.USERS, page=1, per_page=2)
+        self.assertEqual(total, 4)
+        self.assertEqual(rows, [(1, self.users[1].id, 300), (2, self.users[2].id, 120)])
+        rows, _ = leaderboard.page(leaderboard.USERS, page=2, per_page=2)
+        self.assertEqual([rank for rank, _, _ in rows], [3, 4])
+        self.assertEqual(leaderboard.rank_of(leaderboard.USERS, self.users[0].id), (3, 50))
+
+    def test_points_change_applied_only_on_commit(self):
+        self.users[3].points += 1000
+        db.session.flush()
+        self.assertEqual(leaderboard.rank_of(leaderboard.USERS, self.users[3].id)[0], 4)
+        db.session.rollback()
+        self.assertEqual(leaderboard.rank_of(leaderboard.USERS, self.users[3].id)[0], 4)
+
+        self.users[3].points += 1000
+        db.session.commit()
+        self.assertEqual(leaderboard.rank_of(leaderboard.USERS, self.users[3].id), (1, 1010))
+
+        db.session.delete(self.users[3])
+        db.session.commit()
+        self.assertEqual(leaderboard.rank_of(leaderboard.USERS, self.users[3].id), (None, None))
+
+    def test_team_totals_follow_membership_and_points(self):
+        red = Team(name='Vermelho', owner_id=self.users[0].id)
+        blue = Team(name='Azul', owner_id=self.users[1].id)
+        db.session.add_all([red, blue])
+        db.session.commit()
+        self.assertEqual(leaderboard.rank_of(leaderboard.TEAMS, blue.id), (2, 0))
+
+        self.users[0].team_id = red.id
+        self.users[2].team_id = red.id
+        self.users[1].team_id = blue.id
+        db.session.commit()
+        self.assertEqual(self.ranked_ids(leaderboard.TEAMS), [blue.id, red.id])
+
+        self.users[2].points += 200
+        db.session.commit()
+        self.assertEqual(leaderboard.rank_of(leaderboard.TEAMS, red.id), (1, 370))
+
+        self.users[2].team_id = None
+        db.session.commit()
+        self.assertEqual(leaderboard.rank_of(leaderboard.TEAMS, red.id), (2, 50))
+
+    def test_ledger_feeds_period_boards(self):
+        challenge = Challenge(title='Portas', description='SSH?', expected_answer='22', points_reward=30)
+        db.session.add(challenge)
+        db.session.commit()
+        award_points(self.users[3], challenge.points_reward, 'challenge', challenge.id)
+        award_points(self.users[3], 20, 'daily_bonus', challenge.id)
+        award_points(self.users[3], -5, 'hint', challenge.id)
+        db.session.commit()
+        self.assertEqual(self.users[3].points, 55)
+        self.assertEqual(leaderboard.rank_of(leaderboard.weekly_board(), self.users[3].id), (1, 50))
+        self.assertEqual(leaderboard.rank_of(leaderboard.monthly_board(), self.users[3].id), (1, 50))
+
+        # A reconstrução a partir dos buckets diários chega ao mesmo resultado
+        leaderboard.rebuild()
+        self.assertEqual(leaderboard.rank_of(leaderboard.weekly_board(), self.users[3].id), (1, 50))
+
+    def test_shared_boards_rebuilt_only_when_missing(self):
+        backend = mock.create_autospec(RedisLeaderboardBackend, instance=True)
+        self.addCleanup(setattr, leaderboard, 'backend', leaderboard.backend)
+        leaderboard.backend = backend
+
+        # Rankings já existentes: mantidos pelos ZINCRBY dos outros workers
+        backend.exists.return_value = True
+        leaderboard.warm()
+        backend.acquire.assert_not_called()
+        backend.replace.assert_not_called()
+
+        # Só o ranking ausente é reconstruído, sob o lock
+        weekly = leaderboard.weekly_board()
+        backend.exists.side_effect = lambda board: board != weekly
+        backend.acquire.return_value = 'token'
+        leaderboard.warm()
+        self.assertEqual([call.args[0] for call in backend.replace.call_args_list], [weekly])
+        backend.release.assert_called_once_with('rebuild-lock', 'token')
+
+        # Outro worker com o lock: este não reconstrói
+        backend.replace.reset_mock()
+        backend.acquire.return_value = None
+        leaderboard.warm()
+        backend.replace.assert_not_called()
+
+    def test_daily_buckets_aggregate_ledger(self):
+        for amount, source in ((100, 'boss'), (40, 'path'), (-5, 'hint'), (60, 'battle')):
+            award_points(self.users[0], amount, source)
+        db.session.commit()
+        self.assertEqual(PointsLedger.query.filter_by(user_id=self.users[0].id).count(), 4)
+        bucket = PointsDailyBucket.query.filter_by(user_id=self.users[0].id).one()
+        self.assertEqual((bucket.day, bucket.earned, bucket.spent), (date.today(), 200, 5))
+        self.assertEqual(points_in_window(date.today() - timedelta(days=30)), {self.users[0].id: 200})
+        self.assertEqual(points_in_window(date.today() - timedelta(days=30), date.today() - timedelta(days=1)), {})
+
+    def test_memory_backend_matches_full_sort(self):
+        backend = MemoryLeaderboardBackend()
+        rng = random.Random(3)
+        expected = {}
+        for _ in range(500):
+            member = rng.randint(1, 50)
+            delta = rng.randint(-20, 40)
+            backend.incr('board', member, delta)
+            expected[member] = expected.get(member, 0) + delta
+        ordered = sorted(expected.items(), key=lambda item: (-item[1], item[0]))
+        self.assertEqual(backend.range('board', 0, 50), ordered)
+        for position, (member, _) in enumerate(ordered):
+            self.assertEqual(backend.rank('board', member), position)
+
+    def test_ranking_page_renders(self):
+        with self.app.session_transaction() as sess:
+            sess['_user_id'] = str(self.users[0].id)
+        response = self.app.get('/ranking')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Sua posição: <strong>#3</strong>', response.get_data(as_text=True))
+
+        response = self.app.get('/api/ranking/users?per_page=1')
+        self.assertEqual(response.get_json()['entries'], [{'rank': 1, 'id': self.users[1].id, 'points': 300}])
+        self.assertEqual(response.get_json()['me'], {'rank': 3, 'points': 50})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import sys
+import os
+import threading
+
+# Add the project root to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event
+from app import create_app, db
+from app.models import User, Level
+from app.services.level_cache import LevelInfo, LevelTable, level_cache
+from app.utils import update_user_level
+
+
+class LevelCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        class TestConfig:
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+            WTF_CSRF_ENABLED = False
+            SECRET_KEY = 'test-key'
+            CLOUDINARY_CLOUD_NAME = 'test'
+            CLOUDINARY_API_KEY = 'test'
+            CLOUDINARY_API_SECRET = 'test'
+            CACHE_TYPE = 'NullCache'
+
+        self.app_instance = create_app(TestConfig)
+        self.app = self.app_instance.test_client()
+        self.app_context = self.app_instance.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def level_queries(self, action):
+        """Executa action contando as consultas à tabela level"""
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            if 'FROM level' in statement:
+                statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            action()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        return len(statements)
+
+    def test_resolves_levels_by_points(self):
+        self.assertEqual(level_cache.initial().name, 'Iniciante')
+        self.assertEqual(level_cache.for_points(0).name, 'Iniciante')
+        self.assertEqual(level_cache.for_points(149).name, 'Básico')
+        self.assertEqual(level_cache.for_points(150).name, 'Intermediário')
+        self.assertEqual(level_cache.for_points(5000).name, 'Master')
+        self.assertIsNone(level_cache.next_after(level_cache.for_points(5000)))
+        self.assertEqual(level_cache.progress(level_cache.for_points(100).id, 100),
+                         {'percentage': 50.0, 'next_level_points': 150})
+
+    def test_level_up_and_render_without_level_queries(self):
+        level_cache.all()
+        user = User(name='Ana', email='ana@example.com', password='x', points=400,
+                    level_id=level_cache.initial().id)
+        db.session.add(user)
+        db.session.commit()
+        with self.app_instance.test_request_context():
+            self.assertEqual(self.level_queries(lambda: update_user_level(user)), 0)
+        self.assertEqual(user.level_id, level_cache.for_points(400).id)
+        db.session.commit()
+
+        with self.app.session_transaction() as sess:
+            sess['_user_id'] = str(user.id)
+        self.assertEqual(self.level_queries(lambda: self.app.get('/profile')), 0)
+
+    def test_invalidate_reloads_table(self):
+        self.assertEqual(level_cache.for_points(2000).name, 'Master')
+        db.session.add(Level(name='Lenda', min_points=2000, insignia='🐉'))
+        db.session.commit()
+        self.assertEqual(level_cache.for_points(2000).name, 'Master')
+        version = level_cache.version
+        level_cache.invalidate()
+        self.assertGreater(level_cache.version, version)
+        self.assertEqual(level_cache.for_points(2000).name, 'Lenda')
+
+    def test_concurrent_reload_never_mixes_tables(self):
+        def table(*levels):
+            infos = tuple(LevelInfo(i, name, points, '') for i, (name, points) in enumerate(levels, 1))
+            return LevelTable(infos, tuple(info.min_points for info in infos), {info.id: info for info in infos})
+
+        short = table(('A', 0), ('B', 100))
+        long = table(('A', 0), ('B', 100), ('C', 200), ('D', 300))
+        level_cache.all()
+        level_cache._table = short
+        errors = []
+        done = threading.Event()
+
+        def reader():
+            while not done.is_set():
+                try:
+                    self.assertIn(level_cache.for_points(10 ** 6).name, {'B', 'D'})
+                except Exception as e:
+                    errors.append(e)
+                    return
+
+        readers = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in readers:
+            thread.start()
+        # Recargas trocando a tabela enquanto os leitores resolvem níveis
+        for i in range(20000):
+            level_cache._table = long if i % 2 else short
+        done.set()
+        for thread in readers:
+            thread.join()
+        level_cache.invalidate()
+        self.assertEqual(errors, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+import unittest
+import sys
+import os
+
+# Add the project root to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+from app import create_app, db
+from datetime import date, datetime, timedelta
+from app.models import (
+    User, Team, Challenge, UserChallenge, Notification, GlobalNotification,
+    DailyChallenge, LearningPath, UserPathProgress, PointsDailyBucket
+)
+from app.utils.gamification_utils import points_in_window
+from app.migrations import migration_runner
+
+
+class MigrationsTestCase(unittest.TestCase):
+    def setUp(self):
+        class TestConfig:
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+            WTF_CSRF_ENABLED = False
+            SECRET_KEY = 'test-key'
+            CLOUDINARY_CLOUD_NAME = 'test'
+            CLOUDINARY_API_KEY = 'test'
+            CLOUDINARY_API_SECRET = 'test'
+            CACHE_TYPE = 'NullCache'
+
+        self.app_instance = create_app(TestConfig)
+        self.app_context = self.app_instance.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        with db.engine.begin() as conn:
+            conn.execute(text(f'DROP TABLE IF EXISTS {migration_runner.TABLE}'))
+        self.app_context.pop()
+
+    def _indexes(self, table):
+        return {index['name'] for index in db.inspect(db.engine).get_indexes(table)}
+
+    def test_fresh_database_is_stamped(self):
+        applied = migration_runner.applied(db.engine)
+        self.assertEqual(set(applied), {m.version for m in migration_runner.migrations})
+        self.assertEqual(migration_runner.pending(db.engine), [])
+        self.assertIn('ux_user_challenge_user_challenge', self._indexes('user_challenge'))
+        self.assertIn('ix_notification_user_read_created', self._indexes('notification'))
+        self.assertIn('ix_team_points_total', self._indexes('team'))
+
+    def test_legacy_database_is_migrated_once(self):
+        # Simula um banco anterior às migrações: sem índices e com duplicatas
+        with db.engine.begin() as conn:
+            conn.execute(text(f'DELETE FROM {migration_runner.TABLE} WHERE version >= 2'))
+            conn.execute(text('DROP INDEX ux_user_challenge_user_challenge'))
+            conn.execute(text('DROP INDEX ix_notification_user_read_created'))
+            conn.execute(text('DROP INDEX ix_team_points_total'))
+
+        user = User(name='Ana', email='ana@example.com', password='x', points=30)
+        challenge = Challenge(title='T', description='D', expected_answer='a')
+        db.session.add_all([user, challenge])
+        db.session.commit()
+        team = Team(name='Rede', owner_id=user.id)
+        db.session.add(team)
+        db.session.commit()
+        user.team_id = team.id
+        db.session.add_all([UserChallenge(user_id=user.id, challenge_id=challenge.id) for _ in range(3)])
+        db.session.commit()
+        with db.engine.begin() as conn:
+            conn.execute(text('UPDATE team SET points_total = 0'))
+        team_id = team.id
+        db.session.remove()
+
+        results = migration_runner.run(db.engine)
+        self.assertEqual([r['version'] for r in results], [m.version for m in migration_runner.migrations if m.version >= 2])
+        self.assertTrue(all(r['duration_ms'] >= 0 for r in results))
+
+        self.assertEqual(UserChallenge.query.count(), 1)
+        self.assertEqual(db.session.get(Team, team_id).points_total, 30)
+        self.assertIn('ux_user_challenge_user_challenge', self._indexes('user_challenge'))
+        self.assertIn('ix_notification_user_read_created', self._indexes('notification'))
+        self.assertIn('ix_team_points_total', self._indexes('team'))
+
+        applied = migration_runner.applied(db.engine)
+        self.assertEqual(applied[3]['name'], 'hot_filter_indexes')
+        self.assertEqual(migration_runner.run(db.engine), [])
+
+    def test_path_progress_without_started_at_is_migrated(self):
+        user = User(name='Ana', email='ana@example.com', password='x')
+        path = LearningPath(name='Trilha', reward_points=10)
+        db.session.add_all([user, path])
+        db.session.commit()
+        user_id, path_id = user.id, path.id
+        db.session.remove()
+        # Tabela como era antes da coluna started_at
+        with db.engine.begin() as conn:
+            conn.execute(text('DROP TABLE user_path_progress'))
+            conn.execute(text(
+                'CREATE TABLE user_path_progress (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, '
+                'path_id INTEGER NOT NULL, completed_at DATETIME)'
+            ))
+            conn.execute(text('INSERT INTO user_path_progress (user_id, path_id) VALUES (:user, :path)'),
+                         {'user': user_id, 'path': path_id})
+            conn.execute(text(f'DELETE FROM {migration_runner.TABLE} WHERE version = 1'))
+
+        results = migration_runner.run(db.engine)
+        self.assertEqual([r['version'] for r in results], [1])
+        progress = UserPathProgress.query.one()
+        self.assertIsNotNone(progress.started_at)
+
+        db.session.add(UserPathProgress(user_id=user_id, path_id=path_id))
+        db.session.commit()
+        self.assertEqual(UserPathProgress.query.filter(UserPathProgress.started_at.is_(None)).count(), 0)
+
+    def test_global_notifications_move_to_own_table(self):
+        user = User(name='Ana', email='ana@example.com', password='x')
+        db.session.add(user)
+        db.session.add(Notification(user_id=None, type='info', category='system', message='Aviso antigo'))
+        db.session.commit()
+        user_id = user.id
+        with db.engine.begin() as conn:
+            conn.execute(text(f'DELETE FROM {migration_runner.TABLE} WHERE version = 4'))
+        db.session.remove()
+
+        migration_runner.run(db.engine)
+        self.assertEqual(Notification.query.count(), 0)
+        moved = GlobalNotification.query.one()
+        self.assertEqual(moved.message, 'Aviso antigo')
+        self.assertEqual(db.session.get(User, user_id).global_read_id, moved.id)
+
+    def test_daily_buckets_backfilled_from_history(self):
+        today = date.today()
+        week_ago = datetime.utcnow() - timedelta(days=7)
+        user = User(name='Ana', email='ana@example.com', password='x')
+        old = Challenge(title='Antigo', description='D', expected_answer='a', points_reward=30)
+        recent = Challenge(title='Recente', description='D', expected_answer='b', points_reward=40)
+        path = LearningPath(name='Trilha', reward_points=100)
+        db.session.add_all([user, old, recent, path])
+        db.session.flush()
+        db.session.add_all([
+            UserChallenge(user_id=user.id, challenge_id=old.id, completed_at=week_ago),
+            DailyChallenge(day=week_ago.date(), challenge_id=old.id, bonus_points=15),
+            UserPathProgress(user_id=user.id, path_id=path.id, completed_at=week_ago),
+            # Hoje já passou pelo award_points: o bucket existe e não é recontado
+            UserChallenge(user_id=user.id, challenge_id=recent.id),
+            PointsDailyBucket(user_id=user.id, day=today, earned=40, spent=0),
+        ])
+        db.session.commit()
+        user_id = user.id
+        with db.engine.begin() as conn:
+            conn.execute(text(f'DELETE FROM {migration_runner.TABLE} WHERE version = 8'))
+        db.session.remove()
+
+        migration_runner.run(db.engine)
+        self.assertEqual(points_in_window(week_ago.date(), week_ago.date()), {user_id: 30 + 15 + 100})
+        self.assertEqual(points_in_window(today), {user_id: 40})
+        self.assertEqual(points_in_window(today - timedelta(days=30)), {user_id: 185})
+
+
+if __name__ == '__main__':
+    unittest.main()
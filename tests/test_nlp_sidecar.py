@@ -0,0 +1,69 @@
+import unittest
+import sys
+import os
+import tempfile
+import threading
+from collections import namedtuple
+
+# Add the project root to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.lemma_service import LemmaService
+from app.services.nlp_sidecar import NLPSidecarClient, NLPSidecarServer
+
+FakeFAQ = namedtuple('FakeFAQ', 'id question answer')
+
+
+class NLPSidecarTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.tmp.name, 'nlp.sock')
+        self.server = NLPSidecarServer(self.socket_path)
+        # Sem modelo do spaCy o sidecar usa o analisador por regex
+        self.server._nlp = None
+        self.server.analyzer_id = lambda: 'regex'
+        self.server.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        client = NLPSidecarClient(self.socket_path)
+        self.assertEqual(client.analyzer_id(), 'regex')
+        results = client.analyze(['Impressora NÃO imprime', 'Rede lenta'])
+        self.assertEqual(results, [(['impressora', 'não', 'imprime'], []), (['rede', 'lenta'], [])])
+
+    def test_concurrent_requests_share_batches(self):
+        self.server.BATCH_WAIT_SECONDS = 0.05
+        client = NLPSidecarClient(self.socket_path)
+        results = {}
+
+        def worker(i):
+            results[i] = client.analyze([f'texto {i}'])
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results[3], [(['texto', '3'], [])])
+        self.assertEqual(self.server.texts, 8)
+        self.assertLess(self.server.batches, 8)
+
+    def test_lemma_service_uses_sidecar_and_falls_back(self):
+        service = LemmaService()
+        service._sidecar = NLPSidecarClient(self.socket_path)
+        faq = FakeFAQ(1, 'Senha expirada', 'Troque a senha no portal')
+        self.assertEqual(service.analyze_faq(faq).question_terms, ['senha', 'expirada'])
+        self.assertEqual(self.server.texts, 2)
+
+        self.server.shutdown()
+        service._sidecar = NLPSidecarClient(self.socket_path)
+        self.assertIsNone(service._sidecar.analyze(['x']))
+        self.assertEqual(service.terms('VPN caiu'), ['vpn', 'caiu'])
+        self.assertFalse(service._sidecar.available)
+
+
+if __name__ == '__main__':
+    unittest.main()
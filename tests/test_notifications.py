@@ -0,0 +1,294 @@
+import unittest
+import sys
+import os
+import threading
+import time
+
+# Add the project root to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event
+from app import create_app, db
+from app.models import User, Notification, GlobalNotification
+from app.services import notification_service as notification_module
+from app.services.security_monitor import SecurityMonitor
+
+
+class FakeSocketIO:
+    """Registra os eventos emitidos e roda tarefas de fundo em threads"""
+
+    def __init__(self, on_emit=None):
+        self.emitted = []
+        self.tasks = []
+        self.on_emit = on_emit
+
+    def emit(self, event_name, payload, room=None, namespace=None):
+        if self.on_emit:
+            self.on_emit()
+        self.emitted.append((event_name, payload, room))
+
+    def start_background_task(self, target):
+        thread = threading.Thread(target=target)
+        self.tasks.append(thread)
+        thread.start()
+        return thread
+
+
+class NotificationFanOutTestCase(unittest.TestCase):
+    def setUp(self):
+        class TestConfig:
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+            WTF_CSRF_ENABLED = False
+            SECRET_KEY = 'test-key'
+            CLOUDINARY_CLOUD_NAME = 'test'
+            CLOUDINARY_API_KEY = 'test'
+            CLOUDINARY_API_SECRET = 'test'
+            CACHE_TYPE = 'NullCache'
+
+        self.app_instance = create_app(TestConfig)
+        self.app_context = self.app_instance.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        db.session.bulk_insert_mappings(User, [
+            {'name': f'Usuário {i}', 'email': f'u{i}@example.com', 'password': 'x', 'is_admin': i < 3}
+            for i in range(250)
+        ])
+        db.session.commit()
+        self.user_ids = [user_id for (user_id,) in db.session.query(User.id).order_by(User.id)]
+
+        self.commits = 0
+        self.emits_before_commit = 0
+        self.service = notification_module.notification_service
+        self.service.socketio = FakeSocketIO(on_emit=self._check_committed)
+        event.listen(db.session, 'after_commit', self._count_commit)
+
+    def tearDown(self):
+        event.remove(db.session, 'after_commit', self._count_commit)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _count_commit(self, session):
+        self.commits += 1
+
+    def _check_committed(self):
+        if self.commits == 0:
+            self.emits_before_commit += 1
+
+    def test_bulk_insert_single_commit_then_emit(self):
+        sent = self.service.notify_many(self.user_ids[:200], 'info', 'Manutenção às 22h', category='system')
+        self.assertEqual(sent, 200)
+        self.assertEqual(self.commits, 1)
+        self.assertEqual(self.emits_before_commit, 0)
+        self.assertEqual(Notification.query.filter_by(category='system').count(), 200)
+        event_name, payload, room = self.service.socketio.emitted[0]
+        self.assertEqual(event_name, 'notification')
+        self.assertEqual(room, f"user_{payload['user_id']}")
+        self.assertIsNotNone(payload['id'])
+
+    def test_large_fan_out_is_chunked(self):
+        self.service.BULK_CHUNK_SIZE = 100
+        self.service.notify_many(self.user_ids, 'info', 'Aviso geral', background=False)
+        self.assertEqual(self.commits, 3)
+        self.assertEqual(Notification.query.count(), 250)
+        self.assertEqual(len(self.service.socketio.emitted), 250)
+
+    def test_background_fan_out_does_not_hold_caller(self):
+        self.service.BACKGROUND_THRESHOLD = 10
+        self.service.notify_many(self.user_ids, 'info', 'Aviso em segundo plano')
+        for task in self.service.socketio.tasks:
+            task.join(timeout=30)
+        self.assertEqual(len(self.service.socketio.tasks), 1)
+        self.assertEqual(Notification.query.filter_by(message='Aviso em segundo plano').count(), 250)
+
+    def test_broadcast_to_10k_users_is_bounded(self):
+        db.session.bulk_insert_mappings(User, [
+            {'name': f'Extra {i}', 'email': f'extra{i}@example.com', 'password': 'x'}
+            for i in range(9750)
+        ])
+        db.session.commit()
+        user_ids = [user_id for (user_id,) in db.session.query(User.id)]
+        self.assertEqual(len(user_ids), 10000)
+
+        started = time.perf_counter()
+        self.service.notify_many(user_ids, 'info', 'Broadcast persistido')
+        returned_after = time.perf_counter() - started
+        for task in self.service.socketio.tasks:
+            task.join(timeout=60)
+        finished_after = time.perf_counter() - started
+
+        self.assertLess(returned_after, 0.5)
+        self.assertLess(finished_after, 30)
+        self.assertEqual(Notification.query.filter_by(message='Broadcast persistido').count(), 10000)
+
+    def test_security_alert_persists_once_per_super_admin(self):
+        suspect = self.user_ids[0]
+        SecurityMonitor.alert_super_admins({
+            'admin_id': suspect,
+            'severity': 'high',
+            'reasons': ['Exclusões em massa'],
+            'timestamp': '2026-01-01T10:00:00'
+        })
+        rows = Notification.query.filter_by(category='security').all()
+        self.assertEqual(sorted(n.user_id for n in rows), self.user_ids[1:3])
+        self.assertEqual(self.commits, 1)
+
+
+
+class GlobalNotificationTestCase(unittest.TestCase):
+    def setUp(self):
+        class TestConfig:
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+            WTF_CSRF_ENABLED = False
+            SECRET_KEY = 'test-key'
+            CLOUDINARY_CLOUD_NAME = 'test'
+            CLOUDINARY_API_KEY = 'test'
+            CLOUDINARY_API_SECRET = 'test'
+            CACHE_TYPE = 'NullCache'
+
+        self.app_instance = create_app(TestConfig)
+        self.app_context = self.app_instance.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.service = notification_module.notification_service
+        self.service.socketio = FakeSocketIO()
+        self.ana = User(name='Ana', email='ana@example.com', password='x')
+        self.bia = User(name='Bia', email='bia@example.com', password='x')
+        db.session.add_all([self.ana, self.bia])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_broadcast_is_stored_once_and_read_per_user(self):
+        self.service.notify_all('info', 'Manutenção programada', category='system')
+        self.service.notify_all('info', 'Nova temporada', category='system')
+        self.service.notify_user(self.ana.id, 'success', 'Desafio concluído')
+        self.assertEqual(GlobalNotification.query.count(), 2)
+        self.assertEqual(Notification.query.count(), 1)
+
+        self.assertEqual(self.service.get_unread_count(self.ana.id), 3)
+        self.assertEqual(self.service.get_unread_count(self.bia.id), 2)
+        page = self.service.get_notifications_page(self.bia.id)
+        self.assertEqual([n['message'] for n in page['notifications']], ['Nova temporada', 'Manutenção programada'])
+        self.assertTrue(all(n['is_global'] and not n['is_read'] for n in page['notifications']))
+
+        older = GlobalNotification.query.filter_by(message='Manutenção programada').one()
+        self.assertTrue(self.service.mark_global_as_read(older.id, self.bia.id))
+        self.assertEqual(self.service.get_unread_count(self.bia.id), 1)
+        unread = self.service.get_notifications_page(self.bia.id, filter_type='unread')['notifications']
+        self.assertEqual([n['message'] for n in unread], ['Nova temporada'])
+
+        self.service.mark_all_as_read(self.ana.id)
+        self.assertEqual(self.service.get_unread_count(self.ana.id), 0)
+        self.assertEqual(len(self.service.get_notifications_page(self.ana.id, filter_type='read')['notifications']), 3)
+
+    def test_unread_count_is_one_query(self):
+        self.service.notify_all('info', 'Aviso')
+        user_id = self.ana.id
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            self.assertEqual(self.service.get_unread_count(user_id), 1)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertEqual(len(statements), 1)
+
+    def test_new_users_start_after_existing_globals(self):
+        self.service.notify_all('info', 'Aviso antigo')
+        carla = User(name='Carla', email='carla@example.com', password='x')
+        db.session.add(carla)
+        db.session.commit()
+        self.assertEqual(self.service.get_unread_count(carla.id), 0)
+        self.service.notify_all('info', 'Aviso novo')
+        self.assertEqual(self.service.get_unread_count(carla.id), 1)
+
+
+
+class UnreadCounterTestCase(unittest.TestCase):
+    def setUp(self):
+        class TestConfig:
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+            WTF_CSRF_ENABLED = False
+            SECRET_KEY = 'test-key'
+            CLOUDINARY_CLOUD_NAME = 'test'
+            CLOUDINARY_API_KEY = 'test'
+            CLOUDINARY_API_SECRET = 'test'
+            CACHE_TYPE = 'NullCache'
+
+        self.app_instance = create_app(TestConfig)
+        self.app_context = self.app_instance.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.service = notification_module.notification_service
+        self.service.socketio = FakeSocketIO()
+        ana = User(name='Ana', email='ana@example.com', password='x')
+        db.session.add(ana)
+        db.session.commit()
+        self.user_id = ana.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _pushed(self):
+        return [payload['unread_count'] for name, payload, room in self.service.socketio.emitted
+                if name == 'unread_count' and room == f'user_{self.user_id}']
+
+    def test_counter_follows_every_change_and_is_pushed(self):
+        for i in range(3):
+            self.service.notify_user(self.user_id, 'info', f'Aviso {i}')
+        first, second, third = Notification.query.order_by(Notification.id).all()
+        first_id, second_id, third_id = first.id, second.id, third.id
+        self.assertEqual(self.service.socketio.emitted[-1][1]['unread_count'], 3)
+
+        self.service.mark_as_read(first_id, self.user_id)
+        self.service.mark_as_read(first_id, self.user_id)
+        self.service.mark_as_unread(first_id, self.user_id)
+        self.service.delete_notification(second_id, self.user_id)
+        self.service.mark_as_read(third_id, self.user_id)
+        self.service.clear_read_notifications(self.user_id)
+        self.service.mark_all_as_read(self.user_id)
+        self.assertEqual(self._pushed(), [2, 2, 3, 2, 1, 0])
+
+        self.service.notify_many([self.user_id], 'info', 'Lote')
+        self.assertEqual(self.service.get_unread_count(self.user_id), 1)
+        self.assertEqual(db.session.get(User, self.user_id).unread_notifications, 1)
+        from app.services.unread_counter import unread_counter
+        self.assertEqual(unread_counter.recompute(), {})
+
+    def test_cached_reads_skip_the_database(self):
+        self.service.notify_user(self.user_id, 'info', 'Pessoal')
+        self.service.get_unread_count(self.user_id)
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            self.assertEqual(self.service.get_unread_count(self.user_id), 1)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertEqual(statements, [])
+
+        # Uma nova global invalida os totais em cache
+        self.service.notify_all('info', 'Global')
+        self.assertEqual(self.service.get_unread_count(self.user_id), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add the project root to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import User, Notification, AdminLog
+from app.utils import decode_cursor, encode_cursor, estimate_count, keyset_paginate
+
+
+class KeysetPaginationTestCase(unittest.TestCase):
+    def setUp(self):
+        class TestConfig:
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+            WTF_CSRF_ENABLED = False
+            SECRET_KEY = 'test-key'
+            CLOUDINARY_CLOUD_NAME = 'test'
+            CLOUDINARY_API_KEY = 'test'
+            CLOUDINARY_API_SECRET = 'test'
+            CACHE_TYPE = 'NullCache'
+
+        self.app_instance = create_app(TestConfig)
+        self.app = self.app_instance.test_client()
+        self.app_context = self.app_instance.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.admin = User(name='Admin', email='admin@example.com', password='x', is_admin=True)
+        db.session.add(self.admin)
+        db.session.commit()
+        # Vários registros com o mesmo created_at: o id desempata
+        base = datetime(2026, 1, 1, 12, 0, 0)
+        db.session.add_all([
+            Notification(user_id=self.admin.id, type='info', category='system', message=f'Aviso {i}',
+                         is_read=i % 3 == 0, created_at=base + timedelta(minutes=i // 2))
+            for i in range(45)
+        ])
+        db.session.add_all([
+            AdminLog(admin_id=self.admin.id, action='UPDATE', resource_type='FAQ', description=f'Log {i}',
+                     created_at=base + timedelta(seconds=i))
+            for i in range(30)
+        ])
+        db.session.commit()
+        with self.app.session_transaction() as sess:
+            sess['_user_id'] = str(self.admin.id)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_cursor_round_trip(self):
+        token = encode_cursor((datetime(2026, 1, 1, 12, 30), 7), 'p')
+        self.assertEqual(decode_cursor(token), ('p', (datetime(2026, 1, 1, 12, 30), 7)))
+        with self.assertRaises(ValueError):
+            decode_cursor('nao-e-um-cursor')
+
+    def test_pages_forward_and_back_without_gaps(self):
+        query = Notification.query.filter_by(user_id=self.admin.id)
+        columns = (Notification.created_at, Notification.id)
+        expected = [n.id for n in query.order_by(Notification.created_at.desc(), Notification.id.desc()).all()]
+
+        pages, cursor = [], None
+        while True:
+            page = keyset_paginate(query, columns, cursor=cursor, per_page=10)
+            pages.append(page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual([n.id for page in pages for n in page.items], expected)
+        self.assertFalse(pages[0].has_prev)
+        self.assertEqual(len(pages[-1].items), 5)
+
+        back = keyset_paginate(query, columns, cursor=pages[2].prev_cursor, per_page=10)
+        self.assertEqual([n.id for n in back.items], [n.id for n in pages[1].items])
+        self.assertTrue(back.has_next and back.has_prev)
+
+    def test_estimate_count_is_capped(self):
+        query = Notification.query.filter_by(user_id=self.admin.id)
+        self.assertEqual(estimate_count(query), (45, True))
+        self.assertEqual(estimate_count(query, cap=20), (20, False))
+
+    def test_notifications_api_uses_cursors(self):
+        data = self.app.get('/notifications/api/list?filter=unread&per_page=20').get_json()
+        self.assertEqual((len(data['notifications']), data['total'], data['unread_count']), (20, 30, 30))
+        data = self.app.get(f"/notifications/api/list?filter=unread&per_page=20&cursor={data['next_cursor']}").get_json()
+        self.assertEqual(len(data['notifications']), 10)
+        self.assertFalse(data['has_next'])
+        self.assertTrue(data['has_prev'])
+        self.assertEqual(self.app.get('/notifications/api/list?cursor=xyz').status_code, 400)
+
+    def test_admin_logs_api_and_users_page(self):
+        data = self.app.get('/admin/logs/api/list?per_page=25&resource_type=FAQ').get_json()
+        self.assertEqual(data['logs'][0]['description'], 'Log 29')
+        data = self.app.get(f"/admin/logs/api/list?per_page=25&resource_type=FAQ&cursor={data['next_cursor']}").get_json()
+        self.assertEqual([log['description'] for log in data['logs']], [f'Log {i}' for i in range(4, -1, -1)])
+
+        response = self.app.get('/admin/users')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.app.get('/admin/users?cursor=xyz').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
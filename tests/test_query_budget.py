@@ -0,0 +1,173 @@
+import unittest
+import sys
+import os
+import html
+import re
+from datetime import datetime, timedelta
+
+# Add the project root to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event, update
+from app import create_app, db
+from app.models import (
+    User, Team, TeamBattle, BossFight, BossFightStage, BossFightStep,
+    LearningPath, PathChallenge, Challenge, FAQ, Category
+)
+from app.services.level_cache import level_cache
+
+
+class AdminQueryBudgetTestCase(unittest.TestCase):
+    """Páginas de listagem do admin rodam um número fixo de consultas"""
+
+    # Consultas máximas por página (sessão, usuário, página e carregamentos em lote)
+    BUDGETS = {
+        '/admin/users': 6,
+        '/admin/teams': 6,
+        '/admin/battles': 6,
+        '/admin/bossfights': 6,
+        '/admin/paths': 6,
+        '/admin/faqs': 6,
+    }
+
+    # Entidade listada por página: nenhuma carrega mais que uma página (50) de linhas
+    PAGE_MODELS = {
+        '/admin/users': User,
+        '/admin/teams': Team,
+        '/admin/battles': TeamBattle,
+        '/admin/bossfights': BossFight,
+        '/admin/paths': LearningPath,
+        '/admin/faqs': FAQ,
+    }
+    PER_PAGE = 50
+
+    @classmethod
+    def setUpClass(cls):
+        class TestConfig:
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+            WTF_CSRF_ENABLED = False
+            SECRET_KEY = 'test-key'
+            CLOUDINARY_CLOUD_NAME = 'test'
+            CLOUDINARY_API_KEY = 'test'
+            CLOUDINARY_API_SECRET = 'test'
+            CACHE_TYPE = 'NullCache'
+
+        cls.app_instance = create_app(TestConfig)
+        cls.app_context = cls.app_instance.app_context()
+        cls.app_context.push()
+        db.create_all()
+        cls.seed()
+
+    @classmethod
+    def tearDownClass(cls):
+        db.session.remove()
+        db.drop_all()
+        cls.app_context.pop()
+
+    @classmethod
+    def seed(cls):
+        levels = level_cache.all()
+        now = datetime.utcnow()
+        db.session.bulk_insert_mappings(User, [
+            {'id': i, 'name': f'Usuário {i:04d}', 'email': f'u{i}@example.com', 'password': 'x',
+             'points': i, 'level_id': levels[i % len(levels)].id, 'is_admin': i == 1}
+            for i in range(1, 1501)
+        ])
+        db.session.bulk_insert_mappings(Team, [
+            {'id': i, 'name': f'Equipe {i}', 'owner_id': i} for i in range(1, 301)
+        ])
+        db.session.bulk_insert_mappings(TeamBattle, [
+            {'challenging_team_id': i % 300 + 1, 'challenged_team_id': (i + 1) % 300 + 1,
+             'winner_team_id': i % 300 + 1 if i % 2 else None, 'end_time': now + timedelta(days=1)}
+            for i in range(1000)
+        ])
+        db.session.bulk_insert_mappings(BossFight, [
+            {'id': i, 'name': f'Boss {i}', 'description': 'Chefão', 'reward_points': 100} for i in range(1, 101)
+        ])
+        db.session.bulk_insert_mappings(BossFightStage, [
+            {'id': i, 'boss_fight_id': (i - 1) // 3 + 1, 'name': f'Etapa {i}', 'order': i % 3} for i in range(1, 301)
+        ])
+        db.session.bulk_insert_mappings(BossFightStep, [
+            {'stage_id': (i - 1) // 3 + 1, 'description': f'Tarefa {i}', 'expected_answer': 'ok'} for i in range(1, 901)
+        ])
+        db.session.bulk_insert_mappings(Challenge, [
+            {'id': i, 'title': f'Desafio {i}', 'description': '?', 'expected_answer': '!'} for i in range(1, 501)
+        ])
+        db.session.bulk_insert_mappings(LearningPath, [
+            {'id': i, 'name': f'Trilha {i}'} for i in range(1, 101)
+        ])
+        db.session.bulk_insert_mappings(PathChallenge, [
+            {'path_id': i // 5 + 1, 'challenge_id': i + 1, 'step': i % 5} for i in range(500)
+        ])
+        categories = Category.query.all()
+        db.session.bulk_insert_mappings(FAQ, [
+            {'category_id': categories[i % len(categories)].id, 'question': f'Pergunta {i}?', 'answer': 'Resposta'}
+            for i in range(3000)
+        ])
+        db.session.commit()
+
+    def setUp(self):
+        self.app = self.app_instance.test_client()
+        with self.app.session_transaction() as sess:
+            sess['_user_id'] = '1'
+
+    def test_admin_pages_stay_within_query_budget(self):
+        for path, budget in self.BUDGETS.items():
+            with self.subTest(path=path):
+                response = self.app.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(int(response.headers['X-Query-Count']), budget)
+
+    def test_admin_pages_load_one_page_of_rows(self):
+        for path, model in self.PAGE_MODELS.items():
+            with self.subTest(path=path):
+                loaded = []
+
+                def count(target, context):
+                    loaded.append(target)
+
+                event.listen(model, 'load', count)
+                try:
+                    response = self.app.get(path)
+                finally:
+                    event.remove(model, 'load', count)
+                self.assertEqual(response.status_code, 200)
+                # +1 para o usuário logado na listagem de usuários
+                self.assertLessEqual(len(loaded), self.PER_PAGE + 1)
+                self.assertIn(b'cursor=', response.data)
+
+
+    def test_admin_teams_pages_ignore_point_changes(self):
+        # Equipes pontuando enquanto o admin pagina: nenhuma é pulada ou repetida
+        self.addCleanup(self._reset_team_points)
+        seen, url, bump = [], '/admin/teams', 1000
+        while url:
+            loaded = []
+
+            def collect(target, context):
+                loaded.append(target.id)
+
+            event.listen(Team, 'load', collect)
+            try:
+                response = self.app.get(url)
+            finally:
+                event.remove(Team, 'load', collect)
+            self.assertEqual(response.status_code, 200)
+            # A página busca uma linha a mais para saber se há próxima
+            seen.extend(loaded[:self.PER_PAGE])
+            # As equipes ainda não vistas passam à frente na pontuação
+            db.session.execute(update(Team).where(Team.id.notin_(seen)).values(points_total=bump))
+            db.session.commit()
+            bump += 1000
+            next_link = re.search(r'href="([^"]+)"[^>]*>Próxima', response.get_data(as_text=True))
+            url = html.unescape(next_link.group(1)) if next_link else None
+        self.assertEqual(sorted(seen), list(range(1, 301)))
+
+    @staticmethod
+    def _reset_team_points():
+        db.session.execute(update(Team).values(points_total=0))
+        db.session.commit()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import sys
+import os
+import tempfile
+import threading
+import time
+
+# Add the project root to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import socketio as socketio_client
+from flask import Flask
+from flask_socketio import SocketIO, join_room
+from werkzeug.serving import make_server as make_http_server
+from app.services.socketio_queue import PubSubHub, UnixSocketManager, create_emitter, socketio_options
+
+
+def make_server(url):
+    """Servidor Socket.IO mínimo, como um worker, com a sala pedida pelo cliente"""
+    app = Flask(__name__)
+    socketio = SocketIO(app, async_mode='threading', **socketio_options(url))
+
+    @socketio.on('join')
+    def handle_join(data):
+        join_room(data['room'])
+
+    return app, socketio
+
+
+class SocketIOQueueTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.url = 'unix://' + os.path.join(self.tmp.name, 'socketio.sock')
+        self.hub = PubSubHub(self.url[len('unix://'):])
+        self.hub.start()
+
+    def tearDown(self):
+        self.hub.shutdown()
+        self.tmp.cleanup()
+
+    def _wait_for(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            result = condition()
+            if result:
+                return result
+            time.sleep(0.02)
+        self.fail('Tempo esgotado')
+
+    def test_emit_reaches_clients_of_another_worker(self):
+        _, publisher = make_server(self.url)
+        app, _ = make_server(self.url)
+        http = make_http_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=http.serve_forever, daemon=True).start()
+        self.addCleanup(http.shutdown)
+
+        received = []
+        client = socketio_client.Client()
+        client.on('*', lambda event, data: received.append((event, data)))
+        client.connect(f'http://127.0.0.1:{http.server_port}', transports=['polling'])
+        self.addCleanup(client.disconnect)
+        client.call('join', {'room': 'user_7'})
+        self._wait_for(lambda: self.hub.subscribers == 1)
+
+        # Emits fora de requisição, como um job em segundo plano
+        publisher.emit('notification', {'message': 'Backup concluído'}, room='user_7')
+        publisher.emit('notification', {'message': 'Outra sala'}, room='user_8')
+        create_emitter(self.url).emit('unread_count', {'unread_count': 3}, room='user_7')
+
+        self._wait_for(lambda: len(received) >= 2)
+        time.sleep(0.2)
+        self.assertEqual(
+            sorted(received, key=lambda item: item[0]),
+            [('notification', {'message': 'Backup concluído'}), ('unread_count', {'unread_count': 3})]
+        )
+
+    def test_create_app_uses_configured_queue(self):
+        from app import create_app
+
+        class TestConfig:
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+            WTF_CSRF_ENABLED = False
+            SECRET_KEY = 'test-key'
+            SOCKETIO_ASYNC_MODE = 'threading'
+            SOCKETIO_MESSAGE_QUEUE = self.url
+
+        app = create_app(TestConfig)
+        self.assertIsInstance(app.socketio.server.manager, UnixSocketManager)
+        self.assertEqual(app.socketio.server.manager.socket_path, self.url[len('unix://'):])
+
+
+if __name__ == '__main__':
+    unittest.main()
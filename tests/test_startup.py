@@ -0,0 +1,74 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add the project root to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db, initialize_database
+from app.migrations import migration_runner
+from app.utils.startup_profile import parse_importtime, profile_startup
+
+
+class StartupTestCase(unittest.TestCase):
+    def setUp(self):
+        class TestConfig:
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+            WTF_CSRF_ENABLED = False
+            SECRET_KEY = 'test-key'
+            CLOUDINARY_CLOUD_NAME = 'test'
+            CLOUDINARY_API_KEY = 'test'
+            CLOUDINARY_API_SECRET = 'test'
+            CACHE_TYPE = 'NullCache'
+
+        self.app_instance = create_app(TestConfig)
+        self.app_context = self.app_instance.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_schema_check_is_skipped_when_version_matches(self):
+        self.assertTrue(self.app_instance.startup_profile.schema_checked)
+        self.assertFalse(initialize_database())
+        migration_runner.set_meta(db.engine, 'boot_version', 'antiga')
+        self.assertTrue(initialize_database())
+        self.assertFalse(initialize_database())
+
+    def test_parse_importtime_groups_self_time_by_package(self):
+        output = '\n'.join([
+            'import time: self [us] | cumulative | imported package',
+            'import time:      1000 |       1000 |   spacy.util',
+            'import time:      4000 |       5000 | spacy',
+            'import time:      1500 |       2000 | flask',
+            'import time:       500 |        500 |   flask.cli',
+        ])
+        self.assertEqual(parse_importtime(output), [('spacy', 5.0), ('flask', 2.0)])
+
+    def test_cold_start(self):
+        # Dois boots a frio em processos novos contra o mesmo banco em arquivo
+        with tempfile.TemporaryDirectory() as data_dir:
+            env = {
+                'DATABASE_URL': 'sqlite:///' + os.path.join(data_dir, 'startup.db'),
+                'SOCKETIO_ASYNC_MODE': 'threading',
+                'REDIS_URL': '',
+            }
+            first = profile_startup(env=env)
+            second = profile_startup(env=env)
+
+        print(f"\nBoot a frio: import {second['import_ms']:.0f} ms, create_app {second['create_app_ms']:.0f} ms")
+        self.assertTrue(first['schema_checked'])
+        self.assertFalse(second['schema_checked'])
+        self.assertEqual(second['deferred_loaded'], [])
+        phases = dict(second['phases'])
+        self.assertIn('database', phases)
+        self.assertLess(phases['database'], dict(first['phases'])['database'])
+        self.assertTrue(second['imports'])
+
+
+if __name__ == '__main__':
+    unittest.main()
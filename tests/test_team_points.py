@@ -0,0 +1,103 @@
+import unittest
+import sys
+import os
+
+# Add the project root to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import User, Team
+from app.services.team_points import team_points
+from app.utils import award_points
+
+
+class TeamPointsTestCase(unittest.TestCase):
+    def setUp(self):
+        class TestConfig:
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+            WTF_CSRF_ENABLED = False
+            SECRET_KEY = 'test-key'
+            CLOUDINARY_CLOUD_NAME = 'test'
+            CLOUDINARY_API_KEY = 'test'
+            CLOUDINARY_API_SECRET = 'test'
+            CACHE_TYPE = 'NullCache'
+
+        self.app_instance = create_app(TestConfig)
+        self.app = self.app_instance.test_client()
+        self.app_context = self.app_instance.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.owner = User(name='Dono', email='dono@example.com', password='x', points=100)
+        self.member = User(name='Membro', email='membro@example.com', password='x', points=40)
+        db.session.add_all([self.owner, self.member])
+        db.session.commit()
+        self.team = Team(name='Suporte', owner_id=self.owner.id)
+        db.session.add(self.team)
+        db.session.commit()
+        self.owner.team = self.team
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def login(self, user):
+        with self.app.session_transaction() as sess:
+            sess['_user_id'] = str(user.id)
+
+    def test_total_follows_membership_and_points(self):
+        self.assertEqual(self.team.points_total, 100)
+
+        self.login(self.member)
+        self.app.post(f'/teams/join/{self.team.id}')
+        self.assertEqual(self.team.points_total, 140)
+
+        award_points(self.member, 25, 'challenge')
+        db.session.commit()
+        self.assertEqual(self.team.points_total, 165)
+
+        self.app.post('/teams/leave')
+        self.assertEqual(self.team.points_total, 100)
+
+    def test_kick_and_delete_user(self):
+        self.member.team_id = self.team.id
+        db.session.commit()
+        self.login(self.owner)
+        self.app.post(f'/teams/kick/{self.member.id}')
+        self.assertEqual(self.team.points_total, 100)
+
+        self.member.team_id = self.team.id
+        db.session.commit()
+        db.session.delete(self.member)
+        db.session.commit()
+        self.assertEqual(self.team.points_total, 100)
+
+    def test_rollback_keeps_total(self):
+        self.owner.points += 500
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual(self.team.points_total, 100)
+
+    def test_recompute_repairs_drift(self):
+        db.session.execute(Team.__table__.update().values(points_total=7))
+        db.session.commit()
+        self.assertEqual(team_points.recompute(), {self.team.id: (7, 100)})
+        self.assertEqual(self.team.points_total, 100)
+        self.assertEqual(team_points.recompute(), {})
+
+        result = self.app_instance.test_cli_runner().invoke(args=['repair-team-points'])
+        self.assertIn('0 equipe(s) corrigida(s).', result.output)
+
+    def test_standings_single_query(self):
+        rival = Team(name='Redes', owner_id=self.member.id)
+        db.session.add(rival)
+        db.session.commit()
+        self.assertEqual([(team.name, count) for team, count in team_points.standings()],
+                         [('Suporte', 1), ('Redes', 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
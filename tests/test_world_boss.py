@@ -0,0 +1,130 @@
+import unittest
+import sys
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+# Add the project root to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models import User, GlobalEvent, GlobalEventContribution, GlobalEventDamageShard
+from app.services.world_boss import world_boss
+
+
+class WorldBossTestCase(unittest.TestCase):
+    def setUp(self):
+        # Banco em arquivo: cada thread usa a própria conexão, como os workers
+        self.tmp = tempfile.TemporaryDirectory()
+        database_path = os.path.join(self.tmp.name, 'boss.db')
+
+        class TestConfig:
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{database_path}'
+            WTF_CSRF_ENABLED = False
+            SECRET_KEY = 'test-key'
+            CACHE_TYPE = 'NullCache'
+
+        self.app_instance = create_app(TestConfig)
+        self.app_context = self.app_instance.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        db.session.bulk_insert_mappings(User, [
+            {'name': f'Jogador {i}', 'email': f'j{i}@example.com', 'password': 'x'} for i in range(20)
+        ])
+        now = datetime.utcnow()
+        event = GlobalEvent(name='Dragão', description='Boss', total_hp=1000, current_hp=1000,
+                            start_date=now - timedelta(hours=1), end_date=now + timedelta(hours=1), is_active=True)
+        db.session.add(event)
+        db.session.commit()
+        self.event_id = event.id
+        self.user_ids = [user_id for (user_id,) in db.session.query(User.id).order_by(User.id)]
+
+    def tearDown(self):
+        world_boss.shards = 0
+        world_boss._last_merge = {}
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+        self.app_context.pop()
+        self.tmp.cleanup()
+
+    def _hp(self):
+        db.session.expire_all()
+        return db.session.get(GlobalEvent, self.event_id).current_hp
+
+    def test_damage_floors_at_zero_and_defeat_is_reported_once(self):
+        first = world_boss.apply_damage(self.event_id, self.user_ids[0], 600)
+        second = world_boss.apply_damage(self.event_id, self.user_ids[0], 600)
+        third = world_boss.apply_damage(self.event_id, self.user_ids[1], 600)
+        db.session.commit()
+
+        self.assertEqual((first.current_hp, first.defeated), (400, False))
+        self.assertEqual((second.current_hp, second.defeated), (0, True))
+        self.assertEqual(third.damage, 0)
+        self.assertEqual(self._hp(), 0)
+        contributions = {c.user_id: c.contribution_points for c in GlobalEventContribution.query}
+        self.assertEqual(contributions, {self.user_ids[0]: 1200})
+
+    def test_concurrent_submissions_lose_no_damage(self):
+        errors = []
+
+        def submit(user_id):
+            with self.app_instance.app_context():
+                try:
+                    for _ in range(5):
+                        world_boss.apply_damage(self.event_id, user_id, 7)
+                        db.session.commit()
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    db.session.remove()
+
+        threads = [threading.Thread(target=submit, args=(user_id,)) for user_id in self.user_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=60)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self._hp(), 1000 - 20 * 5 * 7)
+        self.assertEqual(GlobalEventContribution.query.count(), 20)
+        self.assertEqual(db.session.query(db.func.sum(GlobalEventContribution.contribution_points)).scalar(), 700)
+
+    def test_sharded_damage_is_applied_on_merge(self):
+        world_boss.shards = 4
+        world_boss.merge_seconds = 3600
+        world_boss._last_merge[self.event_id] = float('inf')
+        for user_id in self.user_ids[:10]:
+            world_boss.apply_damage(self.event_id, user_id, 30)
+        db.session.commit()
+        self.assertEqual(self._hp(), 1000)
+        self.assertEqual(world_boss.pending_damage(self.event_id), 300)
+        self.assertLessEqual(GlobalEventDamageShard.query.count(), 4)
+
+        merged = world_boss.merge(self.event_id)
+        db.session.commit()
+        self.assertEqual((merged.damage, merged.current_hp), (300, 700))
+        self.assertEqual(self._hp(), 700)
+        self.assertEqual(world_boss.pending_damage(self.event_id), 0)
+
+    def test_sharded_damage_stops_once_event_is_defeated(self):
+        world_boss.shards = 4
+        world_boss._last_merge[self.event_id] = float('inf')
+        world_boss.apply_damage(self.event_id, self.user_ids[0], 1000)
+        db.session.commit()
+        self.assertTrue(world_boss.merge(self.event_id).defeated)
+        db.session.commit()
+
+        late = world_boss.apply_damage(self.event_id, self.user_ids[1], 30)
+        db.session.commit()
+        self.assertEqual(late.damage, 0)
+        self.assertEqual(world_boss.pending_damage(self.event_id), 0)
+        contributions = {c.user_id: c.contribution_points for c in GlobalEventContribution.query}
+        self.assertEqual(contributions, {self.user_ids[0]: 1000})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,213 @@
+import unittest
+import sys
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Add the project root to the python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event
+from app import create_app, db
+from app.extensions import cache
+from app.models import User, GlobalEvent
+from app.services.world_boss import world_boss
+from app.services.world_boss_stream import WorldBossStream, world_boss_stream
+
+
+class FakeSocketIO:
+    """Registra os emits (com o instante) e roda tarefas de fundo em threads"""
+
+    def __init__(self):
+        self.emitted = []
+        self.tasks = []
+
+    def emit(self, event_name, payload, room=None, namespace=None):
+        self.emitted.append((time.monotonic(), event_name, room, payload))
+
+    def start_background_task(self, target):
+        thread = threading.Thread(target=target)
+        self.tasks.append(thread)
+        thread.start()
+        return thread
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class WorldBossStreamTestCase(unittest.TestCase):
+    def setUp(self):
+        class TestConfig:
+            TESTING = True
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+            WTF_CSRF_ENABLED = False
+            SECRET_KEY = 'test-key'
+
+        self.app_instance = create_app(TestConfig)
+        self.app_context = self.app_instance.app_context()
+        self.app_context.push()
+        db.create_all()
+        cache.clear()
+
+        user = User(name='Jogador', email='jogador@example.com', password='x')
+        now = datetime.utcnow()
+        boss = GlobalEvent(name='Dragão', description='Boss', total_hp=10 ** 9, current_hp=10 ** 9,
+                           start_date=now - timedelta(hours=1), end_date=now + timedelta(hours=1), is_active=True)
+        db.session.add_all([user, boss])
+        db.session.commit()
+        self.user_id, self.event_id = user.id, boss.id
+
+        self.event_queries = 0
+        event.listen(db.engine, 'before_cursor_execute', self._count_event_queries)
+
+    def tearDown(self):
+        event.remove(db.engine, 'before_cursor_execute', self._count_event_queries)
+        cache.clear()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _count_event_queries(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and 'global_event' in statement:
+            self.event_queries += 1
+
+    def test_soak_thousands_of_damage_events_per_second(self):
+        socketio = FakeSocketIO()
+        stream = WorldBossStream(socketio, self.app_instance)
+        stream.interval = 0.25
+        self.assertEqual(stream.snapshot().current_hp, 10 ** 9)
+
+        state = {'hp': 10 ** 9, 'damage': 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + 1.5
+
+        def attacker():
+            while time.monotonic() < deadline:
+                with lock:
+                    state['hp'] -= 3
+                    state['damage'] += 3
+                    stream.record(self.event_id, 3, state['hp'])
+
+        started = time.monotonic()
+        attackers = [threading.Thread(target=attacker) for _ in range(4)]
+        for thread in attackers:
+            thread.start()
+        for thread in attackers:
+            thread.join()
+        elapsed = time.monotonic() - started
+        for task in socketio.tasks:
+            task.join(timeout=5)
+
+        self.assertGreater(stream.received / elapsed, 2000)
+        self.assertEqual(len(socketio.tasks), 1)
+        ticks = [emitted_at for emitted_at, _, _, _ in socketio.emitted]
+        payloads = [payload for _, _, _, payload in socketio.emitted]
+        # No máximo ~4 atualizações por segundo, independentemente da taxa de dano
+        self.assertLessEqual(len(ticks), elapsed / stream.interval + 2)
+        self.assertTrue(all(later - earlier >= 0.2 for earlier, later in zip(ticks, ticks[1:])))
+        self.assertEqual({(name, room) for _, name, room, _ in socketio.emitted}, {('world_boss_hp', 'world_boss')})
+        # Nenhum dano perdido entre ticks e o último HP é o real
+        self.assertEqual(sum(payload['damage'] for payload in payloads), state['damage'])
+        self.assertEqual(payloads[-1]['current_hp'], state['hp'])
+
+        queries = self.event_queries
+        self.assertEqual(stream.snapshot().current_hp, state['hp'])
+        self.assertEqual(self.event_queries, queries)
+
+    def _global_stream(self):
+        """Stream global com FakeSocketIO; sem laço de fundo, o teste chama flush() diretamente"""
+        socketio = FakeSocketIO()
+        original = world_boss_stream.socketio
+        world_boss_stream.socketio = socketio
+        # Descarta danos de outros testes e espera o laço de fundo encerrar
+        world_boss_stream._pending = {}
+        world_boss_stream._unmerged = {}
+        deadline = time.monotonic() + 5
+        while world_boss_stream._running and time.monotonic() < deadline:
+            time.sleep(0.05)
+        world_boss_stream._running = True
+
+        def restore():
+            world_boss_stream.socketio = original
+            world_boss_stream._running = False
+            world_boss_stream._pending = {}
+            world_boss_stream._unmerged = {}
+            world_boss.shards = 0
+            world_boss._last_merge = {}
+
+        self.addCleanup(restore)
+        return socketio
+
+    def test_committed_damage_updates_cached_snapshot(self):
+        socketio = self._global_stream()
+        self.assertEqual(world_boss_stream.snapshot().current_hp, 10 ** 9)
+        self.assertEqual(world_boss_stream.snapshot().current_hp, 10 ** 9)
+        self.assertEqual(self.event_queries, 1)
+
+        world_boss.apply_damage(self.event_id, self.user_id, 50)
+        db.session.rollback()
+        self.assertEqual(world_boss_stream.flush(), 0)
+
+        world_boss.apply_damage(self.event_id, self.user_id, 50)
+        world_boss.apply_damage(self.event_id, self.user_id, 70)
+        db.session.commit()
+        self.assertEqual(world_boss_stream.flush(), 1)
+        [(_, name, room, payload)] = socketio.emitted
+        self.assertEqual((name, room), ('world_boss_hp', 'world_boss'))
+        self.assertEqual((payload['damage'], payload['current_hp'], payload['defeated']), (120, 10 ** 9 - 120, False))
+
+        queries = self.event_queries
+        self.assertEqual(world_boss_stream.snapshot().current_hp, 10 ** 9 - 120)
+        self.assertEqual(self.event_queries, queries)
+
+        world_boss.apply_damage(self.event_id, self.user_id, 10 ** 9)
+        db.session.commit()
+        world_boss_stream.flush()
+        self.assertTrue(socketio.emitted[-1][3]['defeated'])
+        self.assertIsNone(world_boss_stream.snapshot())
+
+    def test_tick_merges_sharded_damage_without_new_submissions(self):
+        socketio = self._global_stream()
+        world_boss.shards = 4
+        world_boss._last_merge[self.event_id] = float('inf')
+        world_boss.apply_damage(self.event_id, self.user_id, 40)
+        world_boss.apply_damage(self.event_id, self.user_id, 60)
+        db.session.commit()
+        self.assertEqual(world_boss_stream.flush(), 1)
+        self.assertEqual(world_boss.pending_damage(self.event_id), 100)
+        self.assertEqual(world_boss_stream.stats()['unmerged_events'], 1)
+
+        # Sem novas submissões, o tick seguinte aplica as fatias quando o merge vence
+        world_boss._last_merge[self.event_id] = 0.0
+        world_boss_stream.flush()
+        self.assertEqual(world_boss.pending_damage(self.event_id), 0)
+        self.assertEqual(world_boss_stream.stats()['unmerged_events'], 0)
+        world_boss_stream.flush()
+        self.assertEqual(socketio.emitted[-1][3]['current_hp'], 10 ** 9 - 100)
+        db.session.expire_all()
+        self.assertEqual(db.session.get(GlobalEvent, self.event_id).current_hp, 10 ** 9 - 100)
+
+
+    def test_unmerged_damage_never_announces_defeat(self):
+        socketio = self._global_stream()
+        world_boss.shards = 4
+        world_boss._last_merge[self.event_id] = float('inf')
+        world_boss.apply_damage(self.event_id, self.user_id, 10 ** 9)
+        db.session.commit()
+        world_boss_stream.flush()
+        payload = socketio.emitted[-1][3]
+        # HP estimado para exibição, mas o snapshot segue com o HP real do banco
+        self.assertEqual((payload['current_hp'], payload['defeated']), (1, False))
+        self.assertEqual(world_boss_stream.snapshot().current_hp, 10 ** 9)
+
+        world_boss._last_merge[self.event_id] = 0.0
+        world_boss_stream.flush()
+        world_boss_stream.flush()
+        payload = socketio.emitted[-1][3]
+        self.assertEqual((payload['current_hp'], payload['defeated']), (0, True))
+        self.assertIsNone(world_boss_stream.snapshot())
+
+
+if __name__ == '__main__':
+    unittest.main()